@@ -0,0 +1,154 @@
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import tracing
+
+# --- 1. 설정 ---
+
+# 동시에 처리하는 요청 수와 대기열 길이, 대기열에서 기다리는 최대 시간 (초). 넘치면 "혼잡" 응답으로 바로 거절합니다.
+MAX_ACTIVE_REQUESTS = int(os.getenv("SOCY_MAX_ACTIVE_REQUESTS", "8"))
+MAX_QUEUED_REQUESTS = int(os.getenv("SOCY_MAX_QUEUED_REQUESTS", "32"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("SOCY_QUEUE_TIMEOUT_SECONDS", "15"))
+
+# 외부 서비스별 동시 호출 수 상한 (Gemini 429, Neo4j 커넥션 풀 고갈 방지)과 슬롯을 기다리는 최대 시간 (초)
+DEPENDENCY_LIMITS = {
+    "llm": int(os.getenv("SOCY_LLM_CONCURRENCY", "4")),
+    "embedding": int(os.getenv("SOCY_EMBEDDING_CONCURRENCY", "8")),
+    "neo4j": int(os.getenv("SOCY_NEO4J_CONCURRENCY", "16")),
+}
+DEPENDENCY_TIMEOUT_SECONDS = float(os.getenv("SOCY_DEPENDENCY_TIMEOUT_SECONDS", "5"))
+
+# LLM 슬롯을 얻지 못하면 오류 대신 추천 논문 목록만 보여줄지 여부 (빠른 목록 모드로 강등)
+DEGRADE_TO_RETRIEVAL_ONLY = os.getenv("SOCY_DEGRADE_TO_RETRIEVAL_ONLY", "1") == "1"
+
+
+class ServerBusyError(RuntimeError):
+    """요청이 너무 많아 처리하지 않고 거절했음을 나타냅니다. (reason: queue_full, queue_timeout, 또는 외부 서비스 이름)"""
+
+    def __init__(self, reason):
+        super().__init__(f"지금은 요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해 주세요. ({reason})")
+        self.reason = reason
+
+
+# --- 2. 요청 승인 (세션 간 공정 대기열) ---
+
+class _Ticket:
+    __slots__ = ("session_id", "granted")
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    요청 단위 동시 처리 수를 제한하고, 빈자리가 나면 세션을 돌아가며(라운드 로빈) 대기 중인 요청을 승인합니다.
+    한 세션이 요청을 연달아 보내도 다른 세션의 요청이 뒤로 밀리지 않습니다.
+    외부 서비스(LLM, 임베딩, Neo4j)별 동시 호출 수도 함께 제한합니다. 한 프로세스의 모든 세션(스레드)이 공유합니다.
+    """
+
+    def __init__(self, max_active=MAX_ACTIVE_REQUESTS, max_queued=MAX_QUEUED_REQUESTS,
+                 queue_timeout=QUEUE_TIMEOUT_SECONDS, dependency_limits=None,
+                 dependency_timeout=DEPENDENCY_TIMEOUT_SECONDS):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.dependency_timeout = dependency_timeout
+        self._condition = threading.Condition()
+        self._active = 0
+        self._queued = 0
+        # 세션 ID -> 그 세션의 대기 요청(도착 순서). 딕셔너리 순서가 곧 다음에 승인할 세션의 순번입니다.
+        self._session_queues = OrderedDict()
+        self._dependencies = {name: threading.BoundedSemaphore(limit)
+                              for name, limit in (dependency_limits or DEPENDENCY_LIMITS).items()}
+        self._stats = {"admitted": 0, "queued": 0, "rejected": 0}
+
+    def _grant_next(self):
+        """빈자리에 다음 순번 세션의 가장 오래된 요청을 승인하고, 그 세션은 순번 맨 뒤로 보냅니다."""
+        while self._active < self.max_active and self._session_queues:
+            session_id, tickets = self._session_queues.popitem(last=False)
+            ticket = tickets.popleft()
+            if tickets:
+                self._session_queues[session_id] = tickets
+            ticket.granted = True
+            self._queued -= 1
+            self._active += 1
+        self._condition.notify_all()
+
+    def _reject(self, reason):
+        self._stats["rejected"] += 1
+        tracing.increment("admission_rejections_total", reason=reason)
+        raise ServerBusyError(reason)
+
+    def acquire(self, session_id):
+        """요청 처리 자리를 얻을 때까지 기다립니다. 대기열이 가득 찼거나 QUEUE_TIMEOUT_SECONDS를 넘기면 ServerBusyError."""
+        start_time = time.monotonic()
+        with self._condition:
+            if self._active < self.max_active and not self._session_queues:
+                self._active += 1
+                self._stats["admitted"] += 1
+                return
+            if self._queued >= self.max_queued:
+                self._reject("queue_full")
+
+            ticket = _Ticket(session_id)
+            self._session_queues.setdefault(session_id, deque()).append(ticket)
+            self._queued += 1
+            self._stats["queued"] += 1
+            deadline = start_time + self.queue_timeout
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    tickets = self._session_queues[session_id]
+                    tickets.remove(ticket)
+                    if not tickets:
+                        del self._session_queues[session_id]
+                    self._queued -= 1
+                    self._reject("queue_timeout")
+                self._condition.wait(remaining)
+            self._stats["admitted"] += 1
+        tracing.observe("admission_wait_seconds", time.monotonic() - start_time)
+
+    def release(self):
+        with self._condition:
+            self._active -= 1
+            self._grant_next()
+
+    @contextmanager
+    def admit(self, session_id):
+        """`with controller.admit(세션 ID):` 블록 동안 요청 처리 자리를 차지합니다."""
+        self.acquire(session_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    # 외부 서비스별 동시 호출 제한
+
+    def acquire_dependency(self, name, timeout=None):
+        """외부 서비스 호출 슬롯을 얻으면 True, timeout(기본값: DEPENDENCY_TIMEOUT_SECONDS) 안에 얻지 못하면 False."""
+        acquired = self._dependencies[name].acquire(timeout=self.dependency_timeout if timeout is None else timeout)
+        if not acquired:
+            tracing.increment("dependency_saturation_total", dependency=name)
+        return acquired
+
+    def release_dependency(self, name):
+        self._dependencies[name].release()
+
+    @contextmanager
+    def dependency(self, name):
+        """`with controller.dependency("neo4j"):` 블록 동안 슬롯을 차지합니다. 슬롯을 얻지 못하면 ServerBusyError."""
+        if not self.acquire_dependency(name):
+            raise ServerBusyError(name)
+        try:
+            yield
+        finally:
+            self.release_dependency(name)
+
+    def stats(self):
+        """처리 중/대기 중 요청 수와 누적 승인·대기·거절 횟수를 반환합니다."""
+        with self._condition:
+            return dict(self._stats, active=self._active, waiting=self._queued)
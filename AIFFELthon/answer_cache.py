@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import tracing
+
+# --- 1. 설정 ---
+
+# 보관할 최대 답변 수와 답변을 재사용할 수 있는 시간 (초). 가득 차면 가장 오래 쓰이지 않은 답변부터 버립니다.
+ANSWER_CACHE_SIZE = int(os.getenv("SOCY_ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("SOCY_ANSWER_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+# 질문 임베딩의 코사인 유사도가 이 값 이상이어야 같은 질문(말만 바꾼 질문)으로 봅니다.
+SIMILARITY_THRESHOLD = float(os.getenv("SOCY_ANSWER_CACHE_SIMILARITY", "0.9"))
+# 질문이 비슷해도 이번에 찾은 논문 집합과 캐시된 답변의 논문 집합이 이만큼(Jaccard) 겹쳐야 재사용합니다.
+# (컨텍스트 논문 5편 기준으로 4편 이상 같아야 함. 데이터가 갱신되어 추천이 바뀌면 자연히 다시 생성됩니다)
+MIN_PAPER_OVERLAP = 0.6
+# 캐시된 답변을 스트리밍처럼 나누어 보낼 때 한 조각의 글자 수
+REPLAY_CHUNK_CHARS = 32
+
+
+# --- 2. 의미 기반 답변 캐시 ---
+
+def paper_overlap(paper_ids, other_paper_ids):
+    """두 논문 집합의 Jaccard 유사도를 반환합니다."""
+    paper_ids, other_paper_ids = set(paper_ids), set(other_paper_ids)
+    union = paper_ids | other_paper_ids
+    return len(paper_ids & other_paper_ids) / len(union) if union else 0.0
+
+
+class SemanticAnswerCache:
+    """
+    최종 답변을 질문 임베딩·컨텍스트 논문 집합과 함께 보관하고,
+    임베딩이 충분히 가깝고 논문 집합이 겹치는 새 질문에 그 답변을 돌려줍니다.
+    임베딩은 미리 할당한 행렬의 슬롯에 정규화해 두므로 조회는 행렬-벡터 곱 한 번으로 끝납니다.
+    크기 제한(LRU)과 유효 시간(TTL)으로 항목을 버리며, 여러 스레드에서 함께 사용해도 안전합니다.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+                 similarity_threshold=SIMILARITY_THRESHOLD, min_paper_overlap=MIN_PAPER_OVERLAP):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.min_paper_overlap = min_paper_overlap
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "lru_evictions": 0, "ttl_evictions": 0,
+                       "follow_up_skipped": 0, "no_embedding_skipped": 0}
+        self._reset()
+
+    def _reset(self):
+        # 항목 키 -> {"question", "paper_ids", "answer", "created_at", "slot"} (LRU 순서: 앞쪽이 가장 오래 쓰이지 않은 항목)
+        self._entries = OrderedDict()
+        self._vectors = None
+        self._slot_keys = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        self._next_key = 0
+
+    def clear(self):
+        """모든 항목을 버립니다. (통계는 유지)"""
+        with self._lock:
+            self._reset()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _normalize(self, embedding):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _evict(self, key, reason):
+        entry = self._entries.pop(key)
+        self._vectors[entry["slot"]] = 0.0
+        self._slot_keys[entry["slot"]] = None
+        self._free_slots.append(entry["slot"])
+        self._stats[f"{reason}_evictions"] += 1
+        tracing.increment("answer_cache_evictions_total", reason=reason)
+
+    def _evict_expired(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry["created_at"] >= self.ttl_seconds]
+        for key in expired:
+            self._evict(key, "ttl")
+
+    def lookup(self, embedding, paper_ids):
+        """
+        유사도 기준과 논문 집합 겹침 기준을 모두 만족하는 가장 가까운 질문의 답변을 반환합니다. (없으면 None)
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            answer = None
+            if vector is not None and self._vectors is not None and len(vector) == self._vectors.shape[1]:
+                similarities = self._vectors @ vector
+                candidates = np.flatnonzero(similarities >= self.similarity_threshold)
+                now = time.monotonic()
+                for slot in candidates[np.argsort(-similarities[candidates], kind="stable")]:
+                    key = self._slot_keys[slot]
+                    if key is None:
+                        continue
+                    entry = self._entries[key]
+                    if now - entry["created_at"] >= self.ttl_seconds:
+                        self._evict(key, "ttl")
+                        continue
+                    if paper_overlap(paper_ids, entry["paper_ids"]) >= self.min_paper_overlap:
+                        self._entries.move_to_end(key)
+                        answer = entry["answer"]
+                        break
+            self._stats["hits" if answer is not None else "misses"] += 1
+        tracing.increment("answer_cache_lookups_total", result="hit" if answer is not None else "miss")
+        return answer
+
+    def skip(self, reason):
+        """
+        캐시를 조회하지 않은 요청을 사유별로 셉니다. (적중률 계산에서는 제외)
+        - follow_up: 직전 턴을 가리키는 후속 질문
+        - no_embedding: 질문 임베딩이 없음 (벡터 검색 시간 초과 등)
+        """
+        with self._lock:
+            self._stats[f"{reason}_skipped"] += 1
+        tracing.increment("answer_cache_lookups_total", result=f"{reason}_skipped")
+
+    def store(self, question, embedding, paper_ids, answer):
+        """생성이 끝난 답변을 질문 임베딩·컨텍스트 논문 집합과 함께 보관합니다."""
+        vector = self._normalize(embedding)
+        if vector is None or not paper_ids or not answer or self.max_entries <= 0:
+            return
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                # 첫 항목이거나 임베딩 모델(차원)이 바뀌었으면 행렬을 새로 만듭니다.
+                self._reset()
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            self._evict_expired(time.monotonic())
+            if not self._free_slots:
+                self._evict(next(iter(self._entries)), "lru")
+
+            slot = self._free_slots.pop()
+            key = self._next_key
+            self._next_key += 1
+            self._vectors[slot] = vector
+            self._slot_keys[slot] = key
+            self._entries[key] = {"question": question, "paper_ids": frozenset(paper_ids), "answer": answer,
+                                  "created_at": time.monotonic(), "slot": slot}
+            self._stats["stores"] += 1
+        tracing.increment("answer_cache_stores_total")
+
+    def stats(self):
+        """조회/저장/제거 횟수와 적중률, 현재 항목 수를 반환합니다."""
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+def replay_answer(answer, chunk_chars=REPLAY_CHUNK_CHARS):
+    """캐시된 답변을 LLM 스트리밍과 같은 방식으로 소비할 수 있도록 작은 조각으로 나누어 내보냅니다."""
+    for start in range(0, len(answer), chunk_chars):
+        yield answer[start:start + chunk_chars]
@@ -4,6 +4,9 @@ import time
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 import logging
+import argparse
+
+from run_ledger import RunLedger, claim_batch
 
 # --- 0. 로깅 설정 ---
 logging.basicConfig(
@@ -25,8 +28,11 @@ NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD") # .env 파일에서 불러옵니다
 
 # Semantic Scholar API 키
 S2_API_KEY = os.getenv("SEMANTIC_SCHOLAR_API_KEY")
-AUTHOR_API_URL = "https://api.semanticscholar.org/graph/v1/author/"
+# API 주소 (벤치마크 시 mock_s2_server.py 주소로 바꿔 실행할 수 있습니다)
+S2_API_BASE_URL = os.getenv("S2_API_BASE_URL", "https://api.semanticscholar.org/graph/v1").rstrip("/")
+AUTHOR_API_URL = f"{S2_API_BASE_URL}/author/"
 AUTHOR_FIELDS = "hIndex,paperCount,citationCount,affiliations" # 가져올 저자 필드
+BATCH_SIZE = 100 # 한 번에 API로 조회해 한 트랜잭션으로 저장하는 저자 수
 
 # API 요청 헤더 설정
 headers = {}
@@ -41,29 +47,44 @@ driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
 
 # --- 2. Neo4j 데이터 조회 및 업데이트 함수 ---
 
-def get_authors_to_enrich(tx):
-    """
-    Neo4j에서 hIndex가 없는 저자 ID 목록을 가져옵니다.
-    """
-    query = """
+# 저자 정보 강화에 사용하는 Cypher 질의 (query_profiler.py가 PROFILE 대상으로 사용합니다)
+PENDING_AUTHOR_COUNT_QUERY = """
     MATCH (a:Author)
     WHERE a.authorId IS NOT NULL AND (a.hIndex IS NULL OR a.hIndex = 0)
-    RETURN a.authorId AS authorId
-    LIMIT 100
+    RETURN count(a) AS total
     """
-    result = tx.run(query)
-    return [record["authorId"] for record in result]
 
-def update_author_details(tx, author_data_list):
-    """
-    Neo4j의 저자 노드에 상세 정보를 업데이트합니다.
+# authorId 순서로 커서 이후의 저자만 가져오므로, 재시작하거나 API가 404를 돌려준 저자가 남아 있어도 같은 저자를 반복 조회하지 않습니다.
+AUTHORS_TO_ENRICH_QUERY = """
+    MATCH (a:Author)
+    WHERE a.authorId > $cursor AND (a.hIndex IS NULL OR a.hIndex = 0)
+    RETURN a.authorId AS authorId
+    ORDER BY a.authorId
+    LIMIT $limit
     """
-    query = """
+
+UPDATE_AUTHOR_DETAILS_QUERY = """
     UNWIND $data AS author
     MATCH (a:Author {authorId: author.authorId})
     SET a += author.details
     """
-    tx.run(query, data=author_data_list)
+
+def get_authors_to_enrich(tx, cursor=""):
+    """
+    Neo4j에서 커서 이후의 hIndex가 없는 저자 ID 목록을 가져옵니다.
+    """
+    result = tx.run(AUTHORS_TO_ENRICH_QUERY, cursor=cursor, limit=BATCH_SIZE)
+    return [record["authorId"] for record in result]
+
+def update_author_details(tx, author_data_list, batch_params=None):
+    """
+    Neo4j의 저자 노드에 상세 정보를 업데이트합니다.
+    배치 표식을 같은 트랜잭션에서 기록하며, 이미 커밋된 배치면 쓰지 않고 False를 반환합니다.
+    """
+    if batch_params is not None and not claim_batch(tx, batch_params):
+        return False
+    tx.run(UPDATE_AUTHOR_DETAILS_QUERY, data=author_data_list)
+    return True
 
 # --- 3. 보조 함수 ---
 
@@ -75,47 +96,56 @@ def format_time(seconds):
 
 # --- 4. 메인 실행 로직 ---
 
-def enrich_authors():
+def enrich_authors(restart=False):
     """
     Semantic Scholar API를 통해 Neo4j의 저자 노드 정보를 강화하는 메인 함수입니다.
+    실행 원장(run_ledger.py)에 배치별 커서를 기록하므로, 중단 후 다시 실행하면 전체 대상을 다시 세지 않고
+    마지막으로 커밋된 저자 다음부터 이어서 진행합니다.
     """
     logging.info("="*30 + " 저자 정보 강화 시작 " + "="*30)
 
-    try:
-        with driver.session(database="neo4j") as session:
-            # 강화할 전체 저자 수를 미리 가져옵니다.
-            total_authors_to_process = session.run("""
-                MATCH (a:Author)
-                WHERE a.authorId IS NOT NULL AND (a.hIndex IS NULL OR a.hIndex = 0)
-                RETURN count(a) AS total
-            """).single()['total']
-        
-        if total_authors_to_process == 0:
-            logging.info("모든 저자 정보가 이미 최신입니다 (hIndex가 없는 저자가 없습니다). 작업을 종료합니다.")
+    ledger = RunLedger("author_enricher")
+    state = None if restart else ledger.resume()
+    if state is not None:
+        ledger.reconcile(driver)
+        total_authors_to_process = state["info"].get("total", 0)
+    else:
+        try:
+            with driver.session(database="neo4j") as session:
+                # 강화할 전체 저자 수를 새 실행을 시작할 때만 가져옵니다. (진행률 표시용, 원장에 기록)
+                total_authors_to_process = session.run(PENDING_AUTHOR_COUNT_QUERY).single()['total']
+
+            if total_authors_to_process == 0:
+                logging.info("모든 저자 정보가 이미 최신입니다 (hIndex가 없는 저자가 없습니다). 작업을 종료합니다.")
+                return
+
+        except Exception as e:
+            logging.error(f"오류: 전체 저자 수를 가져오는 데 실패했습니다. Neo4j DB 연결을 확인하세요. - {e}")
             return
-            
-        logging.info(f"총 {total_authors_to_process}명의 저자 정보 강화를 시작합니다...")
+        ledger.start_run(total=total_authors_to_process)
 
-    except Exception as e:
-        logging.error(f"오류: 전체 저자 수를 가져오는 데 실패했습니다. Neo4j DB 연결을 확인하세요. - {e}")
-        return
+    logging.info(f"총 {total_authors_to_process}명의 저자 정보 강화를 시작합니다...")
 
-    processed_count = 0
+    # 이번 프로세스에서 처리한 수로 남은 시간을 추정하고, 진행률은 원장의 누적 처리 수로 표시합니다.
+    resumed_count = ledger.run["processed"]
     start_time = time.time() # 작업 시작 시간 기록
 
     while True:
         try:
+            cursor = ledger.run["cursor"]
             with driver.session(database="neo4j") as session:
-                # hIndex가 없는 저자 ID 목록을 가져옵니다.
-                author_ids = session.execute_read(get_authors_to_enrich)
+                # 커서 이후의 hIndex가 없는 저자 ID 목록을 가져옵니다.
+                author_ids = session.execute_read(get_authors_to_enrich, cursor)
             
             if not author_ids:
                 logging.info("\n처리할 저자가 더 이상 없습니다. 모든 저자 정보 강화 작업이 완료되었습니다.")
+                ledger.complete_run()
                 break
                 
             logging.info(f"\n{len(author_ids)}명의 저자 정보를 Semantic Scholar API로부터 가져옵니다...")
             
             authors_to_update_batch = []
+            failed_author_ids = []
             for author_id in author_ids:
                 try:
                     response = requests.get(
@@ -143,6 +173,8 @@ def enrich_authors():
 
                 except requests.exceptions.HTTPError as e:
                     logging.warning(f"경고: Author ID '{author_id}' 정보를 가져오는 데 실패했습니다. (HTTP 에러: {e.response.status_code} - {e.response.text})")
+                    if e.response.status_code != 404:
+                        failed_author_ids.append(author_id)
                     if e.response.status_code == 429: # Too Many Requests
                         logging.warning("API 속도 제한(429) 발생. 60초간 대기합니다.")
                         time.sleep(60)
@@ -156,27 +188,40 @@ def enrich_authors():
                         time.sleep(15) # 일반적인 HTTP 오류
                 except requests.exceptions.RequestException as e:
                     logging.error(f"네트워크/연결 오류 발생: {author_id} - {e}. 15초 후 재시도합니다.")
+                    failed_author_ids.append(author_id)
                     time.sleep(15)
                 except Exception as e:
                     logging.error(f"알 수 없는 에러 발생: {author_id} - {e}")
+                    failed_author_ids.append(author_id)
                     time.sleep(5) # 알 수 없는 오류 발생 시 잠시 대기
 
                 # API 호출 간 지연
                 time.sleep(1.5 if S2_API_KEY else 3.1) # 키가 있으면 1.5초, 없으면 3.1초 지연
 
-            if authors_to_update_batch:
-                with driver.session(database="neo4j") as session:
-                    session.execute_write(update_author_details, authors_to_update_batch)
-                processed_count += len(authors_to_update_batch)
-                
-                percentage = (processed_count / total_authors_to_process) * 100
+            # API 결과와 배치 표식을 한 트랜잭션으로 저장한 뒤 원장에 커서를 기록합니다.
+            # 업데이트할 정보가 없는 배치도 표식은 남겨 커서를 전진시킵니다.
+            cursor_end = author_ids[-1]
+            batch_id = ledger.batch_id(cursor)
+            with driver.session(database="neo4j") as session:
+                committed = session.execute_write(
+                    update_author_details, authors_to_update_batch,
+                    ledger.batch_params(batch_id, cursor, cursor_end, len(authors_to_update_batch)))
+            # 일시적 오류로 실패한 저자는 hIndex가 비어 있는 채로 남으므로 다음 실행에서 다시 조회됩니다.
+            ledger.record_batch(batch_id, cursor, cursor_end, len(authors_to_update_batch),
+                                committed=committed, failed=failed_author_ids)
+
+            if not committed:
+                logging.info(f"배치 {batch_id}는 이미 저장되어 있어 건너뜁니다.")
+            elif authors_to_update_batch:
+                processed_count = ledger.run["processed"]
+                percentage = (processed_count / total_authors_to_process) * 100 if total_authors_to_process else 100.0
                 elapsed_time = time.time() - start_time
                 
                 # 남은 예상 시간 계산
                 etr_formatted = "계산 중..."
-                if processed_count > 0:
-                    time_per_item = elapsed_time / processed_count
-                    remaining_items = total_authors_to_process - processed_count
+                if processed_count > resumed_count:
+                    time_per_item = elapsed_time / (processed_count - resumed_count)
+                    remaining_items = max(total_authors_to_process - processed_count, 0)
                     etr_seconds = remaining_items * time_per_item
                     etr_formatted = format_time(etr_seconds)
 
@@ -189,6 +234,9 @@ def enrich_authors():
             else:
                 logging.info("이번 배치에서 업데이트할 저자 정보가 없었습니다.")
 
+        except KeyboardInterrupt:
+            logging.info(f"중단되었습니다. 다시 실행하면 커서 '{ledger.run['cursor']}' 이후부터 이어서 진행합니다.")
+            break
         except Exception as e:
             logging.error(f"메인 루프 실행 중 오류 발생: {e}")
             time.sleep(10) # 치명적인 오류 발생 시 대기
@@ -199,4 +247,7 @@ def enrich_authors():
 
 # --- 5. 스크립트 실행 ---
 if __name__ == '__main__':
-    enrich_authors()
+    parser = argparse.ArgumentParser(description="Semantic Scholar API로 Neo4j 저자 노드의 h-index 등 상세 정보를 강화")
+    parser.add_argument("--restart", action="store_true", help="중단된 실행을 이어가지 않고 처음부터 새로 실행")
+    args = parser.parse_args()
+    enrich_authors(restart=args.restart)
@@ -0,0 +1,171 @@
+import os
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+from graph_snapshot import GraphSnapshot, DATA_DIR, SNAPSHOT_DIR, find_id_index, publish_arrays, load_arrays
+from signal_status import mark_fresh
+
+# --- 1. 설정 ---
+
+# 이웃 테이블 저장 디렉토리 (스냅샷과 마찬가지로 버전 디렉토리 + CURRENT 포인터로 관리)
+COUPLING_TABLE_DIR = os.path.join(DATA_DIR, "coupling_table")
+
+# 논문당 저장할 서지 결합 이웃 수와 최소 공유 참고문헌 수
+TOP_K_NEIGHBORS = 20
+MIN_SHARED_REFERENCES = 2
+
+# 너무 많은 논문이 참고한 고전 문헌은 결합 신호가 약하고 곱셈 결과를 조밀하게 만들기 때문에 제외합니다.
+MAX_REFERENCE_CITERS = 5000
+
+# 한 번에 곱셈할 행(논문) 수. 블록 크기가 곧 워커당 최대 메모리 사용량을 결정합니다.
+BLOCK_SIZE = 2048
+
+
+# --- 2. 서지 결합 계산 (A·Aᵀ 블록 곱) ---
+
+# 워커 프로세스마다 한 번만 스냅샷을 메모리 매핑으로 불러옵니다. (프로세스 간 복사 없음)
+_worker_state = {}
+
+
+def _init_worker(snapshot_dir, top_k, min_shared, max_reference_citers):
+    snapshot = GraphSnapshot.load(snapshot_dir)
+    references = snapshot.cites
+    if max_reference_citers:
+        citer_counts = np.diff(snapshot.cited_by.indptr)
+        if (citer_counts > max_reference_citers).any():
+            keep = (citer_counts <= max_reference_citers).astype(np.float32)
+            references = (references @ sparse.diags(keep)).tocsr()
+            references.eliminate_zeros()
+    _worker_state.update(
+        references=references,
+        references_t=references.T.tocsr(),
+        top_k=top_k,
+        min_shared=min_shared,
+    )
+
+
+def _couple_block(block_start, block_end):
+    """
+    [block_start, block_end) 행에 대해 공유 참고문헌 수 행렬(A_block · Aᵀ)을 계산하고
+    행마다 상위 K개 이웃만 남겨 반환합니다.
+    """
+    references = _worker_state["references"]
+    shared = (references[block_start:block_end] @ _worker_state["references_t"]).tocsr()
+    top_k, min_shared = _worker_state["top_k"], _worker_state["min_shared"]
+
+    counts_per_row, neighbors, shared_counts = [], [], []
+    for row in range(shared.shape[0]):
+        start, end = shared.indptr[row], shared.indptr[row + 1]
+        columns = shared.indices[start:end]
+        values = shared.data[start:end]
+        mask = (values >= min_shared) & (columns != block_start + row)
+        columns, values = columns[mask], values[mask]
+        if len(values) > top_k:
+            keep = np.argpartition(-values, top_k - 1)[:top_k]
+            columns, values = columns[keep], values[keep]
+        order = np.lexsort((columns, -values))
+        counts_per_row.append(len(order))
+        neighbors.append(columns[order].astype(np.int32))
+        shared_counts.append(values[order].astype(np.int32))
+
+    return (
+        block_start,
+        np.asarray(counts_per_row, dtype=np.int32),
+        np.concatenate(neighbors) if neighbors else np.empty(0, dtype=np.int32),
+        np.concatenate(shared_counts) if shared_counts else np.empty(0, dtype=np.int32),
+    )
+
+
+def compute_coupling_table(snapshot_dir=SNAPSHOT_DIR, table_dir=COUPLING_TABLE_DIR, top_k=TOP_K_NEIGHBORS,
+                           min_shared=MIN_SHARED_REFERENCES, max_reference_citers=MAX_REFERENCE_CITERS,
+                           block_size=BLOCK_SIZE, workers=None):
+    """
+    그래프 스냅샷의 인용 행렬 A로 서지 결합(A·Aᵀ)을 블록 단위로 병렬 계산하여
+    논문별 상위 K개 이웃 테이블을 CSR 형태(.npy)로 저장합니다.
+    """
+    logging.info("\n" + "=" * 30 + " 서지 결합 이웃 테이블 계산 시작 " + "=" * 30)
+    start_time = time.perf_counter()
+    snapshot = GraphSnapshot.load(snapshot_dir)
+    num_papers = snapshot.num_papers
+    workers = workers or os.cpu_count() or 1
+
+    blocks = [(start, min(start + block_size, num_papers)) for start in range(0, num_papers, block_size)]
+    counts_per_row = np.zeros(num_papers, dtype=np.int32)
+    block_results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(snapshot_dir, top_k, min_shared, max_reference_citers)) as executor:
+        for done, (block_start, row_counts, neighbors, shared_counts) in enumerate(
+                executor.map(_couple_block, *zip(*blocks)) if blocks else [], start=1):
+            counts_per_row[block_start:block_start + len(row_counts)] = row_counts
+            block_results[block_start] = (neighbors, shared_counts)
+            if done % 50 == 0 or done == len(blocks):
+                logging.info(f"블록 {done}/{len(blocks)} 처리 완료.")
+
+    indptr = np.zeros(num_papers + 1, dtype=np.int64)
+    np.cumsum(counts_per_row, out=indptr[1:])
+    neighbors = np.concatenate([block_results[s][0] for s in sorted(block_results)]) \
+        if block_results else np.empty(0, dtype=np.int32)
+    shared_counts = np.concatenate([block_results[s][1] for s in sorted(block_results)]) \
+        if block_results else np.empty(0, dtype=np.int32)
+
+    _, version_name = publish_arrays(table_dir, {
+        "paper_ids": snapshot.paper_ids,
+        "indptr": indptr.astype(np.int32),
+        "neighbors": neighbors.astype(np.int32, copy=False),
+        "shared_counts": shared_counts.astype(np.int32, copy=False),
+    }, {"snapshot_version": snapshot.version, "top_k": top_k, "num_neighbors": int(len(neighbors))})
+    logging.info(
+        f"서지 결합 이웃 {len(neighbors)}개 저장 완료 ({version_name}, 논문 {num_papers}개, "
+        f"{time.perf_counter() - start_time:.1f}초)"
+    )
+    logging.info("=" * 32 + " 서지 결합 이웃 테이블 계산 완료 " + "=" * 32 + "\n")
+    return version_name
+
+
+# --- 3. 이웃 테이블 조회 ---
+
+class CouplingTable:
+    """
+    compute_coupling_table()이 저장한 서지 결합 이웃 테이블을 메모리 매핑으로 읽어 조회합니다.
+    """
+
+    def __init__(self, version, paper_ids, indptr, neighbors, shared_counts):
+        self.version = version
+        self.paper_ids = paper_ids
+        self._paper_order = np.argsort(paper_ids, kind="stable")
+        self._indptr = indptr
+        self._neighbors = neighbors
+        self._shared_counts = shared_counts
+
+    @classmethod
+    def load(cls, table_dir=COUPLING_TABLE_DIR):
+        version, _, arrays = load_arrays(table_dir, ["paper_ids", "indptr", "neighbors", "shared_counts"])
+        return cls(version, arrays["paper_ids"], arrays["indptr"], arrays["neighbors"], arrays["shared_counts"])
+
+    def neighbors_of(self, paper_id, limit=TOP_K_NEIGHBORS):
+        """paperId와 참고문헌을 많이 공유하는 논문 목록 [(paperId, 공유 참고문헌 수), ...]을 반환합니다."""
+        index = find_id_index(self.paper_ids, self._paper_order, paper_id)
+        if index is None:
+            return []
+        start, end = int(self._indptr[index]), int(self._indptr[index + 1])
+        end = min(end, start + limit)
+        return [(self.paper_ids[neighbor].decode("ascii"), int(count))
+                for neighbor, count in zip(self._neighbors[start:end], self._shared_counts[start:end])]
+
+
+# --- 4. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="그래프 스냅샷으로 서지 결합(공유 참고문헌) 이웃 테이블 계산")
+    parser.add_argument("--top-k", type=int, default=TOP_K_NEIGHBORS)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="병렬 프로세스 수 (기본값: CPU 코어 수)")
+    args = parser.parse_args()
+
+    compute_coupling_table(top_k=args.top_k, block_size=args.block_size, workers=args.workers)
+    mark_fresh("bibliographic_coupling")
@@ -0,0 +1,228 @@
+import os
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+from graph_snapshot import GraphSnapshot, DATA_DIR, SNAPSHOT_DIR, current_version, publish_arrays, load_arrays
+from signal_status import mark_fresh
+
+# --- 1. 설정 ---
+
+# 중심성 점수 저장 디렉토리 (data_collector의 프론티어 스케줄러가 Neo4j 없이 읽을 수 있도록 로컬에도 저장)
+CENTRALITY_DIR = os.path.join(DATA_DIR, "centrality")
+
+# PageRank 설정
+DAMPING_FACTOR = 0.85
+CONVERGENCE_TOLERANCE = 1e-9
+MAX_ITERATIONS = 100
+
+# Neo4j에 속성을 쓸 때 한 트랜잭션에 담는 노드 수
+WRITE_BATCH_SIZE = 5000
+
+# 중심성 지표를 Paper/Author 노드 속성으로 기록하는 질의
+PAPER_CENTRALITY_QUERY = """
+    UNWIND $rows AS row
+    MATCH (p:Paper {paperId: row.id})
+    SET p.corpusPageRank = row.pagerank,
+        p.corpusCitationCount = row.citations,
+        p.coreNumber = row.core
+    """
+
+AUTHOR_CENTRALITY_QUERY = """
+    UNWIND $rows AS row
+    MATCH (a:Author {authorId: row.id})
+    SET a.corpusPageRank = row.pagerank,
+        a.corpusCitationCount = row.citations
+    """
+
+
+# --- 2. 중심성 계산 ---
+
+def _parallel_matvec(row_blocks, vector, executor, out):
+    """
+    행 블록으로 나눈 CSR 행렬과 벡터의 곱을 스레드 풀에서 병렬로 계산합니다.
+    SciPy의 희소 행렬 곱은 GIL을 해제하므로 블록들이 여러 코어에서 동시에 실행됩니다.
+    """
+    def multiply(block):
+        start, end, matrix = block
+        out[start:end] = matrix @ vector
+
+    list(executor.map(multiply, row_blocks))
+    return out
+
+
+def compute_pagerank(snapshot, damping=DAMPING_FACTOR, tol=CONVERGENCE_TOLERANCE,
+                     max_iter=MAX_ITERATIONS, workers=None):
+    """
+    수집된 인용 그래프(citer -> cited)에서 전역 PageRank를 병렬 희소 거듭제곱법으로 계산합니다.
+    점수 합은 1이며, 참고문헌이 없는(dangling) 논문의 확률 질량은 전체에 균등하게 분배합니다.
+    """
+    num_papers = snapshot.num_papers
+    if num_papers == 0:
+        return np.zeros(0, dtype=np.float64)
+
+    out_degree = np.diff(snapshot.cites.indptr).astype(np.float64)
+    dangling = out_degree == 0
+    inverse_degree = np.zeros(num_papers, dtype=np.float64)
+    inverse_degree[~dangling] = 1.0 / out_degree[~dangling]
+    # cited_by 행렬(논문 -> 그 논문을 인용한 논문들)에 인용한 논문의 1/out_degree를 곱하면 전이 행렬의 전치가 됩니다.
+    transition_t = (snapshot.cited_by @ sparse.diags(inverse_degree)).tocsr()
+
+    workers = workers or os.cpu_count() or 1
+    block_size = max(1, -(-num_papers // (workers * 4)))
+    row_blocks = [(start, min(start + block_size, num_papers), transition_t[start:start + block_size])
+                  for start in range(0, num_papers, block_size)]
+
+    scores = np.full(num_papers, 1.0 / num_papers)
+    product = np.empty(num_papers, dtype=np.float64)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for iteration in range(1, max_iter + 1):
+            _parallel_matvec(row_blocks, scores, executor, product)
+            updated = damping * product + (damping * scores[dangling].sum() + 1.0 - damping) / num_papers
+            delta = np.abs(updated - scores).sum()
+            scores = updated
+            if delta < tol:
+                break
+    logging.info(f"PageRank 계산 완료: 반복 {iteration}회, 최종 변화량 {delta:.2e}")
+    return scores
+
+
+def compute_core_numbers(snapshot):
+    """
+    인용 관계를 무방향으로 본 그래프에서 논문별 k-core 번호를 계산합니다.
+    차수가 k 미만인 노드를 한 번에 제거하는 벡터화된 peeling 방식입니다.
+    """
+    adjacency = (snapshot.cites + snapshot.cited_by).tocsr()
+    adjacency.data[:] = 1.0
+    degree = np.asarray(adjacency.sum(axis=1)).ravel().astype(np.int64)
+    core = np.zeros(snapshot.num_papers, dtype=np.int32)
+    alive = np.ones(snapshot.num_papers, dtype=bool)
+
+    k = 0
+    while alive.any():
+        k = max(k, int(degree[alive].min()))
+        while True:
+            peel = alive & (degree <= k)
+            if not peel.any():
+                break
+            core[peel] = k
+            alive &= ~peel
+            degree -= (adjacency @ peel.astype(np.float32)).astype(np.int64)
+        k += 1
+    return core
+
+
+def compute_centrality(snapshot, workers=None):
+    """논문/저자 중심성 지표를 계산해 배열 사전으로 반환합니다."""
+    start_time = time.perf_counter()
+    pagerank = compute_pagerank(snapshot, workers=workers)
+    citation_counts = np.diff(snapshot.cited_by.indptr).astype(np.int32)
+    core_numbers = compute_core_numbers(snapshot)
+
+    # 저자 지표: 저술한 논문들의 PageRank 합과 코퍼스 내 피인용 수 합
+    author_pagerank = snapshot.authored @ pagerank
+    author_citation_counts = (snapshot.authored @ citation_counts.astype(np.float64)).astype(np.int32)
+
+    logging.info(f"중심성 계산 완료 ({time.perf_counter() - start_time:.1f}초)")
+    return {
+        "pagerank": pagerank,
+        "citation_counts": citation_counts,
+        "core_numbers": core_numbers,
+        "author_pagerank": author_pagerank,
+        "author_citation_counts": author_citation_counts,
+    }
+
+
+# --- 3. 결과 저장 ---
+
+def save_centrality(snapshot, metrics, directory=CENTRALITY_DIR):
+    """중심성 배열을 새 버전 디렉토리에 .npy로 저장하고 CURRENT 포인터를 교체합니다."""
+    arrays = {"paper_ids": snapshot.paper_ids, "author_ids": snapshot.author_ids}
+    arrays.update(metrics)
+    _, version_name = publish_arrays(directory, arrays, {"snapshot_version": snapshot.version})
+    logging.info(f"중심성 점수 버전 {version_name} 저장 완료: '{directory}'")
+    return version_name
+
+
+def load_paper_pagerank(directory=CENTRALITY_DIR):
+    """
+    저장된 논문 PageRank를 {paperId: 점수} 사전으로 불러옵니다. 저장된 점수가 없으면 빈 사전을 반환합니다.
+    (data_collector의 프론티어 우선순위 결정에 사용)
+    """
+    if current_version(directory) is None:
+        return {}
+    _, _, arrays = load_arrays(directory, ["paper_ids", "pagerank"])
+    paper_ids, pagerank = arrays["paper_ids"], arrays["pagerank"]
+    return {paper_id.decode("ascii"): float(score) for paper_id, score in zip(paper_ids, pagerank)}
+
+
+def write_centrality_to_neo4j(driver, snapshot, metrics, database="neo4j"):
+    """
+    중심성 지표를 Paper/Author 노드 속성으로 일괄 기록합니다.
+    - Paper: corpusPageRank, corpusCitationCount, coreNumber
+    - Author: corpusPageRank, corpusCitationCount
+    """
+    with driver.session(database=database) as session:
+        for start in range(0, snapshot.num_papers, WRITE_BATCH_SIZE):
+            end = min(start + WRITE_BATCH_SIZE, snapshot.num_papers)
+            rows = [{
+                "id": snapshot.paper_id_of(i),
+                "pagerank": float(metrics["pagerank"][i]),
+                "citations": int(metrics["citation_counts"][i]),
+                "core": int(metrics["core_numbers"][i]),
+            } for i in range(start, end)]
+            session.execute_write(lambda tx: tx.run(PAPER_CENTRALITY_QUERY, rows=rows).consume())
+        logging.info(f"논문 {snapshot.num_papers}개의 중심성 속성 기록 완료.")
+
+        for start in range(0, snapshot.num_authors, WRITE_BATCH_SIZE):
+            end = min(start + WRITE_BATCH_SIZE, snapshot.num_authors)
+            rows = [{
+                "id": snapshot.author_id_of(i),
+                "pagerank": float(metrics["author_pagerank"][i]),
+                "citations": int(metrics["author_citation_counts"][i]),
+            } for i in range(start, end)]
+            session.execute_write(lambda tx: tx.run(AUTHOR_CENTRALITY_QUERY, rows=rows).consume())
+        logging.info(f"저자 {snapshot.num_authors}명의 중심성 속성 기록 완료.")
+
+
+# --- 4. 메인 실행 함수 ---
+
+def run_centrality_calculator(write_neo4j=True, workers=None):
+    """
+    그래프 스냅샷으로 PageRank, 코퍼스 내 피인용 수, k-core 번호를 계산하여
+    로컬 파일과 (선택적으로) Neo4j 노드 속성에 기록합니다.
+    """
+    logging.info("\n" + "=" * 30 + " 인용 그래프 중심성 계산 시작 " + "=" * 30)
+    snapshot = GraphSnapshot.load(SNAPSHOT_DIR)
+    metrics = compute_centrality(snapshot, workers=workers)
+    save_centrality(snapshot, metrics)
+
+    if write_neo4j:
+        from dotenv import load_dotenv
+        from neo4j import GraphDatabase
+        load_dotenv()
+        driver = GraphDatabase.driver(
+            os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+            auth=(os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD"))
+        )
+        try:
+            write_centrality_to_neo4j(driver, snapshot, metrics)
+        finally:
+            driver.close()
+    logging.info("=" * 32 + " 인용 그래프 중심성 계산 완료 " + "=" * 32 + "\n")
+
+
+# --- 5. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="인용 그래프 중심성(PageRank, 피인용 수, k-core) 일괄 계산")
+    parser.add_argument("--skip-neo4j", action="store_true", help="Neo4j에 속성을 쓰지 않고 로컬 파일만 저장")
+    parser.add_argument("--workers", type=int, default=None, help="병렬 스레드 수 (기본값: CPU 코어 수)")
+    args = parser.parse_args()
+
+    run_centrality_calculator(write_neo4j=not args.skip_neo4j, workers=args.workers)
+    mark_fresh("centrality")
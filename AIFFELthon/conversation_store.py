@@ -0,0 +1,283 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+
+import tracing
+
+# --- 1. 설정 ---
+
+# 대화 기록(질문, 답변, 턴별 추천 논문 ID와 점수)을 저장하는 SQLite 파일과 보관 기간 (일)
+CONVERSATION_DB = os.getenv("SOCY_CONVERSATION_DB", "conversations.sqlite3")
+CONVERSATION_RETENTION_DAYS = float(os.getenv("SOCY_CONVERSATION_RETENTION_DAYS", "30"))
+# 턴마다 보관할 추천 후보 수 (점수순 상위). 후속 질문은 이 후보 집합과 그래프 이웃에서 먼저 찾습니다.
+MAX_STORED_CANDIDATES = 20
+
+# "그 중 두 번째 논문", "3번 논문", "second paper"처럼 이전 목록의 순번을 가리키는 표현
+KOREAN_ORDINALS = {"첫": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10}
+ENGLISH_ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+                    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10}
+# 한국어 순번("두 번째", "3번")만 그 자체로 순번으로 읽습니다. "2nd", "second", "마지막"은 새 질문에도 흔히 나오므로
+# ("20th century", "the first study on ...") 지시 표현(FOLLOW_UP_PATTERN)이 있거나 바로 뒤에 "paper", "one", "논문" 등이 올 때만 읽습니다.
+# "5 studies", "Top 10"처럼 순번 표시가 없는 숫자는 순번으로 읽지 않습니다.
+ORDINAL_PATTERN = re.compile(
+    r"(?P<korean>" + "|".join(KOREAN_ORDINALS) + r")\s*번째"
+    r"|(?<!\d)(?P<number>\d{1,2})\s*(?:번째|번)"
+    r"|\b(?P<english_number>\d{1,2})(?:st|nd|rd|th)\b"
+    r"|(?P<last>마지막)"
+    r"|\b(?P<english>" + "|".join(ENGLISH_ORDINALS) + r")\b",
+    re.IGNORECASE,
+)
+ORDINAL_NOUN_PATTERN = re.compile(r"\s*(?:paper|one|article|result|item|논문|거|것)", re.IGNORECASE)
+# 이전 답변을 가리키는 표현 ("그 중", "위 논문", "비슷한 것 더", "더 추천해줘", "more like these" 등)
+# "그 중"은 뒤에 공백·문장부호가 올 때만 읽습니다. ("그 중요성", "그중심" 같은 단어와 구분)
+FOLLOW_UP_PATTERN = re.compile(
+    r"그\s*중(?:에서|에)?(?=[\s,.?!]|$)|그\s*논문|이\s*논문|위\s*논문|위의|앞서|앞의|방금|이\s*목록|그\s*목록|그것|이것"
+    r"|(?:것|거|논문|연구)\s*(?:을|를|도)?\s*더|더\s*(?:추천|알려|보여|찾아|있)"
+    r"|\b(?:more like|similar to (?:these|those|it|that)|the (?:above|previous)|another one|more of these)\b",
+    re.IGNORECASE,
+)
+
+# 후속 질문 해석 예시 (질문, 기대 순번, 후속 질문 여부). `python conversation_store.py check-follow-ups`로 확인합니다.
+ORDINAL_EXAMPLES = (
+    ("그 중 두 번째 논문과 비슷한 것 더", 2, True),
+    ("그중에 마지막 거", -1, True),
+    ("3번 논문 자세히 알려줘", 3, True),
+    ("마지막 거", -1, True),
+    ("second paper", 2, True),
+    ("tell me about the 2nd one", 2, True),
+    ("more like the third", 3, True),
+    ("Recommend 5 studies on emotional labor", None, False),
+    ("Give me 3 theories about gender", None, False),
+    ("Top 10 things", None, False),
+    ("20th century sociology", None, False),
+    ("What was the first study on precarious work?", None, False),
+    ("감정노동 논문 5편 추천해줘", None, False),
+    ("그 중요성을 다룬 논문 추천", None, False),
+    ("2020번 버스 이용자 연구", None, False),
+)
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS turns (
+        session_id TEXT NOT NULL,
+        turn INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        question TEXT NOT NULL,
+        answer TEXT,
+        follow_up_of INTEGER,
+        shown TEXT NOT NULL,
+        candidates TEXT NOT NULL,
+        PRIMARY KEY (session_id, turn)
+    ) WITHOUT ROWID
+    """
+CREATE_INDEX_SQL = "CREATE INDEX IF NOT EXISTS turns_created_at ON turns (created_at)"
+
+
+# --- 2. 후속 질문 해석 ---
+
+def find_ordinal(question):
+    """질문에서 이전 목록의 순번(1부터, 마지막은 -1)을 찾습니다. 없으면 None."""
+    has_cue = FOLLOW_UP_PATTERN.search(question) is not None
+    for match in ORDINAL_PATTERN.finditer(question):
+        if match.group("korean"):
+            return KOREAN_ORDINALS[match.group("korean")]
+        if match.group("number"):
+            return int(match.group("number")) or None
+        if not (has_cue or ORDINAL_NOUN_PATTERN.match(question, match.end())):
+            continue
+        if match.group("english_number"):
+            return int(match.group("english_number")) or None
+        if match.group("last"):
+            return -1
+        return ENGLISH_ORDINALS[match.group("english").lower()]
+    return None
+
+
+def is_follow_up(question):
+    """질문에 이전 목록의 순번이나 이전 답변을 가리키는 표현이 있는지 확인합니다."""
+    return find_ordinal(question) is not None or FOLLOW_UP_PATTERN.search(question) is not None
+
+
+def resolve_follow_up(question, last_turn):
+    """
+    질문이 직전 턴의 추천 목록을 가리키는 후속 질문이면 그 해석 결과를 반환합니다. (아니면 None)
+    순번 표현이 목록 범위 안에 있으면 그 논문 하나를, 그 밖의 지시 표현("그 중", "더 추천해줘" 등)이면 직전 목록 전체를 기준으로 삼습니다.
+    Returns:
+        dict: {'turn': 직전 턴 번호, 'anchors': [기준 paperId, ...], 'anchor_rank': 순번 또는 None,
+               'anchor_title': 기준 논문 제목 또는 None, 'candidates': [(paperId, 점수), ...] 직전 턴 후보}
+    """
+    if not last_turn or not last_turn["shown"]:
+        return None
+    shown = last_turn["shown"]
+    ordinal = find_ordinal(question)
+    if ordinal is not None and -len(shown) <= ordinal <= len(shown) and ordinal != 0:
+        index = ordinal - 1 if ordinal > 0 else ordinal
+        anchor_id, anchor_title = shown[index]
+        return {"turn": last_turn["turn"], "anchors": [anchor_id], "anchor_rank": index % len(shown) + 1,
+                "anchor_title": anchor_title, "candidates": last_turn["candidates"]}
+    if FOLLOW_UP_PATTERN.search(question):
+        return {"turn": last_turn["turn"], "anchors": [paper_id for paper_id, _ in shown], "anchor_rank": None,
+                "anchor_title": None, "candidates": last_turn["candidates"]}
+    return None
+
+
+# --- 3. 대화 저장소 (SQLite) ---
+
+class ConversationStore:
+    """
+    세션별 대화 턴(질문, 답변, 화면에 보여준 논문, 점수순 추천 후보)을 SQLite에 저장합니다.
+    앱을 다시 불러와도 같은 세션 ID로 대화 기록을 복원하며, 후속 질문은 직전 턴의 후보와 그 그래프 이웃으로 먼저 해석합니다.
+    파일은 처음 사용할 때 열고, 보관 기간이 지난 턴은 그때 지웁니다. 여러 스레드에서 함께 사용해도 안전합니다.
+    """
+
+    def __init__(self, path=CONVERSATION_DB, retention_days=CONVERSATION_RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            # WAL: 쓰는 동안에도 다른 세션의 읽기를 막지 않습니다.
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(CREATE_TABLE_SQL)
+            connection.execute(CREATE_INDEX_SQL)
+            self._connection = connection
+            self._prune(connection)
+        return self._connection
+
+    def _prune(self, connection):
+        if self.retention_days <= 0:
+            return 0
+        cutoff = time.time() - self.retention_days * 24 * 60 * 60
+        return connection.execute("DELETE FROM turns WHERE created_at < ?", (cutoff,)).rowcount
+
+    def prune(self):
+        """보관 기간이 지난 턴을 지우고 지운 수를 반환합니다."""
+        with self._lock:
+            return self._prune(self._connect())
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def record_turn(self, session_id, question, cards, sorted_recs, follow_up=None):
+        """
+        한 턴의 질문과 추천 결과를 저장하고 턴 번호를 반환합니다.
+        cards: 화면에 보여준 순서의 카드 목록 (fetch_paper_cards 형식), sorted_recs: 점수순 추천 목록 [(paperId, {'score', ...}), ...]
+        """
+        shown = [[card['paperId'], card['details']['paper'].get('title')] for card in cards]
+        candidates = [[paper_id, round(float(data['score']), 4)] for paper_id, data in sorted_recs[:MAX_STORED_CANDIDATES]]
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                turn = connection.execute("SELECT COALESCE(MAX(turn), 0) + 1 FROM turns WHERE session_id = ?",
+                                          (session_id,)).fetchone()[0]
+                connection.execute(
+                    "INSERT INTO turns (session_id, turn, created_at, question, follow_up_of, shown, candidates) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (session_id, turn, time.time(), question, follow_up["turn"] if follow_up else None,
+                     json.dumps(shown, ensure_ascii=False, separators=(",", ":")),
+                     json.dumps(candidates, separators=(",", ":"))),
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        tracing.increment("conversation_turns_total", follow_up="yes" if follow_up else "no")
+        return turn
+
+    def record_answer(self, session_id, answer, append=False):
+        """세션의 마지막 턴에 화면에 표시한 최종 답변을 저장합니다. append가 참이면 기존 답변 뒤에 이어 붙입니다. (나중에 불러온 해설)"""
+        with self._lock:
+            self._connect().execute(
+                "UPDATE turns SET answer = CASE WHEN ? AND answer IS NOT NULL THEN answer || char(10) || char(10) || ? "
+                "ELSE ? END WHERE session_id = ? AND turn = (SELECT MAX(turn) FROM turns WHERE session_id = ?)",
+                (int(append), answer, answer, session_id, session_id),
+            )
+
+    def last_turn(self, session_id):
+        """세션의 마지막 턴을 {'turn', 'question', 'shown': [(paperId, 제목), ...], 'candidates': [(paperId, 점수), ...]}로 반환합니다."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT turn, question, shown, candidates FROM turns WHERE session_id = ? ORDER BY turn DESC LIMIT 1",
+                (session_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"turn": row[0], "question": row[1],
+                "shown": [tuple(item) for item in json.loads(row[2])],
+                "candidates": [tuple(item) for item in json.loads(row[3])]}
+
+    def shown_paper_ids(self, session_id):
+        """세션에서 지금까지 보여준 논문 ID 집합을 반환합니다. (후속 질문에서 같은 논문을 다시 추천하지 않도록)"""
+        with self._lock:
+            rows = self._connect().execute("SELECT shown FROM turns WHERE session_id = ?", (session_id,)).fetchall()
+        return {paper_id for (shown,) in rows for paper_id, _ in json.loads(shown)}
+
+    def history(self, session_id):
+        """세션의 대화 기록을 [{'turn', 'question', 'answer'}, ...] 순서대로 반환합니다."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT turn, question, answer FROM turns WHERE session_id = ? ORDER BY turn", (session_id,)
+            ).fetchall()
+        return [{"turn": turn, "question": question, "answer": answer} for turn, question, answer in rows]
+
+    def stats(self):
+        """저장된 세션 수, 턴 수, 후속 질문 턴 수, 파일 크기를 반환합니다."""
+        with self._lock:
+            sessions, turns, follow_ups = self._connect().execute(
+                "SELECT COUNT(DISTINCT session_id), COUNT(*), COUNT(follow_up_of) FROM turns"
+            ).fetchone()
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {"sessions": sessions, "turns": turns, "follow_up_turns": follow_ups, "bytes": size}
+
+
+# --- 4. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="챗봇 대화 기록 저장소 통계 조회 및 정리")
+    parser.add_argument("--db", default=CONVERSATION_DB)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="저장된 세션/턴 수와 파일 크기 출력")
+    prune_parser = subparsers.add_parser("prune", help="보관 기간이 지난 턴 삭제")
+    prune_parser.add_argument("--retention-days", type=float, default=CONVERSATION_RETENTION_DAYS)
+    show_parser = subparsers.add_parser("show", help="한 세션의 대화 기록 출력")
+    show_parser.add_argument("session_id")
+    subparsers.add_parser("check-follow-ups", help="후속 질문 해석 예시(ORDINAL_EXAMPLES) 확인")
+    args = parser.parse_args()
+
+    if args.command == "check-follow-ups":
+        failures = 0
+        for question, expected, expected_follow_up in ORDINAL_EXAMPLES:
+            ordinal, follow_up = find_ordinal(question), is_follow_up(question)
+            ok = ordinal == expected and follow_up == expected_follow_up
+            failures += not ok
+            print(f"{'OK ' if ok else 'FAIL'} {question!r}: 순번 {ordinal}, 후속 질문 {follow_up} "
+                  f"(기대값 {expected}, {expected_follow_up})")
+        raise SystemExit(1 if failures else 0)
+
+    store = ConversationStore(args.db, getattr(args, "retention_days", CONVERSATION_RETENTION_DAYS))
+    if args.command == "stats":
+        stats = store.stats()
+        print(f"세션 {stats['sessions']}개, 턴 {stats['turns']}개 (후속 질문 {stats['follow_up_turns']}개), "
+              f"파일 크기 {stats['bytes'] / 1024:.1f}KB")
+    elif args.command == "prune":
+        logging.info(f"보관 기간이 지난 턴 {store.prune()}개를 삭제했습니다.")
+    else:
+        for turn in store.history(args.session_id):
+            print(f"\n[{turn['turn']}] 질문: {turn['question']}")
+            print(turn['answer'] or "(답변 없음)")
+    store.close()
@@ -8,6 +8,10 @@ import random
 import re
 from collections import deque # 논문/저자 큐를 명시적으로 사용하지는 않으나, 기존 코드의 import를 유지
 
+from venue_normalizer import is_target_venue
+from jsonl_writer import JsonlWriterGroup
+from sharded_dataset import dataset_exists, iter_dataset_lines
+
 # --- 0. 로깅 설정 ---
 # 디버깅 및 진행 상황 추적을 위해 파일과 콘솔에 로그를 남깁니다.
 logging.basicConfig(
@@ -30,6 +34,13 @@ if not API_KEY:
 
 # --- 2. 설정 ---
 
+# Semantic Scholar API 주소 (벤치마크 시 mock_s2_server.py 주소로 바꿔 실행할 수 있습니다)
+S2_API_BASE_URL = os.getenv("S2_API_BASE_URL", "https://api.semanticscholar.org/graph/v1").rstrip("/")
+
+# API 호출 간 지연 (초) 및 재시도/오류 대기 시간 배율 (벤치마크에서는 0에 가깝게 줄여 실행)
+API_CALL_DELAY = float(os.getenv("S2_API_CALL_DELAY", "1.2"))
+WAIT_TIME_SCALE = float(os.getenv("S2_WAIT_TIME_SCALE", "1"))
+
 # 데이터 저장 디렉토리 및 파일명
 DATA_DIR = "semantic_scholar_sociology_data"
 os.makedirs(DATA_DIR, exist_ok=True) # 데이터 디렉토리가 없으면 생성
@@ -161,6 +172,8 @@ INITIAL_SEED_LIMIT = 1000
 
 # 몇 개의 프론티어 논문을 처리한 후, 신규 노드 수집 및 저장을 할지 결정 (그래프 확장 시)
 SAVE_INTERVAL_EXPANSION = 50
+# 상세 정보를 조회할 신규 논문 ID가 이만큼 쌓이면 저장 주기 전이라도 먼저 조회합니다. (인용이 많은 논문이 몰릴 때 메모리 제한)
+MAX_PENDING_DETAIL_IDS = 5000
 
 # 일반 검색 시 필터링을 위한 최소 초록 단어 수
 MIN_ABSTRACT_WORDS = 50
@@ -181,28 +194,7 @@ CONNECTION_FIELDS = "references.paperId,citations.paperId,authors.authorId,autho
 # 모든 논문에 대해 주 식별자로 사용할 필드
 PRIMARY_ID_FIELD = "paperId"
 
-# 일반 검색 시 필터링을 위한 타겟 저널 목록 (소문자로 통일)
-TARGET_SOCIOLOGY_JOURNALS = { 
-    "young - nordic journal of youth research", "american journal of sociology", "social forces",
-    "demography", "sociological symposium", "sociological science",
-    "sociological methodology", "social science research", "sociological analysis",
-    "sociological bulletin", "sociological abstracts", "sociological jurisprudence journal",
-    "sociological forum (randolph, n.j.)", "sociological theory",
-    "sociological methods & research", "sociological perspectives", "sociological research",
-    "sociological studies of children and youth", "sociological practice",
-    "british journal of sociology", "sociological inquiry", "sociological journal",
-    "sociological spectrum", "american sociological review", "journal of health and social behavior",
-    "sociologia da educação", "gender & society", "sociology of health and illness",
-    "sociological research online", "the sociological quarterly", "theory and society",
-    "sociology of race and ethnicity", "men and masculinities", "sexualities",
-    "politics & society", "cultural sociology", "current sociology", "social networks",
-    "qualitative sociology", "european sociological review", "contexts",
-    "social indicators research", "ethnic and racial studies", "advances in group processes",
-    "socius", "social psychology quarterly", "social science & medicine (1967)",
-    "social science & medicine medical psychology and medical sociology", "sociology compass",
-    "journal of marriage and family", "city & society", "city & community",
-    "work and occupations", "social problems", "the annual review of sociology"
-}
+# 일반 검색 시 필터링을 위한 타겟 저널 목록은 venue_normalizer.py의 CANONICAL_VENUES에서 관리합니다. (약어·표기 변형 포함)
 TARGET_FIELD_OF_STUDY = "sociology"
 
 
@@ -214,21 +206,21 @@ def load_ids_from_file(filename, id_key):
     파일이 존재하지 않으면 빈 set을 반환합니다.
     """
     ids = set()
-    if not os.path.exists(filename):
+    if not dataset_exists(filename):
         logging.info(f"파일 '{os.path.basename(filename)}'이(가) 존재하지 않습니다. 빈 ID 집합을 반환합니다.")
         return ids
     
     logging.info(f"'{os.path.basename(filename)}' 파일에서 '{id_key}' 로드를 시작합니다...")
-    with open(filename, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                data = json.loads(line)
-                item_id = data.get(id_key)
-                if item_id:
-                    ids.add(str(item_id))
-            except (json.JSONDecodeError, AttributeError) as e:
-                logging.warning(f"'{os.path.basename(filename)}'에서 ID 로드 중 파싱 오류: {line.strip()} - {e}. 건너뜁니다.")
-                continue
+    # 샤드로 묶인 부분(sharded_dataset.py)과 압축해서 수집한 파일(.gz/.zst)도 함께 읽습니다.
+    for line in iter_dataset_lines(filename):
+        try:
+            data = json.loads(line)
+            item_id = data.get(id_key)
+            if item_id:
+                ids.add(str(item_id))
+        except (json.JSONDecodeError, AttributeError) as e:
+            logging.warning(f"'{os.path.basename(filename)}'에서 ID 로드 중 파싱 오류: {line.strip()} - {e}. 건너뜁니다.")
+            continue
     logging.info(f"ID 로드 완료. 총 {len(ids)}개의 유효한 '{id_key}'를 찾았습니다.")
     return ids
 
@@ -238,23 +230,24 @@ def load_priority_ids_from_file(filename, id_key, num_lines):
     파일이 존재하지 않으면 빈 리스트를 반환합니다.
     """
     priority_ids = []
-    if not os.path.exists(filename):
+    if not dataset_exists(filename):
         logging.info(f"우선순위 ID 파일 '{os.path.basename(filename)}'이(가) 존재하지 않습니다. 빈 리스트를 반환합니다.")
         return priority_ids
     
     logging.info(f"'{os.path.basename(filename)}' 파일에서 우선순위 ID 로드를 시작합니다 (첫 {num_lines}개).")
-    with open(filename, 'r', encoding='utf-8') as f:
-        for i, line in enumerate(f):
-            if i >= num_lines:
-                break
-            try:
-                data = json.loads(line)
-                item_id = data.get(id_key)
-                if item_id:
-                    priority_ids.append(str(item_id))
-            except (json.JSONDecodeError, AttributeError) as e:
-                logging.warning(f"우선순위 ID 로드 중 {i+1}번째 줄 파싱 오류: {line.strip()} - {e}. 건너뜁니다.")
-                continue
+    lines = iter_dataset_lines(filename)
+    for i, line in enumerate(lines):
+        if i >= num_lines:
+            break
+        try:
+            data = json.loads(line)
+            item_id = data.get(id_key)
+            if item_id:
+                priority_ids.append(str(item_id))
+        except (json.JSONDecodeError, AttributeError) as e:
+            logging.warning(f"우선순위 ID 로드 중 {i+1}번째 줄 파싱 오류: {line.strip()} - {e}. 건너뜁니다.")
+            continue
+    lines.close()
     logging.info(f"우선순위 ID 로드 완료. 총 {len(priority_ids)}개의 유효한 우선순위 ID를 찾았습니다.")
     return priority_ids
 
@@ -297,15 +290,13 @@ def save_state(state, filename):
     logging.info(f"상태 파일 저장 완료. (일반 검색 Year: {state.get('general_search_current_year')}, Offset: {state.get('general_search_offset')}, 처리된 확장 ID: {len(state.get('processed_expansion_ids'))})")
 
 
-def append_to_jsonl(data_list, filename):
+def commit_progress(state, writers):
     """
-    데이터 목록을 .jsonl 파일에 추가합니다.
+    수집 결과 파일(논문/저자/엣지)의 버퍼를 비우고 fsync한 뒤 진행 상황을 저장합니다.
+    상태 파일이 처리 완료로 기록한 지점까지의 데이터는 항상 디스크에 남아 있습니다.
     """
-    if not data_list:
-        return
-    with open(filename, 'a', encoding='utf-8') as f:
-        for item in data_list:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    writers.checkpoint()
+    save_state(state, STATE_FILE)
 
 
 def is_valid_and_relevant(paper_data):
@@ -332,15 +323,8 @@ def is_valid_and_relevant(paper_data):
     if fields_of_study and any(TARGET_FIELD_OF_STUDY in str(field).lower() for field in fields_of_study):
         return True
     
-    # 4. 저널/발행처 이름 필터링
-    journal_name = ""
-    journal_info = paper_data.get("journal")
-    if journal_info and journal_info.get("name"):
-        journal_name = journal_info.get("name", "").lower()
-    elif paper_data.get("venue"):
-        journal_name = paper_data.get("venue", "").lower()
-
-    if journal_name in TARGET_SOCIOLOGY_JOURNALS:
+    # 4. 저널/발행처 이름 필터링 (정규화 인덱스로 약어·표기 변형까지 일치)
+    if is_target_venue(paper_data):
         return True
         
     return False
@@ -381,10 +365,10 @@ def make_api_request(url, headers, timeout=60, retries=5, initial_wait=15, is_po
                 logging.warning(f"API 서버 오류({e.response.status_code}) 발생. {wait_time}초 후 재시도합니다.")
             else:
                 logging.warning(f"기타 HTTP 오류. {wait_time}초 후 재시도합니다.")
-            time.sleep(wait_time)
+            time.sleep(wait_time * WAIT_TIME_SCALE)
         except requests.exceptions.RequestException as e:
             logging.error(f"네트워크 연결 오류 발생 (시도 {i+1}/{retries}): {e}. {initial_wait}초 후 재시도합니다.")
-            time.sleep(initial_wait)
+            time.sleep(initial_wait * WAIT_TIME_SCALE)
     logging.error(f"최대 재시도 횟수 초과. 요청 실패: {url}")
     return None
 
@@ -399,7 +383,7 @@ def search_paper_by_title(title, headers, fields):
         dict or None: 첫 번째 일치하는 논문 데이터 딕셔너리, 없으면 None.
     """
     # 정확도를 높이기 위해 제목을 인용 부호로 묶습니다.
-    search_url = f"https://api.semanticscholar.org/graph/v1/paper/search?query=\"{requests.utils.quote(title)}\"&limit=1&fields={fields}"
+    search_url = f"{S2_API_BASE_URL}/paper/search?query=\"{requests.utils.quote(title)}\"&limit=1&fields={fields}"
     logging.info(f"특정 제목 검색 API 요청: {title}")
     data = make_api_request(search_url, headers)
     if data and data.get("data"):
@@ -410,7 +394,7 @@ def fetch_related_papers_and_authors(paper_id, headers, paper_details_fields, co
     """
     주어진 논문의 참조, 인용 논문 및 저자 정보를 가져옵니다.
     """
-    url = f"https://api.semanticscholar.org/graph/v1/paper/{paper_id}?fields={connection_fields}"
+    url = f"{S2_API_BASE_URL}/paper/{paper_id}?fields={connection_fields}"
     logging.info(f"관계 및 저자 정보 API 요청: {paper_id}")
     paper_data = make_api_request(url, headers)
     
@@ -448,7 +432,19 @@ def run_full_data_collection():
     """
     Semantic Scholar API를 통해 사회학 논문 데이터를 초기 수집하고, 
     수집된 논문들을 기반으로 그래프를 확장하는 통합 메인 함수입니다.
+    논문/저자/엣지 파일은 실행 내내 열어 둔 버퍼링 작성기(jsonl_writer.py)로 쓰고, 종료 시(오류 포함) 모두 확정합니다.
     """
+    writers = JsonlWriterGroup({"papers": PAPER_NODE_FILE, "authors": AUTHOR_NODE_FILE, "edges": EDGE_DATA_FILE})
+    try:
+        _run_full_data_collection(writers)
+    finally:
+        writers.close()
+        for name, stats in writers.stats().items():
+            logging.info(f"'{name}' 파일 쓰기: {stats['records']}개 레코드, {stats['bytes'] / 1e6:.1f}MB "
+                         f"(디스크 {stats['bytes_on_disk'] / 1e6:.1f}MB), 쓰기 {stats['flushes']}회, fsync {stats['fsyncs']}회")
+
+
+def _run_full_data_collection(writers):
     logging.info("="*30 + " SOCY Assistant 데이터 수집 및 확장 시작 " + "="*30)
     
     headers = {"x-api-key": API_KEY} if API_KEY else {}
@@ -479,7 +475,7 @@ def run_full_data_collection():
         while papers_added_in_seed < INITIAL_SEED_LIMIT:
             query_param = " OR ".join(GENERAL_QUERY_KEYWORDS)
             search_url = (
-                f"https://api.semanticscholar.org/graph/v1/paper/search?"
+                f"{S2_API_BASE_URL}/paper/search?"
                 f"query={requests.utils.quote(query_param)}&offset={current_offset}&limit={LIMIT_PER_REQUEST}&fields={PAPER_DETAILS_FIELDS}"
             )
             logging.info(f"초기 검색 API 요청: offset={current_offset}")
@@ -499,7 +495,7 @@ def run_full_data_collection():
                     papers_added_in_seed += 1
             
             if newly_found_papers_in_batch:
-                append_to_jsonl(newly_found_papers_in_batch, PAPER_NODE_FILE)
+                writers["papers"].write_many(newly_found_papers_in_batch)
                 pbar.update(len(newly_found_papers_in_batch))
                 initial_search_pbar.update(len(newly_found_papers_in_batch))
                 logging.info(f"-> 초기 검색에서 {len(newly_found_papers_in_batch)}개 논문 추가. 현재 총 {len(all_collected_paper_ids)}개 논문.")
@@ -510,11 +506,11 @@ def run_full_data_collection():
                 logging.info("초기 검색 마지막 페이지에 도달했습니다. 시드 수집을 종료합니다.")
                 break
             
-            time.sleep(1.2) # API 지연
+            time.sleep(API_CALL_DELAY) # API 지연
         
         initial_search_pbar.close()
         state['general_search_offset'] = current_offset # 일반 검색 offset 업데이트
-        save_state(state, STATE_FILE) # 초기 검색 진행 상황 저장
+        commit_progress(state, writers) # 초기 검색 진행 상황 저장
 
         if not all_collected_paper_ids:
             logging.error("초기 검색 후에도 논문 노드 파일이 비어있습니다. 작업을 종료합니다.")
@@ -536,7 +532,7 @@ def run_full_data_collection():
         logging.info(f"논문 제목 검색 중: '{title}'")
         found_paper = search_paper_by_title(title, headers, PAPER_DETAILS_FIELDS) # PAPER_DETAILS_FIELDS 사용
         state['last_api_call_counter'] += 1
-        time.sleep(1.2) # API 속도 제한 방지
+        time.sleep(API_CALL_DELAY) # API 속도 제한 방지
 
         papers_to_process = []
         if found_paper:
@@ -548,18 +544,18 @@ def run_full_data_collection():
                 found_paper[PRIMARY_ID_FIELD], headers, PAPER_DETAILS_FIELDS, CONNECTION_FIELDS
             )
             state['last_api_call_counter'] += 1
-            time.sleep(1.2)
+            time.sleep(API_CALL_DELAY)
 
             # 새로 발견된 참조/인용 논문의 상세 정보 일괄 수집
             related_paper_ids_to_fetch = list(set(references_ids + citations_ids) - all_collected_paper_ids)
             if related_paper_ids_to_fetch:
                 logging.info(f"-> '{title}' 관련 신규 참조/인용 논문 {len(related_paper_ids_to_fetch)}개 상세 정보 수집.")
                 batch_details_data = make_api_request(
-                    "https://api.semanticscholar.org/graph/v1/paper/batch",
+                    f"{S2_API_BASE_URL}/paper/batch",
                     headers, is_post=True, json_data={"ids": related_paper_ids_to_fetch, "fields": PAPER_DETAILS_FIELDS}
                 )
                 state['last_api_call_counter'] += 1
-                time.sleep(1.2)
+                time.sleep(API_CALL_DELAY)
                 if batch_details_data:
                     valid_batch_papers = [p for p in batch_details_data if p and p.get(PRIMARY_ID_FIELD)]
                     papers_to_process.extend(valid_batch_papers)
@@ -579,14 +575,14 @@ def run_full_data_collection():
                     all_collected_paper_ids.add(paper_id) # 전체 ID 집합에 추가
         
         if newly_added_for_specific_title:
-            append_to_jsonl(newly_added_for_specific_title, PAPER_NODE_FILE)
+            writers["papers"].write_many(newly_added_for_specific_title)
             pbar.update(len(newly_added_for_specific_title))
             logging.info(f"->> 특정 제목/관련 검색에서 {len(newly_added_for_specific_title)}개의 새 논문 추가. (총: {pbar.n}개)")
         else:
             logging.info("->> 이번 특정 제목/관련 검색에서 필터링을 통과한 새 논문이 없습니다.")
         
         state['processed_specific_titles'].append(title) # 처리된 제목 기록
-        save_state(state, STATE_FILE) # 진행 상황 저장
+        commit_progress(state, writers) # 진행 상황 저장
 
     logging.info("--- 1단계: 초기 논문 상세 정보 수집 완료 ---")
 
@@ -605,8 +601,21 @@ def run_full_data_collection():
 
     # 2-1-2. 나머지 처리 대상 (모든 수집된 논문 중 아직 확장 안 된 것)
     other_unprocessed_ids = (all_collected_paper_ids - processed_expansion_ids) - set(priority_frontier)
-    other_frontier = deque(list(other_unprocessed_ids))
+    other_frontier = list(other_unprocessed_ids)
     random.shuffle(other_frontier) # 나머지 목록은 무작위로 섞음
+    # 중심성 점수(centrality_calculator.py)가 있으면 코퍼스 내 PageRank가 높은 논문부터 확장합니다.
+    # 점수가 없는 논문은 뒤로 밀리며, 정렬이 안정적이므로 서로 간에는 무작위 순서를 유지합니다.
+    # centrality_calculator는 numpy/scipy를 불러오므로 수집기 시작 시점이 아니라 이 단계에서만 import합니다.
+    try:
+        from centrality_calculator import load_paper_pagerank
+        paper_pagerank = load_paper_pagerank()
+    except ImportError as e:
+        logging.warning(f"중심성 점수를 불러올 수 없어 무작위 순서로 확장합니다: {e}")
+        paper_pagerank = {}
+    if paper_pagerank:
+        other_frontier.sort(key=lambda pid: paper_pagerank.get(pid, 0.0), reverse=True)
+        logging.info(f"저장된 PageRank 점수({len(paper_pagerank)}개)로 나머지 프론티어의 확장 순서를 정했습니다.")
+    other_frontier = deque(other_frontier)
     
     # 2-1-3. 최종 프론티어 목록 결합 (deque 사용)
     # priority_frontier가 먼저 비워지고, 그 다음 other_frontier가 처리됩니다.
@@ -617,13 +626,13 @@ def run_full_data_collection():
     if not priority_frontier and not other_frontier:
         logging.info("모든 논문의 그래프 확장이 완료되었습니다. 작업을 종료합니다.")
         pbar.close()
-        save_state(state, STATE_FILE)
+        commit_progress(state, writers)
         return
     
-    # 배치 저장을 위한 임시 리스트
+    # 상세 정보를 조회할 신규 논문 ID (엣지와 저자 노드는 목록에 모으지 않고 작성기 버퍼에 바로 씁니다)
     temp_new_paper_ids_to_fetch_details = set()
-    temp_new_authors_to_save = []
-    temp_edges_to_save = []
+    edges_since_save = 0
+    authors_since_save = 0
     
     # 전체 프론티어를 처리하는 루프
     # priority_frontier를 먼저 처리하고, 그 다음 other_frontier를 처리합니다.
@@ -648,7 +657,7 @@ def run_full_data_collection():
             paper_data_with_connections, references_ids, citations_ids, authors_info = \
                 fetch_related_papers_and_authors(paper_id_to_process, headers, PAPER_DETAILS_FIELDS, CONNECTION_FIELDS)
             state['last_api_call_counter'] += 1
-            time.sleep(1.2) # API 지연
+            time.sleep(API_CALL_DELAY) # API 지연
 
             if not paper_data_with_connections:
                 logging.warning(f"프론티어 논문 ID {paper_id_to_process}의 관계 정보 조회 실패. 건너뜁니다.")
@@ -660,89 +669,90 @@ def run_full_data_collection():
             
             # 2-3. 인용/참고 관계 엣지 생성 및 신규 논문 ID 확보
             for ref_id in references_ids:
-                temp_edges_to_save.append({"source": source_paper_id, "target": ref_id, "relation": "REFERENCES"})
+                writers["edges"].write({"source": source_paper_id, "target": ref_id, "relation": "REFERENCES"})
                 if ref_id not in all_collected_paper_ids: # 아직 수집되지 않은 논문이라면
                     temp_new_paper_ids_to_fetch_details.add(ref_id)
             for cit_id in citations_ids:
-                temp_edges_to_save.append({"source": cit_id, "target": source_paper_id, "relation": "CITES"})
+                writers["edges"].write({"source": cit_id, "target": source_paper_id, "relation": "CITES"})
                 if cit_id not in all_collected_paper_ids: # 아직 수집되지 않은 논문이라면
                     temp_new_paper_ids_to_fetch_details.add(cit_id)
+            edges_since_save += len(references_ids) + len(citations_ids)
 
             # 2-4. 저자-논문(WROTE) 엣지 생성 및 신규 저자 노드 확보
             for author in authors_info:
                 author_id = author.get("authorId")
                 if not author_id: continue
                 
-                temp_edges_to_save.append({"source": author_id, "target": source_paper_id, "relation": "WROTE"})
+                writers["edges"].write({"source": author_id, "target": source_paper_id, "relation": "WROTE"})
+                edges_since_save += 1
                 
                 if author_id not in all_existing_author_ids: # 아직 수집되지 않은 저자라면
-                    temp_new_authors_to_save.append({"authorId": author_id, "name": author.get("name")})
+                    writers["authors"].write({"authorId": author_id, "name": author.get("name")})
+                    authors_since_save += 1
                     all_existing_author_ids.add(author_id) # 전체 저자 ID 집합에 추가
 
             # 현재 논문 ID를 확장 처리 완료 목록에 추가
             processed_expansion_ids.add(paper_id_to_process)
             pbar.update(1) # 메인 프로그레스 바 업데이트
 
-            # 2-5. [저장 주기] 일정 주기마다, 임시 저장된 데이터를 파일에 쓰고, 신규 논문 상세 정보를 조회하여 저장
-            if (pbar.n - len(state['processed_expansion_ids'])) % SAVE_INTERVAL_EXPANSION == 0 or len(current_frontier_queue) + len(other_frontier) == 0:
+            # 2-5. [저장 주기] 일정 주기마다 (또는 조회 대기 논문이 많이 쌓이면) 신규 논문 상세 정보를 조회하여 저장하고 진행 상황을 확정
+            if (pbar.n - len(state['processed_expansion_ids'])) % SAVE_INTERVAL_EXPANSION == 0 or len(current_frontier_queue) + len(other_frontier) == 0 \
+                    or len(temp_new_paper_ids_to_fetch_details) >= MAX_PENDING_DETAIL_IDS:
                 logging.info(f"\n--- 확장 프론티어 배치 처리 완료. ({SAVE_INTERVAL_EXPANSION}개 논문) ---")
                 
-                # 임시 저장된 엣지 및 저자 노드 파일에 추가
-                if temp_edges_to_save:
-                    append_to_jsonl(temp_edges_to_save, EDGE_DATA_FILE)
-                    logging.info(f" -> {len(temp_edges_to_save)}개 엣지 파일에 저장.")
-                    temp_edges_to_save.clear()
-                if temp_new_authors_to_save:
-                    append_to_jsonl(temp_new_authors_to_save, AUTHOR_NODE_FILE)
-                    logging.info(f" -> {len(temp_new_authors_to_save)}개 저자 노드 파일에 저장.")
-                    temp_new_authors_to_save.clear()
+                # 엣지 및 저자 노드는 이미 작성기를 통해 쓰였고, 아래 진행 상황 저장 시 디스크에 확정됩니다.
+                if edges_since_save:
+                    logging.info(f" -> {edges_since_save}개 엣지 파일에 저장.")
+                    edges_since_save = 0
+                if authors_since_save:
+                    logging.info(f" -> {authors_since_save}개 저자 노드 파일에 저장.")
+                    authors_since_save = 0
                 
                 logging.info(f" -> {len(temp_new_paper_ids_to_fetch_details)}개의 새로운 연결 논문 상세 정보 조회 대기 중.")
 
                 # 신규 논문 상세 정보를 일괄 조회하여 저장 (Batch API 호출)
                 if temp_new_paper_ids_to_fetch_details:
                     new_ids_list_for_details = list(temp_new_paper_ids_to_fetch_details)
-                    newly_fetched_details = []
+                    newly_fetched_count = 0
                     
                     details_pbar = tqdm(total=len(new_ids_list_for_details), desc=" -> 신규 논문 상세 정보 수집 중", leave=False)
                     for j in range(0, len(new_ids_list_for_details), BATCH_SIZE):
                         batch_ids = new_ids_list_for_details[j:j+BATCH_SIZE]
                         batch_data = make_api_request(
-                            "https://api.semanticscholar.org/graph/v1/paper/batch",
+                            f"{S2_API_BASE_URL}/paper/batch",
                             headers, is_post=True, json_data={"ids": batch_ids, "fields": PAPER_DETAILS_FIELDS}
                         )
                         state['last_api_call_counter'] += 1
-                        time.sleep(1.2) # API 지연 (배치 호출 간)
+                        time.sleep(API_CALL_DELAY) # API 지연 (배치 호출 간)
 
                         if batch_data:
                             valid_batch_papers = [p for p in batch_data if p and p.get(PRIMARY_ID_FIELD)]
-                            newly_fetched_details.extend(valid_batch_papers)
+                            newly_fetched_count += writers["papers"].write_many(valid_batch_papers)
                             for p in valid_batch_papers:
                                 all_collected_paper_ids.add(p[PRIMARY_ID_FIELD]) # 전체 논문 ID 집합에 추가
                         details_pbar.update(len(batch_ids)) # 배치 크기만큼 업데이트
                     details_pbar.close()
 
-                    if newly_fetched_details:
-                        append_to_jsonl(newly_fetched_details, PAPER_NODE_FILE)
-                        logging.info(f"->> 성공적으로 {len(newly_fetched_details)}개의 신규 논문 상세 정보 저장 완료.")
+                    if newly_fetched_count:
+                        logging.info(f"->> 성공적으로 {newly_fetched_count}개의 신규 논문 상세 정보 저장 완료.")
                     
                     temp_new_paper_ids_to_fetch_details.clear() # 상세 정보를 가져온 후 집합 비우기
 
                 state['processed_expansion_ids'] = list(processed_expansion_ids) # set을 list로 변환하여 저장 가능하게
-                save_state(state, STATE_FILE) # 진행 상황 저장
+                commit_progress(state, writers) # 진행 상황 저장
                 logging.info("-" * 20)
-                time.sleep(2) # 배치 처리 후 추가 지연
+                time.sleep(2 * WAIT_TIME_SCALE) # 배치 처리 후 추가 지연
 
         except Exception as e:
             logging.error(f"논문 ID {paper_id_to_process} 처리 중 오류: {e}")
             processed_expansion_ids.add(paper_id_to_process) # 오류 발생 논문도 처리 완료로 간주하여 재시도 방지
             pbar.update(1)
-            time.sleep(5) # 오류 발생 시 잠시 대기
+            time.sleep(5 * WAIT_TIME_SCALE) # 오류 발생 시 잠시 대기
 
     pbar.close()
     logging.info("="*30 + " 모든 데이터 수집 및 확장 작업 완료 " + "="*30)
     state['processed_expansion_ids'] = list(processed_expansion_ids) # 최종 저장
-    save_state(state, STATE_FILE)
+    commit_progress(state, writers)
     logging.info(f"최종 수집 논문 수: {len(all_collected_paper_ids)}개. 최종 저자 수: {len(all_existing_author_ids)}개.")
     logging.info("다음 실행 시, 오늘 새로 추가되거나 이전에 처리되지 않은 논문들을 기반으로 확장을 계속합니다.")
 
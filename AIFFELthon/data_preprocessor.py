@@ -4,9 +4,18 @@ import time
 import os
 from tqdm import tqdm
 import logging
+import argparse
 import random # `random` 모듈은 현재 코드에서 직접 사용되지 않으므로 제거 가능하지만, 이전 버전과의 일관성을 위해 유지.
 import shutil # `shutil` 모듈은 현재 코드에서 직접 사용되지 않으므로 제거 가능.
 
+from venue_normalizer import is_target_venue
+from duplicate_detector import compute_signatures, merge_duplicate_papers, write_duplicate_map, load_duplicate_map
+from edge_deduplicator import canonical_edge, deduplicate_edges, edge_key
+from delta_state import (DeltaState, IdRegistry, EdgeKeyIndex, PaperDuplicateIndex, edge_key_hashes,
+                         complete_lines_end)
+from jsonl_writer import jsonl_files
+from sharded_dataset import ShardedDataset, dataset_dir, dataset_exists, iter_dataset_lines, export_jsonl
+
 # --- 0. 로깅 설정 ---
 logging.basicConfig(
     level=logging.INFO,
@@ -31,6 +40,15 @@ RAW_EDGE_DATA_FILE = os.path.join(DATA_DIR, "sociology_edges.jsonl")
 CLEANED_PAPER_NODE_FILE = os.path.join(DATA_DIR, "sociology_papers_cleaned.jsonl")
 CLEANED_AUTHOR_NODE_FILE = os.path.join(DATA_DIR, "sociology_authors_cleaned.jsonl")
 CLEANED_EDGE_DATA_FILE = os.path.join(DATA_DIR, "sociology_edges_cleaned.jsonl")
+# 같은 저작의 중복 논문(프리프린트/저널 게재본 등) ID -> 대표 논문 ID 매핑
+DUPLICATE_MAP_FILE = os.path.join(DATA_DIR, "sociology_paper_duplicates.jsonl")
+
+# 정제 파일을 읽기용 압축 샤드 데이터셋(shards/ 아래, sharded_dataset.py)으로도 내보낼지 여부 (neo4j_loader.py가 병렬로 읽음)
+CLEANED_SHARDS_ENABLED = os.getenv("SOCY_CLEANED_SHARDS", "0") == "1"
+
+# 증분 전처리(--delta) 상태: 원본 파일별 처리 위치, 정제 파일 크기, 이미 처리한 ID 목록, 정제된 엣지 키 인덱스,
+# 정제된 논문의 중복 확인 색인(MinHash 서명·LSH 밴드 키·DOI), 끝점 노드가 아직 수집되지 않아 보류한 엣지
+PREPROCESS_STATE_DIR = os.path.join(DATA_DIR, "preprocess_state")
 
 # API 요청 필드 (누락 노드 복구 시 필요)
 PAPER_DETAILS_FIELDS = "paperId,title,abstract,authors,language" # 복구 시 필요한 최소 필드
@@ -51,6 +69,11 @@ if not API_KEY:
     logging.warning("API 키가 설정되지 않았습니다. 누락 노드 복구 기능이 제한될 수 있습니다. .env 파일에 SEMANTIC_SCHOLAR_API_KEY를 설정하세요.")
 HEADERS = {"x-api-key": API_KEY} if API_KEY else {}
 
+# Semantic Scholar API 주소와 호출 간 지연/대기 시간 배율 (data_collector.py와 같은 환경 변수 사용)
+S2_API_BASE_URL = os.getenv("S2_API_BASE_URL", "https://api.semanticscholar.org/graph/v1").rstrip("/")
+API_CALL_DELAY = float(os.getenv("S2_API_CALL_DELAY", "1.2"))
+WAIT_TIME_SCALE = float(os.getenv("S2_WAIT_TIME_SCALE", "1"))
+
 
 # --- 2. 보조 함수 ---
 
@@ -60,48 +83,54 @@ def load_ids_from_file(filename, id_key):
     파일이 존재하지 않으면 빈 set을 반환합니다.
     """
     ids = set()
-    if not os.path.exists(filename):
+    if not dataset_exists(filename):
         logging.info(f"파일 '{os.path.basename(filename)}'이(가) 존재하지 않습니다. 빈 ID 집합을 반환합니다.")
         return ids
     
     logging.info(f"'{os.path.basename(filename)}' 파일에서 '{id_key}' 로드를 시작합니다...")
-    with open(filename, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                data = json.loads(line)
-                item_id = data.get(id_key)
-                if item_id:
-                    ids.add(str(item_id))
-            except (json.JSONDecodeError, AttributeError) as e:
-                logging.warning(f"'{os.path.basename(filename)}'에서 ID 로드 중 파싱 오류: {line.strip()} - {e}. 건너뜁니다.")
-                continue
+    # 샤드로 묶인 부분(병렬 읽기)과 수집기가 압축해서 쓴 파일(.gz/.zst)도 함께 읽습니다. (sharded_dataset.py)
+    for line in iter_dataset_lines(filename):
+        try:
+            data = json.loads(line)
+            item_id = data.get(id_key)
+            if item_id:
+                ids.add(str(item_id))
+        except (json.JSONDecodeError, AttributeError) as e:
+            logging.warning(f"'{os.path.basename(filename)}'에서 ID 로드 중 파싱 오류: {line.strip()} - {e}. 건너뜁니다.")
+            continue
     logging.info(f"ID 로드 완료. 총 {len(ids)}개의 유효한 '{id_key}'를 찾았습니다.")
     return ids
 
 def read_jsonl_file(filename):
     """지정된 .jsonl 파일에서 데이터를 읽어들입니다."""
     data = []
-    if not os.path.exists(filename):
+    if not dataset_exists(filename):
         logging.warning(f"파일을 찾을 수 없습니다: {filename}")
         return data
     
     logging.info(f"'{os.path.basename(filename)}' 파일에서 데이터 로드를 시작합니다...")
-    with open(filename, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                data.append(json.loads(line))
-            except json.JSONDecodeError:
-                logging.error(f"JSON 파싱 오류 발생: {line.strip()}")
-                continue
+    for line in iter_dataset_lines(filename):
+        try:
+            data.append(json.loads(line))
+        except json.JSONDecodeError:
+            logging.error(f"JSON 파싱 오류 발생: {line.strip()}")
+            continue
     logging.info(f"데이터 로드 완료. 총 {len(data)}개의 항목을 읽었습니다.")
     return data
 
 def write_jsonl_file(data_list, filename):
-    """데이터 목록을 .jsonl 파일에 저장합니다."""
+    """
+    데이터 목록을 .jsonl 파일에 저장합니다.
+    임시 파일에 모두 쓰고 fsync한 뒤 교체하므로, 중간에 중단되어도 이전 파일이 잘린 채로 남지 않습니다.
+    """
     logging.info(f"'{os.path.basename(filename)}' 파일에 데이터 쓰기를 시작합니다...")
-    with open(filename, 'w', encoding='utf-8') as f:
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, 'w', encoding='utf-8') as f:
         for item in data_list:
             f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_filename, filename)
     logging.info(f"데이터 쓰기 완료. 총 {len(data_list)}개의 항목을 저장했습니다.")
 
 def append_to_jsonl(data_list, filename):
@@ -140,10 +169,10 @@ def make_api_request(url, headers, timeout=60, retries=5, initial_wait=15, is_po
                 logging.warning(f"API 서버 오류({e.response.status_code}) 발생. {wait_time}초 후 재시도합니다.")
             else:
                 logging.warning(f"기타 HTTP 오류. {wait_time}초 후 재시도합니다.")
-            time.sleep(wait_time)
+            time.sleep(wait_time * WAIT_TIME_SCALE)
         except requests.exceptions.RequestException as e:
             logging.error(f"네트워크 연결 오류 발생 (시도 {i+1}/{retries}): {e}. {initial_wait}초 후 재시도합니다.")
-            time.sleep(initial_wait)
+            time.sleep(initial_wait * WAIT_TIME_SCALE)
     logging.error(f"최대 재시도 횟수 초과. 요청 실패: {url}")
     return None
 
@@ -181,40 +210,13 @@ def is_valid_paper_for_preprocessing(paper_data, min_abstract_words):
     # (이 부분은 data_collector에서 필터링을 수행하므로,
     # 전처리 단계에서는 다시 엄격하게 저널/연구 분야를 필터링할 필요는 없을 수 있습니다.
     # 하지만 데이터 무결성 검증 차원에서 유지하는 것은 좋습니다.)
-    # 5. 연구 분야 또는 저널/발행처 이름 필터링 (data_collector.py의 논리 재사용)
-    TARGET_SOCIOLOGY_JOURNALS = { 
-        "young - nordic journal of youth research", "american journal of sociology", "social forces",
-        "demography", "sociological symposium", "sociological science",
-        "sociological methodology", "social science research", "sociological analysis",
-        "sociological bulletin", "sociological abstracts", "sociological jurisprudence journal",
-        "sociological forum (randolph, n.j.)", "sociological theory",
-        "sociological methods & research", "sociological perspectives", "sociological research",
-        "sociological studies of children and youth", "sociological practice",
-        "british journal of sociology", "sociological inquiry", "sociological journal",
-        "sociological spectrum", "american sociological review", "journal of health and social behavior",
-        "sociologia da educação", "gender & society", "sociology of health and illness",
-        "sociological research online", "the sociological quarterly", "theory and society",
-        "sociology of race and ethnicity", "men and masculinities", "sexualities",
-        "politics & society", "cultural sociology", "current sociology", "social networks",
-        "qualitative sociology", "european sociological review", "contexts",
-        "social indicators research", "ethnic and racial studies", "advances in group processes",
-        "socius", "social psychology quarterly", "social science & medicine (1967)",
-        "social science & medicine medical psychology and medical sociology", "sociology compass",
-        "journal of marriage and family", "city & society", "city & community",
-        "work and occupations", "social problems", "the annual review of sociology"
-    }
+    # 5. 연구 분야 또는 저널/발행처 이름 필터링 (data_collector.py와 같은 venue_normalizer.py 저널 사전 사용)
     TARGET_FIELD_OF_STUDY = "sociology"
 
     fields_of_study = paper_data.get("fieldsOfStudy", [])
-    journal_name = ""
-    journal_info = paper_data.get("journal")
-    if journal_info and journal_info.get("name"):
-        journal_name = journal_info.get("name", "").lower()
-    elif paper_data.get("venue"):
-        journal_name = paper_data.get("venue", "").lower()
 
     is_relevant_field = fields_of_study and any(TARGET_FIELD_OF_STUDY in str(field).lower() for field in fields_of_study)
-    is_relevant_journal = journal_name in TARGET_SOCIOLOGY_JOURNALS
+    is_relevant_journal = is_target_venue(paper_data)
 
     if not (is_relevant_field or is_relevant_journal):
         return False
@@ -224,55 +226,63 @@ def is_valid_paper_for_preprocessing(paper_data, min_abstract_words):
 
 # --- 3. 핵심 전처리 로직 ---
 
-def recover_missing_nodes_from_edges():
+def iter_raw_edges():
+    """원본 엣지 파일을 한 줄씩 읽습니다. 파싱할 수 없는 줄은 경고를 남기고 건너뜁니다."""
+    for line in iter_dataset_lines(RAW_EDGE_DATA_FILE):
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            logging.warning(f"엣지 파싱 중 오류: {line.strip()} - {e}. 건너뜁니다.")
+            continue
+
+def recover_missing_nodes_from_edges(edges=None, existing_paper_ids=None, existing_author_ids=None):
     """
     엣지 파일 기준으로 누락된 논문/저자 노드가 있는지 확인하고 API로 정보를 복구하여 해당 노드 파일에 추가합니다.
+    증분 실행에서는 새로 추가된 엣지(edges)와 이미 알고 있는 ID 집합을 넘겨 원본 파일 전체를 다시 읽지 않습니다.
     """
     logging.info("\n" + "="*30 + " 누락 노드 복구 단계 시작 " + "="*30)
     
-    if not os.path.exists(RAW_EDGE_DATA_FILE):
+    if edges is None and not dataset_exists(RAW_EDGE_DATA_FILE):
         logging.info(f"엣지 파일 '{RAW_EDGE_DATA_FILE}'이(가) 없어 노드 복구 단계를 건너뜁니다.")
         return
 
     # 1. 현재 모든 논문 및 저자 ID 로드
-    existing_paper_ids = load_ids_from_file(RAW_PAPER_NODE_FILE, PRIMARY_ID_FIELD)
-    existing_author_ids = load_ids_from_file(RAW_AUTHOR_NODE_FILE, 'authorId')
+    if existing_paper_ids is None:
+        existing_paper_ids = load_ids_from_file(RAW_PAPER_NODE_FILE, PRIMARY_ID_FIELD)
+    if existing_author_ids is None:
+        existing_author_ids = load_ids_from_file(RAW_AUTHOR_NODE_FILE, 'authorId')
 
-    # 2. 엣지 파일을 순회하며 누락된 노드 ID 수집
+    # 2. 엣지를 순회하며 누락된 노드 ID 수집
     missing_paper_ids = set()
     missing_author_ids = set()
-    logging.info(f"'{os.path.basename(RAW_EDGE_DATA_FILE)}' 파일을 확인하여 누락된 노드를 찾습니다...")
-    with open(RAW_EDGE_DATA_FILE, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                edge = json.loads(line)
-                source_id, target_id, relation = edge.get('source'), edge.get('target'), edge.get('relation')
-
-                if not (source_id and target_id and relation):
-                    continue # 유효하지 않은 엣지 건너뛰기
-
-                # WROTE 관계: source=author, target=paper
-                if relation == 'WROTE':
-                    if source_id not in existing_author_ids: missing_author_ids.add(source_id)
-                    if target_id not in existing_paper_ids: missing_paper_ids.add(target_id)
-                # CITES/REFERENCES 관계: source=paper, target=paper
-                else: # CITES, REFERENCES
-                    if source_id not in existing_paper_ids: missing_paper_ids.add(source_id)
-                    if target_id not in existing_paper_ids: missing_paper_ids.add(target_id)
-            except (json.JSONDecodeError, KeyError) as e:
-                logging.warning(f"엣지 파싱 중 오류: {line.strip()} - {e}. 건너뜁니다.")
-                continue
+    if edges is None:
+        logging.info(f"'{os.path.basename(RAW_EDGE_DATA_FILE)}' 파일을 확인하여 누락된 노드를 찾습니다...")
+        edges = iter_raw_edges()
+    for edge in edges:
+        source_id, target_id, relation = edge.get('source'), edge.get('target'), edge.get('relation')
+
+        if not (source_id and target_id and relation):
+            continue # 유효하지 않은 엣지 건너뛰기
+
+        # WROTE 관계: source=author, target=paper
+        if relation == 'WROTE':
+            if source_id not in existing_author_ids: missing_author_ids.add(source_id)
+            if target_id not in existing_paper_ids: missing_paper_ids.add(target_id)
+        # CITES/REFERENCES 관계: source=paper, target=paper
+        else: # CITES, REFERENCES
+            if source_id not in existing_paper_ids: missing_paper_ids.add(source_id)
+            if target_id not in existing_paper_ids: missing_paper_ids.add(target_id)
     
     # 3. 누락된 논문 정보 복구 (API 호출)
     if missing_paper_ids:
         logging.info(f"{len(missing_paper_ids)}개의 누락된 논문 노드를 발견했습니다. API로 정보를 복구합니다.")
         recovered_papers = []
         for paper_id in tqdm(list(missing_paper_ids), desc="누락 논문 복구 중"):
-            url = f"https://api.semanticscholar.org/graph/v1/paper/{paper_id}?fields={PAPER_DETAILS_FIELDS}"
+            url = f"{S2_API_BASE_URL}/paper/{paper_id}?fields={PAPER_DETAILS_FIELDS}"
             paper_data = make_api_request(url, HEADERS)
             if paper_data and paper_data.get(PRIMARY_ID_FIELD):
                 recovered_papers.append(paper_data)
-            time.sleep(1.2) # API 호출 간 지연
+            time.sleep(API_CALL_DELAY) # API 호출 간 지연
         
         if recovered_papers:
             append_to_jsonl(recovered_papers, RAW_PAPER_NODE_FILE)
@@ -285,11 +295,11 @@ def recover_missing_nodes_from_edges():
         logging.info(f"{len(missing_author_ids)}개의 누락된 저자 노드를 발견했습니다. API로 정보를 복구합니다.")
         recovered_authors = []
         for author_id in tqdm(list(missing_author_ids), desc="누락 저자 복구 중"):
-            url = f"https://api.semanticscholar.org/graph/v1/author/{author_id}?fields={AUTHOR_DETAILS_FIELDS}"
+            url = f"{S2_API_BASE_URL}/author/{author_id}?fields={AUTHOR_DETAILS_FIELDS}"
             author_data = make_api_request(url, HEADERS)
             if author_data and author_data.get('authorId'):
                 recovered_authors.append(author_data)
-            time.sleep(1.2) # API 호출 간 지연
+            time.sleep(API_CALL_DELAY) # API 호출 간 지연
         
         if recovered_authors:
             append_to_jsonl(recovered_authors, RAW_AUTHOR_NODE_FILE)
@@ -303,33 +313,85 @@ def recover_missing_nodes_from_edges():
     logging.info("="*32 + " 노드 복구 완료 " + "="*32 + "\n")
 
 
+def clean_edge(edge, duplicate_map, valid_node_ids, edge_stats, known_node_ids=None, pending_edges=None):
+    """
+    엣지 하나를 정제합니다. 유지할 엣지면 표준화된 엣지를, 제거할 엣지면 None을 반환하고 edge_stats에 사유를 셉니다.
+    known_node_ids(원본 파일에 수집된 적이 있는 노드 ID)와 pending_edges 목록을 넘기면, 끝점 노드가 아직 수집되지 않아
+    제거되는 엣지는 버리지 않고 pending_edges에 모아 노드가 수집된 뒤(다음 증분 실행) 다시 확인하게 합니다.
+    """
+    edge_stats["raw"] += 1
+    source_id = edge.get('source')
+    target_id = edge.get('target')
+    relation = edge.get('relation')
+
+    # 병합된 중복 논문을 가리키는 엣지는 대표 논문으로 연결
+    if source_id in duplicate_map or target_id in duplicate_map:
+        source_id = duplicate_map.get(source_id, source_id)
+        target_id = duplicate_map.get(target_id, target_id)
+        if source_id == target_id:
+            # 같은 저작의 두 버전 사이 인용은 병합 후 자기 자신 인용이 되므로 제거
+            edge_stats["merged_self_loops"] += 1
+            return None
+        edge = dict(edge, source=source_id, target=target_id)
+        edge_stats["remapped"] += 1
+
+    # source, target, relation 필드가 모두 존재하고, 양쪽 노드가 유효한 ID 집합에 속해야 함
+    if source_id and target_id and relation and \
+       source_id in valid_node_ids and target_id in valid_node_ids:
+        # REFERENCES(논문 -> 참고문헌)와 CITES(인용 논문 -> 논문)는 같은 방향의 인용이므로 CITES로 통일
+        return canonical_edge(edge)
+    if pending_edges is not None and source_id and target_id and relation and \
+       (source_id not in known_node_ids or target_id not in known_node_ids):
+        pending_edges.append(edge)
+        edge_stats["pending"] += 1
+        return None
+    edge_stats["invalid"] += 1
+    return None
+
+
 def clean_and_filter_data():
     """
     수집된 원시 데이터를 전처리하여 필터링 조건을 만족하는 데이터만 저장합니다.
-    - 논문: 초록 유무, 초록 길이, 언어(영어), 주요 필드/저널 관련성 필터링.
+    - 논문: 초록 유무, 초록 길이, 언어(영어), 주요 필드/저널 관련성 필터링 후, 같은 저작의 중복 논문을 대표 논문 하나로 병합.
     - 저자: 중복 제거 및 유효한 authorId 확인.
-    - 엣지: 연결된 노드가 모두 유효한 노드(논문/저자) ID 집합에 포함되는지 확인.
+    - 엣지: 병합된 논문 ID를 대표 논문 ID로 바꾼 뒤, 연결된 노드가 모두 유효한 노드(논문/저자) ID 집합에 포함되는지 확인.
+            인용 관계는 CITES(인용 논문 -> 피인용 논문) 하나로 통일하고 중복 엣지를 제거.
     """
     logging.info("\n" + "="*30 + " 데이터 정제 및 필터링 단계 시작 " + "="*30)
 
+    # 정제 파일을 새로 쓰는 동안 중단되면 이전 증분 상태가 맞지 않으므로 먼저 지우고, 완료 후 새 기준을 기록합니다.
+    DeltaState(PREPROCESS_STATE_DIR).clear()
+    raw_offsets = {filename: complete_lines_end(filename) for filename in _raw_files()}
+    raw_shard_rows = _raw_shard_rows()
+
     # 1. 논문 데이터 클리닝 및 필터링
     logging.info(f"'{os.path.basename(RAW_PAPER_NODE_FILE)}' 파일에서 유효하지 않은 논문을 제거합니다...")
     raw_papers = read_jsonl_file(RAW_PAPER_NODE_FILE)
+    known_node_ids = {str(paper[PRIMARY_ID_FIELD]) for paper in raw_papers if paper.get(PRIMARY_ID_FIELD)}
     
     valid_papers = []
-    valid_paper_ids = set() # 유효한 논문 ID만 저장하여 엣지 필터링에 사용
-    
+
     for paper in tqdm(raw_papers, desc="논문 필터링 중"):
         if is_valid_paper_for_preprocessing(paper, MIN_ABSTRACT_WORDS):
             valid_papers.append(paper)
-            valid_paper_ids.add(paper[PRIMARY_ID_FIELD])
-    
+
+    # 프리프린트와 저널 게재본처럼 ID만 다른 같은 저작을 DOI와 제목+초록 MinHash-LSH로 찾아 병합
+    # (서명은 증분 전처리의 중복 확인 색인에도 그대로 저장합니다)
+    signatures = compute_signatures(valid_papers)
+    signature_rows = {paper[PRIMARY_ID_FIELD]: i for i, paper in enumerate(valid_papers)}
+    valid_papers, duplicate_map = merge_duplicate_papers(valid_papers, signatures)
+    paper_index = PaperDuplicateIndex(PREPROCESS_STATE_DIR).reset(
+        valid_papers, signatures[[signature_rows[paper[PRIMARY_ID_FIELD]] for paper in valid_papers]])
+    valid_paper_ids = {paper[PRIMARY_ID_FIELD] for paper in valid_papers}
+    write_duplicate_map(duplicate_map, DUPLICATE_MAP_FILE)
+
     write_jsonl_file(valid_papers, CLEANED_PAPER_NODE_FILE)
     logging.info(f"논문 노드 정제 완료. {len(raw_papers)}개 중 {len(valid_papers)}개 유지. '{os.path.basename(CLEANED_PAPER_NODE_FILE)}'에 저장됨.")
 
     # 2. 저자 데이터 중복 제거 및 유효성 확인
     logging.info(f"'{os.path.basename(RAW_AUTHOR_NODE_FILE)}' 파일에서 저자 데이터를 정제합니다...")
     raw_authors = read_jsonl_file(RAW_AUTHOR_NODE_FILE)
+    known_node_ids.update(str(author['authorId']) for author in raw_authors if author.get('authorId'))
     unique_authors = {} # authorId 기준으로 중복 제거
     
     for author in raw_authors:
@@ -345,36 +407,235 @@ def clean_and_filter_data():
 
     # 3. 엣지 데이터 필터링 (유효한 노드에 연결된 엣지만 유지)
     logging.info(f"'{os.path.basename(RAW_EDGE_DATA_FILE)}' 파일에서 유효하지 않은 노드에 연결된 엣지를 제거합니다...")
-    raw_edges = read_jsonl_file(RAW_EDGE_DATA_FILE)
-    
+    if not dataset_exists(RAW_EDGE_DATA_FILE):
+        logging.warning(f"파일을 찾을 수 없습니다: {RAW_EDGE_DATA_FILE}")
+
     # 논문 및 저자의 모든 유효한 ID를 통합
     all_valid_node_ids = valid_paper_ids.union(valid_author_ids)
 
-    cleaned_edges = []
-    for edge in tqdm(raw_edges, desc="엣지 필터링 중"):
-        source_id = edge.get('source')
-        target_id = edge.get('target')
-        relation = edge.get('relation')
-
-        # source, target, relation 필드가 모두 존재하고, 양쪽 노드가 유효한 ID 집합에 속해야 함
-        if source_id and target_id and relation and \
-           source_id in all_valid_node_ids and target_id in all_valid_node_ids:
-            cleaned_edges.append(edge)
-    
-    write_jsonl_file(cleaned_edges, CLEANED_EDGE_DATA_FILE)
-    logging.info(f"엣지 정제 완료. {len(raw_edges)}개 중 {len(cleaned_edges)}개 유지. '{os.path.basename(CLEANED_EDGE_DATA_FILE)}'에 저장됨.")
+    edge_stats = {"raw": 0, "remapped": 0, "merged_self_loops": 0, "invalid": 0, "pending": 0}
+    pending_edges = []
+
+    def filtered_edges():
+        # 엣지 파일은 메모리에 모두 올리지 않고 한 줄씩 읽어 정제한 뒤 바로 중복 제거 단계로 넘깁니다.
+        if not dataset_exists(RAW_EDGE_DATA_FILE):
+            return
+        for edge in tqdm(iter_raw_edges(), desc="엣지 필터링 중"):
+            cleaned = clean_edge(edge, duplicate_map, all_valid_node_ids, edge_stats, known_node_ids, pending_edges)
+            if cleaned is not None:
+                yield cleaned
+
+    # 같은 인용이 양쪽 논문의 확장에서 각각 기록된 경우와 완전히 같은 엣지의 반복을 제거
+    raw_edge_bytes = (sum(shard["raw_bytes"] for shard in ShardedDataset(dataset_dir(RAW_EDGE_DATA_FILE)).shards)
+                      + sum(os.path.getsize(path) for path in jsonl_files(RAW_EDGE_DATA_FILE)))
+    valid_edge_count, cleaned_edge_count = deduplicate_edges(filtered_edges(), CLEANED_EDGE_DATA_FILE,
+                                                             size_hint=raw_edge_bytes)
+    duplicate_edge_count = valid_edge_count - cleaned_edge_count
+
+    logging.info(f"엣지 정제 완료. {edge_stats['raw']}개 중 {cleaned_edge_count}개 유지. '{os.path.basename(CLEANED_EDGE_DATA_FILE)}'에 저장됨.")
+    logging.info(f"유효하지 않은 노드에 연결된 엣지 {edge_stats['invalid']}개, "
+                 f"인용 방향 통일 후 중복 엣지 {duplicate_edge_count}개 제거 "
+                 f"(유효 엣지 대비 {100 * duplicate_edge_count / max(valid_edge_count, 1):.1f}% 감소).")
+    logging.info(f"중복 논문 병합으로 대표 논문에 다시 연결된 엣지 {edge_stats['remapped']}개, 제거된 자기 인용 엣지 {edge_stats['merged_self_loops']}개.")
+    logging.info(f"끝점 노드가 수집되지 않아 보류한 엣지 {edge_stats['pending']}개 (다음 증분 실행에서 다시 확인).")
+
+    record_delta_baseline(raw_offsets, raw_shard_rows, valid_paper_ids, valid_author_ids, paper_index, pending_edges)
+    export_cleaned_shards()
     
     logging.info("="*32 + " 데이터 정제 및 필터링 완료 " + "="*32 + "\n")
 
 
-# --- 4. 메인 전처리 실행 함수 ---
+# --- 4. 증분 전처리 ---
+
+def _raw_files():
+    return (RAW_PAPER_NODE_FILE, RAW_AUTHOR_NODE_FILE, RAW_EDGE_DATA_FILE)
+
+def _cleaned_files():
+    return (CLEANED_PAPER_NODE_FILE, CLEANED_AUTHOR_NODE_FILE, CLEANED_EDGE_DATA_FILE)
+
+def _raw_shard_rows():
+    return {filename: ShardedDataset(dataset_dir(filename)).rows for filename in _raw_files()}
+
+def _registries():
+    return {name: IdRegistry(name, PREPROCESS_STATE_DIR)
+            for name in ("raw_paper", "raw_author", "cleaned_paper", "cleaned_author")}
+
+def _delta_outputs(registries):
+    # 중단 시 커밋된 크기로 되돌릴 추가 기록 파일 (정제 파일 + ID 목록)
+    return (CLEANED_PAPER_NODE_FILE, CLEANED_AUTHOR_NODE_FILE, CLEANED_EDGE_DATA_FILE, DUPLICATE_MAP_FILE,
+            *(registry.path for registry in registries.values()))
+
+def export_cleaned_shards(appended=None, previous_sizes=None):
+    """
+    SOCY_CLEANED_SHARDS=1이면 정제 파일을 읽기용 압축 샤드 데이터셋으로도 내보냅니다. (정제 파일은 그대로 유지)
+    증분 실행에서는 샤드가 추가 전 정제 파일과 같으면 새로 추가한 레코드만 샤드로 추가합니다.
+    """
+    if not CLEANED_SHARDS_ENABLED:
+        return
+    for filename in _cleaned_files():
+        if not os.path.exists(filename):
+            continue
+        dataset = export_jsonl(filename, (appended or {}).get(filename), (previous_sizes or {}).get(filename))
+        logging.info(f"'{os.path.basename(filename)}'을(를) 샤드 {len(dataset.shards)}개({dataset.rows}줄, "
+                     f"{dataset.disk_bytes() / 1e6:.1f}MB)로 내보냈습니다.")
+
+def record_delta_baseline(raw_offsets, raw_shard_rows, cleaned_paper_ids, cleaned_author_ids, paper_index, pending_edges):
+    """전체 전처리 결과를 증분 전처리의 기준 상태로 기록합니다."""
+    paper_index.save()
+    state = DeltaState(PREPROCESS_STATE_DIR)
+    state.write_pending_edges(pending_edges)
+    registries = _registries()
+    registries["raw_paper"].reset(load_ids_from_file(RAW_PAPER_NODE_FILE, PRIMARY_ID_FIELD))
+    registries["raw_author"].reset(load_ids_from_file(RAW_AUTHOR_NODE_FILE, 'authorId'))
+    registries["cleaned_paper"].reset(cleaned_paper_ids)
+    registries["cleaned_author"].reset(cleaned_author_ids)
+    edge_index = EdgeKeyIndex(PREPROCESS_STATE_DIR).rebuild(CLEANED_EDGE_DATA_FILE, edge_key)
+    edge_index.save()
+    state.commit(raw_offsets, _delta_outputs(registries), len(edge_index), raw_shard_rows)
+    logging.info(f"증분 전처리 기준 상태 기록 완료. ('{PREPROCESS_STATE_DIR}')")
+
+def run_delta_preprocessor():
+    """
+    지난 실행 이후 원본 파일에 추가된 줄만 처리하여 정제 파일 끝에 추가합니다.
+    - 누락 노드 복구는 새 엣지에 대해서만 수행하고, 이미 있는 노드 확인은 ID 목록 파일을 사용합니다.
+    - 새 논문끼리의 중복은 병합하고, 이미 정제된 논문이나 병합된 중복 논문 ID로 다시 수집된 논문은 건너뜁니다.
+      이미 정제된 논문과 같은 저작(DOI 또는 MinHash-LSH 일치)이면 기존 논문을 대표로 두고 중복 매핑만 추가합니다.
+      (정제 파일은 추가만 하므로 기존 대표 논문의 mergedPaperIds/피인용 수는 다음 전체 전처리에서 갱신됩니다)
+    - 새 엣지는 정제된 엣지 키 인덱스로 기존 엣지와의 중복을 확인합니다.
+      끝점 노드가 아직 수집되지 않은 엣지는 보류해 두었다가 이후 실행에서 노드가 들어오면 추가합니다.
+    처리량이 새로 추가된 줄 수에 비례하므로 매일 갱신 시 전체 전처리보다 훨씬 빠릅니다.
+    기준 상태가 없거나 원본 파일이 다시 쓰인 경우에는 전체 전처리를 실행합니다.
+    """
+    start_time = time.time()
+    logging.info("=" * 30 + " 증분 데이터 전처리 시작 " + "=" * 30)
+    state = DeltaState(PREPROCESS_STATE_DIR)
+    if not state.has_baseline() or any(state.raw_was_rewritten(filename) for filename in _raw_files()):
+        logging.warning("증분 전처리 기준 상태가 없거나 원본 파일이 다시 쓰여 전체 전처리를 실행합니다.")
+        run_data_preprocessor()
+        return
+    # 증분 전처리는 압축하지 않은 원본 파일의 바이트 위치로 새 줄을 찾으므로, 압축 수집 파일이 있으면 전체 전처리로 처리합니다.
+    if any(jsonl_files(filename) not in ([], [filename]) for filename in _raw_files()):
+        logging.warning("압축된 원본 파일(.gz/.zst)이 있어 증분 전처리 대신 전체 전처리를 실행합니다.")
+        run_data_preprocessor()
+        return
+    # 지난 실행 이후 원본을 샤드로 묶었다면(sharded_dataset.py pack) 원본 파일의 오프셋이 맞지 않으므로 한 번 전체 전처리를 실행합니다.
+    raw_shard_rows = _raw_shard_rows()
+    if state.raw_shards_changed(raw_shard_rows):
+        logging.warning("원본 파일을 샤드로 묶은 뒤 처음 실행하므로 증분 전처리 대신 전체 전처리를 실행합니다.")
+        run_data_preprocessor()
+        return
+
+    # 지난 증분 실행이 커밋 전에 중단되었다면 정제 파일과 ID 목록을 커밋된 크기로 되돌린 뒤 다시 읽습니다.
+    state.rollback_outputs(_delta_outputs(_registries()))
+    registries = _registries()
+    cleaned_sizes = {filename: os.path.getsize(filename) if os.path.exists(filename) else 0
+                     for filename in _cleaned_files()}
+
+    # 1. 새로 추가된 원본 줄 읽기
+    new_edges, edge_offset = state.read_new_lines(RAW_EDGE_DATA_FILE)
+    new_raw_papers, paper_offset = state.read_new_lines(RAW_PAPER_NODE_FILE)
+    new_raw_authors, author_offset = state.read_new_lines(RAW_AUTHOR_NODE_FILE)
+    registries["raw_paper"].add(paper.get(PRIMARY_ID_FIELD) for paper in new_raw_papers)
+    registries["raw_author"].add(author.get('authorId') for author in new_raw_authors)
+
+    # 2. 새 엣지 기준으로 누락된 논문/저자 노드 정보 복구 (복구된 노드는 원본 파일 끝에 추가되므로 이어서 읽습니다)
+    recover_missing_nodes_from_edges(new_edges, registries["raw_paper"].ids, registries["raw_author"].ids)
+    recovered_papers, paper_offset = state.read_new_lines(RAW_PAPER_NODE_FILE, paper_offset)
+    recovered_authors, author_offset = state.read_new_lines(RAW_AUTHOR_NODE_FILE, author_offset)
+    registries["raw_paper"].add(paper.get(PRIMARY_ID_FIELD) for paper in recovered_papers)
+    registries["raw_author"].add(author.get('authorId') for author in recovered_authors)
+    new_raw_papers += recovered_papers
+    new_raw_authors += recovered_authors
+
+    # 3. 새 논문 정제
+    duplicate_map = load_duplicate_map(DUPLICATE_MAP_FILE)
+    candidates = {}
+    for paper in new_raw_papers:
+        paper_id = paper.get(PRIMARY_ID_FIELD)
+        if paper_id in registries["cleaned_paper"] or paper_id in duplicate_map or paper_id in candidates:
+            continue
+        if is_valid_paper_for_preprocessing(paper, MIN_ABSTRACT_WORDS):
+            candidates[paper_id] = paper
+    candidate_papers = list(candidates.values())
+    signatures = compute_signatures(candidate_papers)
+    signature_rows = {paper[PRIMARY_ID_FIELD]: i for i, paper in enumerate(candidate_papers)}
+    new_papers, new_duplicates = merge_duplicate_papers(candidate_papers, signatures)
+    new_signatures = signatures[[signature_rows[paper[PRIMARY_ID_FIELD]] for paper in new_papers]]
+    # 기존 코퍼스와의 중복은 저장된 서명·밴드 키·DOI 색인으로 확인합니다.
+    paper_index = PaperDuplicateIndex(PREPROCESS_STATE_DIR).load(len(registries["cleaned_paper"].ids),
+                                                                 CLEANED_PAPER_NODE_FILE)
+    existing_matches = paper_index.find_duplicates(new_papers, new_signatures)
+    if existing_matches:
+        new_duplicates = {duplicate_id: existing_matches.get(canonical_id, canonical_id)
+                          for duplicate_id, canonical_id in new_duplicates.items()}
+        new_duplicates.update(existing_matches)
+        kept = [i for i, paper in enumerate(new_papers) if paper[PRIMARY_ID_FIELD] not in existing_matches]
+        new_papers, new_signatures = [new_papers[i] for i in kept], new_signatures[kept]
+    paper_index.add(new_papers, new_signatures)
+    append_to_jsonl(new_papers, CLEANED_PAPER_NODE_FILE)
+    write_duplicate_map(new_duplicates, DUPLICATE_MAP_FILE, append=True)
+    duplicate_map.update(new_duplicates)
+    registries["cleaned_paper"].add(paper[PRIMARY_ID_FIELD] for paper in new_papers)
+
+    # 4. 새 저자 정제
+    new_authors = {}
+    for author in new_raw_authors:
+        author_id = author.get('authorId')
+        if author_id and author.get('name') and author_id not in registries["cleaned_author"]:
+            new_authors[author_id] = author
+    append_to_jsonl(list(new_authors.values()), CLEANED_AUTHOR_NODE_FILE)
+    registries["cleaned_author"].add(new_authors)
+
+    # 5. 새 엣지와 지난 실행에서 보류한 엣지 정제 및 기존 엣지와의 중복 제거
+    all_valid_node_ids = registries["cleaned_paper"].ids | registries["cleaned_author"].ids
+    known_node_ids = registries["raw_paper"].ids | registries["raw_author"].ids
+    previous_pending = state.read_pending_edges()
+    edge_stats = {"raw": 0, "remapped": 0, "merged_self_loops": 0, "invalid": 0, "pending": 0}
+    valid_edges = {}
+    still_pending = []
+    for edge in previous_pending + new_edges:
+        cleaned = clean_edge(edge, duplicate_map, all_valid_node_ids, edge_stats, known_node_ids, still_pending)
+        if cleaned is not None:
+            valid_edges.setdefault(edge_key(cleaned), cleaned)
+    edge_index = EdgeKeyIndex(PREPROCESS_STATE_DIR).load(state.state["edge_key_count"], CLEANED_EDGE_DATA_FILE, edge_key)
+    keys = list(valid_edges)
+    hashes = edge_key_hashes(keys)
+    known = edge_index.contains(hashes)
+    fresh_edges = [valid_edges[key] for key, is_known in zip(keys, known) if not is_known]
+    append_to_jsonl(fresh_edges, CLEANED_EDGE_DATA_FILE)
+    edge_index.add(hashes[~known])
+    edge_index.save()
+    paper_index.save()
+    # 커밋 전에 중단되어 같은 델타를 다시 처리해도 보류 엣지가 두 번 쌓이지 않도록 (source, target, relation)으로 중복을 없앱니다.
+    still_pending = list({(edge.get('source'), edge.get('target'), edge.get('relation')): edge
+                          for edge in still_pending}.values())
+    # 새 보류 목록은 다음 세대 파일에 쓰고 아래 커밋에서 함께 교체합니다. (커밋 전에 중단되면 이전 보류 목록으로 다시 처리)
+    state.write_pending_edges(still_pending)
+
+    # 6. 모든 출력을 쓴 뒤 처리 위치를 커밋 (중단되면 다음 실행이 이 델타를 처음부터 다시 처리)
+    state.commit({RAW_PAPER_NODE_FILE: paper_offset, RAW_AUTHOR_NODE_FILE: author_offset,
+                  RAW_EDGE_DATA_FILE: edge_offset}, _delta_outputs(registries), len(edge_index), raw_shard_rows)
+    export_cleaned_shards({CLEANED_PAPER_NODE_FILE: new_papers, CLEANED_AUTHOR_NODE_FILE: list(new_authors.values()),
+                           CLEANED_EDGE_DATA_FILE: fresh_edges}, cleaned_sizes)
+
+    valid_new_edges = edge_stats["raw"] - edge_stats["invalid"] - edge_stats["merged_self_loops"] - edge_stats["pending"]
+    logging.info(f"증분 정제 결과: 논문 {len(new_raw_papers)}줄 -> {len(new_papers)}개 추가 "
+                 f"(중복 병합 {len(new_duplicates)}개, 그중 기존 논문과 중복 {len(existing_matches)}개), "
+                 f"저자 {len(new_raw_authors)}줄 -> {len(new_authors)}개 추가, "
+                 f"엣지 {len(new_edges)}줄 + 보류 {len(previous_pending)}개 -> {len(fresh_edges)}개 추가 "
+                 f"(유효하지 않음 {edge_stats['invalid']}개, 중복 {valid_new_edges - len(fresh_edges)}개, "
+                 f"계속 보류 {len(still_pending)}개)")
+    logging.info("=" * 30 + f" 증분 데이터 전처리 완료 ({time.time() - start_time:.1f}초) " + "=" * 30)
+
+
+# --- 5. 메인 전처리 실행 함수 ---
 
 def run_data_preprocessor():
     """
     데이터 전처리 스크립트의 메인 실행 함수입니다.
     이 함수는 누락 노드를 복구한 후 데이터를 정제합니다.
     """
-    print_step_header("데이터 전처리 파이프라인 시작")
+    logging.info("=" * 30 + " 데이터 전처리 파이프라인 시작 " + "=" * 30)
     
     # 1. 엣지 파일 기준으로 누락된 논문/저자 노드 정보 복구 (필요시 API 호출)
     recover_missing_nodes_from_edges()
@@ -382,8 +643,16 @@ def run_data_preprocessor():
     # 2. 수집된 모든 Raw 데이터를 필터링하고 정제하여 Cleaned 파일 생성
     clean_and_filter_data()
 
-    print_step_footer("데이터 전처리 파이프라인 완료")
+    logging.info("=" * 30 + " 데이터 전처리 파이프라인 완료 " + "=" * 30)
 
-# --- 5. 스크립트 실행 ---
+# --- 6. 스크립트 실행 ---
 if __name__ == '__main__':
-    run_data_preprocessor()
+    parser = argparse.ArgumentParser(description="수집된 Raw 데이터 전처리 (누락 노드 복구 및 정제)")
+    parser.add_argument("--delta", action="store_true",
+                        help="지난 실행 이후 원본 파일에 추가된 줄만 처리 (기준 상태가 없으면 전체 전처리)")
+    args = parser.parse_args()
+
+    if args.delta:
+        run_delta_preprocessor()
+    else:
+        run_data_preprocessor()
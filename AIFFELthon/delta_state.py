@@ -0,0 +1,351 @@
+import os
+import json
+import time
+import hashlib
+import logging
+
+import numpy as np
+
+from duplicate_detector import (BANDS, DUPLICATE_THRESHOLD, MAX_BUCKET_SIZE, NUM_PERMUTATIONS, PRIMARY_ID_FIELD,
+                                band_keys, compute_signatures, normalize_doi)
+
+# --- 1. 설정 ---
+
+# 증분 전처리 상태 디렉토리 (data_collector.py/data_preprocessor.py의 데이터 디렉토리 아래)
+DATA_DIR = "semantic_scholar_sociology_data"
+STATE_DIR = os.path.join(DATA_DIR, "preprocess_state")
+
+# 원본 파일별 처리 위치(바이트 오프셋)와 출력 파일 크기를 기록하는 상태 파일
+WATERMARK_FILE = "watermarks.json"
+# 정제된 엣지 키(source, target, relation)의 64비트 해시를 정렬해 저장한 파일 (증분 엣지 중복 확인용)
+EDGE_KEY_INDEX_FILE = "edge_keys.npy"
+# 정제된 논문의 MinHash 서명·LSH 밴드 키·정규화 DOI (증분 논문이 기존 코퍼스와 같은 저작인지 확인용)
+PAPER_DUPLICATE_INDEX_FILE = "paper_duplicates.npz"
+# 끝점 노드가 아직 수집되지 않아 보류한 엣지 (다음 증분 실행에서 다시 확인)
+# 실행마다 새 세대 파일(pending_edges.000001.jsonl ...)에 쓰고 워터마크 커밋이 그 파일을 가리키게 하므로,
+# 커밋 전에 중단되면 이전 세대의 보류 목록이 그대로 남습니다. (이 이름은 세대 번호가 없던 이전 상태 파일용)
+PENDING_EDGE_FILE = "pending_edges.jsonl"
+
+
+def _atomic_write(path, write):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def complete_lines_end(filename, size=None):
+    """파일에서 줄바꿈으로 끝난 마지막 완전한 줄의 끝 위치를 반환합니다. (수집기가 쓰는 중인 마지막 줄 제외)"""
+    if not os.path.exists(filename):
+        return 0
+    size = os.path.getsize(filename) if size is None else size
+    with open(filename, 'rb') as f:
+        position = size
+        while position > 0:
+            start = max(0, position - 65536)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            position = start
+    return 0
+
+
+# --- 2. 처리 위치(워터마크) ---
+
+class DeltaState:
+    """
+    증분 전처리의 워터마크 상태입니다.
+    - raw: 원본 파일별로 처리를 마친 바이트 오프셋 (다음 실행은 이 위치 이후에 추가된 줄만 읽습니다)
+    - outputs: 마지막으로 커밋된 정제 파일 크기. 실행 도중 중단되어 일부만 추가된 출력은 다음 실행 시작 시 이 크기로 되돌립니다.
+    - edge_key_count: 엣지 키 인덱스에 들어 있어야 하는 키 수 (정제된 엣지 수와 같음)
+    - baseline_id: 전체 전처리로 기준 상태를 만들 때마다 바뀌는 ID (graph_sync.py가 정제 파일이 새로 쓰였는지 확인하는 데 사용)
+    - pending_edges: 커밋된 보류 엣지 파일 이름과 세대 번호
+    상태 파일은 모든 출력을 쓴 뒤 마지막에 원자적으로 교체하므로, 중단되면 이전 커밋 상태에서 다시 시작합니다.
+    """
+
+    def __init__(self, directory=STATE_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, WATERMARK_FILE)
+        os.makedirs(directory, exist_ok=True)
+        self.state = {"raw": {}, "outputs": {}, "edge_key_count": 0}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.state.update(json.load(f))
+        self._next_pending = None
+
+    def clear(self):
+        """기준 상태를 지웁니다. (전체 전처리가 정제 파일을 새로 쓰기 전에 호출)"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.state = {"raw": {}, "outputs": {}, "edge_key_count": 0}
+
+    def has_baseline(self):
+        return bool(self.state["raw"])
+
+    def raw_offset(self, filename):
+        return self.state["raw"].get(os.path.basename(filename), 0)
+
+    def raw_was_rewritten(self, filename):
+        """원본 파일이 기록된 오프셋보다 작아졌으면(덮어쓰기/삭제) 증분 처리할 수 없습니다."""
+        size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        return size < self.raw_offset(filename)
+
+    def raw_shards_changed(self, raw_shard_rows):
+        """
+        원본을 샤드로 묶은(sharded_dataset.py pack) 줄 수가 기준 상태와 다르면 True.
+        묶을 때 원본 파일이 지워지고 새로 쓰이므로 기록된 오프셋이 더 이상 맞지 않습니다.
+        """
+        current = {os.path.basename(name): rows for name, rows in raw_shard_rows.items() if rows}
+        return current != self.state.get("raw_shards", {})
+
+    def read_new_lines(self, filename, offset=None):
+        """
+        기록된 오프셋(또는 주어진 offset) 이후에 추가된 완전한 줄만 읽어 (레코드 목록, 새 오프셋)을 반환합니다.
+        JSON 파싱에 실패한 줄은 건너뜁니다.
+        """
+        offset = self.raw_offset(filename) if offset is None else offset
+        if not os.path.exists(filename):
+            return [], offset
+        with open(filename, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        data = data[:data.rfind(b"\n") + 1]
+        records = []
+        for line in data.decode('utf-8').splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logging.error(f"JSON 파싱 오류 발생: {line.strip()}")
+        return records, offset + len(data)
+
+    def rollback_outputs(self, filenames):
+        """지난 실행이 커밋 전에 중단되어 정제 파일 끝에 남은 부분을 잘라냅니다."""
+        for filename in filenames:
+            committed = self.state["outputs"].get(os.path.basename(filename))
+            if committed is not None and os.path.exists(filename) and os.path.getsize(filename) > committed:
+                logging.warning(f"'{os.path.basename(filename)}'에 커밋되지 않은 내용이 있어 {committed}바이트로 되돌립니다.")
+                with open(filename, 'r+b') as f:
+                    f.truncate(committed)
+
+    def pending_edge_path(self):
+        """커밋된 보류 엣지 파일 경로를 반환합니다."""
+        return os.path.join(self.directory, self.state.get("pending_edges", {}).get("file", PENDING_EDGE_FILE))
+
+    def read_pending_edges(self):
+        path = self.pending_edge_path()
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def write_pending_edges(self, edges):
+        """보류 엣지를 다음 세대 파일에 씁니다. commit()이 상태를 교체해야 이 파일이 보류 목록이 됩니다."""
+        generation = self.state.get("pending_edges", {}).get("generation", 0) + 1
+        name = f"pending_edges.{generation:06d}.jsonl"
+        payload = "".join(json.dumps(edge, ensure_ascii=False) + "\n" for edge in edges).encode('utf-8')
+        _atomic_write(os.path.join(self.directory, name), lambda f: f.write(payload))
+        self._next_pending = {"file": name, "generation": generation}
+
+    def _remove_stale_pending_files(self):
+        current = os.path.basename(self.pending_edge_path())
+        for name in os.listdir(self.directory):
+            if name.startswith("pending_edges") and name.endswith(".jsonl") and name != current:
+                os.remove(os.path.join(self.directory, name))
+
+    def commit(self, raw_offsets, output_files, edge_key_count, raw_shard_rows=None):
+        if self._next_pending is not None:
+            self.state["pending_edges"], self._next_pending = self._next_pending, None
+        self.state["raw"] = {os.path.basename(name): offset for name, offset in raw_offsets.items()}
+        self.state["raw_shards"] = {os.path.basename(name): rows for name, rows in (raw_shard_rows or {}).items() if rows}
+        self.state["outputs"] = {os.path.basename(name): os.path.getsize(name) if os.path.exists(name) else 0
+                                 for name in output_files}
+        self.state["edge_key_count"] = int(edge_key_count)
+        self.state.setdefault("baseline_id", time.strftime("%Y%m%dT%H%M%S"))
+        self.state["committed_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        payload = json.dumps(self.state, ensure_ascii=False, indent=2).encode('utf-8')
+        _atomic_write(self.path, lambda f: f.write(payload))
+        # 커밋된 세대 외의 보류 엣지 파일(이전 세대, 커밋 전에 중단된 실행이 쓴 파일)은 지웁니다.
+        self._remove_stale_pending_files()
+
+
+# --- 3. ID 목록, 엣지 키 인덱스 및 논문 중복 색인 ---
+
+class IdRegistry:
+    """
+    한 줄에 ID 하나를 추가 기록하는 ID 목록 파일입니다.
+    증분 실행이 큰 노드 파일(초록 포함)을 다시 읽지 않고도 이미 있는 논문/저자인지 확인하는 데 사용합니다.
+    추가만 하므로 같은 ID가 여러 번 기록되어도 결과는 같습니다.
+    """
+
+    def __init__(self, name, directory=STATE_DIR):
+        self.path = os.path.join(directory, f"{name}_ids.txt")
+        self.ids = set()
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.ids = {line.rstrip("\n") for line in f if line.strip()}
+
+    def __contains__(self, item_id):
+        return item_id in self.ids
+
+    def add(self, ids):
+        new_ids = {str(item_id) for item_id in ids if item_id} - self.ids
+        if new_ids:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(f"{item_id}\n" for item_id in sorted(new_ids))
+            self.ids |= new_ids
+        return new_ids
+
+    def reset(self, ids):
+        self.ids = {str(item_id) for item_id in ids if item_id}
+        content = "".join(f"{item_id}\n" for item_id in sorted(self.ids)).encode('utf-8')
+        _atomic_write(self.path, lambda f: f.write(content))
+
+
+def edge_key_hashes(keys):
+    """엣지 키 문자열 목록을 64비트 해시(uint64) 배열로 변환합니다."""
+    return np.fromiter((int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+                        for key in keys), dtype=np.uint64, count=len(keys))
+
+
+class EdgeKeyIndex:
+    """
+    정제된 엣지 키 해시의 정렬 배열입니다. 증분 엣지가 이미 정제 파일에 있는지 이진 탐색으로 확인합니다.
+    엣지당 8바이트이므로 엣지 파일 전체를 다시 읽거나 키 문자열을 메모리에 올리는 것보다 훨씬 가볍습니다.
+    """
+
+    def __init__(self, directory=STATE_DIR):
+        self.path = os.path.join(directory, EDGE_KEY_INDEX_FILE)
+        self.hashes = np.zeros(0, dtype=np.uint64)
+
+    def load(self, expected_count, edge_file, key_fn):
+        """저장된 인덱스를 읽습니다. 키 수가 상태 파일과 다르면(중단된 실행 등) 정제된 엣지 파일로 다시 만듭니다."""
+        if os.path.exists(self.path):
+            self.hashes = np.load(self.path)
+        if len(self.hashes) != expected_count:
+            logging.info(f"엣지 키 인덱스를 '{os.path.basename(edge_file)}'에서 다시 만듭니다.")
+            self.rebuild(edge_file, key_fn)
+        return self
+
+    def rebuild(self, edge_file, key_fn):
+        keys = []
+        if os.path.exists(edge_file):
+            with open(edge_file, 'r', encoding='utf-8') as f:
+                keys = [key_fn(json.loads(line)) for line in f if line.strip()]
+        self.hashes = np.unique(edge_key_hashes(keys))
+        return self
+
+    def contains(self, hashes):
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        return self.hashes[positions] == hashes
+
+    def add(self, hashes):
+        self.hashes = np.union1d(self.hashes, hashes).astype(np.uint64)
+
+    def save(self):
+        _atomic_write(self.path, lambda f: np.save(f, self.hashes))
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+class PaperDuplicateIndex:
+    """
+    정제된(대표) 논문의 MinHash 서명, LSH 밴드 키, 정규화 DOI 색인입니다.
+    증분 실행에서 새 논문이 이미 정제된 논문과 같은 저작인지, 정제 파일을 다시 읽거나 서명을 다시 계산하지 않고
+    같은 DOI 또는 같은 LSH 버킷의 논문만 비교해 확인합니다. (논문당 서명 256바이트 + 밴드 키 128바이트)
+    """
+
+    def __init__(self, directory=STATE_DIR):
+        self.path = os.path.join(directory, PAPER_DUPLICATE_INDEX_FILE)
+        self.paper_ids = np.zeros(0, dtype=str)
+        self.dois = np.zeros(0, dtype=str)
+        self.signatures = np.zeros((0, NUM_PERMUTATIONS), dtype=np.uint32)
+        self.bands = np.zeros((0, BANDS), dtype=np.uint64)
+        self._sorted_bands = None
+        self._doi_ids = None
+
+    def load(self, expected_count, paper_file):
+        """저장된 색인을 읽습니다. 논문 수가 정제된 논문 수와 다르면(중단된 실행, 이전 버전 상태 등) 정제된 논문 파일로 다시 만듭니다."""
+        if os.path.exists(self.path):
+            with np.load(self.path) as data:
+                self.paper_ids, self.dois = data["paper_ids"], data["dois"]
+                self.signatures, self.bands = data["signatures"], data["bands"]
+            self._sorted_bands = self._doi_ids = None
+        if len(self.paper_ids) != expected_count:
+            logging.info(f"논문 중복 색인을 '{os.path.basename(paper_file)}'에서 다시 만듭니다.")
+            self.rebuild(paper_file)
+        return self
+
+    def rebuild(self, paper_file):
+        papers = []
+        if os.path.exists(paper_file):
+            with open(paper_file, 'r', encoding='utf-8') as f:
+                papers = [json.loads(line) for line in f if line.strip()]
+        return self.reset(papers, compute_signatures(papers))
+
+    def reset(self, papers, signatures):
+        self.paper_ids = np.array([paper[PRIMARY_ID_FIELD] for paper in papers], dtype=str)
+        self.dois = np.array([normalize_doi(paper) for paper in papers], dtype=str)
+        self.signatures = np.asarray(signatures, dtype=np.uint32).reshape(len(papers), NUM_PERMUTATIONS)
+        self.bands = band_keys(self.signatures)
+        self._sorted_bands = self._doi_ids = None
+        return self
+
+    def add(self, papers, signatures):
+        if not papers:
+            return
+        added = PaperDuplicateIndex().reset(papers, signatures)
+        self.paper_ids = np.concatenate([self.paper_ids, added.paper_ids])
+        self.dois = np.concatenate([self.dois, added.dois])
+        self.signatures = np.concatenate([self.signatures, added.signatures])
+        self.bands = np.concatenate([self.bands, added.bands])
+        self._sorted_bands = self._doi_ids = None
+
+    def find_duplicates(self, papers, signatures, threshold=DUPLICATE_THRESHOLD):
+        """
+        새 논문 중 색인에 있는 논문과 같은 저작인 것을 찾아 {새 paperId: 기존 대표 paperId}로 반환합니다.
+        DOI가 같으면 바로 일치로 보고, 아니면 밴드 키가 하나라도 같은 기존 논문 중 서명 일치 비율이 가장 높은 논문이
+        threshold 이상일 때 일치로 봅니다. (전체 전처리의 find_duplicate_groups와 같은 기준)
+        """
+        matches = {}
+        if len(self.paper_ids) == 0 or not papers:
+            return matches
+        if self._doi_ids is None:
+            self._doi_ids = {doi: str(paper_id) for doi, paper_id in zip(self.dois, self.paper_ids) if doi}
+        if self._sorted_bands is None:
+            orders = [np.argsort(self.bands[:, band], kind="stable") for band in range(BANDS)]
+            self._sorted_bands = [(order, self.bands[order, band]) for band, order in enumerate(orders)]
+        new_bands = band_keys(signatures)
+        for i, paper in enumerate(papers):
+            doi = normalize_doi(paper)
+            if doi and doi in self._doi_ids:
+                matches[paper[PRIMARY_ID_FIELD]] = self._doi_ids[doi]
+                continue
+            rows = set()
+            for band, (order, keys) in enumerate(self._sorted_bands):
+                left = np.searchsorted(keys, new_bands[i, band], side="left")
+                right = np.searchsorted(keys, new_bands[i, band], side="right")
+                # 과밀 버킷은 전체 전처리와 마찬가지로 비교하지 않습니다.
+                if 0 < right - left <= MAX_BUCKET_SIZE:
+                    rows.update(order[left:right].tolist())
+            if not rows:
+                continue
+            rows = np.array(sorted(rows))
+            similarity = (self.signatures[rows] == signatures[i]).mean(axis=1)
+            best = int(np.argmax(similarity))
+            if similarity[best] >= threshold:
+                matches[paper[PRIMARY_ID_FIELD]] = str(self.paper_ids[rows[best]])
+        return matches
+
+    def save(self):
+        _atomic_write(self.path, lambda f: np.savez(f, paper_ids=self.paper_ids, dois=self.dois,
+                                                    signatures=self.signatures, bands=self.bands))
+
+    def __len__(self):
+        return len(self.paper_ids)
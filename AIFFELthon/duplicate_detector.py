@@ -0,0 +1,237 @@
+import os
+import re
+import json
+import time
+import zlib
+import logging
+import argparse
+from collections import defaultdict
+
+import numpy as np
+
+# --- 1. 설정 ---
+
+# MinHash 서명 길이와 LSH 밴드 구성 (BANDS * ROWS_PER_BAND == NUM_PERMUTATIONS)
+# 밴드 16개 x 행 4개: 자카드 유사도 약 0.5 이상인 쌍이 후보로 잡히고, 아래 임계값으로 다시 확인합니다.
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+# 서명으로 추정한 자카드 유사도가 이 값 이상이면 같은 저작으로 봅니다.
+DUPLICATE_THRESHOLD = 0.8
+
+# 단어 n-gram(shingle) 크기와, 서명 계산에 사용하는 최대 단어 수 (제목 + 초록 앞부분)
+SHINGLE_SIZE = 3
+MAX_SHINGLE_WORDS = 200
+
+# 한 버킷에 너무 많은 논문이 몰리면(정형화된 초록 등) 쌍 비교 비용이 커지므로 건너뜁니다.
+MAX_BUCKET_SIZE = 200
+
+# MinHash 해시 함수 (a * x + b) mod p 의 소수 p (2^32보다 큰 소수) 및 난수 시드
+HASH_PRIME = 4294967311
+RANDOM_SEED = 42
+
+PRIMARY_ID_FIELD = "paperId"
+
+
+# --- 2. MinHash 서명 ---
+
+_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+
+def normalized_words(paper):
+    """제목과 초록을 소문자 단어 목록으로 정규화합니다. (구두점·대소문자 차이 제거)"""
+    text = f"{paper.get('title') or ''} {paper.get('abstract') or ''}".lower()
+    return _WORD_PATTERN.findall(text)[:MAX_SHINGLE_WORDS]
+
+
+def shingle_hashes(words):
+    """단어 n-gram의 32비트 해시 배열을 만듭니다. (단어마다 한 번만 해시한 뒤 numpy로 조합)"""
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    word_hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words))
+    if len(word_hashes) < SHINGLE_SIZE:
+        return np.unique(word_hashes)
+    combined = np.zeros(len(word_hashes) - SHINGLE_SIZE + 1, dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        combined = (combined * np.uint64(1000003) + word_hashes[offset:offset + len(combined)]) % np.uint64(1 << 32)
+    return np.unique(combined)
+
+
+class MinHasher:
+    """고정된 난수 해시 함수 NUM_PERMUTATIONS개로 shingle 집합의 MinHash 서명을 계산합니다."""
+
+    def __init__(self, num_permutations=NUM_PERMUTATIONS, seed=RANDOM_SEED):
+        rng = np.random.default_rng(seed)
+        # a, b < 2^32 이고 x < 2^32 이므로 a * x + b는 uint64 범위를 넘지 않습니다.
+        self.a = rng.integers(1, 1 << 32, size=num_permutations, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_permutations, dtype=np.uint64)
+        self.num_permutations = num_permutations
+
+    def signature(self, hashes):
+        if len(hashes) == 0:
+            return np.full(self.num_permutations, np.iinfo(np.uint32).max, dtype=np.uint32)
+        values = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % np.uint64(HASH_PRIME)
+        return values.min(axis=1).astype(np.uint32)
+
+
+def compute_signatures(papers, hasher=None):
+    """논문 목록의 MinHash 서명 행렬 (논문 수 x NUM_PERMUTATIONS, uint32)을 계산합니다."""
+    hasher = hasher or MinHasher()
+    signatures = np.empty((len(papers), hasher.num_permutations), dtype=np.uint32)
+    for i, paper in enumerate(papers):
+        signatures[i] = hasher.signature(shingle_hashes(normalized_words(paper)))
+    return signatures
+
+
+def band_keys(signatures):
+    """
+    서명 행렬을 LSH 밴드마다 64비트 키 하나로 줄입니다. (논문 수 x BANDS, uint64)
+    증분 실행이 기존 코퍼스의 밴드 키를 저장해 두고 새 논문과 같은 버킷의 논문만 찾는 데 사용합니다.
+    키가 같아도 서명 일치 비율로 다시 확인하므로 해시 충돌은 후보가 조금 늘어날 뿐입니다.
+    """
+    columns = signatures.reshape(len(signatures), BANDS, ROWS_PER_BAND).astype(np.uint64)
+    keys = np.zeros((len(signatures), BANDS), dtype=np.uint64)
+    for row in range(ROWS_PER_BAND):
+        keys = keys * np.uint64(1099511628211) + columns[:, :, row]
+    return keys
+
+
+# --- 3. 중복 후보 탐색 ---
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = np.arange(size)
+
+    def find(self, x):
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, x, y):
+        root_x, root_y = self.find(x), self.find(y)
+        if root_x != root_y:
+            self.parent[max(root_x, root_y)] = min(root_x, root_y)
+            return True
+        return False
+
+
+def normalize_doi(paper):
+    doi = ((paper.get("externalIds") or {}).get("DOI") or "").strip().lower()
+    return re.sub(r"^(https?://)?(dx\.)?doi\.org/", "", doi)
+
+
+def find_duplicate_groups(papers, signatures=None, threshold=DUPLICATE_THRESHOLD):
+    """
+    같은 저작으로 판단되는 논문 인덱스 묶음 목록을 반환합니다.
+    1) externalIds.DOI가 같은 논문은 바로 묶습니다.
+    2) MinHash 서명을 밴드로 나눠 밴드 값이 같은 논문끼리만 비교(LSH)하므로 전체 쌍 비교 없이 O(n log n)에 후보를 찾고,
+       서명 일치 비율(추정 자카드 유사도)이 threshold 이상인 쌍을 묶습니다.
+    """
+    stats = {"doi_merges": 0, "minhash_merges": 0, "skipped_buckets": 0}
+    union_find = _UnionFind(len(papers))
+
+    by_doi = defaultdict(list)
+    for i, paper in enumerate(papers):
+        doi = normalize_doi(paper)
+        if doi:
+            by_doi[doi].append(i)
+    for indices in by_doi.values():
+        for other in indices[1:]:
+            stats["doi_merges"] += union_find.union(indices[0], other)
+
+    if signatures is None:
+        signatures = compute_signatures(papers)
+    for band in range(BANDS):
+        columns = np.ascontiguousarray(signatures[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+        keys = columns.view(np.dtype((np.void, columns.dtype.itemsize * ROWS_PER_BAND))).ravel()
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        shared = np.flatnonzero(counts[inverse] > 1)
+        if len(shared) == 0:
+            continue
+        order = shared[np.argsort(inverse[shared], kind="stable")]
+        boundaries = np.flatnonzero(np.diff(inverse[order])) + 1
+        for bucket in np.split(order, boundaries):
+            if len(bucket) > MAX_BUCKET_SIZE:
+                stats["skipped_buckets"] += 1
+                continue
+            bucket_signatures = signatures[bucket]
+            similarity = (bucket_signatures[:, None, :] == bucket_signatures[None, :, :]).mean(axis=2)
+            for x, y in zip(*np.nonzero(np.triu(similarity >= threshold, k=1))):
+                stats["minhash_merges"] += union_find.union(int(bucket[x]), int(bucket[y]))
+
+    groups = defaultdict(list)
+    for i in range(len(papers)):
+        groups[union_find.find(i)].append(i)
+    return [members for members in groups.values() if len(members) > 1], stats
+
+
+def _canonical_rank(paper):
+    # 저널 게재본 > 피인용 수 > paperId 순으로 대표 논문을 고릅니다. (결과가 실행마다 같도록 마지막은 ID 비교)
+    has_journal = bool((paper.get("journal") or {}).get("name"))
+    return (not has_journal, -(paper.get("citationCount") or 0), paper.get(PRIMARY_ID_FIELD, ""))
+
+
+def merge_duplicate_papers(papers, signatures=None):
+    """
+    중복 논문을 대표 논문 하나로 합칩니다.
+    대표 논문에는 합쳐진 논문 ID 목록(mergedPaperIds)을 기록하고, 피인용 수는 묶음 중 최댓값을 사용합니다.
+    signatures를 넘기면(compute_signatures 결과) 서명을 다시 계산하지 않습니다.
+    Returns:
+        (merged_papers, duplicate_map): duplicate_map은 {중복 paperId: 대표 paperId}
+    """
+    start_time = time.perf_counter()
+    groups, stats = find_duplicate_groups(papers, signatures)
+    duplicate_map = {}
+    dropped = set()
+    for members in groups:
+        ranked = sorted(members, key=lambda i: _canonical_rank(papers[i]))
+        canonical = papers[ranked[0]]
+        canonical_id = canonical[PRIMARY_ID_FIELD]
+        merged_ids = [papers[i][PRIMARY_ID_FIELD] for i in ranked[1:] if papers[i][PRIMARY_ID_FIELD] != canonical_id]
+        if merged_ids:
+            canonical["mergedPaperIds"] = sorted(set(canonical.get("mergedPaperIds", [])) | set(merged_ids))
+        canonical["citationCount"] = max((papers[i].get("citationCount") or 0) for i in members)
+        for i in ranked[1:]:
+            # 같은 논문이 다시 수집된 경우(같은 paperId)는 매핑 없이 한 건만 남깁니다.
+            if papers[i][PRIMARY_ID_FIELD] != canonical_id:
+                duplicate_map[papers[i][PRIMARY_ID_FIELD]] = canonical_id
+            dropped.add(i)
+    merged_papers = [paper for i, paper in enumerate(papers) if i not in dropped]
+    logging.info(f"중복 논문 탐지 완료: {len(papers)}개 중 {len(groups)}개 묶음, {len(dropped)}개 병합 "
+                 f"(DOI {stats['doi_merges']}건, MinHash {stats['minhash_merges']}건, "
+                 f"건너뛴 과밀 버킷 {stats['skipped_buckets']}개, {time.perf_counter() - start_time:.1f}초)")
+    return merged_papers, duplicate_map
+
+
+def write_duplicate_map(duplicate_map, filename, append=False):
+    with open(filename, 'a' if append else 'w', encoding='utf-8') as f:
+        for duplicate_id, canonical_id in sorted(duplicate_map.items()):
+            f.write(json.dumps({"duplicateId": duplicate_id, "canonicalId": canonical_id}) + "\n")
+
+
+def load_duplicate_map(filename):
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, 'r', encoding='utf-8') as f:
+        return {record["duplicateId"]: record["canonicalId"] for record in map(json.loads, f)}
+
+
+# --- 4. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="논문 파일에서 DOI/MinHash-LSH로 같은 저작의 중복 논문을 찾아 보고")
+    parser.add_argument("--input", default=os.path.join("semantic_scholar_sociology_data", "sociology_papers_cleaned.jsonl"))
+    parser.add_argument("--show", type=int, default=10, help="출력할 중복 묶음 수")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        papers = [json.loads(line) for line in f if line.strip()]
+    groups, stats = find_duplicate_groups(papers)
+    print(f"논문 {len(papers)}개 중 중복 묶음 {len(groups)}개, 병합 대상 {sum(len(g) - 1 for g in groups)}개 "
+          f"(DOI {stats['doi_merges']}건, MinHash {stats['minhash_merges']}건)")
+    for members in groups[:args.show]:
+        print("- " + " | ".join(f"{papers[i][PRIMARY_ID_FIELD]}: {str(papers[i].get('title'))[:60]}" for i in members))
@@ -0,0 +1,136 @@
+import os
+import json
+import zlib
+import shutil
+import logging
+import argparse
+import tempfile
+from contextlib import contextmanager
+
+# --- 1. 설정 ---
+
+# 인용 관계의 표준 표기. 수집기는 같은 인용을 두 방향에서 기록합니다.
+# - REFERENCES: 확장한 논문(source)이 참고문헌(target)을 인용
+# - CITES: 인용한 논문(source)이 확장한 논문(target)을 인용
+# 두 관계 모두 source가 target을 인용하는 방향이므로, 관계 이름만 CITES로 통일하면 같은 인용은 같은 엣지가 됩니다.
+CANONICAL_CITATION_RELATION = "CITES"
+CITATION_RELATION_ALIASES = {"CITES": "CITES", "REFERENCES": "CITES"}
+
+# 한 파티션(메모리 안에서 중복을 제거하는 단위)이 차지할 최대 입력 크기 (바이트)
+# 입력 파일이 이보다 작으면 임시 파일 없이 바로 메모리에서 중복을 제거합니다.
+PARTITION_MEMORY_BYTES = int(os.getenv("SOCY_EDGE_DEDUP_MEMORY_BYTES", str(256 * 1024 * 1024)))
+
+
+# --- 2. 표준화 ---
+
+def canonical_edge(edge):
+    """인용 관계 이름을 CITES로 통일한 엣지를 반환합니다. (방향은 source -> target 인용 그대로)"""
+    relation = CITATION_RELATION_ALIASES.get(edge.get("relation"))
+    if relation is None or relation == edge.get("relation"):
+        return edge
+    return dict(edge, relation=relation)
+
+
+def edge_key(edge):
+    return f"{edge.get('source')}\t{edge.get('target')}\t{edge.get('relation')}"
+
+
+# --- 3. 해시 파티션 중복 제거 ---
+
+def _partition_count(size_hint):
+    return max(1, -(-int(size_hint) // PARTITION_MEMORY_BYTES))
+
+
+def _write_unique(lines, output):
+    """한 파티션의 줄에서 처음 나온 엣지만 출력 파일에 씁니다. (쓴 줄 수 반환)"""
+    seen = set()
+    written = 0
+    for key, line in lines:
+        if key in seen:
+            continue
+        seen.add(key)
+        output.write(line)
+        written += 1
+    return written
+
+
+@contextmanager
+def _replacing(output_file):
+    """임시 파일에 쓰고 fsync한 뒤 output_file을 교체합니다. (중간에 중단되어도 잘린 출력 파일이 남지 않음)"""
+    temp_file = f"{output_file}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as output:
+        yield output
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temp_file, output_file)
+
+
+def deduplicate_edges(edges, output_file, size_hint=0, temp_dir=None):
+    """
+    엣지를 표준화된 키(source, target, relation) 기준으로 중복 제거하여 output_file에 씁니다.
+    edges는 한 번만 순회하는 이터레이터여도 되고, size_hint(입력 크기, 바이트)로 파티션 수를 정합니다.
+    입력이 PARTITION_MEMORY_BYTES보다 크면 키 해시로 여러 임시 파일에 나눈 뒤 파티션별로 메모리에서 중복을 제거하므로,
+    메모리보다 큰 엣지 파일도 처리할 수 있습니다. (같은 키는 항상 같은 파티션으로 갑니다)
+    Returns:
+        (입력 엣지 수, 출력 엣지 수)
+    """
+    num_partitions = _partition_count(size_hint)
+    total = 0
+
+    if num_partitions == 1:
+        def keyed_lines():
+            nonlocal total
+            for edge in edges:
+                total += 1
+                yield edge_key(edge), json.dumps(edge, ensure_ascii=False) + "\n"
+
+        with _replacing(output_file) as output:
+            written = _write_unique(keyed_lines(), output)
+        return total, written
+
+    work_dir = tempfile.mkdtemp(prefix="edge_dedup_", dir=temp_dir or os.path.dirname(os.path.abspath(output_file)))
+    logging.info(f"엣지 중복 제거: 입력 {size_hint / 1024 ** 2:.0f}MB를 {num_partitions}개 파티션으로 나눠 처리합니다.")
+    try:
+        partitions = [open(os.path.join(work_dir, f"part-{i:04d}.jsonl"), 'w', encoding='utf-8')
+                      for i in range(num_partitions)]
+        try:
+            for edge in edges:
+                total += 1
+                key = edge_key(edge)
+                partitions[zlib.crc32(key.encode("utf-8")) % num_partitions].write(
+                    json.dumps(edge, ensure_ascii=False) + "\n")
+        finally:
+            for partition in partitions:
+                partition.close()
+
+        written = 0
+        with _replacing(output_file) as output:
+            for partition in partitions:
+                with open(partition.name, 'r', encoding='utf-8') as f:
+                    written += _write_unique(((edge_key(json.loads(line)), line) for line in f), output)
+                os.remove(partition.name)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return total, written
+
+
+def iter_edges(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+# --- 4. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="엣지 파일의 인용 관계를 CITES로 통일하고 중복 엣지를 제거")
+    parser.add_argument("input", help="입력 엣지 파일 (.jsonl)")
+    parser.add_argument("output", help="출력 엣지 파일 (.jsonl)")
+    args = parser.parse_args()
+
+    total, written = deduplicate_edges((canonical_edge(edge) for edge in iter_edges(args.input)), args.output,
+                                       size_hint=os.path.getsize(args.input))
+    print(f"엣지 {total}개 -> {written}개 (중복 {total - written}개 제거, {100 * (total - written) / max(total, 1):.1f}% 감소)")
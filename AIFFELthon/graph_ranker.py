@@ -0,0 +1,85 @@
+import time
+
+import numpy as np
+
+# --- 1. 설정 ---
+
+# 랜덤 워크 지속 확률 (1 - 재시작 확률)
+DAMPING_FACTOR = 0.85
+
+# 반복 간 점수 변화(L1)가 이 값보다 작아지면 수렴으로 판단하고 조기 종료합니다.
+CONVERGENCE_TOLERANCE = 1e-6
+
+# 최대 반복 횟수 및 온라인 호출 시 허용하는 시간 예산 (밀리초)
+MAX_ITERATIONS = 50
+DEFAULT_TIME_BUDGET_MS = 30
+
+
+# --- 2. Personalized PageRank ---
+
+def personalized_pagerank(snapshot, seed_weights, damping=DAMPING_FACTOR, tol=CONVERGENCE_TOLERANCE,
+                          max_iter=MAX_ITERATIONS, time_budget_ms=DEFAULT_TIME_BUDGET_MS):
+    """
+    시드 논문에서 재시작하는 랜덤 워크(Personalized PageRank)를 희소 행렬 거듭제곱법으로 계산합니다.
+    Args:
+        snapshot (GraphSnapshot): 인용/저자 그래프 스냅샷.
+        seed_weights (dict): {paperId: 가중치} 형태의 재시작 분포.
+        damping (float): 랜덤 워크 지속 확률.
+        tol (float): 조기 종료 기준 (반복 간 L1 변화량).
+        max_iter (int): 최대 반복 횟수.
+        time_budget_ms (float): 시간 예산. 초과 시 현재까지의 근사값을 반환합니다. None이면 제한 없음.
+    Returns:
+        tuple: (논문별 점수 np.ndarray 또는 None, 수행한 반복 횟수)
+    """
+    restart = np.zeros(snapshot.num_papers + snapshot.num_authors, dtype=np.float32)
+    for paper_id, weight in seed_weights.items():
+        index = snapshot.paper_index_of(paper_id)
+        if index is not None and weight > 0:
+            restart[index] += weight
+    if restart.sum() == 0:
+        return None, 0
+    restart /= restart.sum()
+
+    transition_t, dangling = snapshot.walk_matrix()
+    deadline = None if time_budget_ms is None else time.perf_counter() + time_budget_ms / 1000.0
+
+    scores = restart.copy()
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        # dangling 노드에 머무는 확률 질량은 시드 분포로 되돌립니다.
+        dangling_mass = scores[dangling].sum()
+        updated = damping * (transition_t @ scores) + (damping * dangling_mass + (1.0 - damping)) * restart
+        delta = np.abs(updated - scores).sum()
+        scores = updated
+        if delta < tol or (deadline is not None and time.perf_counter() >= deadline):
+            break
+
+    return scores[:snapshot.num_papers], iterations
+
+
+def recommend_by_random_walk(snapshot, seed_paper_ids, top_n=4, **kwargs):
+    """
+    벡터 검색 결과(순위순 paperId 목록)를 시드로 PPR을 수행하고, 시드를 제외한 상위 논문을 반환합니다.
+    상위 순위의 시드일수록 재시작 가중치가 큽니다 (1 / 순위).
+    Returns:
+        list: [(paperId, 점수), ...] 점수 내림차순. 시드가 그래프에 없으면 빈 리스트.
+    """
+    seed_weights = {}
+    for rank, paper_id in enumerate(seed_paper_ids):
+        seed_weights[paper_id] = seed_weights.get(paper_id, 0.0) + 1.0 / (rank + 1)
+
+    scores, _ = personalized_pagerank(snapshot, seed_weights, **kwargs)
+    if scores is None:
+        return []
+
+    for paper_id in seed_weights:
+        index = snapshot.paper_index_of(paper_id)
+        if index is not None:
+            scores[index] = 0.0
+
+    candidate_count = min(top_n, int(np.count_nonzero(scores)))
+    if candidate_count == 0:
+        return []
+    top_indices = np.argpartition(-scores, candidate_count - 1)[:candidate_count]
+    top_indices = top_indices[np.argsort(-scores[top_indices])]
+    return [(snapshot.paper_id_of(i), float(scores[i])) for i in top_indices]
@@ -0,0 +1,531 @@
+import os
+import json
+import glob
+import time
+import shutil
+import logging
+import argparse
+
+import numpy as np
+from scipy import sparse
+
+from signal_status import mark_fresh
+from sharded_dataset import iter_exported_lines
+
+# --- 1. 설정 ---
+
+# 데이터 디렉토리 (data_collector.py와 동일하게 설정)
+DATA_DIR = "semantic_scholar_sociology_data"
+
+# 전처리된 노드/엣지 파일 (data_preprocessor.py에서 생성)
+CLEANED_PAPER_NODE_FILE = os.path.join(DATA_DIR, "sociology_papers_cleaned.jsonl")
+CLEANED_EDGE_DATA_FILE = os.path.join(DATA_DIR, "sociology_edges_cleaned.jsonl")
+
+# 스냅샷 저장 디렉토리 및 증분 엣지(delta) 파일 디렉토리
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "graph_snapshot")
+EDGE_DELTA_DIR = os.path.join(DATA_DIR, "edge_deltas")
+
+# 스냅샷 디렉토리 안에서 현재 버전을 가리키는 파일. 버전 교체는 이 파일의 원자적 교체로 이루어집니다.
+CURRENT_POINTER_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+# 이전 버전을 몇 개까지 남겨둘지 (읽고 있는 워커가 있을 수 있으므로 바로 지우지 않습니다)
+KEEP_VERSIONS = 2
+
+# 인용 관계로 취급하는 엣지 유형. 두 유형 모두 source가 target을 인용합니다.
+# (REFERENCES: 논문 -> 참고문헌, CITES: 인용한 논문 -> 논문)
+CITATION_RELATIONS = ("CITES", "REFERENCES")
+AUTHORSHIP_RELATION = "WROTE"  # source=author, target=paper
+
+# 랜덤 워크 시 관계 유형별 가중치 (인용 관계와 저자 관계의 상대적 중요도)
+CITATION_EDGE_WEIGHT = 1.0
+AUTHOR_EDGE_WEIGHT = 0.5
+
+# Neo4j에서 스냅샷을 만들 때 사용하는 질의
+EXPORT_PAPERS_QUERY = "MATCH (p:Paper) WHERE p.paperId IS NOT NULL RETURN p.paperId AS paperId"
+EXPORT_CITES_QUERY = "MATCH (s:Paper)-[:CITES]->(t:Paper) RETURN s.paperId AS source, t.paperId AS target"
+EXPORT_AUTHORSHIP_QUERY = (
+    "MATCH (p:Paper)-[:HAS_AUTHOR]->(a:Author) WHERE a.authorId IS NOT NULL "
+    "RETURN p.paperId AS paperId, a.authorId AS authorId"
+)
+
+# 스냅샷을 구성하는 CSR 배열 이름 (각각 <이름>_indptr.npy, <이름>_indices.npy로 저장)
+# cites: 논문 -> 인용한 논문, cited_by: 논문 -> 인용한 논문들(역방향)
+# has_author: 논문 -> 저자, authored: 저자 -> 논문(역방향)
+CSR_ARRAYS = ("cites", "cited_by", "has_author", "authored")
+
+
+# --- 2. 그래프 스냅샷 ---
+
+class GraphSnapshot:
+    """
+    인용(CITES) / 저자(HAS_AUTHOR) 그래프를 CSR 희소 행렬 형태로 보관하는 스냅샷입니다.
+    - 논문 인덱스: 0 ~ num_papers-1, 저자 인덱스: 0 ~ num_authors-1
+    - cites / cited_by: (논문 x 논문) 인용 관계 행렬과 그 역방향
+    - has_author / authored: (논문 x 저자) 저술 관계 행렬과 그 역방향
+    인덱스 배열은 int32이며, save()/load()를 통해 메모리 매핑된 .npy 파일로 여러 프로세스가 복사 없이 공유합니다.
+    """
+
+    def __init__(self, paper_ids, author_ids, cites, has_author, cited_by=None, authored=None,
+                 version=0, applied_deltas=None):
+        self.paper_ids = _as_id_array(paper_ids)
+        self.author_ids = _as_id_array(author_ids)
+        self._paper_order = np.argsort(self.paper_ids, kind="stable")
+        self._author_order = np.argsort(self.author_ids, kind="stable")
+        self.cites = cites
+        self.has_author = has_author
+        self.cited_by = cited_by if cited_by is not None else _to_int32_csr(cites.T)
+        self.authored = authored if authored is not None else _to_int32_csr(has_author.T)
+        self.version = version
+        self.applied_deltas = list(applied_deltas or [])
+        self._walk_matrix = None
+
+    @property
+    def num_papers(self):
+        return len(self.paper_ids)
+
+    @property
+    def num_authors(self):
+        return len(self.author_ids)
+
+    # --- ID <-> 인덱스 변환 (정렬된 순서 배열에 대한 이진 탐색, 별도의 dict를 만들지 않습니다) ---
+
+    def paper_index_of(self, paper_id):
+        """paperId의 행 인덱스를 반환합니다. 스냅샷에 없으면 None."""
+        return find_id_index(self.paper_ids, self._paper_order, paper_id)
+
+    def author_index_of(self, author_id):
+        """authorId의 열 인덱스를 반환합니다. 스냅샷에 없으면 None."""
+        return find_id_index(self.author_ids, self._author_order, author_id)
+
+    def paper_id_of(self, index):
+        return self.paper_ids[index].decode("ascii")
+
+    def author_id_of(self, index):
+        return self.author_ids[index].decode("ascii")
+
+    # --- 생성 ---
+
+    @classmethod
+    def from_pairs(cls, paper_ids, author_ids, cite_pairs, author_pairs):
+        """
+        (citer, cited) 논문 ID 쌍과 (paperId, authorId) 쌍 목록으로 스냅샷을 만듭니다.
+        알 수 없는 ID를 가리키는 쌍과 자기 인용, 중복 엣지는 제외됩니다.
+        """
+        paper_ids = list(dict.fromkeys(paper_ids))
+        author_ids = list(dict.fromkeys(author_ids))
+        paper_index = {paper_id: i for i, paper_id in enumerate(paper_ids)}
+        author_index = {author_id: i for i, author_id in enumerate(author_ids)}
+
+        cite_rows, cite_cols = [], []
+        for source_id, target_id in cite_pairs:
+            s, t = paper_index.get(source_id), paper_index.get(target_id)
+            if s is not None and t is not None and s != t:
+                cite_rows.append(s)
+                cite_cols.append(t)
+
+        author_rows, author_cols = [], []
+        for paper_id, author_id in author_pairs:
+            p, a = paper_index.get(paper_id), author_index.get(author_id)
+            if p is not None and a is not None:
+                author_rows.append(p)
+                author_cols.append(a)
+
+        cites = _build_binary_csr(cite_rows, cite_cols, (len(paper_ids), len(paper_ids)))
+        has_author = _build_binary_csr(author_rows, author_cols, (len(paper_ids), len(author_ids)))
+        return cls(paper_ids, author_ids, cites, has_author)
+
+    @classmethod
+    def from_edges_file(cls, edge_file=CLEANED_EDGE_DATA_FILE, paper_file=CLEANED_PAPER_NODE_FILE):
+        """
+        전처리된 엣지 파일(.jsonl)로 스냅샷을 만듭니다.
+        논문 노드 파일이 있으면 엣지가 없는 논문도 포함하고, 노드 파일에 없는 논문을 가리키는 엣지는 제외합니다.
+        """
+        start_time = time.perf_counter()
+        paper_ids = None
+        if paper_file and os.path.exists(paper_file):
+            paper_ids = [record.get("paperId") for record in _iter_jsonl(paper_file) if record.get("paperId")]
+
+        cite_pairs, author_pairs = [], []
+        for edge in _iter_jsonl(edge_file):
+            pair = _edge_to_pair(edge)
+            if pair is None:
+                continue
+            kind, first, second = pair
+            (cite_pairs if kind == "cite" else author_pairs).append((first, second))
+
+        if paper_ids is None:
+            paper_ids = [pid for pair in cite_pairs for pid in pair] + [pid for pid, _ in author_pairs]
+        author_ids = [author_id for _, author_id in author_pairs]
+        snapshot = cls.from_pairs(paper_ids, author_ids, cite_pairs, author_pairs)
+        snapshot._log_summary(f"엣지 파일 '{os.path.basename(edge_file)}'", start_time)
+        return snapshot
+
+    @classmethod
+    def from_neo4j(cls, driver, database="neo4j"):
+        """
+        Neo4j에서 Paper/Author 노드와 CITES/HAS_AUTHOR 관계를 한 번에 내보내 스냅샷을 만듭니다.
+        """
+        start_time = time.perf_counter()
+        with driver.session(database=database) as session:
+            paper_ids = [record["paperId"] for record in session.run(EXPORT_PAPERS_QUERY)]
+            cite_pairs = [(record["source"], record["target"]) for record in session.run(EXPORT_CITES_QUERY)]
+            author_pairs = [(record["paperId"], record["authorId"])
+                            for record in session.run(EXPORT_AUTHORSHIP_QUERY)]
+
+        author_ids = [author_id for _, author_id in author_pairs]
+        snapshot = cls.from_pairs(paper_ids, author_ids, cite_pairs, author_pairs)
+        snapshot._log_summary("Neo4j", start_time)
+        return snapshot
+
+    def _log_summary(self, source_name, start_time):
+        logging.info(
+            f"{source_name}에서 그래프 스냅샷 생성 완료: 논문 {self.num_papers}개, 저자 {self.num_authors}명, "
+            f"인용 {self.cites.nnz}개, 저술 {self.has_author.nnz}개 "
+            f"({time.perf_counter() - start_time:.1f}초)"
+        )
+
+    # --- 저장 / 로드 ---
+
+    def save(self, directory=SNAPSHOT_DIR):
+        """
+        스냅샷을 새 버전 디렉토리(v000001, v000002, ...)에 .npy 파일로 저장한 뒤,
+        CURRENT 포인터를 원자적으로 교체합니다. 기존 버전을 읽고 있는 프로세스에는 영향이 없습니다.
+        """
+        arrays = {"paper_ids": self.paper_ids, "author_ids": self.author_ids}
+        max_nnz = 0
+        for name in CSR_ARRAYS:
+            matrix = getattr(self, name)
+            arrays[f"{name}_indptr"] = matrix.indptr.astype(np.int32, copy=False)
+            arrays[f"{name}_indices"] = matrix.indices.astype(np.int32, copy=False)
+            max_nnz = max(max_nnz, matrix.nnz)
+        # 모든 CSR 행렬이 공유하는 값 배열 (이진 그래프이므로 1.0). 로드 시 잘라서 뷰로 사용합니다.
+        arrays["ones"] = np.ones(max_nnz, dtype=np.float32)
+
+        self.version, version_name = publish_arrays(directory, arrays, {
+            "num_papers": self.num_papers,
+            "num_authors": self.num_authors,
+            "num_citations": int(self.cites.nnz),
+            "num_authorships": int(self.has_author.nnz),
+            "applied_deltas": self.applied_deltas,
+        })
+        logging.info(f"그래프 스냅샷 버전 {version_name} 저장 완료: '{directory}'")
+        return version_name
+
+    @classmethod
+    def load(cls, directory=SNAPSHOT_DIR):
+        """
+        CURRENT가 가리키는 버전을 메모리 매핑(mmap_mode='r')으로 불러옵니다.
+        파일을 다시 파싱하지 않으므로 대용량 그래프도 수 초 안에 로드되며,
+        같은 파일을 매핑한 프로세스들은 OS 페이지 캐시를 공유합니다.
+        """
+        start_time = time.perf_counter()
+        version, manifest, arrays = load_arrays(
+            directory, ["paper_ids", "author_ids", "ones"]
+            + [f"{name}_{part}" for name in CSR_ARRAYS for part in ("indptr", "indices")]
+        )
+        paper_ids, author_ids, ones = arrays["paper_ids"], arrays["author_ids"], arrays["ones"]
+        shapes = {
+            "cites": (len(paper_ids), len(paper_ids)),
+            "cited_by": (len(paper_ids), len(paper_ids)),
+            "has_author": (len(paper_ids), len(author_ids)),
+            "authored": (len(author_ids), len(paper_ids)),
+        }
+        matrices = {}
+        for name in CSR_ARRAYS:
+            indptr, indices = arrays[f"{name}_indptr"], arrays[f"{name}_indices"]
+            matrices[name] = sparse.csr_matrix((ones[:len(indices)], indices, indptr),
+                                               shape=shapes[name], copy=False)
+
+        snapshot = cls(paper_ids, author_ids, matrices["cites"], matrices["has_author"],
+                       cited_by=matrices["cited_by"], authored=matrices["authored"],
+                       version=version, applied_deltas=manifest.get("applied_deltas"))
+        logging.info(f"그래프 스냅샷 버전 v{version:06d} 로드 완료 ({time.perf_counter() - start_time:.2f}초)")
+        return snapshot
+
+    # --- 증분 갱신 ---
+
+    def apply_edge_deltas(self, delta_files):
+        """
+        엣지 delta 파일(.jsonl)들을 반영한 새 스냅샷을 반환합니다. (원본 스냅샷은 변경하지 않음)
+        각 줄은 전처리된 엣지와 같은 형식이며, "op": "delete"인 줄은 해당 엣지를 제거합니다.
+        새로 등장한 논문/저자는 기존 인덱스 뒤에 추가되므로 기존 인덱스는 그대로 유지됩니다.
+        """
+        paper_ids = [pid.decode("ascii") for pid in self.paper_ids]
+        author_ids = [aid.decode("ascii") for aid in self.author_ids]
+        known_papers = set(paper_ids)
+        known_authors = set(author_ids)
+
+        additions = {"cite": [], "author": []}
+        deletions = {"cite": [], "author": []}
+        for delta_file in delta_files:
+            for edge in _iter_jsonl(delta_file):
+                pair = _edge_to_pair(edge)
+                if pair is None:
+                    continue
+                kind, first, second = pair
+                if edge.get("op") == "delete":
+                    deletions[kind].append((first, second))
+                    continue
+                for paper_id in ((first, second) if kind == "cite" else (first,)):
+                    if paper_id not in known_papers:
+                        known_papers.add(paper_id)
+                        paper_ids.append(paper_id)
+                if kind == "author" and second not in known_authors:
+                    known_authors.add(second)
+                    author_ids.append(second)
+                additions[kind].append((first, second))
+
+        paper_index = {paper_id: i for i, paper_id in enumerate(paper_ids)}
+        author_index = {author_id: i for i, author_id in enumerate(author_ids)}
+        num_papers, num_authors = len(paper_ids), len(author_ids)
+
+        cites = _merge_edges(self.cites, (num_papers, num_papers),
+                             _pairs_to_indices(additions["cite"], paper_index, paper_index),
+                             _pairs_to_indices(deletions["cite"], paper_index, paper_index))
+        has_author = _merge_edges(self.has_author, (num_papers, num_authors),
+                                  _pairs_to_indices(additions["author"], paper_index, author_index),
+                                  _pairs_to_indices(deletions["author"], paper_index, author_index))
+
+        applied = self.applied_deltas + [os.path.basename(path) for path in delta_files]
+        logging.info(
+            f"엣지 delta {len(delta_files)}개 반영: 인용 +{len(additions['cite'])}/-{len(deletions['cite'])}, "
+            f"저술 +{len(additions['author'])}/-{len(deletions['author'])}"
+        )
+        return GraphSnapshot(paper_ids, author_ids, cites, has_author,
+                             version=self.version, applied_deltas=applied)
+
+    # --- 랜덤 워크 ---
+
+    def walk_matrix(self):
+        """
+        랜덤 워크용 전이 행렬의 전치(Tᵀ)와 dangling 노드 마스크를 반환합니다. (최초 1회 계산 후 캐싱)
+        노드 공간은 [논문 0..P-1, 저자 P..P+A-1]이며, 인용은 양방향(참고문헌/피인용)으로 이동합니다.
+        """
+        if self._walk_matrix is None:
+            citations = CITATION_EDGE_WEIGHT * (self.cites + self.cited_by)
+            authorship = AUTHOR_EDGE_WEIGHT * self.has_author
+            adjacency = sparse.bmat(
+                [[citations, authorship], [AUTHOR_EDGE_WEIGHT * self.authored, None]],
+                format="csr", dtype=np.float32
+            )
+            out_degree = np.asarray(adjacency.sum(axis=1)).ravel()
+            dangling = out_degree == 0
+            inverse_degree = np.zeros_like(out_degree)
+            inverse_degree[~dangling] = 1.0 / out_degree[~dangling]
+            transition = sparse.diags(inverse_degree.astype(np.float32)) @ adjacency
+            self._walk_matrix = (transition.T.tocsr(), dangling)
+        return self._walk_matrix
+
+
+# --- 3. 보조 함수 ---
+
+def current_version(directory=SNAPSHOT_DIR):
+    """CURRENT 포인터가 가리키는 스냅샷 버전 번호를 반환합니다. 스냅샷이 없으면 None."""
+    pointer = os.path.join(directory, CURRENT_POINTER_FILE)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, 'r', encoding='utf-8') as f:
+        name = f.read().strip()
+    return int(name.lstrip("v")) if name else None
+
+
+def pending_delta_files(snapshot, delta_dir=EDGE_DELTA_DIR):
+    """스냅샷에 아직 반영되지 않은 delta 파일 목록을 파일명 순으로 반환합니다."""
+    applied = set(snapshot.applied_deltas)
+    return [path for path in sorted(glob.glob(os.path.join(delta_dir, "*.jsonl")))
+            if os.path.basename(path) not in applied]
+
+
+def _as_id_array(ids):
+    """ID 목록을 고정 길이 ASCII 바이트 배열로 변환합니다. (mmap으로 공유 가능한 형태)"""
+    if isinstance(ids, np.ndarray) and ids.dtype.kind == "S":
+        return ids
+    ids = [str(item).encode("ascii") for item in ids]
+    return np.array(ids, dtype="S1") if not ids else np.array(ids)
+
+
+def find_id_index(ids, order, item_id):
+    """정렬 순서 배열(order)을 이용해 ID 배열에서 item_id의 위치를 이진 탐색합니다. 없으면 None."""
+    if len(ids) == 0 or item_id is None:
+        return None
+    key = str(item_id).encode("ascii")
+    position = np.searchsorted(ids, key, sorter=order)
+    if position < len(order) and ids[order[position]] == key:
+        return int(order[position])
+    return None
+
+
+def _iter_jsonl(filename):
+    # 정제 파일을 샤드로 내보냈다면(SOCY_CLEANED_SHARDS=1) 샤드를 병렬로 읽습니다. (sharded_dataset.py)
+    for line in iter_exported_lines(filename):
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            logging.warning(f"'{os.path.basename(filename)}' 파싱 오류: {line.strip()}. 건너뜁니다.")
+
+
+def _edge_to_pair(edge):
+    """
+    엣지 레코드를 ("cite", citer, cited) 또는 ("author", paperId, authorId)로 변환합니다.
+    알 수 없는 유형이거나 필드가 없으면 None.
+    """
+    source_id, target_id, relation = edge.get("source"), edge.get("target"), edge.get("relation")
+    if not (source_id and target_id and relation):
+        return None
+    if relation in CITATION_RELATIONS:
+        return "cite", str(source_id), str(target_id)
+    if relation == AUTHORSHIP_RELATION:
+        return "author", str(target_id), str(source_id)
+    return None
+
+
+def _pairs_to_indices(pairs, row_index, col_index):
+    rows, cols = [], []
+    for first, second in pairs:
+        r, c = row_index.get(first), col_index.get(second)
+        if r is not None and c is not None and (row_index is not col_index or r != c):
+            rows.append(r)
+            cols.append(c)
+    return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+
+
+def _merge_edges(matrix, shape, additions, deletions):
+    """기존 CSR 행렬에 엣지를 추가/삭제한 새 이진 CSR 행렬을 만듭니다."""
+    existing = matrix.tocoo()
+    rows = np.concatenate([existing.row.astype(np.int64), additions[0]])
+    cols = np.concatenate([existing.col.astype(np.int64), additions[1]])
+    if len(deletions[0]):
+        keys = rows * shape[1] + cols
+        keep = ~np.isin(keys, deletions[0] * shape[1] + deletions[1])
+        rows, cols = rows[keep], cols[keep]
+    return _build_binary_csr(rows, cols, shape)
+
+
+def _build_binary_csr(rows, cols, shape):
+    """행/열 인덱스 목록으로 중복이 제거된 0/1 값의 int32 인덱스 CSR 행렬을 만듭니다."""
+    matrix = sparse.coo_matrix(
+        (np.ones(len(rows), dtype=np.float32),
+         (np.asarray(rows, dtype=np.int32), np.asarray(cols, dtype=np.int32))),
+        shape=shape
+    ).tocsr()
+    matrix.sum_duplicates()
+    matrix.data[:] = 1.0
+    return _to_int32_csr(matrix)
+
+
+def _to_int32_csr(matrix):
+    matrix = matrix.tocsr()
+    matrix.sort_indices()
+    matrix.indptr = matrix.indptr.astype(np.int32, copy=False)
+    matrix.indices = matrix.indices.astype(np.int32, copy=False)
+    return matrix
+
+
+def publish_arrays(directory, arrays, manifest):
+    """
+    배열들을 새 버전 디렉토리(v000001, v000002, ...)에 .npy 파일로 저장한 뒤 CURRENT 포인터를 원자적으로 교체합니다.
+    manifest에는 version과 created_at이 추가되어 manifest.json으로 함께 저장됩니다.
+    Returns:
+        tuple: (버전 번호, 버전 디렉토리 이름)
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = (current_version(directory) or 0) + 1
+    version_name = f"v{version:06d}"
+    staging_dir = os.path.join(directory, f".{version_name}.tmp")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    for name, values in arrays.items():
+        np.save(os.path.join(staging_dir, f"{name}.npy"), values)
+    manifest = dict(manifest, version=version, created_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    with open(os.path.join(staging_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=4)
+
+    os.replace(staging_dir, os.path.join(directory, version_name))
+    write_atomic(os.path.join(directory, CURRENT_POINTER_FILE), version_name)
+    remove_old_versions(directory)
+    return version, version_name
+
+
+def load_arrays(directory, names):
+    """
+    CURRENT가 가리키는 버전의 배열들을 메모리 매핑(mmap_mode='r')으로 불러옵니다.
+    Returns:
+        tuple: (버전 번호, manifest 사전, {이름: 배열})
+    """
+    version = current_version(directory)
+    if version is None:
+        raise FileNotFoundError(f"저장된 버전이 없습니다: '{directory}'")
+    version_dir = os.path.join(directory, f"v{version:06d}")
+    with open(os.path.join(version_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    arrays = {name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r') for name in names}
+    return version, manifest, arrays
+
+
+def write_atomic(path, content):
+    """임시 파일에 쓰고 fsync한 뒤 교체하여, 읽는 쪽이 항상 완전한 내용만 보도록 합니다."""
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def remove_old_versions(directory):
+    """최근 KEEP_VERSIONS개를 제외한 이전 버전 디렉토리를 삭제합니다."""
+    versions = sorted(name for name in os.listdir(directory)
+                      if name.startswith("v") and os.path.isdir(os.path.join(directory, name)))
+    for name in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+# --- 4. 메인 실행 함수 ---
+
+def build_snapshot(source="edges", directory=SNAPSHOT_DIR):
+    """전처리된 엣지 파일 또는 Neo4j 전체 내보내기로 스냅샷을 새로 만들어 저장합니다."""
+    if source == "neo4j":
+        from dotenv import load_dotenv
+        from neo4j import GraphDatabase
+        load_dotenv()
+        driver = GraphDatabase.driver(
+            os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+            auth=(os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD"))
+        )
+        try:
+            snapshot = GraphSnapshot.from_neo4j(driver)
+        finally:
+            driver.close()
+    else:
+        snapshot = GraphSnapshot.from_edges_file()
+    # 전체 재구축 시점에 이미 존재하던 delta는 원본 파일에 포함된 것으로 간주합니다.
+    snapshot.applied_deltas = [os.path.basename(path) for path in pending_delta_files(snapshot)]
+    return snapshot.save(directory)
+
+
+def refresh_snapshot(directory=SNAPSHOT_DIR, delta_dir=EDGE_DELTA_DIR):
+    """현재 스냅샷에 아직 반영되지 않은 delta 파일만 적용해 새 버전을 저장합니다."""
+    snapshot = GraphSnapshot.load(directory)
+    delta_files = pending_delta_files(snapshot, delta_dir)
+    if not delta_files:
+        logging.info("반영할 새 엣지 delta 파일이 없습니다.")
+        return None
+    return snapshot.apply_edge_deltas(delta_files).save(directory)
+
+
+# --- 5. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="인용/저자 그래프 CSR 스냅샷 생성 및 증분 갱신")
+    parser.add_argument("command", choices=["build", "refresh"])
+    parser.add_argument("--source", choices=["edges", "neo4j"], default="edges",
+                        help="build 시 사용할 원본 (전처리된 엣지 파일 또는 Neo4j)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_snapshot(args.source)
+    else:
+        refresh_snapshot()
+    mark_fresh("graph_snapshot")
@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import logging
+import argparse
+
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+from neo4j_schema import apply_schema
+from neo4j_loader import LINK_PUBLISHED_IN_QUERY, STORE_EMBEDDINGS_QUERY, embedding_text
+from venue_normalizer import build_journal_rows
+from edge_deduplicator import canonical_edge
+from delta_state import DeltaState, complete_lines_end
+from graph_snapshot import EDGE_DELTA_DIR
+from signal_status import mark_stale, stale_signals, DERIVED_SIGNALS
+
+# --- 1. 설정 ---
+load_dotenv()
+
+NEO4J_URI = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+# 전처리된 파일 (data_preprocessor.py에서 생성, --delta 실행 시 끝에 추가됨)
+DATA_DIR = "semantic_scholar_sociology_data"
+CLEANED_PAPER_NODE_FILE = os.path.join(DATA_DIR, "sociology_papers_cleaned.jsonl")
+CLEANED_AUTHOR_NODE_FILE = os.path.join(DATA_DIR, "sociology_authors_cleaned.jsonl")
+CLEANED_EDGE_DATA_FILE = os.path.join(DATA_DIR, "sociology_edges_cleaned.jsonl")
+
+# 증분 전처리 상태 디렉토리 (data_preprocessor.py의 PREPROCESS_STATE_DIR)와 동기화 위치 파일
+PREPROCESS_STATE_DIR = os.path.join(DATA_DIR, "preprocess_state")
+SYNC_STATE_FILE = os.path.join(PREPROCESS_STATE_DIR, "graph_sync.json")
+
+# 한 트랜잭션에 쓰는 레코드 수와, 임베딩 API 한 번에 보내는 논문 수
+SYNC_BATCH_SIZE = 1000
+EMBED_BATCH_SIZE = 100
+
+# Paper 노드에 속성으로 저장하는 논문 필드 (중첩 객체인 journal/externalIds/authors는 별도 처리)
+PAPER_PROPERTY_FIELDS = ("title", "abstract", "year", "citationCount", "url", "venue", "fieldsOfStudy",
+                         "publicationDate", "mergedPaperIds")
+
+# 논문 upsert. 제목/초록이 바뀐 논문은 기존 임베딩(압축 인덱스로 옮긴 표시 포함)을 지우고 paperId를 반환하여 다시 임베딩합니다.
+UPSERT_PAPERS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (p:Paper {paperId: row.paperId})
+    WITH p, row,
+         coalesce(p.title, '') <> coalesce(row.properties.title, '')
+         OR coalesce(p.abstract, '') <> coalesce(row.properties.abstract, '') AS textChanged
+    SET p += row.properties
+    FOREACH (_ IN CASE WHEN textChanged THEN [1] ELSE [] END |
+        REMOVE p.abstractEmbedding, p.text_for_embedding, p.embeddingOffloaded)
+    WITH p, textChanged
+    WHERE textChanged
+    RETURN p.paperId AS paperId
+    """
+
+# 저자 upsert. hIndex 등은 author_enricher.py가 채우므로 이름만 갱신합니다. (hIndex가 없는 새 저자는 강화 대상이 됨)
+UPSERT_AUTHORS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (a:Author {authorId: row.authorId})
+    SET a.name = row.name
+    """
+
+# 새 논문의 저널. 기존 Journal 노드의 표시 이름은 유지하고, 게재 논문 수는 연결 후 다시 셉니다.
+SYNC_JOURNALS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (j:Journal {journalKey: row.key})
+    ON CREATE SET j.journalName = row.name,
+                  j.isSociologyJournal = row.isTarget
+    """
+
+REFRESH_JOURNAL_COUNTS_QUERY = """
+    UNWIND $keys AS key
+    MATCH (j:Journal {journalKey: key})
+    SET j.paperCount = COUNT { (j)<-[:PUBLISHED_IN]-(:Paper) }
+    """
+
+UPSERT_CITES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (s:Paper {paperId: row.source})
+    MATCH (t:Paper {paperId: row.target})
+    MERGE (s)-[:CITES]->(t)
+    """
+
+UPSERT_HAS_AUTHOR_QUERY = """
+    UNWIND $rows AS row
+    MATCH (p:Paper {paperId: row.target})
+    MATCH (a:Author {authorId: row.source})
+    MERGE (p)-[:HAS_AUTHOR]->(a)
+    """
+
+# 이번 동기화에서 추가/변경된 논문 중 아직 임베딩이 없는 논문
+PAPERS_TO_EMBED_QUERY = """
+    UNWIND $ids AS id
+    MATCH (p:Paper {paperId: id})
+    WHERE p.title IS NOT NULL AND p.abstract IS NOT NULL AND p.abstractEmbedding IS NULL
+      AND p.embeddingOffloaded IS NULL
+    RETURN p.paperId AS paperId, p.title AS title, p.abstract AS abstract
+    """
+
+
+# --- 2. 동기화 위치 ---
+
+class SyncState:
+    """
+    정제 파일별로 Neo4j에 반영한 바이트 오프셋과 임베딩 대기 논문 목록입니다.
+    배치를 커밋할 때마다 원자적으로 저장하며, 모든 쓰기가 MERGE이므로 저장 직전에 중단되어 배치를 다시 반영해도 결과가 같습니다.
+    """
+
+    def __init__(self, path=SYNC_STATE_FILE):
+        self.path = path
+        self.state = {"baseline_id": None, "offsets": {}, "pending_embeddings": []}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.state.update(json.load(f))
+
+    def offset(self, filename):
+        return self.state["offsets"].get(os.path.basename(filename), 0)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+
+def committed_end(filename, preprocess_state):
+    """증분 전처리가 커밋한 정제 파일 크기 (전처리 실행 중 덜 쓰인 부분은 읽지 않습니다)."""
+    committed = preprocess_state.state["outputs"].get(os.path.basename(filename))
+    if committed is not None:
+        return min(committed, complete_lines_end(filename))
+    return complete_lines_end(filename)
+
+
+def iter_batches(filename, start, end, batch_size=SYNC_BATCH_SIZE):
+    """파일의 [start, end) 구간을 batch_size 줄씩 읽어 (레코드 목록, 배치 끝 오프셋)을 차례로 반환합니다."""
+    if not os.path.exists(filename) or start >= end:
+        return
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        position = start
+        batch = []
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            try:
+                batch.append(json.loads(line))
+            except json.JSONDecodeError:
+                logging.warning(f"'{os.path.basename(filename)}' 파싱 오류: {line.strip()[:200]}. 건너뜁니다.")
+            if len(batch) >= batch_size:
+                yield batch, position
+                batch = []
+        if batch:
+            yield batch, position
+
+
+# --- 3. 배치 쓰기 ---
+
+def paper_row(paper):
+    properties = {field: paper[field] for field in PAPER_PROPERTY_FIELDS if paper.get(field) is not None}
+    doi = (paper.get("externalIds") or {}).get("DOI")
+    if doi:
+        properties["doi"] = doi
+    return {"paperId": paper["paperId"], "properties": properties}
+
+
+def write_papers(tx, papers):
+    """논문과 저널 게재 관계를 한 트랜잭션으로 반영하고, 다시 임베딩할 paperId 목록을 반환합니다."""
+    rows = [paper_row(paper) for paper in papers if paper.get("paperId")]
+    changed = [record["paperId"] for record in tx.run(UPSERT_PAPERS_QUERY, rows=rows)]
+    journals, links = build_journal_rows(papers)
+    if journals:
+        tx.run(SYNC_JOURNALS_QUERY, rows=journals).consume()
+        tx.run(LINK_PUBLISHED_IN_QUERY, rows=links).consume()
+        tx.run(REFRESH_JOURNAL_COUNTS_QUERY, keys=[journal["key"] for journal in journals]).consume()
+    return changed
+
+
+def write_authors(tx, authors):
+    rows = [{"authorId": author["authorId"], "name": author.get("name")} for author in authors if author.get("authorId")]
+    tx.run(UPSERT_AUTHORS_QUERY, rows=rows).consume()
+
+
+def write_edges(tx, edges):
+    cites = [edge for edge in edges if edge.get("relation") == "CITES"]
+    wrote = [edge for edge in edges if edge.get("relation") == "WROTE"]
+    if cites:
+        tx.run(UPSERT_CITES_QUERY, rows=cites).consume()
+    if wrote:
+        tx.run(UPSERT_HAS_AUTHOR_QUERY, rows=wrote).consume()
+
+
+def write_edge_delta(edges, baseline_id, start_offset, delta_dir=EDGE_DELTA_DIR):
+    """
+    그래프 스냅샷 증분 갱신(graph_snapshot.py refresh)용 엣지 delta 파일을 씁니다.
+    파일 이름이 기준 상태와 시작 오프셋으로 정해지므로, 같은 배치를 다시 반영해도 같은 파일을 덮어씁니다.
+    """
+    os.makedirs(delta_dir, exist_ok=True)
+    path = os.path.join(delta_dir, f"sync-{baseline_id}-{start_offset:015d}.jsonl")
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        for edge in edges:
+            f.write(json.dumps(edge, ensure_ascii=False) + "\n")
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def embed_pending_papers(driver, sync_state, embeddings=None):
+    """임베딩 대기 목록의 논문만 임베딩하여 저장합니다. 배치마다 대기 목록에서 제거합니다."""
+    pending = sync_state.state["pending_embeddings"]
+    if not pending:
+        return 0
+    if embeddings is None:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=GOOGLE_API_KEY)
+    embedded = 0
+    while pending:
+        ids = pending[:EMBED_BATCH_SIZE]
+        with driver.session(database="neo4j") as session:
+            papers = session.execute_read(lambda tx: [record.data() for record in tx.run(PAPERS_TO_EMBED_QUERY, ids=ids)])
+            if papers:
+                texts = [embedding_text(paper) for paper in papers]
+                vectors = embeddings.embed_documents(texts)
+                rows = [{"paperId": paper["paperId"], "embedding": vector} for paper, vector in zip(papers, vectors)]
+                session.execute_write(lambda tx: tx.run(STORE_EMBEDDINGS_QUERY, data=rows).consume())
+        embedded += len(papers)
+        del pending[:len(ids)]
+        sync_state.save()
+    return embedded
+
+
+# --- 4. 메인 동기화 함수 ---
+
+def run_graph_sync(driver=None, embeddings=None, skip_embeddings=False):
+    """
+    전처리된 파일에서 지난 동기화 이후 추가된 논문/저자/엣지만 Neo4j에 배치 upsert합니다.
+    - 논문 -> 저자 -> 엣지 순서로 반영하므로 엣지의 양쪽 노드는 항상 먼저 존재합니다.
+    - 새 논문과 제목/초록이 바뀐 논문만 임베딩합니다.
+    - 새 엣지는 그래프 스냅샷 delta 파일로도 기록하고, 영향받는 미리 계산된 신호를 stale로 표시합니다.
+    모든 쓰기가 MERGE 기반 upsert라 서비스 중인 데이터베이스에 그대로 적용할 수 있으며, 중단 후 다시 실행하면 이어서 진행합니다.
+    전체 전처리로 정제 파일이 새로 쓰였으면 처음부터 다시 반영합니다. (이미 있는 노드/관계는 변하지 않음)
+    """
+    start_time = time.time()
+    logging.info("=" * 30 + " Neo4j 증분 그래프 동기화 시작 " + "=" * 30)
+    own_driver = driver is None
+    if own_driver:
+        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+
+    preprocess_state = DeltaState(PREPROCESS_STATE_DIR)
+    sync_state = SyncState()
+    baseline_id = preprocess_state.state.get("baseline_id")
+    # 첫 동기화와 재동기화는 정제 파일 전체를 반영하므로 스냅샷 delta를 쓰지 않습니다. (스냅샷은 build로 새로 만듦)
+    resync = sync_state.state["baseline_id"] != baseline_id or not sync_state.state["offsets"]
+    if resync:
+        if sync_state.state["offsets"]:
+            logging.warning("전체 전처리로 정제 파일이 새로 쓰여 처음부터 다시 동기화합니다. "
+                            "(스냅샷은 'python graph_snapshot.py build'로 다시 만드세요)")
+        sync_state.state.update({"baseline_id": baseline_id, "offsets": {}})
+
+    counts = {"papers": 0, "authors": 0, "edges": 0}
+    try:
+        apply_schema(driver)
+
+        # 1. 논문 (저널 게재 관계 포함)
+        start = sync_state.offset(CLEANED_PAPER_NODE_FILE)
+        for papers, end in iter_batches(CLEANED_PAPER_NODE_FILE, start, committed_end(CLEANED_PAPER_NODE_FILE, preprocess_state)):
+            with driver.session(database="neo4j") as session:
+                changed = session.execute_write(write_papers, papers)
+            counts["papers"] += len(papers)
+            sync_state.state["pending_embeddings"].extend(changed)
+            sync_state.state["offsets"][os.path.basename(CLEANED_PAPER_NODE_FILE)] = end
+            sync_state.save()
+
+        # 2. 저자
+        start = sync_state.offset(CLEANED_AUTHOR_NODE_FILE)
+        for authors, end in iter_batches(CLEANED_AUTHOR_NODE_FILE, start, committed_end(CLEANED_AUTHOR_NODE_FILE, preprocess_state)):
+            with driver.session(database="neo4j") as session:
+                session.execute_write(write_authors, authors)
+            counts["authors"] += len(authors)
+            sync_state.state["offsets"][os.path.basename(CLEANED_AUTHOR_NODE_FILE)] = end
+            sync_state.save()
+
+        # 3. 엣지 (CITES, WROTE -> HAS_AUTHOR)
+        start = sync_state.offset(CLEANED_EDGE_DATA_FILE)
+        for edges, end in iter_batches(CLEANED_EDGE_DATA_FILE, start, committed_end(CLEANED_EDGE_DATA_FILE, preprocess_state)):
+            edges = [canonical_edge(edge) for edge in edges]
+            with driver.session(database="neo4j") as session:
+                session.execute_write(write_edges, edges)
+            if not resync:
+                write_edge_delta(edges, baseline_id or "0", start)
+            counts["edges"] += len(edges)
+            sync_state.state["offsets"][os.path.basename(CLEANED_EDGE_DATA_FILE)] = end
+            sync_state.save()
+            start = end
+
+        # 4. 새로 추가되었거나 제목/초록이 바뀐 논문만 임베딩
+        if skip_embeddings:
+            logging.info(f"임베딩 대기 논문 {len(sync_state.state['pending_embeddings'])}개 (--skip-embeddings)")
+        else:
+            embedded = embed_pending_papers(driver, sync_state, embeddings)
+            logging.info(f"논문 {embedded}개 임베딩 완료.")
+    except KeyboardInterrupt:
+        logging.warning("중단되었습니다. 다시 실행하면 마지막으로 반영한 배치 다음부터 이어서 진행합니다.")
+    finally:
+        # 중단되더라도 이미 반영한 변경에 대해서는 신호를 stale로 표시합니다.
+        mark_stale(counts)
+        if own_driver:
+            driver.close()
+
+    logging.info(f"동기화 결과: 논문 {counts['papers']}개, 저자 {counts['authors']}개, 엣지 {counts['edges']}개 반영 "
+                 f"({time.time() - start_time:.1f}초)")
+    pending_signals = stale_signals()
+    if pending_signals:
+        logging.info("갱신이 필요한 미리 계산된 신호: " +
+                     ", ".join(f"{name} ({DERIVED_SIGNALS[name]['refresh']})" for name in pending_signals))
+    logging.info("=" * 30 + " Neo4j 증분 그래프 동기화 완료 " + "=" * 30)
+    return counts
+
+
+# --- 5. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="전처리된 파일의 새 논문/저자/엣지만 Neo4j에 증분 upsert하고 새 논문을 임베딩")
+    parser.add_argument("--skip-embeddings", action="store_true", help="임베딩 생성을 건너뛰고 대기 목록에만 남김")
+    args = parser.parse_args()
+
+    run_graph_sync(skip_embeddings=args.skip_embeddings)
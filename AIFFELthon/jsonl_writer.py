@@ -0,0 +1,183 @@
+import io
+import os
+import gzip
+import json
+import time
+import logging
+
+# --- 1. 설정 ---
+
+# 버퍼에 모인 직렬화 결과가 이 크기(바이트)를 넘거나, 마지막으로 내보낸 뒤 이 시간(초)이 지나면 파일에 씁니다.
+WRITER_BUFFER_BYTES = int(os.getenv("SOCY_WRITER_BUFFER_BYTES", str(1024 * 1024)))
+WRITER_FLUSH_SECONDS = float(os.getenv("SOCY_WRITER_FLUSH_SECONDS", "5"))
+
+# 수집 결과 파일 압축 방식: none, gzip, zstd (zstd는 zstandard 패키지 필요)
+# 압축하면 "<파일명>.gz" / "<파일명>.zst"에 쓰고, 버퍼를 내보낼 때마다 독립된 gzip 멤버 / zstd 프레임으로 추가합니다.
+WRITER_COMPRESSION = os.getenv("SOCY_COLLECTOR_COMPRESSION", "none")
+COMPRESSED_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# json.dumps에 인자를 넘기면 호출할 때마다 인코더를 새로 만드므로, 한 번 만든 인코더를 재사용합니다.
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def load_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("zstd 압축을 사용하려면 zstandard 패키지를 설치하세요. (pip install zstandard)") from e
+    return zstandard
+
+
+# --- 2. 버퍼링 JSONL 작성기 ---
+
+class JsonlWriter:
+    """
+    JSONL 파일을 계속 열어 둔 채 레코드를 버퍼에 모았다가 크기/시간 기준으로 한 번에 씁니다.
+    - 버퍼는 WRITER_BUFFER_BYTES 근처에서 비우므로, 인용이 많은 논문의 엣지를 한꺼번에 넣어도 메모리가 일정하게 유지됩니다.
+    - checkpoint()는 버퍼를 비우고 fsync하여 그때까지 쓴 레코드를 디스크에 확정합니다. (진행 상황 저장 직전에 호출)
+    - 압축하면 내보낼 때마다 완결된 gzip 멤버 / zstd 프레임을 붙이므로, 중간에 중단되어도 마지막 checkpoint까지는 읽을 수 있습니다.
+    """
+
+    def __init__(self, filename, buffer_bytes=WRITER_BUFFER_BYTES, flush_seconds=WRITER_FLUSH_SECONDS,
+                 compression=WRITER_COMPRESSION):
+        if compression not in ("none", *COMPRESSED_SUFFIXES):
+            raise ValueError(f"지원하지 않는 압축 방식입니다: {compression} (none, gzip, zstd)")
+        self.filename = filename + COMPRESSED_SUFFIXES.get(compression, "")
+        self.buffer_bytes = buffer_bytes
+        self.flush_seconds = flush_seconds
+        self.compression = compression
+        self._compressor = load_zstandard().ZstdCompressor(level=ZSTD_LEVEL) if compression == "zstd" else None
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.filename, 'ab')
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._last_flush = time.monotonic()
+        self.stats = {"records": 0, "bytes": 0, "bytes_on_disk": 0, "flushes": 0, "fsyncs": 0}
+
+    def write(self, record):
+        """레코드 하나를 버퍼에 추가하고, 기준을 넘으면 파일에 씁니다."""
+        line = _encode(record) + "\n"
+        self._buffer.append(line)
+        self._buffered_bytes += len(line)
+        self.stats["records"] += 1
+        if self._buffered_bytes >= self.buffer_bytes or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def write_many(self, records):
+        """여러 레코드를 차례로 추가합니다. (제너레이터를 넘기면 목록을 만들지 않고 바로 버퍼에 씁니다)"""
+        count = 0
+        for record in records:
+            self.write(record)
+            count += 1
+        return count
+
+    def flush(self):
+        """버퍼의 레코드를 파일에 씁니다. (운영체제 버퍼까지만, 디스크 확정은 checkpoint)"""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        data = "".join(self._buffer).encode("utf-8")
+        self._buffer.clear()
+        self._buffered_bytes = 0
+        if self.compression == "gzip":
+            payload = gzip.compress(data, compresslevel=GZIP_LEVEL)
+        elif self.compression == "zstd":
+            payload = self._compressor.compress(data)
+        else:
+            payload = data
+        self._file.write(payload)
+        self._file.flush()
+        self.stats["bytes"] += len(data)
+        self.stats["bytes_on_disk"] += len(payload)
+        self.stats["flushes"] += 1
+
+    def checkpoint(self):
+        """버퍼를 비우고 fsync하여 지금까지 쓴 레코드를 디스크에 확정합니다."""
+        self.flush()
+        os.fsync(self._file.fileno())
+        self.stats["fsyncs"] += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.checkpoint()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JsonlWriterGroup:
+    """
+    이름별 JsonlWriter 묶음입니다. (예: 논문/저자/엣지 파일)
+    checkpoint()는 모든 파일을 확정하므로, 진행 상황 파일을 저장하기 직전에 호출하면
+    상태 파일이 가리키는 지점까지의 레코드가 항상 디스크에 남아 있습니다.
+    """
+
+    def __init__(self, filenames, **writer_options):
+        self._writers = {name: JsonlWriter(filename, **writer_options) for name, filename in filenames.items()}
+
+    def __getitem__(self, name):
+        return self._writers[name]
+
+    def checkpoint(self):
+        for writer in self._writers.values():
+            writer.checkpoint()
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+
+    def stats(self):
+        return {name: dict(writer.stats) for name, writer in self._writers.items()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# --- 3. 읽기 ---
+
+def jsonl_files(filename):
+    """논리적 JSONL 파일을 이루는 실제 파일 목록: 압축하지 않은 파일, .gz, .zst 순서 (있는 것만)"""
+    candidates = [filename] + [filename + suffix for suffix in COMPRESSED_SUFFIXES.values()]
+    return [path for path in candidates if os.path.exists(path)]
+
+
+def jsonl_exists(filename):
+    return bool(jsonl_files(filename))
+
+
+def _open_text(path):
+    if path.endswith(COMPRESSED_SUFFIXES["gzip"]):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith(COMPRESSED_SUFFIXES["zstd"]):
+        reader = load_zstandard().ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True,
+                                                               closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_jsonl_lines(filename):
+    """
+    압축 여부와 관계없이 논리적 JSONL 파일의 줄을 차례로 내보냅니다. (jsonl_files 순서)
+    수집 도중 중단되어 압축 파일 끝이 잘린 경우에는 경고를 남기고 읽을 수 있는 곳까지만 내보냅니다.
+    """
+    for path in jsonl_files(filename):
+        try:
+            with _open_text(path) as f:
+                yield from f
+        except Exception as e:
+            # gzip: EOFError / zlib.error, zstd: ZstdError (압축하지 않은 파일의 오류는 그대로 올립니다)
+            if path == filename:
+                raise
+            logging.warning(f"'{os.path.basename(path)}' 끝부분을 읽을 수 없어 그 앞까지만 사용합니다: {e}")
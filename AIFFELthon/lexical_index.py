@@ -0,0 +1,279 @@
+import os
+import re
+import json
+import math
+import time
+import logging
+import argparse
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+from graph_snapshot import DATA_DIR, publish_arrays, load_arrays
+from signal_status import mark_fresh
+
+# --- 1. 설정 ---
+
+# 전처리된 노드/엣지 파일 (data_preprocessor.py에서 생성)
+CLEANED_PAPER_NODE_FILE = os.path.join(DATA_DIR, "sociology_papers_cleaned.jsonl")
+CLEANED_AUTHOR_NODE_FILE = os.path.join(DATA_DIR, "sociology_authors_cleaned.jsonl")
+CLEANED_EDGE_DATA_FILE = os.path.join(DATA_DIR, "sociology_edges_cleaned.jsonl")
+
+# 인덱스 저장 디렉토리 (버전 디렉토리 + CURRENT 포인터)
+LEXICAL_INDEX_DIR = os.path.join(DATA_DIR, "lexical_index")
+
+# 필드별 가중치 (BM25F 방식으로 필드별 단어 빈도에 가중치를 곱해 합산)
+FIELD_WEIGHTS = {"title": 3.0, "authors": 3.0, "abstract": 1.0}
+# 핵심 필드: 질의 용어가 이 필드에서 일치했는지 포스팅마다 따로 기록합니다. (초록에만 나온 용어와 구분)
+KEY_FIELDS = ("title", "authors")
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 색인할 최대 토큰 길이 (이보다 긴 토큰은 잘라서 저장)
+MAX_TERM_LENGTH = 32
+
+# 검색에서 제외할 영어 불용어
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it", "its",
+    "of", "on", "or", "that", "the", "this", "to", "was", "were", "with",
+}
+
+TOKEN_PATTERN = re.compile(r"[0-9a-z]+|[가-힣]+")
+
+
+# --- 2. 토큰화 ---
+
+def tokenize(text):
+    """소문자화 및 악센트 제거 후 영문/숫자/한글 토큰 목록을 반환합니다. (불용어 제외)"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+
+# --- 3. 인덱스 생성 ---
+
+def _load_author_names_by_paper(author_file, edge_file):
+    """저자 노드 파일과 WROTE 엣지로 {paperId: [저자명, ...]}을 만듭니다. (논문 레코드에 저자 정보가 없을 때 보완용)"""
+    names = {}
+    if author_file and os.path.exists(author_file):
+        with open(author_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    author = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if author.get("authorId") and author.get("name"):
+                    names[str(author["authorId"])] = author["name"]
+
+    authors_by_paper = defaultdict(list)
+    if edge_file and os.path.exists(edge_file):
+        with open(edge_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    edge = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if edge.get("relation") == "WROTE" and str(edge.get("source")) in names:
+                    authors_by_paper[str(edge.get("target"))].append(names[str(edge["source"])])
+    return authors_by_paper
+
+
+def build_lexical_index(paper_file=CLEANED_PAPER_NODE_FILE, author_file=CLEANED_AUTHOR_NODE_FILE,
+                        edge_file=CLEANED_EDGE_DATA_FILE, directory=LEXICAL_INDEX_DIR):
+    """
+    전처리된 논문/저자 파일로 제목·초록·저자명에 대한 BM25 역색인을 만들어 .npy 파일로 저장합니다.
+    - terms.npy: 정렬된 용어 (UTF-8 바이트)
+    - offsets.npy / postings_docs.npy / postings_tf.npy: 용어별 포스팅 (문서 번호, 가중 단어 빈도)
+    - postings_key.npy: 포스팅별로 용어가 제목 또는 저자명에 나왔는지 여부
+    - doc_ids.npy / doc_lengths.npy: 문서 번호별 paperId와 가중 문서 길이
+    """
+    logging.info("\n" + "=" * 30 + " BM25 역색인 생성 시작 " + "=" * 30)
+    start_time = time.perf_counter()
+    authors_by_paper = _load_author_names_by_paper(author_file, edge_file)
+
+    postings = defaultdict(list)
+    doc_ids, doc_lengths = [], []
+    with open(paper_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                paper = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            paper_id = paper.get("paperId")
+            if not paper_id:
+                continue
+            author_names = [a.get("name") for a in (paper.get("authors") or []) if a and a.get("name")]
+            author_names = author_names or authors_by_paper.get(paper_id, [])
+
+            term_weights = defaultdict(float)
+            key_terms = set()
+            for field, text in (("title", paper.get("title")), ("abstract", paper.get("abstract")),
+                                ("authors", " ".join(author_names))):
+                for token in tokenize(text):
+                    term_weights[token] += FIELD_WEIGHTS[field]
+                    if field in KEY_FIELDS:
+                        key_terms.add(token)
+
+            doc_number = len(doc_ids)
+            doc_ids.append(str(paper_id))
+            doc_lengths.append(sum(term_weights.values()))
+            for term, weight in term_weights.items():
+                postings[term].append((doc_number, weight, term in key_terms))
+
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+    postings_docs = np.empty(offsets[-1], dtype=np.int32)
+    postings_tf = np.empty(offsets[-1], dtype=np.float32)
+    postings_key = np.empty(offsets[-1], dtype=np.bool_)
+    for i, term in enumerate(terms):
+        entries = postings[term]
+        postings_docs[offsets[i]:offsets[i + 1]] = [doc for doc, _, _ in entries]
+        postings_tf[offsets[i]:offsets[i + 1]] = [tf for _, tf, _ in entries]
+        postings_key[offsets[i]:offsets[i + 1]] = [key for _, _, key in entries]
+
+    arrays = {
+        "terms": np.array([term.encode("utf-8") for term in terms]) if terms else np.array([], dtype="S1"),
+        "offsets": offsets,
+        "postings_docs": postings_docs,
+        "postings_tf": postings_tf,
+        "postings_key": postings_key,
+        "doc_ids": np.array([doc_id.encode("ascii") for doc_id in doc_ids]) if doc_ids else np.array([], dtype="S1"),
+        "doc_lengths": np.asarray(doc_lengths, dtype=np.float32),
+    }
+    manifest = {
+        "num_docs": len(doc_ids),
+        "num_terms": len(terms),
+        "avg_doc_length": float(np.mean(doc_lengths)) if doc_lengths else 0.0,
+        "field_weights": FIELD_WEIGHTS,
+        "key_fields": list(KEY_FIELDS),
+    }
+    _, version_name = publish_arrays(directory, arrays, manifest)
+    logging.info(
+        f"BM25 역색인 {version_name} 저장 완료: 문서 {len(doc_ids)}개, 용어 {len(terms)}개, "
+        f"포스팅 {int(offsets[-1])}개 ({time.perf_counter() - start_time:.1f}초)"
+    )
+    logging.info("=" * 32 + " BM25 역색인 생성 완료 " + "=" * 32 + "\n")
+    return version_name
+
+
+# --- 4. 검색 ---
+
+class LexicalIndex:
+    """
+    build_lexical_index()가 저장한 BM25 역색인을 메모리 매핑으로 읽어 검색합니다.
+    임베딩 API를 거치지 않으므로 저자명/제목 검색은 수 밀리초 안에 끝납니다.
+    """
+
+    def __init__(self, version, arrays, manifest):
+        self.version = version
+        self._terms = arrays["terms"]
+        self._offsets = arrays["offsets"]
+        self._postings_docs = arrays["postings_docs"]
+        self._postings_tf = arrays["postings_tf"]
+        # 핵심 필드 표시가 없는 이전 버전 색인은 어떤 일치도 제목·저자명 일치로 보지 않습니다.
+        self._postings_key = arrays.get("postings_key")
+        if self._postings_key is None:
+            self._postings_key = np.zeros(len(self._postings_docs), dtype=np.bool_)
+        self._doc_ids = arrays["doc_ids"]
+        self._doc_lengths = arrays["doc_lengths"]
+        self.num_docs = manifest["num_docs"]
+        self._avg_doc_length = manifest["avg_doc_length"] or 1.0
+
+    @classmethod
+    def load(cls, directory=LEXICAL_INDEX_DIR):
+        names = ["terms", "offsets", "postings_docs", "postings_tf", "doc_ids", "doc_lengths"]
+        try:
+            version, manifest, arrays = load_arrays(directory, names + ["postings_key"])
+        except FileNotFoundError:
+            logging.warning("BM25 역색인에 제목·저자명 일치 정보가 없습니다. 'python lexical_index.py build'로 다시 만드세요.")
+            version, manifest, arrays = load_arrays(directory, names)
+        return cls(version, arrays, manifest)
+
+    def _term_index(self, term):
+        """정렬된 용어 배열에서 이진 탐색으로 용어 번호를 찾습니다. 없으면 None."""
+        if len(self._terms) == 0:
+            return None
+        key = term.encode("utf-8")
+        position = int(np.searchsorted(self._terms, key))
+        if position < len(self._terms) and self._terms[position] == key:
+            return position
+        return None
+
+    def search(self, query, k=20):
+        """
+        BM25로 상위 k개 논문을 검색합니다.
+        Returns:
+            list: [(paperId, BM25 점수, 제목·저자명에서 일치한 질의 용어 수), ...] 점수 내림차순.
+                  초록에서만 일치한 용어는 점수에는 반영되지만 일치 용어 수에는 세지 않습니다.
+        """
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms or self.num_docs == 0:
+            return []
+
+        docs_parts, score_parts, key_parts = [], [], []
+        for term in query_terms:
+            index = self._term_index(term)
+            if index is None:
+                continue
+            start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+            docs = np.asarray(self._postings_docs[start:end])
+            tf = np.asarray(self._postings_tf[start:end])
+            idf = math.log(1.0 + (self.num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            length_norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self._doc_lengths[docs] / self._avg_doc_length)
+            docs_parts.append(docs)
+            key_parts.append(np.asarray(self._postings_key[start:end]))
+            score_parts.append(idf * tf * (BM25_K1 + 1.0) / (tf + length_norm))
+        if not docs_parts:
+            return []
+
+        unique_docs, inverse = np.unique(np.concatenate(docs_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        key_matched = np.bincount(inverse, weights=np.concatenate(key_parts))
+        top = min(k, len(unique_docs))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        return [(self._doc_ids[unique_docs[i]].decode("ascii"), float(scores[i]), int(key_matched[i])) for i in best]
+
+
+# --- 5. 검색 결과 융합 ---
+
+def reciprocal_rank_fusion(ranked_lists, k=60):
+    """
+    여러 검색 결과(paperId 순위 목록)를 Reciprocal Rank Fusion으로 합칩니다.
+    Returns:
+        list: 융합 점수 내림차순 paperId 목록.
+    """
+    fused = defaultdict(float)
+    for ranked in ranked_lists:
+        for rank, paper_id in enumerate(ranked):
+            fused[paper_id] += 1.0 / (k + rank + 1)
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+# --- 6. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="제목·초록·저자명 BM25 역색인 생성 및 검색")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build")
+    search_parser = subparsers.add_parser("search")
+    search_parser.add_argument("query")
+    search_parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_lexical_index()
+        mark_fresh("lexical_index")
+    else:
+        index = LexicalIndex.load()
+        search_start = time.perf_counter()
+        results = index.search(args.query, k=args.k)
+        print(f"검색 시간: {(time.perf_counter() - search_start) * 1000:.1f}ms")
+        for paper_id, score, matched in results:
+            print(f"{paper_id}\t{score:.3f}\t(제목·저자명에서 일치한 질의 용어 {matched}개)")
@@ -0,0 +1,352 @@
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# --- 1. 설정 ---
+
+# 합성 코퍼스 기본 크기
+DEFAULT_NUM_PAPERS = 5000
+AUTHORS_PER_PAPER = (1, 4)
+REFERENCES_PER_PAPER = (5, 30)
+
+# 합성 논문 중 수집/전처리 필터(초록 길이, 언어, 분야)를 통과하는 비율
+VALID_PAPER_RATIO = 0.8
+
+# Semantic Scholar 검색 API는 질의당 최대 1,000건까지만 페이지를 넘길 수 있습니다.
+MAX_SEARCH_RESULTS = 1000
+
+SYNTHETIC_JOURNALS = (
+    "American Journal of Sociology", "Social Forces", "Sociological Theory",
+    "Social Psychology Quarterly", "Gender & Society", "Journal of Applied Physics",
+)
+SYNTHETIC_WORDS = (
+    "emotion", "labor", "inequality", "gender", "identity", "network", "culture", "status", "power",
+    "institution", "family", "migration", "movement", "interaction", "trust", "religion", "class",
+    "education", "health", "work", "community", "narrative", "affect", "ritual", "norm",
+)
+
+# 수집된 Raw 데이터 파일명 (data_collector.py와 동일, --corpus 재생 모드에서 사용)
+RAW_PAPER_NODE_FILE = "sociology_papers_core_data.jsonl"
+RAW_AUTHOR_NODE_FILE = "sociology_authors.jsonl"
+RAW_EDGE_DATA_FILE = "sociology_edges.jsonl"
+
+
+# --- 2. 코퍼스 ---
+
+def _synthetic_id(kind, number):
+    return hashlib.sha1(f"{kind}-{number}".encode("ascii")).hexdigest()
+
+
+class MockCorpus:
+    """mock 서버가 응답하는 논문/저자/인용 관계 집합입니다. 합성 생성하거나 수집된 Raw 파일에서 재생합니다."""
+
+    def __init__(self, inline_connections=False):
+        self.papers = {}
+        self.authors = {}
+        self.references = defaultdict(list)
+        self.citations = defaultdict(list)
+        self.paper_ids = []
+        # True이면 요청한 fields와 관계없이 논문 응답에 references/citations 목록을 항상 포함합니다.
+        # (data_preprocessor.py의 품질 필터는 Raw 논문 레코드에 두 키가 있어야 통과시킵니다.)
+        self.inline_connections = inline_connections
+
+    @classmethod
+    def synthetic(cls, num_papers=DEFAULT_NUM_PAPERS, seed=0):
+        """
+        재현 가능한 합성 코퍼스를 생성합니다.
+        인용은 앞 번호(오래된) 논문 쪽으로 몰리도록 뽑아 실제 인용 분포처럼 소수 논문에 집중되게 합니다.
+        """
+        corpus = cls()
+        rng = random.Random(seed)
+        num_authors = max(1, num_papers // 2)
+        author_ids = [_synthetic_id("author", n) for n in range(num_authors)]
+        for n, author_id in enumerate(author_ids):
+            corpus.authors[author_id] = {
+                "authorId": author_id,
+                "name": f"Author {n}",
+                "hIndex": rng.randint(0, 60),
+                "paperCount": rng.randint(1, 200),
+                "citationCount": rng.randint(0, 20000),
+                "affiliations": [{"name": f"University {n % 97}"}],
+            }
+
+        for n in range(num_papers):
+            paper_id = _synthetic_id("paper", n)
+            valid = rng.random() < VALID_PAPER_RATIO
+            words = [rng.choice(SYNTHETIC_WORDS) for _ in range(rng.randint(120, 220) if valid else rng.randint(0, 40))]
+            journal = rng.choice(SYNTHETIC_JOURNALS[:-1] if valid else SYNTHETIC_JOURNALS)
+            authors = [author_ids[i] for i in rng.sample(range(num_authors), min(num_authors, rng.randint(*AUTHORS_PER_PAPER)))]
+            corpus.papers[paper_id] = {
+                "paperId": paper_id,
+                "corpusId": n,
+                "externalIds": {"CorpusId": n},
+                "url": f"https://www.semanticscholar.org/paper/{paper_id}",
+                "title": f"{words[0].title() if words else 'Untitled'} and {rng.choice(SYNTHETIC_WORDS)} study {n}",
+                "abstract": " ".join(words) or None,
+                "authors": [{"authorId": a, "name": corpus.authors[a]["name"]} for a in authors],
+                "year": 1950 + n * 75 // max(1, num_papers),
+                "journal": {"name": journal},
+                "venue": journal,
+                "fieldsOfStudy": ["Sociology"] if valid else ["Physics"],
+                "publicationTypes": ["JournalArticle"],
+                "publicationDate": None,
+                "language": "en" if valid or rng.random() < 0.5 else "de",
+            }
+            if n > 0:
+                for _ in range(rng.randint(*REFERENCES_PER_PAPER)):
+                    cited = int(n * rng.random() ** 2)
+                    corpus.add_citation(paper_id, _synthetic_id("paper", cited))
+        corpus._finalize()
+        return corpus
+
+    @classmethod
+    def from_data_dir(cls, data_dir):
+        """data_collector.py가 이전에 수집한 Raw 파일(논문/저자/엣지)을 그대로 응답 데이터로 사용합니다."""
+        corpus = cls()
+        for record in _iter_jsonl(os.path.join(data_dir, RAW_AUTHOR_NODE_FILE)):
+            if record.get("authorId"):
+                corpus.authors[str(record["authorId"])] = record
+        for record in _iter_jsonl(os.path.join(data_dir, RAW_PAPER_NODE_FILE)):
+            if record.get("paperId"):
+                corpus.papers[str(record["paperId"])] = record
+        for edge in _iter_jsonl(os.path.join(data_dir, RAW_EDGE_DATA_FILE)):
+            # REFERENCES(source가 target을 참고), CITES(source가 target을 인용) 모두 source -> target 인용입니다.
+            if edge.get("relation") in ("REFERENCES", "CITES") and edge.get("source") and edge.get("target"):
+                corpus.add_citation(str(edge["source"]), str(edge["target"]))
+        corpus._finalize()
+        return corpus
+
+    def add_citation(self, citing_id, cited_id):
+        if citing_id == cited_id or cited_id in self.references[citing_id]:
+            return
+        self.references[citing_id].append(cited_id)
+        self.citations[cited_id].append(citing_id)
+
+    def _finalize(self):
+        for paper_id, paper in self.papers.items():
+            paper["citationCount"] = len(self.citations.get(paper_id, ()))
+            paper["referenceCount"] = len(self.references.get(paper_id, ()))
+        self.paper_ids = sorted(self.papers)
+
+    def paper(self, paper_id, fields):
+        paper = self.papers.get(paper_id)
+        if paper is None:
+            return None
+        if self.inline_connections:
+            fields = f"{fields or 'title'},references.paperId,citations.paperId"
+        return _select_fields(paper, fields, self.references.get(paper_id, []), self.citations.get(paper_id, []))
+
+    def author(self, author_id, fields):
+        author = self.authors.get(author_id)
+        if author is None:
+            return None
+        return _select_fields(author, fields, [], [], id_field="authorId")
+
+    def search(self, query, offset, limit, fields):
+        """질의 문자열로 시작 위치를 정해 결정적인 순서로 논문을 페이지 단위로 반환합니다."""
+        total = min(len(self.paper_ids), MAX_SEARCH_RESULTS)
+        start = int(hashlib.sha1(query.encode("utf-8")).hexdigest(), 16) % max(1, len(self.paper_ids))
+        end = min(offset + limit, total)
+        data = [self.paper(self.paper_ids[(start + i) % len(self.paper_ids)], fields) for i in range(offset, end)]
+        response = {"total": total, "offset": offset, "data": data}
+        if end < total:
+            response["next"] = end
+        return response
+
+
+def _iter_jsonl(filename):
+    if not os.path.exists(filename):
+        return
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _select_fields(record, fields, references, citations, id_field="paperId"):
+    """fields 파라미터(예: "title,references.paperId")에 해당하는 필드만 골라 응답 객체를 만듭니다."""
+    if not fields:
+        fields = "title" if id_field == "paperId" else "name"
+    selected = {id_field: record[id_field]}
+    for field in fields.split(","):
+        top = field.strip().split(".")[0]
+        if top == "references":
+            selected["references"] = [{"paperId": paper_id} for paper_id in references]
+        elif top == "citations":
+            selected["citations"] = [{"paperId": paper_id} for paper_id in citations]
+        elif top:
+            selected[top] = record.get(top)
+    return selected
+
+
+# --- 3. HTTP 서버 ---
+
+class FaultInjector:
+    """요청마다 지연과 429/5xx 오류를 주입하고 엔드포인트별 호출 수를 셉니다."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_429_rate=0.0, error_5xx_rate=0.0,
+                 max_requests_per_second=None, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_429_rate = error_429_rate
+        self.error_5xx_rate = error_5xx_rate
+        self.max_requests_per_second = max_requests_per_second
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.counts = Counter()
+
+    def next_status(self, endpoint):
+        """이번 요청에 주입할 상태 코드(정상이면 None)와 지연 시간(초)을 정하고 호출 수를 기록합니다."""
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+            status = None
+            if self.max_requests_per_second:
+                now = time.monotonic()
+                if now - self._window_start >= 1.0:
+                    self._window_start, self._window_count = now, 0
+                self._window_count += 1
+                if self._window_count > self.max_requests_per_second:
+                    status = 429
+            roll = self._rng.random()
+            if status is None and roll < self.error_429_rate:
+                status = 429
+            elif status is None and roll < self.error_429_rate + self.error_5xx_rate:
+                status = self._rng.choice((500, 502, 503))
+            self.counts[endpoint] += 1
+            self.counts["total"] += 1
+            if status is not None:
+                self.counts[f"status_{status}"] += 1
+            return status, delay
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+
+class MockS2RequestHandler(BaseHTTPRequestHandler):
+    """Semantic Scholar Graph API(/graph/v1) 일부 엔드포인트를 흉내 냅니다. 경로 앞의 /graph/v1은 생략해도 됩니다."""
+
+    server_version = "MockS2/1.0"
+
+    def log_message(self, format, *args):
+        logging.debug("mock S2: " + format % args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, method):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        if path.startswith("/graph/v1"):
+            path = path[len("/graph/v1"):]
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+        if path == "/__stats":
+            return self._send_json(200, self.server.faults.stats())
+        if path == "/__reset":
+            self.server.faults.reset()
+            return self._send_json(200, {"ok": True})
+
+        parts = [part for part in path.split("/") if part]
+        if len(parts) != 2 or parts[0] not in ("paper", "author"):
+            return self._send_json(404, {"error": "Not found"})
+        kind, target = parts
+        endpoint = f"{method} /{kind}/{target if target in ('search', 'batch') else '{id}'}"
+
+        status, delay = self.server.faults.next_status(endpoint)
+        if delay:
+            time.sleep(delay)
+        if status == 429:
+            return self._send_json(429, {"message": "Too Many Requests"})
+        if status is not None:
+            return self._send_json(status, {"message": "Internal Server Error"})
+
+        corpus = self.server.corpus
+        fields = query.get("fields", "")
+        if method == "POST" and target == "batch":
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                return self._send_json(400, {"error": "Invalid JSON body"})
+            fields = body.get("fields") or fields
+            lookup = corpus.paper if kind == "paper" else corpus.author
+            return self._send_json(200, [lookup(str(item_id), fields) for item_id in body.get("ids", [])])
+        if method == "GET" and kind == "paper" and target == "search":
+            try:
+                offset, limit = int(query.get("offset", 0)), min(int(query.get("limit", 10)), 100)
+            except ValueError:
+                return self._send_json(400, {"error": "Invalid offset or limit"})
+            return self._send_json(200, corpus.search(query.get("query", ""), offset, limit, fields))
+        if method == "GET":
+            record = corpus.paper(target, fields) if kind == "paper" else corpus.author(target, fields)
+            if record is None:
+                return self._send_json(404, {"error": f"{kind.title()} with id {target} not found"})
+            return self._send_json(200, record)
+        return self._send_json(405, {"error": "Method not allowed"})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+
+def create_server(corpus, faults, host="127.0.0.1", port=0):
+    """mock 서버를 생성합니다. port=0이면 빈 포트를 자동으로 사용합니다. (server.server_address로 확인)"""
+    server = ThreadingHTTPServer((host, port), MockS2RequestHandler)
+    server.daemon_threads = True
+    server.corpus = corpus
+    server.faults = faults
+    return server
+
+
+# --- 4. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="벤치마크용 Semantic Scholar API mock 서버")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--corpus", default=None, help="수집된 Raw 데이터 디렉토리 (지정하지 않으면 합성 코퍼스 사용)")
+    parser.add_argument("--num-papers", type=int, default=DEFAULT_NUM_PAPERS)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429 응답을 주입할 확률")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="5xx 응답을 주입할 확률")
+    parser.add_argument("--max-rps", type=float, default=None, help="초당 요청 수 제한 (초과 시 429)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--inline-connections", action="store_true",
+                        help="논문 응답에 references/citations 목록을 항상 포함 (전처리 품질 필터 통과용)")
+    args = parser.parse_args()
+
+    corpus = MockCorpus.from_data_dir(args.corpus) if args.corpus else MockCorpus.synthetic(args.num_papers, args.seed)
+    corpus.inline_connections = args.inline_connections
+    faults = FaultInjector(args.latency_ms, args.jitter_ms, args.rate_429, args.rate_5xx, args.max_rps, args.seed)
+    server = create_server(corpus, faults, port=args.port)
+    logging.info(f"mock S2 서버 시작: http://127.0.0.1:{args.port}/graph/v1 (논문 {len(corpus.papers)}개, 저자 {len(corpus.authors)}명)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -5,10 +5,15 @@ import time
 from tqdm.notebook import tqdm
 from collections import deque
 import logging 
+import argparse
 
 from neo4j import GraphDatabase
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
+from neo4j_schema import apply_schema
+from run_ledger import RunLedger, claim_batch
+from venue_normalizer import build_journal_rows, iter_papers
+
 # 환경 변수 로드
 load_dotenv()
 
@@ -18,68 +23,155 @@ NEO4J_USER = os.getenv("NEO4J_USER", "neo4j") # 기본값 설정
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") # Google API 키도 환경 변수에서 가져옴
 
-# Google Generative AI 임베딩 모델을 초기화합니다.
-embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=GOOGLE_API_KEY)
+# 한 번에 임베딩하여 저장하는 논문 수 (배치 하나가 한 트랜잭션)
+BATCH_SIZE = 500
 
-# Neo4j 드라이버를 초기화합니다.
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# 전처리된 논문 파일 (data_preprocessor.py에서 생성, Journal 노드 생성에 사용)
+CLEANED_PAPER_NODE_FILE = os.path.join("semantic_scholar_sociology_data", "sociology_papers_cleaned.jsonl")
+# Journal 노드/PUBLISHED_IN 관계를 한 트랜잭션에 쓰는 행 수
+JOURNAL_WRITE_BATCH_SIZE = 5000
 
-# 임베딩이 없는 논문을 가져오는 함수입니다.
-def get_papers_without_embeddings(tx):
-    # title 속성, abstract 속성, 그리고 abstractEmbedding이 없는 논문을 가져옵니다.
-    query = """
+# 정규화된 저널 키로 Journal 노드를 중복 없이 만들고, 논문과 PUBLISHED_IN 관계로 연결합니다.
+# (venue_normalizer.py가 약어·표기 변형을 하나의 키로 합칩니다)
+MERGE_JOURNALS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (j:Journal {journalKey: row.key})
+    SET j.journalName = row.name,
+        j.isSociologyJournal = row.isTarget,
+        j.paperCount = row.paperCount
+    """
+
+LINK_PUBLISHED_IN_QUERY = """
+    UNWIND $rows AS row
+    MATCH (p:Paper {paperId: row.paperId})
+    MATCH (j:Journal {journalKey: row.key})
+    MERGE (p)-[:PUBLISHED_IN]->(j)
+    """
+
+# 임베딩이 없는 논문을 가져오는 질의와 생성된 임베딩을 저장하는 질의입니다. (query_profiler.py가 PROFILE 대상으로 사용합니다)
+# title 속성, abstract 속성, 그리고 abstractEmbedding이 없는 논문을 paperId 순서로 커서 이후부터 가져옵니다.
+# (vector_compressor.py offload로 임베딩을 압축 인덱스에 옮긴 논문(embeddingOffloaded)은 제외)
+# (paperId 고유 제약 조건의 인덱스로 커서 위치부터 바로 읽으므로, 재시작해도 앞부분을 다시 훑지 않습니다)
+PAPERS_WITHOUT_EMBEDDINGS_QUERY = """
     MATCH (p:Paper)
-    WHERE p.title IS NOT NULL AND p.abstract IS NOT NULL AND p.abstractEmbedding IS NULL
+    WHERE p.paperId > $cursor
+      AND p.title IS NOT NULL AND p.abstract IS NOT NULL AND p.abstractEmbedding IS NULL
+      AND p.embeddingOffloaded IS NULL
     RETURN p.paperId AS paperId, p.title AS title, p.abstract AS abstract
-    LIMIT 500
+    ORDER BY p.paperId
+    LIMIT $limit
     """
-    result = tx.run(query)
-    # title과 abstract를 모두 포함하여 반환합니다.
-    return [{"paperId": record["paperId"], "title": record["title"], "abstract": record["abstract"]} for record in result]
 
-# 생성된 임베딩을 Neo4j에 저장하는 함수입니다.
-def store_embeddings(tx, paper_embeddings_data):
-    # 임베딩과 함께, 임베딩에 사용된 합쳐진 텍스트도 저장합니다.
-    query = """
+# 임베딩만 저장합니다. 임베딩 입력 텍스트는 title/abstract로 다시 만들 수 있으므로 노드에 중복 저장하지 않습니다.
+# (벡터 검색 결과의 본문은 socy_recommender_core.py의 VECTOR_RETRIEVAL_QUERY가 title/abstract로 구성)
+STORE_EMBEDDINGS_QUERY = """
     UNWIND $data AS row
     MATCH (p:Paper {paperId: row.paperId})
-    SET p.abstractEmbedding = row.embedding,
-        p.text_for_embedding = row.text
+    SET p.abstractEmbedding = row.embedding
     """
-    tx.run(query, data=paper_embeddings_data)
 
-print("임베딩 생성 및 저장을 시작합니다 (제목 + 초록)...")
+# 논문의 임베딩 입력 텍스트 (제목 + 초록). graph_sync.py도 같은 형식으로 새 논문을 임베딩합니다.
+def embedding_text(paper):
+    return f"Title: {paper['title']}\n\nAbstract: {paper['abstract']}"
+
+# 임베딩이 없는 논문을 가져오는 함수입니다.
+def get_papers_without_embeddings(tx, cursor=""):
+    result = tx.run(PAPERS_WITHOUT_EMBEDDINGS_QUERY, cursor=cursor, limit=BATCH_SIZE)
+    # title과 abstract를 모두 포함하여 반환합니다.
+    return [{"paperId": record["paperId"], "title": record["title"], "abstract": record["abstract"]} for record in result]
+
+# 생성된 임베딩을 Neo4j에 저장하는 함수입니다.
+# 배치 표식을 임베딩과 같은 트랜잭션에서 기록하므로 각 배치는 정확히 한 번만 반영됩니다.
+# 이미 커밋된 배치면 쓰지 않고 False를 반환합니다.
+def store_embeddings(tx, paper_embeddings_data, batch_params=None):
+    if batch_params is not None and not claim_batch(tx, batch_params):
+        return False
+    tx.run(STORE_EMBEDDINGS_QUERY, data=paper_embeddings_data)
+    return True
 
-# 임베딩이 없는 논문이 없을 때까지 반복하여 임베딩을 생성하고 저장합니다.
-while True:
+# 전처리된 논문 파일의 저널 정보로 Journal 노드와 PUBLISHED_IN 관계를 일괄 생성합니다. (MERGE이므로 다시 실행해도 안전)
+def load_journals(driver, paper_file=CLEANED_PAPER_NODE_FILE):
+    if not os.path.exists(paper_file):
+        print(f"논문 파일 '{paper_file}'이(가) 없어 Journal 노드 생성을 건너뜁니다.")
+        return 0
+    journals, links = build_journal_rows(iter_papers(paper_file))
     with driver.session(database="neo4j") as session:
-        # 임베딩이 없는 논문 목록을 가져옵니다.
-        papers = session.execute_read(get_papers_without_embeddings)
-
-        if not papers:
-            print("처리할 논문이 없습니다. 작업을 종료합니다.")
-            break
-
-        print(f"{len(papers)}개의 논문을 가져왔습니다. 임베딩을 생성합니다...")
-
-        # 제목과 초록을 합쳐서 임베딩할 텍스트 리스트를 만듭니다.
-        texts_to_embed = [f"Title: {p['title']}\n\nAbstract: {p['abstract']}" for p in papers]
-        
-        # 텍스트에 대한 임베딩을 생성합니다.
-        paper_vectors = embeddings.embed_documents(texts_to_embed)
-
-        paper_embeddings_to_store = []
-        for i, paper in enumerate(papers):
-            # 각 논문의 paperId, 생성된 임베딩, 그리고 임베딩에 사용된 텍스트를 저장할 목록에 추가합니다.
-            paper_embeddings_to_store.append({
-                "paperId": paper['paperId'],
-                "embedding": paper_vectors[i],
-                "text": texts_to_embed[i] # 임베딩에 사용된 텍스트
-            })
-
-        # 생성된 임베딩을 Neo4j에 저장합니다.
-        session.execute_write(store_embeddings, paper_embeddings_to_store)
-        print(f"{len(papers)}개의 (제목+초록) 임베딩을 성공적으로 저장했습니다.")
-
-# Neo4j 드라이버 연결을 닫습니다.
-driver.close()
+        for start in range(0, len(journals), JOURNAL_WRITE_BATCH_SIZE):
+            rows = journals[start:start + JOURNAL_WRITE_BATCH_SIZE]
+            session.execute_write(lambda tx: tx.run(MERGE_JOURNALS_QUERY, rows=rows).consume())
+        for start in range(0, len(links), JOURNAL_WRITE_BATCH_SIZE):
+            rows = links[start:start + JOURNAL_WRITE_BATCH_SIZE]
+            session.execute_write(lambda tx: tx.run(LINK_PUBLISHED_IN_QUERY, rows=rows).consume())
+    print(f"Journal 노드 {len(journals)}개 생성/갱신, 논문 {len(links)}편과 PUBLISHED_IN 관계로 연결했습니다.")
+    return len(journals)
+
+def run_embedding_loader(restart=False):
+    # Google Generative AI 임베딩 모델과 Neo4j 드라이버를 초기화합니다.
+    # (모듈 임포트만으로 외부 서비스에 연결하지 않도록 실행 시점에 생성합니다)
+    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=GOOGLE_API_KEY)
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+
+    # 조회/저장 질의가 사용하는 제약 조건과 인덱스를 먼저 준비합니다. (이미 있으면 아무 일도 하지 않음)
+    apply_schema(driver)
+
+    # 중단된 실행이 있으면 실행 원장의 마지막 커밋 커서부터 이어서 진행합니다.
+    ledger = RunLedger("neo4j_loader")
+    if restart or ledger.resume() is None:
+        # 새 실행을 시작할 때 Journal 노드와 게재 관계를 먼저 만듭니다. (중단된 실행을 이어갈 때는 이미 끝난 단계)
+        load_journals(driver)
+        ledger.start_run(batch_size=BATCH_SIZE)
+    else:
+        ledger.reconcile(driver)
+
+    print("임베딩 생성 및 저장을 시작합니다 (제목 + 초록)...")
+
+    # 임베딩이 없는 논문이 없을 때까지 반복하여 임베딩을 생성하고 저장합니다.
+    try:
+        while True:
+            cursor = ledger.run["cursor"]
+            with driver.session(database="neo4j") as session:
+                # 커서 이후의 임베딩이 없는 논문 목록을 가져옵니다.
+                papers = session.execute_read(get_papers_without_embeddings, cursor)
+
+                if not papers:
+                    print("처리할 논문이 없습니다. 작업을 종료합니다.")
+                    ledger.complete_run()
+                    break
+
+                print(f"{len(papers)}개의 논문을 가져왔습니다. 임베딩을 생성합니다...")
+
+                # 제목과 초록을 합쳐서 임베딩할 텍스트 리스트를 만듭니다.
+                texts_to_embed = [embedding_text(p) for p in papers]
+
+                # 텍스트에 대한 임베딩을 생성합니다.
+                paper_vectors = embeddings.embed_documents(texts_to_embed)
+
+                paper_embeddings_to_store = []
+                for i, paper in enumerate(papers):
+                    # 각 논문의 paperId와 생성된 임베딩을 저장할 목록에 추가합니다.
+                    paper_embeddings_to_store.append({
+                        "paperId": paper['paperId'],
+                        "embedding": paper_vectors[i]
+                    })
+
+                # 생성된 임베딩과 배치 표식을 한 트랜잭션으로 Neo4j에 저장한 뒤, 원장에 커서를 기록합니다.
+                cursor_end = papers[-1]['paperId']
+                batch_id = ledger.batch_id(cursor)
+                committed = session.execute_write(store_embeddings, paper_embeddings_to_store,
+                                                  ledger.batch_params(batch_id, cursor, cursor_end, len(papers)))
+                ledger.record_batch(batch_id, cursor, cursor_end, len(papers), committed=committed)
+                if committed:
+                    print(f"{len(papers)}개의 (제목+초록) 임베딩을 성공적으로 저장했습니다. (누적 {ledger.run['processed']}개)")
+                else:
+                    print(f"배치 {batch_id}는 이미 저장되어 있어 건너뜁니다.")
+    except KeyboardInterrupt:
+        print(f"중단되었습니다. 다시 실행하면 커서 '{ledger.run['cursor']}' 이후부터 이어서 진행합니다.")
+    finally:
+        # Neo4j 드라이버 연결을 닫습니다.
+        driver.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="임베딩이 없는 논문의 (제목+초록) 임베딩을 생성해 Neo4j에 저장")
+    parser.add_argument("--restart", action="store_true", help="중단된 실행을 이어가지 않고 처음부터 새로 실행")
+    args = parser.parse_args()
+    run_embedding_loader(restart=args.restart)
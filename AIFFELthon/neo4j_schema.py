@@ -0,0 +1,114 @@
+import os
+import logging
+import argparse
+
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+# --- 1. 설정 ---
+load_dotenv()
+
+NEO4J_URI = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+
+# 임베딩 모델(models/embedding-001)의 벡터 차원
+EMBEDDING_DIMENSION = 768
+
+# 챗봇의 벡터 검색 백엔드 (socy_recommender_core.py). "compressed"이면 Neo4j 벡터 인덱스를 만들지 않습니다.
+# (vector_compressor.py offload가 임베딩을 압축 인덱스로 옮기며 삭제한 인덱스를 적재 작업이 다시 만들지 않도록 함)
+VECTOR_BACKEND = os.getenv("SOCY_VECTOR_BACKEND", "neo4j")
+
+# 인덱스가 ONLINE 상태가 될 때까지 기다리는 최대 시간 (초)
+INDEX_WAIT_TIMEOUT = 600
+
+# 프로젝트의 Cypher 질의가 사용하는 제약 조건과 인덱스 (이름, 종류, 생성 구문)
+# 모든 구문은 IF NOT EXISTS로 작성되어 여러 번 실행해도 결과가 같습니다.
+SCHEMA_STATEMENTS = (
+    # 추천/적재/중심성 질의의 MATCH (p:Paper {paperId: ...}) 조회 (고유 제약 조건이 범위 인덱스를 함께 만듭니다)
+    ("paper_paper_id_unique", "constraint",
+     "CREATE CONSTRAINT paper_paper_id_unique IF NOT EXISTS FOR (p:Paper) REQUIRE p.paperId IS UNIQUE"),
+    # 저자 정보 강화/중심성 질의의 MATCH (a:Author {authorId: ...}) 조회
+    ("author_author_id_unique", "constraint",
+     "CREATE CONSTRAINT author_author_id_unique IF NOT EXISTS FOR (a:Author) REQUIRE a.authorId IS UNIQUE"),
+    # 저자 기반 추천의 대체 영향력 필터 (코퍼스 중심성이 없을 때 hIndex > 10 OR citationCount > 1000) 및 저자 정보 강화 대상 조회 (hIndex = 0)
+    ("author_h_index", "index",
+     "CREATE INDEX author_h_index IF NOT EXISTS FOR (a:Author) ON (a.hIndex)"),
+    ("author_citation_count", "index",
+     "CREATE INDEX author_citation_count IF NOT EXISTS FOR (a:Author) ON (a.citationCount)"),
+    # 적재 시 정규화된 저널 키로 Journal 노드를 MERGE (venue_normalizer.py)
+    ("journal_journal_key_unique", "constraint",
+     "CREATE CONSTRAINT journal_journal_key_unique IF NOT EXISTS FOR (j:Journal) REQUIRE j.journalKey IS UNIQUE"),
+    # 배치 작업 실행 원장(run_ledger.py)의 배치 표식. 같은 배치가 두 번 커밋되지 않도록 합니다.
+    ("ingest_batch_id_unique", "constraint",
+     "CREATE CONSTRAINT ingest_batch_id_unique IF NOT EXISTS FOR (b:IngestBatch) REQUIRE b.batchId IS UNIQUE"),
+    ("ingest_batch_run_id", "index",
+     "CREATE INDEX ingest_batch_run_id IF NOT EXISTS FOR (b:IngestBatch) ON (b.runId)"),
+    # 챗봇이 Neo4jVector.from_existing_index로 사용하는 초록 임베딩 벡터 인덱스 (VECTOR_BACKEND="compressed"이면 제외)
+    ("paper_abstract_embeddings", "index",
+     "CREATE VECTOR INDEX paper_abstract_embeddings IF NOT EXISTS FOR (p:Paper) ON (p.abstractEmbedding) "
+     "OPTIONS {indexConfig: {`vector.dimensions`: " + str(EMBEDDING_DIMENSION) + ", "
+     "`vector.similarity_function`: 'cosine'}}"),
+)
+
+
+# --- 2. 스키마 조회 및 적용 ---
+
+def existing_schema(session):
+    """데이터베이스에 이미 있는 제약 조건/인덱스 이름을 {"constraint": set, "index": set} 형태로 반환합니다."""
+    constraints = {record["name"] for record in session.run("SHOW CONSTRAINTS YIELD name")}
+    indexes = {record["name"] for record in session.run("SHOW INDEXES YIELD name")}
+    return {"constraint": constraints, "index": indexes}
+
+
+def missing_schema(driver, database="neo4j"):
+    """SCHEMA_STATEMENTS 중 아직 데이터베이스에 없는 항목의 (이름, 생성 구문) 목록을 반환합니다."""
+    with driver.session(database=database) as session:
+        existing = existing_schema(session)
+    return [(name, statement) for name, kind, statement in SCHEMA_STATEMENTS
+            if name not in existing[kind] and not (VECTOR_BACKEND == "compressed" and name == "paper_abstract_embeddings")]
+
+
+def apply_schema(driver, database="neo4j", wait=True):
+    """
+    누락된 제약 조건과 인덱스를 생성합니다. 이미 있는 항목은 건너뛰므로 적재 작업 시작 시마다 호출해도 됩니다.
+    중복 paperId/authorId가 있어 고유 제약 조건을 만들 수 없으면 오류를 기록하고 나머지 항목을 계속 생성합니다.
+    생성한 항목의 이름 목록을 반환합니다.
+    """
+    created = []
+    for name, statement in missing_schema(driver, database):
+        try:
+            with driver.session(database=database) as session:
+                session.run(statement).consume()
+            created.append(name)
+            logging.info(f"스키마 항목 생성: {name}")
+        except Exception as e:
+            logging.error(f"스키마 항목 '{name}' 생성 실패 (중복 값이 있는지 확인하세요): {e}")
+
+    if created and wait:
+        # 새 인덱스는 기존 노드를 채우는 동안 POPULATING 상태이므로, 질의가 인덱스를 쓰도록 ONLINE이 될 때까지 기다립니다.
+        with driver.session(database=database) as session:
+            session.run(f"CALL db.awaitIndexes({INDEX_WAIT_TIMEOUT})").consume()
+        logging.info(f"스키마 항목 {len(created)}개 생성 완료 (인덱스 ONLINE 확인).")
+    return created
+
+
+# --- 3. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="프로젝트 Cypher 질의에 필요한 Neo4j 제약 조건/인덱스를 멱등적으로 생성")
+    parser.add_argument("--dry-run", action="store_true", help="생성하지 않고 누락된 항목만 출력")
+    args = parser.parse_args()
+
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        if args.dry_run:
+            missing = missing_schema(driver)
+            for name, statement in missing:
+                print(f"- {name}: {statement}")
+            print(f"누락된 스키마 항목 {len(missing)}개")
+        else:
+            created = apply_schema(driver)
+            print(f"생성한 스키마 항목 {len(created)}개: {', '.join(created) if created else '없음 (이미 최신)'}")
+    finally:
+        driver.close()
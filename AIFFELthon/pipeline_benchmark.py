@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from mock_s2_server import MockCorpus, FaultInjector, create_server, DEFAULT_NUM_PAPERS
+from jsonl_writer import iter_jsonl_lines, jsonl_files
+
+# --- 1. 설정 ---
+
+# 벤치마크 대상 스크립트가 있는 디렉토리 (이 파일과 같은 위치)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 벤치마크에서 실행할 파이프라인 단계 (단계 이름, 스크립트 파일)
+PIPELINE_STAGES = (
+    ("collect", "data_collector.py"),
+    ("preprocess", "data_preprocessor.py"),
+)
+
+# 작업 디렉토리 안의 데이터 파일 (data_collector.py / data_preprocessor.py와 동일)
+DATA_DIR = "semantic_scholar_sociology_data"
+RAW_PAPER_NODE_FILE = os.path.join(DATA_DIR, "sociology_papers_core_data.jsonl")
+RAW_DATA_FILES = (RAW_PAPER_NODE_FILE,
+                  os.path.join(DATA_DIR, "sociology_authors.jsonl"),
+                  os.path.join(DATA_DIR, "sociology_edges.jsonl"))
+CLEANED_PAPER_NODE_FILE = os.path.join(DATA_DIR, "sociology_papers_cleaned.jsonl")
+
+# mock 서버를 쓰므로 API 호출 간 지연은 기본적으로 없애고, 재시도 대기 시간은 1/1000로 줄입니다.
+DEFAULT_API_CALL_DELAY = 0.0
+DEFAULT_WAIT_TIME_SCALE = 0.001
+
+
+# --- 2. 단계 실행 ---
+
+def count_lines(filename):
+    # 수집기가 압축해서 쓴 파일(.gz/.zst)도 함께 셉니다.
+    return sum(1 for line in iter_jsonl_lines(filename) if line.strip())
+
+
+def raw_bytes_on_disk(work_dir):
+    return sum(os.path.getsize(path) for filename in RAW_DATA_FILES
+               for path in jsonl_files(os.path.join(work_dir, filename)))
+
+
+def run_stage(script, work_dir, env, log_file):
+    """
+    스크립트를 별도 프로세스로 실행하고 (종료 코드, 소요 시간(초), 최대 RSS(MB))를 반환합니다.
+    os.wait4로 해당 자식 프로세스의 자원 사용량만 가져오므로 단계별 최대 메모리를 따로 잴 수 있습니다.
+    """
+    start_time = time.perf_counter()
+    with open(log_file, 'w', encoding='utf-8') as log:
+        process = subprocess.Popen([sys.executable, os.path.join(SCRIPT_DIR, script)],
+                                   cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # Linux의 ru_maxrss 단위는 KB입니다. (macOS는 바이트)
+    max_rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return process.returncode, time.perf_counter() - start_time, max_rss_mb
+
+
+def run_pipeline_benchmark(corpus, faults, api_call_delay=DEFAULT_API_CALL_DELAY,
+                           wait_time_scale=DEFAULT_WAIT_TIME_SCALE, work_dir=None, collector_compression="none"):
+    """
+    mock S2 서버를 띄우고 빈 작업 디렉토리에서 수집 -> 전처리 파이프라인을 실행해 단계별 지표를 반환합니다.
+    collector_compression: 수집 결과 파일 압축 방식 (none, gzip, zstd)
+    """
+    # 수집기가 요청하는 논문 상세 필드에는 references/citations가 없어 전처리 필터를 하나도 통과하지 못하므로,
+    # 논문 응답에 연결 목록을 함께 실어 전처리 단계도 실제 논문을 정제하도록 합니다.
+    corpus.inline_connections = True
+    server = create_server(corpus, faults)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/graph/v1"
+
+    env = dict(os.environ)
+    env.update({
+        "S2_API_BASE_URL": base_url,
+        "S2_API_CALL_DELAY": str(api_call_delay),
+        "S2_WAIT_TIME_SCALE": str(wait_time_scale),
+        "SEMANTIC_SCHOLAR_API_KEY": "benchmark",
+        "SOCY_COLLECTOR_COMPRESSION": collector_compression,
+        "PYTHONPATH": SCRIPT_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+    })
+
+    results = {"base_url": base_url, "collector_compression": collector_compression, "stages": {}}
+    try:
+        for stage, script in PIPELINE_STAGES:
+            logging.info(f"[{stage}] {script} 실행 중...")
+            faults.reset()
+            returncode, elapsed, max_rss_mb = run_stage(script, work_dir, env, os.path.join(work_dir, f"{stage}.log"))
+            results["stages"][stage] = {
+                "returncode": returncode,
+                "seconds": elapsed,
+                "max_rss_mb": max_rss_mb,
+                "api_calls": faults.stats(),
+            }
+            if returncode != 0:
+                logging.error(f"[{stage}] 종료 코드 {returncode}. 로그: {os.path.join(work_dir, stage + '.log')}")
+                break
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    collect = results["stages"].get("collect", {})
+    new_papers = count_lines(os.path.join(work_dir, RAW_PAPER_NODE_FILE))
+    collect_calls = collect.get("api_calls", {}).get("total", 0)
+    total_seconds = sum(stage["seconds"] for stage in results["stages"].values())
+    results.update({
+        "new_papers": new_papers,
+        "cleaned_papers": count_lines(os.path.join(work_dir, CLEANED_PAPER_NODE_FILE)),
+        "collect_papers_per_second": new_papers / collect["seconds"] if collect.get("seconds") else 0.0,
+        "pipeline_papers_per_second": new_papers / total_seconds if total_seconds else 0.0,
+        "api_calls_per_new_paper": collect_calls / new_papers if new_papers else None,
+        "peak_rss_mb": max((stage["max_rss_mb"] for stage in results["stages"].values()), default=0.0),
+        "raw_mb_on_disk": raw_bytes_on_disk(work_dir) / 1e6,
+    })
+    if new_papers and not results["cleaned_papers"]:
+        logging.warning("수집된 논문이 전처리 필터를 하나도 통과하지 못했습니다. 전처리 단계 지표가 실제 작업을 반영하지 않습니다.")
+    return results
+
+
+def print_report(results):
+    print("\n" + "=" * 30 + " 수집 파이프라인 벤치마크 결과 " + "=" * 30)
+    for stage, metrics in results["stages"].items():
+        calls = metrics["api_calls"]
+        errors = sum(count for key, count in calls.items() if key.startswith("status_"))
+        print(f"- {stage:<10} {metrics['seconds']:8.1f}초 | 최대 RSS {metrics['max_rss_mb']:7.1f}MB | "
+              f"API 호출 {calls.get('total', 0)}회 (주입된 오류 {errors}회) | 종료 코드 {metrics['returncode']}")
+    print(f"- 신규 수집 논문: {results['new_papers']}개 (전처리 후 {results['cleaned_papers']}개)")
+    print(f"- 수집 처리량: {results['collect_papers_per_second']:.1f} 논문/초 "
+          f"(파이프라인 전체 {results['pipeline_papers_per_second']:.1f} 논문/초)")
+    if results["api_calls_per_new_paper"] is not None:
+        print(f"- 신규 논문당 API 호출 수: {results['api_calls_per_new_paper']:.3f}")
+    print(f"- 최대 RSS: {results['peak_rss_mb']:.1f}MB")
+    print(f"- 원본 수집 파일 크기: {results['raw_mb_on_disk']:.2f}MB (압축: {results['collector_compression']})")
+
+
+# --- 3. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="mock S2 서버에 대해 수집 -> 전처리 파이프라인 처리량/메모리 측정")
+    parser.add_argument("--corpus", default=None, help="재생할 Raw 데이터 디렉토리 (지정하지 않으면 합성 코퍼스 사용)")
+    parser.add_argument("--num-papers", type=int, default=DEFAULT_NUM_PAPERS)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--api-call-delay", type=float, default=DEFAULT_API_CALL_DELAY)
+    parser.add_argument("--wait-time-scale", type=float, default=DEFAULT_WAIT_TIME_SCALE)
+    parser.add_argument("--collector-compression", choices=("none", "gzip", "zstd"), default="none",
+                        help="수집 결과 파일 압축 방식 (zstd는 zstandard 패키지 필요)")
+    parser.add_argument("--work-dir", default=None, help="작업 디렉토리 (지정하지 않으면 임시 디렉토리를 만들고 종료 시 삭제)")
+    parser.add_argument("--output", default=None, help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    corpus = MockCorpus.from_data_dir(args.corpus) if args.corpus else MockCorpus.synthetic(args.num_papers, args.seed)
+    faults = FaultInjector(args.latency_ms, args.jitter_ms, args.rate_429, args.rate_5xx, args.max_rps, args.seed)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="socy_pipeline_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        results = run_pipeline_benchmark(corpus, faults, args.api_call_delay, args.wait_time_scale, work_dir,
+                                         args.collector_compression)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
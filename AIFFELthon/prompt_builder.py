@@ -0,0 +1,159 @@
+import os
+import math
+import logging
+import argparse
+
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+# --- 1. 설정 ---
+
+# LLM 컨텍스트(추천 논문 목록)에 허용하는 최대 토큰 수 (추정치 기준)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("SOCY_CONTEXT_TOKEN_BUDGET", "1200"))
+# 논문 하나에 표기할 최대 저자 수와 추천 근거 수, 근거 하나의 최대 글자 수
+MAX_AUTHORS = 3
+MAX_REASONS = 3
+MAX_REASON_CHARS = 120
+# 예산을 넘으면 (저자 수, 근거 수)를 이 순서대로 줄여 다시 만들고, 그래도 넘으면 순위가 낮은 논문부터 뺍니다.
+COMPACTION_LEVELS = ((MAX_AUTHORS, MAX_REASONS), (2, 2), (1, 1))
+
+# 고정 지시문(instructions)을 미리 올려 둔 Gemini cached content 이름 (python prompt_builder.py create-cache로 생성).
+# 설정하면 요청마다 지시문을 보내지 않고 캐시를 참조합니다. 설정하지 않아도 지시문을 system 메시지로 항상 프롬프트 맨 앞에
+# 두므로, 암묵적 프리픽스 캐싱을 지원하는 모델에서는 같은 앞부분이 자동으로 캐시됩니다.
+PROMPT_CACHE_NAME = os.getenv("SOCY_PROMPT_CACHE")
+PROMPT_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+CONTEXT_HEADER = "### 추천 논문 목록 ###\n"
+
+
+# --- 2. 토큰 추정 ---
+
+def estimate_tokens(text):
+    """
+    API 호출 없이 토큰 수를 보수적으로 추정합니다.
+    라틴 문자·숫자·기호는 약 4글자당 1토큰, 한글 등 그 밖의 문자는 1글자당 1토큰으로 계산합니다.
+    """
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+# --- 3. 컨텍스트 구성 (토큰 예산) ---
+
+def format_authors(authors, max_authors=MAX_AUTHORS):
+    """저자 목록을 앞에서부터 max_authors명까지 영향력 정보와 함께 표기하고, 나머지는 인원수만 표기합니다."""
+    if not authors:
+        return 'N/A'
+    formatted = ', '.join(
+        f"{a.get('name', 'N/A')} (h-index: {a.get('hIndex', 0)}, 총 인용: {a.get('citationCount', 0)})"
+        for a in authors[:max_authors]
+    )
+    if len(authors) > max_authors:
+        formatted += f" 외 {len(authors) - max_authors}명"
+    return formatted
+
+
+def format_reasons(reasons, max_reasons=MAX_REASONS, max_chars=MAX_REASON_CHARS):
+    """중복을 뺀 추천 근거를 앞에서부터 max_reasons개까지, 각각 max_chars글자 이내로 이어 붙입니다."""
+    unique_reasons = list(dict.fromkeys(reasons))[:max_reasons]
+    return ' / '.join(reason if len(reason) <= max_chars else reason[:max_chars - 1] + '…'
+                      for reason in unique_reasons)
+
+
+def format_paper(rank, details, reasons, max_authors=MAX_AUTHORS, max_reasons=MAX_REASONS):
+    """추천 논문 하나의 컨텍스트 블록을 만듭니다. details: {'paper', 'authors', 'journalName'}"""
+    paper = details['paper']
+    journal_name = details['journalName']
+    # 중심성 배치 작업(centrality_calculator.py)이 기록한 코퍼스 내 피인용 수가 있으면 함께 표기합니다.
+    corpus_citations = ''
+    if paper.get('corpusCitationCount') is not None:
+        corpus_citations = f" (수집된 사회학 코퍼스 내 {paper['corpusCitationCount']}회)"
+    return f"""
+[추천 {rank}] {paper.get('title', 'N/A')} ({paper.get('year', 'N/A')})
+- 저자: {format_authors(details['authors'], max_authors)}
+- 저널: {journal_name if journal_name else 'N/A'}
+- 인용 수: {paper.get('citationCount', 0)}{corpus_citations}
+- **추천 핵심 근거:** {format_reasons(reasons, max_reasons)}
+"""
+
+
+def build_context(recs, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    추천 논문 목록 [{'details': ..., 'reasons': [...]}, ...](순위순)으로 토큰 예산 안의 컨텍스트를 만듭니다.
+    Returns:
+        tuple: (컨텍스트 문자열, {'tokens', 'papers', 'dropped', 'level'})
+    """
+    if not recs:
+        return "", {"tokens": 0, "papers": 0, "dropped": 0, "level": 0}
+
+    header_tokens = estimate_tokens(CONTEXT_HEADER)
+    for level, (max_authors, max_reasons) in enumerate(COMPACTION_LEVELS):
+        blocks = [format_paper(i + 1, rec['details'], rec['reasons'], max_authors, max_reasons)
+                  for i, rec in enumerate(recs)]
+        block_tokens = [estimate_tokens(block) for block in blocks]
+        if header_tokens + sum(block_tokens) <= token_budget:
+            break
+
+    # 가장 짧게 줄여도 넘치면 순위가 낮은 논문부터 뺍니다. (최소 한 편은 남김)
+    total_tokens = header_tokens + sum(block_tokens)
+    kept = len(blocks)
+    while kept > 1 and total_tokens > token_budget:
+        kept -= 1
+        total_tokens -= block_tokens[kept]
+
+    context = CONTEXT_HEADER + "".join(blocks[:kept])
+    return context, {"tokens": total_tokens, "papers": kept, "dropped": len(blocks) - kept, "level": level}
+
+
+# --- 4. 프롬프트 ---
+
+def build_prompt(instructions, request_template, cached_instructions=PROMPT_CACHE_NAME is not None):
+    """
+    고정 지시문을 system 메시지로 맨 앞에, 요청마다 바뀌는 컨텍스트/질문을 그 뒤에 두는 프롬프트를 만듭니다.
+    cached_instructions가 참이면 지시문은 cached content로 모델에 이미 올라가 있으므로 프롬프트에서 뺍니다.
+    """
+    if cached_instructions:
+        return ChatPromptTemplate.from_messages([("human", request_template)])
+    return ChatPromptTemplate.from_messages([SystemMessage(content=instructions), ("human", request_template)])
+
+
+def create_instruction_cache(model, instructions, ttl_seconds=PROMPT_CACHE_TTL_SECONDS):
+    """고정 지시문을 Gemini cached content로 올리고 그 이름을 반환합니다. (모델별 최소 토큰 수 미만이면 API가 거부합니다)"""
+    from google import genai
+    from google.genai import types
+
+    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+    cache = client.caches.create(
+        model=model,
+        config=types.CreateCachedContentConfig(
+            display_name="socy-instructions",
+            system_instruction=instructions,
+            ttl=f"{int(ttl_seconds)}s",
+        ),
+    )
+    return cache.name
+
+
+# --- 5. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="LLM 프롬프트 토큰 추정 및 고정 지시문 컨텍스트 캐시 생성")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="고정 지시문과 컨텍스트 예산의 토큰 수 출력")
+    create_parser = subparsers.add_parser("create-cache", help="고정 지시문을 Gemini cached content로 생성")
+    create_parser.add_argument("--ttl-hours", type=float, default=PROMPT_CACHE_TTL_SECONDS / 3600)
+    args = parser.parse_args()
+
+    from socy_recommender_core import LLM_MODEL, instructions
+
+    if args.command == "stats":
+        print(f"고정 지시문: 약 {estimate_tokens(instructions)} 토큰 ({len(instructions)}자)")
+        print(f"컨텍스트 예산: {CONTEXT_TOKEN_BUDGET} 토큰 (논문당 저자 최대 {MAX_AUTHORS}명, 근거 최대 {MAX_REASONS}개)")
+        print(f"지시문 캐시: {PROMPT_CACHE_NAME or '사용 안 함 (SOCY_PROMPT_CACHE 미설정)'}")
+    else:
+        try:
+            cache_name = create_instruction_cache(LLM_MODEL, instructions, args.ttl_hours * 3600)
+        except Exception as e:
+            logging.error(f"지시문 캐시 생성 실패: {e}")
+            logging.info("지시문이 모델의 최소 캐시 크기보다 작으면 명시적 캐시 대신 암묵적 프리픽스 캐싱만 적용됩니다.")
+            raise SystemExit(1)
+        print(f"지시문 캐시를 만들었습니다. 챗봇 실행 전에 SOCY_PROMPT_CACHE={cache_name} 로 설정하세요.")
@@ -0,0 +1,257 @@
+import re
+import json
+import logging
+import argparse
+import importlib
+
+from neo4j import GraphDatabase
+
+from neo4j_schema import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, EMBEDDING_DIMENSION, SCHEMA_STATEMENTS, apply_schema, missing_schema
+
+# --- 1. 설정 ---
+
+# 프로젝트의 모든 Cypher 질의 (이름, 모듈, 질의 상수 이름, 매개변수 생성 함수, 전체 스캔이 의도된 질의인지)
+# 매개변수 생성 함수는 데이터베이스에서 고른 예시 paperId/authorId를 받아 질의 매개변수를 만듭니다.
+# 쓰기 질의도 롤백되는 트랜잭션 안에서 실행하므로 데이터는 바뀌지 않습니다.
+PROFILED_QUERIES = (
+    ("paper_details", "socy_recommender_core", "PAPER_DETAILS_QUERY",
+     lambda sample: {"paperId": sample["paperId"]}, False),
+    ("author_recs", "socy_recommender_core", "AUTHOR_RECS_QUERY",
+     lambda sample: {"paperId": sample["paperId"], "limit": 2, "minCorpusCitations": 20}, False),
+    ("cocitation_recs", "socy_recommender_core", "COCITATION_RECS_QUERY",
+     lambda sample: {"paperId": sample["paperId"], "limit": 2}, False),
+    ("papers_without_embeddings", "neo4j_loader", "PAPERS_WITHOUT_EMBEDDINGS_QUERY",
+     lambda sample: {"cursor": "", "limit": 500}, False),
+    ("store_embeddings", "neo4j_loader", "STORE_EMBEDDINGS_QUERY",
+     lambda sample: {"data": [{"paperId": sample["paperId"], "embedding": [0.0] * EMBEDDING_DIMENSION}]}, False),
+    ("merge_journals", "neo4j_loader", "MERGE_JOURNALS_QUERY",
+     lambda sample: {"rows": [{"key": "query profiler sample", "name": "Query Profiler Sample", "isTarget": False,
+                               "paperCount": 1}]}, False),
+    ("link_published_in", "neo4j_loader", "LINK_PUBLISHED_IN_QUERY",
+     lambda sample: {"rows": [{"paperId": sample["paperId"], "key": "query profiler sample"}]}, False),
+    ("pending_author_count", "author_enricher", "PENDING_AUTHOR_COUNT_QUERY",
+     lambda sample: {}, False),
+    ("authors_to_enrich", "author_enricher", "AUTHORS_TO_ENRICH_QUERY",
+     lambda sample: {"cursor": "", "limit": 100}, False),
+    ("update_author_details", "author_enricher", "UPDATE_AUTHOR_DETAILS_QUERY",
+     lambda sample: {"data": [{"authorId": sample["authorId"], "details": {"hIndex": 0}}]}, False),
+    ("paper_centrality", "centrality_calculator", "PAPER_CENTRALITY_QUERY",
+     lambda sample: {"rows": [{"id": sample["paperId"], "pagerank": 0.0, "citations": 0, "core": 0}]}, False),
+    ("author_centrality", "centrality_calculator", "AUTHOR_CENTRALITY_QUERY",
+     lambda sample: {"rows": [{"id": sample["authorId"], "pagerank": 0.0, "citations": 0}]}, False),
+    ("claim_batch", "run_ledger", "CLAIM_BATCH_QUERY",
+     lambda sample: {"batchId": "query_profiler:sample", "job": "query_profiler", "runId": "sample",
+                     "cursorStart": "", "cursorEnd": "", "size": 0}, False),
+    ("run_markers", "run_ledger", "RUN_MARKERS_QUERY",
+     lambda sample: {"job": "query_profiler", "runId": "sample"}, False),
+    ("upsert_papers", "graph_sync", "UPSERT_PAPERS_QUERY",
+     lambda sample: {"rows": [{"paperId": sample["paperId"], "properties": {}}]}, False),
+    ("upsert_authors", "graph_sync", "UPSERT_AUTHORS_QUERY",
+     lambda sample: {"rows": [{"authorId": sample["authorId"], "name": "Query Profiler Sample"}]}, False),
+    ("sync_journals", "graph_sync", "SYNC_JOURNALS_QUERY",
+     lambda sample: {"rows": [{"key": "query profiler sample", "name": "Query Profiler Sample", "isTarget": False}]},
+     False),
+    ("refresh_journal_counts", "graph_sync", "REFRESH_JOURNAL_COUNTS_QUERY",
+     lambda sample: {"keys": ["query profiler sample"]}, False),
+    ("upsert_cites", "graph_sync", "UPSERT_CITES_QUERY",
+     lambda sample: {"rows": [{"source": sample["paperId"], "target": sample["paperId"]}]}, False),
+    ("upsert_has_author", "graph_sync", "UPSERT_HAS_AUTHOR_QUERY",
+     lambda sample: {"rows": [{"source": sample["authorId"], "target": sample["paperId"]}]}, False),
+    ("papers_to_embed", "graph_sync", "PAPERS_TO_EMBED_QUERY",
+     lambda sample: {"ids": [sample["paperId"]]}, False),
+    ("export_embeddings", "vector_compressor", "EXPORT_EMBEDDINGS_QUERY",
+     lambda sample: {"cursor": "", "limit": 500}, False),
+    ("offloaded_papers", "vector_compressor", "OFFLOADED_PAPERS_QUERY",
+     lambda sample: {"cursor": "", "limit": 500}, False),
+    ("offload_embeddings", "vector_compressor", "OFFLOAD_EMBEDDINGS_QUERY",
+     lambda sample: {"ids": [sample["paperId"]]}, False),
+    ("strip_embedding_text", "vector_compressor", "STRIP_EMBEDDING_TEXT_QUERY",
+     lambda sample: {"limit": 500}, True),
+    ("export_papers", "graph_snapshot", "EXPORT_PAPERS_QUERY", lambda sample: {}, True),
+    ("export_cites", "graph_snapshot", "EXPORT_CITES_QUERY", lambda sample: {}, True),
+    ("export_authorship", "graph_snapshot", "EXPORT_AUTHORSHIP_QUERY", lambda sample: {}, True),
+)
+
+# 전체 스캔으로 취급하는 실행 계획 연산자 (Neo4j 5는 연산자 이름 뒤에 '@neo4j'를 붙입니다)
+SCAN_OPERATORS = {
+    "AllNodesScan": "전체 노드 스캔",
+    "NodeByLabelScan": "레이블 스캔",
+    "DirectedAllRelationshipsScan": "전체 관계 스캔",
+    "UndirectedAllRelationshipsScan": "전체 관계 스캔",
+    "DirectedRelationshipTypeScan": "관계 유형 스캔",
+    "UndirectedRelationshipTypeScan": "관계 유형 스캔",
+}
+
+# 예시 매개변수로 사용할 paperId/authorId (인용된 논문을 골라 공동 인용 질의가 실제로 확장되도록 합니다)
+SAMPLE_PAPER_QUERY = "MATCH (p:Paper)<-[:CITES]-(:Paper) WHERE p.paperId IS NOT NULL RETURN p.paperId AS id LIMIT 1"
+FALLBACK_PAPER_QUERY = "MATCH (p:Paper) WHERE p.paperId IS NOT NULL RETURN p.paperId AS id LIMIT 1"
+SAMPLE_AUTHOR_QUERY = "MATCH (a:Author) WHERE a.authorId IS NOT NULL RETURN a.authorId AS id LIMIT 1"
+
+
+# --- 2. 실행 계획 분석 ---
+
+def _operator_name(plan):
+    return plan.get("operatorType", "").split("@")[0]
+
+
+def _details(plan):
+    return str((plan.get("args") or {}).get("Details", ""))
+
+
+def _sum_db_hits(plan):
+    return int(plan.get("dbHits", 0)) + sum(_sum_db_hits(child) for child in plan.get("children", []))
+
+
+def find_scans(plan, ancestors=()):
+    """
+    실행 계획 트리에서 전체 스캔 연산자를 찾아 (연산자, 설명, 레이블, 변수, 필터에 쓰인 속성 목록)을 반환합니다.
+    속성은 스캔 위쪽의 Filter 연산자 조건에서 '변수.속성' 형태로 찾습니다.
+    """
+    scans = []
+    operator = _operator_name(plan)
+    if operator in SCAN_OPERATORS:
+        match = re.search(r"(\w+):(\w+)", _details(plan))
+        variable, label = (match.group(1), match.group(2)) if match else (None, None)
+        properties = []
+        if variable:
+            for ancestor in ancestors:
+                if _operator_name(ancestor) == "Filter":
+                    for prop in re.findall(rf"\b{re.escape(variable)}\.(\w+)", _details(ancestor)):
+                        if prop not in properties:
+                            properties.append(prop)
+        scans.append({"operator": operator, "description": SCAN_OPERATORS[operator], "details": _details(plan),
+                      "db_hits": int(plan.get("dbHits", 0)), "label": label, "variable": variable,
+                      "properties": properties})
+    for child in plan.get("children", []):
+        scans.extend(find_scans(child, ancestors + (plan,)))
+    return scans
+
+
+def _schema_coverage():
+    """SCHEMA_STATEMENTS의 생성 구문에서 (레이블, 속성) -> 스키마 항목 이름 대응표를 만듭니다."""
+    coverage = {}
+    for name, _, statement in SCHEMA_STATEMENTS:
+        match = re.search(r"FOR \(\w+:(\w+)\) (?:ON|REQUIRE) \(?\w+\.(\w+)", statement)
+        if match:
+            coverage[(match.group(1), match.group(2))] = name
+    return coverage
+
+
+def advise(scan, missing_names):
+    """스캔 하나에 대한 인덱스 조언 문자열을 만듭니다."""
+    if not scan["label"]:
+        return "관계 유형 전체를 읽습니다. 시작 노드를 인덱스로 먼저 찾도록 질의를 바꿀 수 있는지 검토하세요."
+    if not scan["properties"]:
+        return f"필터 없이 :{scan['label']} 노드를 모두 읽습니다. 일괄 내보내기가 아니라면 조건을 추가하세요."
+    coverage = _schema_coverage()
+    advice = []
+    for prop in scan["properties"]:
+        name = coverage.get((scan["label"], prop))
+        if name and name in missing_names:
+            advice.append(f"스키마 항목 '{name}'이 없습니다. `python neo4j_schema.py`로 생성하세요.")
+        elif name:
+            advice.append(f"'{name}' 인덱스가 있지만 사용되지 않았습니다. (IS NULL/OR 조건은 인덱스를 쓰지 못할 수 있습니다)")
+        else:
+            advice.append(f"CREATE INDEX IF NOT EXISTS FOR (n:{scan['label']}) ON (n.{prop}) 추가를 검토하세요.")
+    return " ".join(advice)
+
+
+# --- 3. 질의 프로파일링 ---
+
+def pick_sample_ids(session):
+    record = session.run(SAMPLE_PAPER_QUERY).single() or session.run(FALLBACK_PAPER_QUERY).single()
+    author = session.run(SAMPLE_AUTHOR_QUERY).single()
+    return {"paperId": record["id"] if record else "", "authorId": author["id"] if author else ""}
+
+
+def profile_query(session, query, params):
+    """
+    질의를 PROFILE로 실행하고 (반환 행 수, 총 DB hit 수, 실행 계획)을 반환합니다.
+    명시적 트랜잭션 안에서 실행한 뒤 항상 롤백하므로 쓰기 질의도 데이터를 바꾸지 않습니다.
+    """
+    tx = session.begin_transaction()
+    try:
+        result = tx.run(f"PROFILE {query}", **params)
+        rows = sum(1 for _ in result)
+        plan = result.consume().profile or {}
+    finally:
+        tx.rollback()
+    return rows, _sum_db_hits(plan), plan
+
+
+def profile_all(driver, database="neo4j", only=None, sample=None):
+    """PROFILED_QUERIES를 모두 프로파일링하여 질의별 결과 목록을 반환합니다."""
+    missing_names = {name for name, _ in missing_schema(driver, database)}
+    results = []
+    with driver.session(database=database) as session:
+        sample = sample or pick_sample_ids(session)
+        for name, module, attribute, make_params, expect_scan in PROFILED_QUERIES:
+            if only and name not in only:
+                continue
+            query = getattr(importlib.import_module(module), attribute)
+            try:
+                rows, db_hits, plan = profile_query(session, query, make_params(sample))
+            except Exception as e:
+                logging.error(f"[{name}] 프로파일링 실패: {e}")
+                results.append({"name": name, "source": f"{module}.{attribute}", "error": str(e)})
+                continue
+            scans = find_scans(plan)
+            for scan in scans:
+                scan["advice"] = "일괄 내보내기 질의로 전체 스캔이 의도된 동작입니다." if expect_scan \
+                    else advise(scan, missing_names)
+            results.append({"name": name, "source": f"{module}.{attribute}", "rows": rows, "db_hits": db_hits,
+                            "expected_scan": expect_scan, "scans": scans})
+    return results, sorted(missing_names)
+
+
+def print_report(results, missing_names):
+    print("\n" + "=" * 30 + " Neo4j 질의 프로파일 " + "=" * 30)
+    print(f"{'질의':<28}{'행 수':>10}{'DB hits':>14}  스캔")
+    for result in results:
+        if "error" in result:
+            print(f"{result['name']:<28}{'-':>10}{'-':>14}  오류: {result['error']}")
+            continue
+        flag = "없음"
+        if result["scans"]:
+            flag = ", ".join(scan["description"] for scan in result["scans"])
+            if result["expected_scan"]:
+                flag += " (의도됨)"
+        print(f"{result['name']:<28}{result['rows']:>10}{result['db_hits']:>14}  {flag}")
+
+    flagged = [(result, scan) for result in results for scan in result.get("scans", []) if not result["expected_scan"]]
+    if flagged:
+        print("\n전체 스캔이 발견된 질의:")
+        for result, scan in flagged:
+            print(f"- {result['name']} ({result['source']}): {scan['operator']} {scan['details']} "
+                  f"[DB hits {scan['db_hits']}]")
+            print(f"    -> {scan['advice']}")
+    if missing_names:
+        print(f"\n누락된 스키마 항목: {', '.join(missing_names)} (`python neo4j_schema.py` 또는 --apply-schema로 생성)")
+
+
+# --- 4. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="프로젝트의 모든 Cypher 질의를 PROFILE로 실행해 DB hit/행 수를 기록하고 전체 스캔과 누락 인덱스를 보고")
+    parser.add_argument("--apply-schema", action="store_true", help="프로파일링 전에 누락된 제약 조건/인덱스를 생성")
+    parser.add_argument("--query", nargs="+", default=None, help="프로파일링할 질의 이름 (지정하지 않으면 전체)")
+    parser.add_argument("--paper-id", default=None, help="예시 매개변수로 사용할 paperId")
+    parser.add_argument("--author-id", default=None, help="예시 매개변수로 사용할 authorId")
+    parser.add_argument("--output", default=None, help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        if args.apply_schema:
+            apply_schema(driver)
+        sample = None
+        if args.paper_id or args.author_id:
+            sample = {"paperId": args.paper_id or "", "authorId": args.author_id or ""}
+        results, missing_names = profile_all(driver, only=args.query, sample=sample)
+    finally:
+        driver.close()
+
+    print_report(results, missing_names)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"queries": results, "missing_schema": missing_names}, f, ensure_ascii=False, indent=4)
@@ -0,0 +1,291 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# --- 1. 설정 ---
+
+# 기준 결과(baseline) 파일. --save-baseline으로 저장하고, 이후 실행에서 이 값과 비교합니다.
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(SCRIPT_DIR, "recommender_benchmark_baseline.json")
+
+# 기준 대비 p95 지연 시간 증가 / QPS 감소 허용 비율
+REGRESSION_TOLERANCE = 0.2
+# 이보다 작은 지연 시간 차이는 측정 잡음으로 보고 회귀로 판단하지 않습니다. (밀리초)
+MIN_REGRESSION_MS = 1.0
+
+# 측정 시작 전 스냅샷·역색인 로드 등을 끝내기 위한 워밍업 질의 수
+WARMUP_QUERIES = 5
+
+# 보고서에 표시할 단계 순서
+STAGES = (
+    "candidate_search", "embedding", "vector_search", "random_walk", "author_query", "cocitation_query",
+    "detail_fetch", "llm", "end_to_end",
+)
+
+
+# --- 2. 측정 도구 ---
+
+class StageRecorder:
+    """단계별 소요 시간 표본을 모읍니다. (여러 스레드에서 동시에 기록)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def __call__(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.samples = defaultdict(list)
+
+    def timed(self, stage, function):
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self(stage, time.perf_counter() - start_time)
+        return wrapper
+
+    def summary(self):
+        with self._lock:
+            return {stage: summarize(samples) for stage, samples in self.samples.items() if samples}
+
+
+def summarize(samples):
+    values = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+# --- 3. 벤치마크 실행 ---
+
+def instrument(core, recorder):
+    """추천 모듈 내부 함수 호출(전역 이름 조회)을 시간 측정 래퍼로 바꿉니다."""
+    core.search_candidate_papers = recorder.timed("candidate_search", core.search_candidate_papers)
+    core.get_random_walk_recs = recorder.timed("random_walk", core.get_random_walk_recs)
+
+
+def prepare_environment(core, num_papers, seed, data_dir, args, recorder):
+    """합성 그래프로 데이터 파일·스냅샷·역색인을 만들고, 추천 모듈에 대체 백엔드를 주입합니다."""
+    from synthetic_graph import SyntheticGraph, FakeNeo4jDriver, FakeEmbeddings, FakeVectorStore, make_fake_llm
+    from graph_snapshot import build_snapshot
+    from bibliographic_coupling import compute_coupling_table
+    from lexical_index import build_lexical_index
+
+    graph = SyntheticGraph.generate(num_papers, seed)
+    graph.write_cleaned_files(data_dir)
+    build_snapshot("edges")
+    compute_coupling_table(workers=args.workers)
+    build_lexical_index()
+
+    embeddings = FakeEmbeddings(latency_ms=args.embedding_latency_ms, recorder=recorder)
+    core.configure_backends(
+        llm=make_fake_llm(args.llm_latency_ms, recorder),
+        embedding_model=embeddings,
+        driver=FakeNeo4jDriver(graph, args.db_latency_ms, recorder),
+        vector_store=FakeVectorStore(graph, embeddings, args.vector_latency_ms, recorder),
+    )
+    # 이전 그래프 크기에서 불러온 스냅샷·역색인을 버리고 새 작업 디렉토리의 파일을 읽게 합니다.
+    core.clear_cached_indexes()
+    return graph
+
+
+def replay(core, queries, concurrency, recorder, admission=False):
+    """
+    질의 목록을 지정한 동시성으로 재생하고 (경과 시간, 실패한 질의의 예외 목록, "혼잡"으로 거절된 질의 수)를 반환합니다.
+    admission이 참이면 챗봇 앱처럼 각 질의를 승인 제어(core.admission)를 거쳐 실행합니다. (동시 요청마다 다른 세션)
+    """
+    failures = []
+    shed = []
+
+    def run_query(indexed_question):
+        index, question = indexed_question
+        start_time = time.perf_counter()
+        try:
+            if admission:
+                with core.admission.admit(f"session-{index % concurrency}"):
+                    core.chain.invoke(question)
+            else:
+                core.chain.invoke(question)
+        except core.ServerBusyError:
+            shed.append(question)
+            return
+        except Exception as e:
+            failures.append(e)
+            return
+        recorder("end_to_end", time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run_query, enumerate(queries)))
+    return time.perf_counter() - start_time, failures, len(shed)
+
+
+def run_benchmark(core, recorder, num_papers, queries_file, args):
+    data_dir = "semantic_scholar_sociology_data"
+    graph = prepare_environment(core, num_papers, args.seed, data_dir, args, recorder)
+    core.RECOMMENDATION_MODE = args.mode
+    # 같은 질의를 여러 번 재생하므로 답변 캐시는 지정한 경우에만 켭니다. (기본값은 매번 LLM 단계까지 측정)
+    core.ANSWER_CACHE_ENABLED = args.answer_cache
+    core.answer_cache = core.SemanticAnswerCache()
+    core.admission = core.AdmissionController()
+
+    if queries_file:
+        with open(queries_file, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = graph.generate_queries(args.num_queries, args.seed)
+
+    replay(core, queries[:WARMUP_QUERIES], 1, recorder, args.admission)
+    result = {"num_papers": num_papers, "num_queries": len(queries), "mode": args.mode, "concurrency": {}}
+    for concurrency in args.concurrency:
+        recorder.reset()
+        elapsed, failures, shed = replay(core, queries, concurrency, recorder, args.admission)
+        if failures:
+            logging.error(f"동시성 {concurrency}: 질의 {len(failures)}개 실패 (첫 오류: {failures[0]!r})")
+        result["concurrency"][str(concurrency)] = {
+            "qps": (len(queries) - len(failures) - shed) / elapsed if elapsed else 0.0,
+            "failures": len(failures),
+            "shed": shed,
+            "stages": recorder.summary(),
+        }
+    if args.answer_cache:
+        result["answer_cache"] = core.answer_cache.stats()
+    return result
+
+
+# --- 4. 보고 및 회귀 검사 ---
+
+def print_report(result):
+    print("\n" + "=" * 30 + f" 추천 지연 시간 벤치마크 (논문 {result['num_papers']}개, {result['mode']} 모드) " + "=" * 30)
+    for concurrency, metrics in result["concurrency"].items():
+        print(f"\n[동시성 {concurrency}] QPS {metrics['qps']:.1f} (질의 {result['num_queries']}개, 실패 {metrics['failures']}개, "
+              f"혼잡 거절 {metrics.get('shed', 0)}개)")
+        print(f"  {'단계':<18}{'호출 수':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+        for stage in STAGES:
+            stats = metrics["stages"].get(stage)
+            if stats:
+                print(f"  {stage:<18}{stats['count']:>8}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}")
+    if "answer_cache" in result:
+        stats = result["answer_cache"]
+        print(f"\n[답변 캐시] 적중률 {stats['hit_rate']:.1%} (적중 {stats['hits']}, 실패 {stats['misses']}, "
+              f"저장 {stats['stores']}, LRU 제거 {stats['lru_evictions']}, TTL 제거 {stats['ttl_evictions']}, "
+              f"조회 제외: 후속 질문 {stats['follow_up_skipped']}, 임베딩 없음 {stats['no_embedding_skipped']})")
+
+
+def find_regressions(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """기준 결과 대비 p95 지연 시간이 늘었거나 QPS가 줄어든 항목을 찾아 설명 문자열 목록으로 반환합니다."""
+    regressions = []
+    for size, result in results.items():
+        base_result = baseline.get(size)
+        if not base_result or base_result.get("mode") != result["mode"]:
+            continue
+        for concurrency, metrics in result["concurrency"].items():
+            base_metrics = base_result["concurrency"].get(concurrency)
+            if not base_metrics:
+                continue
+            if metrics["qps"] < base_metrics["qps"] * (1.0 - tolerance):
+                regressions.append(f"논문 {size}개/동시성 {concurrency}: QPS {base_metrics['qps']:.1f} -> {metrics['qps']:.1f}")
+            for stage, stats in metrics["stages"].items():
+                base_stats = base_metrics["stages"].get(stage)
+                if base_stats and stats["p95"] > base_stats["p95"] * (1.0 + tolerance) \
+                        and stats["p95"] - base_stats["p95"] > MIN_REGRESSION_MS:
+                    regressions.append(f"논문 {size}개/동시성 {concurrency}/{stage}: "
+                                       f"p95 {base_stats['p95']:.2f}ms -> {stats['p95']:.2f}ms")
+    return regressions
+
+
+def find_uncompared(results, baseline):
+    """기준 결과에 없어 비교하지 못한 (그래프 크기, 동시성) 항목을 설명 문자열 목록으로 반환합니다."""
+    uncompared = []
+    for size, result in results.items():
+        base_result = baseline.get(size) or {"concurrency": {}}
+        for concurrency in result["concurrency"]:
+            if concurrency not in base_result["concurrency"] or base_result.get("mode") != result["mode"]:
+                uncompared.append(f"논문 {size}개/동시성 {concurrency}")
+    return uncompared
+
+
+# --- 5. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="합성 그래프와 대체 백엔드로 추천 파이프라인의 단계별 지연 시간/QPS 측정")
+    parser.add_argument("--num-papers", type=int, nargs="+", default=[5000], help="그래프 크기 (여러 개 지정 시 크기별로 측정)")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--queries", default=None, help="재생할 질의 파일 (한 줄에 한 질의, 지정하지 않으면 합성 질의 사용)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--mode", choices=("default", "ppr"), default="default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="서지 결합 테이블 계산 프로세스 수")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0)
+    parser.add_argument("--vector-latency-ms", type=float, default=0.0)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--answer-cache", action="store_true", help="의미 기반 답변 캐시를 켜고 적중률을 함께 보고")
+    parser.add_argument("--admission", action="store_true",
+                        help="질의마다 승인 제어(동시 요청 수·대기열 제한)를 거쳐 실행하고 혼잡 거절 수를 함께 보고")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준 결과로 저장")
+    parser.add_argument("--no-regression-check", action="store_true",
+                        help="기준 결과와 비교하지 않음 (기준 결과에 없는 크기/동시성을 측정할 때)")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    # 스냅샷·역색인 등은 상대 경로에 저장되므로 그래프 크기마다 임시 디렉토리에서 실행합니다.
+    queries_file = os.path.abspath(args.queries) if args.queries else None
+    baseline_file = os.path.abspath(args.baseline)
+    original_dir = os.getcwd()
+
+    import socy_recommender_core as core
+    recorder = StageRecorder()
+    instrument(core, recorder)
+
+    results = {}
+    for num_papers in args.num_papers:
+        work_dir = tempfile.mkdtemp(prefix="socy_recommender_bench_")
+        os.chdir(work_dir)
+        try:
+            results[str(num_papers)] = run_benchmark(core, recorder, num_papers, queries_file, args)
+        finally:
+            os.chdir(original_dir)
+            shutil.rmtree(work_dir, ignore_errors=True)
+        print_report(results[str(num_papers)])
+
+    if args.save_baseline:
+        with open(baseline_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print(f"\n기준 결과를 '{baseline_file}'에 저장했습니다.")
+    elif not args.no_regression_check:
+        # 기준 결과가 없거나 비교할 항목이 하나도 없으면 회귀 검사가 조용히 통과하지 않도록 실패로 처리합니다.
+        if not os.path.exists(baseline_file):
+            print(f"\n기준 결과 파일 '{baseline_file}'이 없어 회귀 검사를 할 수 없습니다. "
+                  f"(--save-baseline으로 생성하거나 --no-regression-check 지정)")
+            sys.exit(2)
+        with open(baseline_file, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        uncompared = find_uncompared(results, baseline)
+        if uncompared:
+            print(f"\n기준 결과에 없어 비교하지 못한 항목: {', '.join(uncompared)}")
+        if len(uncompared) == sum(len(result["concurrency"]) for result in results.values()):
+            print("비교할 수 있는 항목이 없어 회귀 검사를 할 수 없습니다. (기준 결과와 같은 --num-papers/--concurrency로 실행)")
+            sys.exit(2)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("\n성능 회귀 발견:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\n기준 결과 대비 성능 회귀가 없습니다.")
@@ -0,0 +1,353 @@
+import os
+import re
+import json
+import math
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from edge_deduplicator import canonical_edge
+
+# --- 1. 설정 ---
+
+# 전처리된 노드/엣지 파일 (data_preprocessor.py에서 생성)
+DATA_DIR = "semantic_scholar_sociology_data"
+CLEANED_PAPER_NODE_FILE = os.path.join(DATA_DIR, "sociology_papers_cleaned.jsonl")
+CLEANED_EDGE_DATA_FILE = os.path.join(DATA_DIR, "sociology_edges_cleaned.jsonl")
+
+# 순위 지표를 계산할 추천 목록 길이
+DEFAULT_K = 10
+
+# nDCG에 사용하는 관련도: 질의 대상 논문 자체와, 그 논문이 인용했거나 그 논문을 인용한 논문
+TARGET_GRADE = 2
+NEIGHBOUR_GRADE = 1
+
+# 초록으로 만든 질의에 사용하는 최대 단어 수 (첫 문장이 너무 길면 앞부분만 사용)
+ABSTRACT_QUERY_WORDS = 30
+
+# 설정에서 바꿀 수 있는 socy_recommender_core 모듈 설정
+TUNABLE_SETTINGS = (
+    "RECOMMENDATION_MODE", "VECTOR_BACKEND", "VECTOR_TOP_K", "LEXICAL_TOP_K", "VECTOR_LANGUAGES",
+    "EXPANSION_LIMIT", "SEED_PAPERS", "COUPLING_TOP_N", "PPR_TOP_N",
+)
+
+# 비교할 검색 설정 (이름: 기본값에서 바꿀 설정). --config-file로 추가하거나 덮어쓸 수 있습니다.
+CONFIGURATIONS = {
+    "baseline": {},
+    "top_k_10": {"VECTOR_TOP_K": 10, "LEXICAL_TOP_K": 10},
+    "top_k_40": {"VECTOR_TOP_K": 40, "LEXICAL_TOP_K": 40},
+    "no_language_filter": {"VECTOR_LANGUAGES": None},
+    "expansion_5": {"EXPANSION_LIMIT": 5},
+    "ppr": {"RECOMMENDATION_MODE": "ppr"},
+    "compressed_vectors": {"VECTOR_BACKEND": "compressed"},
+}
+
+
+# --- 2. 정답 질의 집합 ---
+
+def normalize_title(title):
+    text = unicodedata.normalize("NFKD", str(title or "").lower())
+    return " ".join(re.findall(r"[0-9a-z]+", text))
+
+
+def _abstract_query(abstract):
+    first_sentence = re.split(r"(?<=[.!?])\s+", str(abstract or "").strip(), maxsplit=1)[0]
+    return " ".join(first_sentence.split()[:ABSTRACT_QUERY_WORDS])
+
+
+def build_labelled_queries(paper_file=CLEANED_PAPER_NODE_FILE, edge_file=CLEANED_EDGE_DATA_FILE, titles=None,
+                           num_random=0, seed=0):
+    """
+    전처리된 파일로 정답이 표시된 질의 집합을 만듭니다.
+    - 대상 논문: titles와 제목이 일치하는 논문과, 인용 관계가 있는 논문 중 무작위 num_random편
+    - 질의: 대상 논문의 제목("title")과 초록 첫 문장("abstract", 제목 단어 없이 주제로만 찾는 질의)
+    - 정답: 대상 논문(관련도 TARGET_GRADE)과 인용 이웃(NEIGHBOUR_GRADE)
+    Returns:
+        list: [{"query", "kind", "target", "relevant": {paperId: 관련도}}, ...]
+    """
+    papers = {}
+    with open(paper_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                paper = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if paper.get("paperId"):
+                papers[paper["paperId"]] = paper
+
+    neighbours = {}
+    with open(edge_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                edge = canonical_edge(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+            if edge.get("relation") != "CITES" or edge.get("source") not in papers or edge.get("target") not in papers:
+                continue
+            neighbours.setdefault(edge["source"], set()).add(edge["target"])
+            neighbours.setdefault(edge["target"], set()).add(edge["source"])
+
+    by_title = {normalize_title(paper.get("title")): paper_id for paper_id, paper in papers.items()}
+    targets = []
+    for title in titles or []:
+        paper_id = by_title.get(normalize_title(title))
+        if paper_id is None:
+            logging.info(f"전처리된 논문에 없는 제목입니다: '{title}'")
+        elif paper_id not in targets:
+            targets.append(paper_id)
+    if num_random:
+        rng = random.Random(seed)
+        pool = sorted(paper_id for paper_id in neighbours if paper_id not in targets)
+        targets.extend(rng.sample(pool, min(num_random, len(pool))))
+
+    queries = []
+    for paper_id in targets:
+        paper = papers[paper_id]
+        relevant = {neighbour: NEIGHBOUR_GRADE for neighbour in sorted(neighbours.get(paper_id, ()))}
+        relevant[paper_id] = TARGET_GRADE
+        queries.append({"query": paper["title"], "kind": "title", "target": paper_id, "relevant": relevant})
+        abstract_query = _abstract_query(paper.get("abstract"))
+        if abstract_query:
+            queries.append({"query": abstract_query, "kind": "abstract", "target": paper_id, "relevant": relevant})
+    return queries
+
+
+def load_labelled_queries(filename):
+    """JSONL 질의 집합을 읽습니다. relevant가 paperId 목록이면 모두 관련도 1로 봅니다."""
+    queries = []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item.get("relevant"), list):
+                item["relevant"] = {paper_id: 1 for paper_id in item["relevant"]}
+            item.setdefault("kind", "labelled")
+            queries.append(item)
+    return queries
+
+
+def write_labelled_queries(queries, filename):
+    with open(filename, 'w', encoding='utf-8') as f:
+        for item in queries:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+
+# --- 3. 지표 ---
+
+def recall_at_k(ranked_ids, relevant, k):
+    """상위 k개에 포함된 정답 비율. (정답이 k개보다 많으면 k개를 모두 맞혔을 때 1.0)"""
+    if not relevant:
+        return 0.0
+    hits = sum(1 for paper_id in ranked_ids[:k] if paper_id in relevant)
+    return hits / min(len(relevant), k)
+
+
+def ndcg_at_k(ranked_ids, relevant, k):
+    dcg = sum((2 ** relevant[paper_id] - 1) / math.log2(rank + 2)
+              for rank, paper_id in enumerate(ranked_ids[:k]) if paper_id in relevant)
+    ideal = sum((2 ** grade - 1) / math.log2(rank + 2)
+                for rank, grade in enumerate(sorted(relevant.values(), reverse=True)[:k]))
+    return dcg / ideal if ideal else 0.0
+
+
+# --- 4. 설정별 평가 ---
+
+# 워커 프로세스마다 추천 모듈을 한 번 불러오고 기본 설정값을 기억해 둡니다. (설정마다 기본값에서 다시 시작)
+_worker_state = {}
+
+
+def _init_worker(synthetic):
+    import socy_recommender_core as core
+    _worker_state["core"] = core
+    _worker_state["defaults"] = {name: getattr(core, name) for name in TUNABLE_SETTINGS}
+    if synthetic:
+        from synthetic_graph import SyntheticGraph, FakeNeo4jDriver, FakeEmbeddings, FakeVectorStore, make_fake_llm
+        graph = SyntheticGraph.generate(synthetic["num_papers"], synthetic["seed"])
+        embeddings = FakeEmbeddings()
+        core.configure_backends(llm=make_fake_llm(), embedding_model=embeddings, driver=FakeNeo4jDriver(graph),
+                                vector_store=FakeVectorStore(graph, embeddings))
+
+
+def evaluate_configuration(name, overrides, queries, k=DEFAULT_K):
+    """
+    추천 모듈 설정을 바꾼 뒤 질의마다 get_ultimate_context를 실행하여 추천 순위의 지표와 지연 시간을 측정합니다.
+    순위는 get_ultimate_context가 사용한 rank_recommendations 결과(컨텍스트에 넣기 전 전체 추천 목록)로 평가합니다.
+    """
+    core = _worker_state["core"]
+    for setting, value in dict(_worker_state["defaults"], **overrides).items():
+        setattr(core, setting, value)
+    core.clear_cached_indexes()
+    if core.VECTOR_BACKEND == "compressed" and core.get_compressed_vector_index() is None:
+        logging.warning(f"[{name}] 압축 벡터 인덱스가 없어 Neo4j 벡터 인덱스로 검색합니다.")
+
+    rank_recommendations = core.rank_recommendations
+    captured = {}
+
+    def capturing_rank(*args, **kwargs):
+        captured["ranking"] = rank_recommendations(*args, **kwargs)
+        return captured["ranking"]
+
+    core.rank_recommendations = capturing_rank
+    per_query, errors = [], 0
+    try:
+        # 첫 질의는 스냅샷·역색인 로드 시간을 포함하므로 측정에서 제외합니다.
+        if queries:
+            core.get_ultimate_context(queries[0]["query"])
+        for item in queries:
+            captured.clear()
+            start_time = time.perf_counter()
+            try:
+                core.get_ultimate_context(item["query"])
+            except Exception as e:
+                logging.error(f"[{name}] 질의 실패 ({item['query'][:50]}): {e}")
+                errors += 1
+                continue
+            latency = time.perf_counter() - start_time
+            ranked_ids = [paper_id for paper_id, _ in captured.get("ranking", [])]
+            per_query.append({
+                "kind": item.get("kind"),
+                "recall": recall_at_k(ranked_ids, item["relevant"], k),
+                "ndcg": ndcg_at_k(ranked_ids, item["relevant"], k),
+                "hit": float(item.get("target") in ranked_ids[:k]) if item.get("target") else None,
+                "latency_ms": latency * 1000.0,
+            })
+    finally:
+        core.rank_recommendations = rank_recommendations
+    return {"name": name, "overrides": overrides, "errors": errors, **summarize(per_query),
+            "by_kind": {kind: summarize([row for row in per_query if row["kind"] == kind])
+                        for kind in sorted({row["kind"] for row in per_query})}}
+
+
+def summarize(rows):
+    if not rows:
+        return {"queries": 0, "recall": 0.0, "ndcg": 0.0, "hit": None, "p50_ms": 0.0, "p95_ms": 0.0}
+    latencies = [row["latency_ms"] for row in rows]
+    hits = [row["hit"] for row in rows if row["hit"] is not None]
+    return {
+        "queries": len(rows),
+        "recall": float(np.mean([row["recall"] for row in rows])),
+        "ndcg": float(np.mean([row["ndcg"] for row in rows])),
+        "hit": float(np.mean(hits)) if hits else None,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def run_evaluation(configurations, queries, k=DEFAULT_K, workers=None, synthetic=None):
+    """
+    설정마다 별도 프로세스에서 같은 질의 집합을 평가합니다. (설정이 모듈 전역값이므로 프로세스로 분리)
+    동시에 실행되는 설정끼리 CPU를 나눠 쓰므로, 지연 시간을 정밀하게 비교하려면 workers=1로 실행하세요.
+    """
+    workers = workers or len(configurations)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(synthetic,)) as executor:
+        futures = [executor.submit(evaluate_configuration, name, overrides, queries, k)
+                   for name, overrides in configurations.items()]
+        return [future.result() for future in futures]
+
+
+def prepare_synthetic(num_papers, seed, num_queries):
+    """현재 디렉토리에 합성 그래프의 전처리 파일·스냅샷·역색인·압축 벡터 인덱스를 만들고 질의 집합을 반환합니다."""
+    from synthetic_graph import SyntheticGraph, FakeEmbeddings, FakeVectorStore
+    from graph_snapshot import build_snapshot
+    from bibliographic_coupling import compute_coupling_table
+    from lexical_index import build_lexical_index
+    from vector_compressor import build_vector_index
+
+    graph = SyntheticGraph.generate(num_papers, seed)
+    graph.write_cleaned_files(DATA_DIR)
+    build_snapshot("edges")
+    compute_coupling_table(workers=1)
+    build_lexical_index()
+    build_vector_index(graph.paper_ids, FakeVectorStore(graph, FakeEmbeddings()).matrix)
+    return build_labelled_queries(num_random=num_queries, seed=seed)
+
+
+def print_report(results, k):
+    print("\n" + "=" * 30 + f" 검색 설정 비교 (k={k}) " + "=" * 30)
+    print(f"{'설정':<22}{'질의':>6}{'recall':>9}{'nDCG':>8}{'hit':>7}{'p50(ms)':>10}{'p95(ms)':>10}{'실패':>6}")
+    for result in results:
+        hit = f"{result['hit']:.3f}" if result["hit"] is not None else "-"
+        print(f"{result['name']:<22}{result['queries']:>6}{result['recall']:>9.3f}{result['ndcg']:>8.3f}{hit:>7}"
+              f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['errors']:>6}")
+    kinds = sorted({kind for result in results for kind in result["by_kind"]})
+    if len(kinds) > 1:
+        for kind in kinds:
+            print(f"\n[{kind} 질의]")
+            for result in results:
+                metrics = result["by_kind"].get(kind)
+                if metrics:
+                    print(f"  {result['name']:<20} recall {metrics['recall']:.3f}, nDCG {metrics['ndcg']:.3f}, "
+                          f"p50 {metrics['p50_ms']:.1f}ms")
+
+
+# --- 5. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="정답 질의 집합으로 검색 설정별 recall@k, nDCG, 지연 시간 비교")
+    parser.add_argument("--queries-file", default=None,
+                        help="정답 질의 집합 (.jsonl). 없으면 SPECIFIC_PAPER_TITLES와 인용 이웃으로 생성")
+    parser.add_argument("--save-queries", default=None, help="생성한 질의 집합을 저장할 파일")
+    parser.add_argument("--num-random", type=int, default=0, help="질의 대상에 추가할 무작위 논문 수")
+    parser.add_argument("--configs", nargs="+", default=None, help="평가할 설정 이름 (기본값: 전체)")
+    parser.add_argument("--config-file", default=None, help="추가 설정 JSON ({이름: {설정: 값}})")
+    parser.add_argument("-k", type=int, default=DEFAULT_K)
+    parser.add_argument("--workers", type=int, default=None, help="동시에 평가할 설정 수 (기본값: 설정 수)")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="NUM_PAPERS",
+                        help="합성 그래프와 대체 백엔드로 평가 (질의 대상은 --num-random편)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+
+    configurations = dict(CONFIGURATIONS)
+    if args.config_file:
+        with open(args.config_file, 'r', encoding='utf-8') as f:
+            configurations.update(json.load(f))
+    if args.configs:
+        configurations = {name: configurations[name] for name in args.configs}
+    for name, overrides in configurations.items():
+        unknown = set(overrides) - set(TUNABLE_SETTINGS)
+        if unknown:
+            raise ValueError(f"설정 '{name}'에 알 수 없는 항목이 있습니다: {sorted(unknown)}")
+
+    output_file = os.path.abspath(args.output) if args.output else None
+    save_queries = os.path.abspath(args.save_queries) if args.save_queries else None
+    original_dir = os.getcwd()
+    work_dir = None
+    synthetic = None
+    if args.synthetic:
+        # 스냅샷·역색인 등은 상대 경로에 저장되므로 임시 디렉토리에서 실행합니다.
+        work_dir = tempfile.mkdtemp(prefix="socy_retrieval_eval_")
+        os.chdir(work_dir)
+        synthetic = {"num_papers": args.synthetic, "seed": args.seed}
+    try:
+        generated = prepare_synthetic(args.synthetic, args.seed, args.num_random or 50) if synthetic else None
+        if args.queries_file:
+            queries = load_labelled_queries(os.path.join(original_dir, args.queries_file))
+        elif synthetic:
+            queries = generated
+        else:
+            from data_collector import SPECIFIC_PAPER_TITLES
+            queries = build_labelled_queries(titles=SPECIFIC_PAPER_TITLES, num_random=args.num_random, seed=args.seed)
+        if save_queries:
+            write_labelled_queries(queries, save_queries)
+        if not queries:
+            raise SystemExit("평가할 질의가 없습니다.")
+
+        results = run_evaluation(configurations, queries, args.k, args.workers, synthetic)
+    finally:
+        os.chdir(original_dir)
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(results, args.k)
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
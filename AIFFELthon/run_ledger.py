@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import uuid
+import logging
+import argparse
+
+# --- 1. 설정 ---
+
+# 작업별 실행 원장 파일(<작업 이름>.jsonl)을 저장하는 디렉토리
+LEDGER_DIR = os.getenv("SOCY_RUN_LEDGER_DIR", "run_ledger")
+
+# 배치 커밋 표식. 데이터 쓰기와 같은 트랜잭션에서 생성하므로, 표식이 있으면 그 배치의 쓰기도 반드시 반영되어 있습니다.
+# 같은 batchId로 다시 쓰려고 하면 표식이 이미 있으므로 아무 행도 반환하지 않고, 호출한 쪽은 쓰기를 건너뜁니다.
+CLAIM_BATCH_QUERY = """
+    OPTIONAL MATCH (existing:IngestBatch {batchId: $batchId})
+    WITH existing WHERE existing IS NULL
+    CREATE (b:IngestBatch {
+        batchId: $batchId, job: $job, runId: $runId,
+        cursorStart: $cursorStart, cursorEnd: $cursorEnd, size: $size,
+        committedAt: datetime()
+    })
+    RETURN b.batchId AS batchId
+    """
+
+# 특정 실행에서 커밋된 배치 표식 조회 (로컬 원장 기록 전에 중단된 배치를 복구할 때 사용)
+RUN_MARKERS_QUERY = """
+    MATCH (b:IngestBatch {runId: $runId})
+    WHERE b.job = $job
+    RETURN b.batchId AS batchId, b.cursorStart AS cursorStart, b.cursorEnd AS cursorEnd, b.size AS size
+    ORDER BY b.cursorEnd
+    """
+
+
+# --- 2. 실행 원장 ---
+
+class RunLedger:
+    """
+    장시간 배치 작업(neo4j_loader, author_enricher)의 실행 원장입니다.
+    실행 ID, 배치 ID, 커서(처리한 마지막 키), 상태를 JSONL로 추가 기록하며,
+    재시작 시 마지막 커밋 커서부터 이어서 처리하므로 데이터베이스를 처음부터 다시 훑지 않습니다.
+
+    기록 형식 (한 줄에 하나):
+    - {"event": "run_started", "run_id", "time", ...추가 정보(total 등)}
+    - {"event": "batch_committed", "run_id", "batch_id", "cursor_start", "cursor_end", "size", "time", ...}
+    - {"event": "batch_skipped", ...}  (이미 커밋된 배치를 다시 만난 경우)
+    - {"event": "run_completed", "run_id", "time"}
+    """
+
+    def __init__(self, job, directory=LEDGER_DIR):
+        self.job = job
+        self.path = os.path.join(directory, f"{job}.jsonl")
+        os.makedirs(directory, exist_ok=True)
+        self.run = None
+        self._terminate_torn_line()
+
+    def _terminate_torn_line(self):
+        """기록 도중 중단되어 줄바꿈 없이 끝난 마지막 줄이 있으면, 다음 기록이 그 줄에 이어 붙지 않도록 줄을 끝냅니다."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def _append(self, record):
+        record = dict(record, time=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # 기록 도중 중단되어 잘린 마지막 줄은 무시합니다.
+                    continue
+        return records
+
+    def last_run(self):
+        """
+        마지막 실행의 상태를 반환합니다.
+        {"run_id", "info", "cursor", "processed", "batches", "completed"} 형태이며, 실행 기록이 없으면 None입니다.
+        """
+        state = None
+        for record in self._read():
+            event = record.get("event")
+            if event == "run_started":
+                state = {"run_id": record["run_id"], "info": record.get("info", {}), "cursor": "",
+                         "processed": 0, "batches": set(), "completed": False}
+            elif state is None or record.get("run_id") != state["run_id"]:
+                continue
+            elif event == "batch_committed":
+                state["batches"].add(record["batch_id"])
+                state["cursor"] = max(state["cursor"], record["cursor_end"])
+                state["processed"] += record.get("size", 0)
+            elif event == "run_completed":
+                state["completed"] = True
+        return state
+
+    def resume(self):
+        """마무리되지 않은 마지막 실행이 있으면 이어서 사용할 상태를 반환하고, 없으면 None을 반환합니다."""
+        state = self.last_run()
+        if state is None or state["completed"]:
+            return None
+        self.run = state
+        logging.info(f"[{self.job}] 중단된 실행 {state['run_id']}을 커서 '{state['cursor']}'부터 이어서 진행합니다. "
+                     f"(커밋된 배치 {len(state['batches'])}개, 처리 {state['processed']}건)")
+        return state
+
+    def start_run(self, **info):
+        """새 실행을 시작합니다. info(전체 건수 등)는 재시작 시 다시 계산하지 않도록 원장에 함께 기록됩니다."""
+        run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self._append({"event": "run_started", "job": self.job, "run_id": run_id, "info": info})
+        self.run = {"run_id": run_id, "info": info, "cursor": "", "processed": 0, "batches": set(), "completed": False}
+        logging.info(f"[{self.job}] 새 실행 {run_id} 시작.")
+        return self.run
+
+    def batch_id(self, cursor_start):
+        """같은 실행에서 같은 커서로 시작하는 배치는 항상 같은 ID를 가집니다. (재시도 시 중복 쓰기 방지)"""
+        return f"{self.job}:{self.run['run_id']}:{cursor_start}"
+
+    def batch_params(self, batch_id, cursor_start, cursor_end, size):
+        """CLAIM_BATCH_QUERY에 전달할 매개변수를 만듭니다."""
+        return {"batchId": batch_id, "job": self.job, "runId": self.run["run_id"],
+                "cursorStart": cursor_start, "cursorEnd": cursor_end, "size": size}
+
+    def record_batch(self, batch_id, cursor_start, cursor_end, size, committed=True, **extra):
+        """
+        배치 결과를 기록하고 커서를 전진시킵니다.
+        committed=False는 표식이 이미 있어 쓰기를 건너뛴 배치로, 처리 건수에는 더하지 않습니다.
+        """
+        event = "batch_committed" if committed else "batch_skipped"
+        self._append({"event": event, "run_id": self.run["run_id"], "batch_id": batch_id,
+                      "cursor_start": cursor_start, "cursor_end": cursor_end,
+                      "size": size if committed else 0, **extra})
+        self.run["cursor"] = max(self.run["cursor"], cursor_end)
+        if committed:
+            self.run["batches"].add(batch_id)
+            self.run["processed"] += size
+
+    def complete_run(self):
+        self._append({"event": "run_completed", "run_id": self.run["run_id"]})
+        self.run["completed"] = True
+        logging.info(f"[{self.job}] 실행 {self.run['run_id']} 완료. (처리 {self.run['processed']}건)")
+
+    def reconcile(self, driver, database="neo4j"):
+        """
+        Neo4j의 배치 표식과 로컬 원장을 맞춥니다.
+        트랜잭션 커밋 직후 원장 기록 전에 중단된 배치가 있으면 원장에 복구 기록을 추가하고 커서를 전진시킵니다.
+        """
+        with driver.session(database=database) as session:
+            markers = list(session.run(RUN_MARKERS_QUERY, job=self.job, runId=self.run["run_id"]))
+        recovered = 0
+        for marker in markers:
+            if marker["batchId"] not in self.run["batches"]:
+                self.record_batch(marker["batchId"], marker["cursorStart"], marker["cursorEnd"],
+                                  marker["size"] or 0, recovered=True)
+                recovered += 1
+        if recovered:
+            logging.info(f"[{self.job}] 원장에 없던 커밋 배치 {recovered}개를 Neo4j 표식에서 복구했습니다. "
+                         f"커서: '{self.run['cursor']}'")
+        return recovered
+
+
+def claim_batch(tx, batch_params):
+    """
+    쓰기 트랜잭션 안에서 배치 표식을 생성합니다. 이미 커밋된 배치면 False를 반환하므로 호출한 쪽은 쓰기를 건너뜁니다.
+    (IngestBatch.batchId 고유 제약 조건이 동시에 실행된 같은 배치의 두 번째 커밋을 막습니다)
+    """
+    return tx.run(CLAIM_BATCH_QUERY, **batch_params).single() is not None
+
+
+# --- 3. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="배치 작업 실행 원장 상태 확인")
+    parser.add_argument("job", help="작업 이름 (예: neo4j_loader, author_enricher)")
+    args = parser.parse_args()
+
+    state = RunLedger(args.job).last_run()
+    if state is None:
+        print(f"'{args.job}' 작업의 실행 기록이 없습니다.")
+    else:
+        status = "완료" if state["completed"] else "미완료 (다시 실행하면 이어서 진행)"
+        print(f"실행 ID: {state['run_id']} | 상태: {status}")
+        print(f"커밋된 배치: {len(state['batches'])}개 | 처리: {state['processed']}건 | 커서: '{state['cursor']}'")
+        if state["info"]:
+            print(f"실행 정보: {json.dumps(state['info'], ensure_ascii=False)}")
@@ -0,0 +1,357 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from jsonl_writer import COMPRESSED_SUFFIXES, GZIP_LEVEL, ZSTD_LEVEL, load_zstandard, iter_jsonl_lines, jsonl_exists
+
+# --- 1. 설정 ---
+
+# 데이터 디렉토리 (data_collector.py/data_preprocessor.py와 동일)
+DATA_DIR = "semantic_scholar_sociology_data"
+# JSONL 파일별 샤드 데이터셋은 "<데이터 디렉토리>/shards/<파일 이름>/" 아래에 둡니다.
+SHARDS_DIR_NAME = "shards"
+MANIFEST_FILE = "manifest.json"
+
+# 샤드 하나에 담는 최대 줄 수와 압축 방식 (gzip, zstd - zstd는 zstandard 패키지 필요)
+SHARD_ROWS = int(os.getenv("SOCY_SHARD_ROWS", "50000"))
+SHARD_COMPRESSION = os.getenv("SOCY_SHARD_COMPRESSION", "gzip")
+# 샤드를 동시에 읽는 스레드 수 (체크섬 계산과 압축 해제는 GIL을 놓으므로 스레드로도 병렬로 진행됩니다)
+SHARD_READ_WORKERS = int(os.getenv("SOCY_SHARD_READ_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# pack/stats/verify 명령의 기본 대상 (data_collector.py가 쓰는 원본 수집 파일)
+RAW_DATA_FILES = (
+    os.path.join(DATA_DIR, "sociology_papers_core_data.jsonl"),
+    os.path.join(DATA_DIR, "sociology_authors.jsonl"),
+    os.path.join(DATA_DIR, "sociology_edges.jsonl"),
+)
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def dataset_dir(filename):
+    """JSONL 파일에 대응하는 샤드 데이터셋 디렉토리 (예: .../shards/sociology_edges)"""
+    name = os.path.basename(filename)
+    if name.endswith(".jsonl"):
+        name = name[:-len(".jsonl")]
+    return os.path.join(os.path.dirname(filename), SHARDS_DIR_NAME, name)
+
+
+def _fsync_dir(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path, payload):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def _compress(data, compression):
+    if compression == "gzip":
+        # mtime을 고정해 같은 내용이면 같은 샤드(같은 체크섬)가 되게 합니다.
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return load_zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def _decompress(payload, compression):
+    if compression == "gzip":
+        return gzip.decompress(payload)
+    return load_zstandard().ZstdDecompressor().decompress(payload)
+
+
+# --- 2. 샤드 데이터셋 ---
+
+class ShardedDataset:
+    """
+    번호가 붙은 압축 샤드 파일(part-000000.jsonl.gz ...)과 manifest.json으로 이루어진 데이터셋입니다.
+    - manifest에는 샤드별 줄 수, 압축 전/후 크기, SHA-256 체크섬이 기록되며, manifest에 있는 샤드만 데이터셋에 속합니다.
+    - 쓰기는 새 샤드 파일을 모두 fsync한 뒤 manifest를 원자적으로 교체하는 순간 커밋됩니다.
+      중간에 중단되면 manifest에 없는 샤드 파일만 남고, 다음에 쓸 때 정리됩니다.
+    - 읽기는 샤드 단위로 여러 스레드에 나눠 체크섬 확인과 압축 해제를 하고, 샤드 순서대로 줄을 내보냅니다.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_FILE)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {"version": 1, "next_shard": 0, "rows": 0, "shards": [], "source": None}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def exists(self):
+        return os.path.exists(self.manifest_path)
+
+    @property
+    def shards(self):
+        return self.manifest["shards"]
+
+    @property
+    def rows(self):
+        return self.manifest["rows"]
+
+    def disk_bytes(self):
+        return sum(shard["bytes"] for shard in self.shards)
+
+    def source_size(self):
+        """데이터셋을 내보낸 원본 파일의 당시 크기 (정제 파일 내보내기에서 최신 여부 확인용, 없으면 None)"""
+        return (self.manifest.get("source") or {}).get("size")
+
+    def _commit(self, shards, next_shard, source):
+        manifest = dict(self.manifest, shards=shards, next_shard=next_shard,
+                        rows=sum(shard["rows"] for shard in shards),
+                        committed_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        if source is not None:
+            manifest["source"] = {"file": os.path.basename(source), "size": os.path.getsize(source)}
+        _atomic_write(self.manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+        _fsync_dir(self.directory)
+        self.manifest = manifest
+
+    def remove_orphans(self):
+        """manifest에 없는 샤드 파일(중단된 쓰기나 덮어쓰기 전 샤드)을 지웁니다."""
+        if not os.path.isdir(self.directory):
+            return 0
+        listed = {shard["file"] for shard in self.shards}
+        orphans = [name for name in os.listdir(self.directory)
+                   if name.startswith("part-") and name not in listed]
+        for name in orphans:
+            os.remove(os.path.join(self.directory, name))
+        return len(orphans)
+
+    def writer(self, overwrite=False, shard_rows=SHARD_ROWS, compression=SHARD_COMPRESSION, source=None):
+        return ShardWriter(self, overwrite, shard_rows, compression, source)
+
+    def append(self, records, **writer_options):
+        """레코드를 새 샤드로 추가하고 커밋합니다. 추가한 레코드 수를 반환합니다."""
+        with self.writer(**writer_options) as writer:
+            return writer.write_many(records)
+
+    # 읽기
+
+    def _read_shard(self, shard, verify):
+        with open(os.path.join(self.directory, shard["file"]), 'rb') as f:
+            payload = f.read()
+        if verify and hashlib.sha256(payload).hexdigest() != shard["sha256"]:
+            raise ValueError(f"샤드 체크섬이 manifest와 다릅니다: {os.path.join(self.directory, shard['file'])}")
+        return _decompress(payload, shard["compression"]).decode('utf-8').splitlines()
+
+    def iter_shard_lines(self, workers=SHARD_READ_WORKERS, verify=True):
+        """샤드별 줄 목록을 샤드 순서대로 내보냅니다. (동시에 읽는 샤드는 workers * 2개까지라 메모리가 일정합니다)"""
+        if not self.shards:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            pending = deque()
+            for shard in self.shards:
+                pending.append(pool.submit(self._read_shard, shard, verify))
+                if len(pending) >= 2 * max(1, workers):
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def iter_lines(self, workers=SHARD_READ_WORKERS, verify=True):
+        for lines in self.iter_shard_lines(workers, verify):
+            yield from lines
+
+    def verify(self):
+        """모든 샤드의 체크섬과 줄 수를 확인하고 문제 목록을 반환합니다. (문제가 없으면 빈 목록)"""
+        problems = []
+        for shard in self.shards:
+            try:
+                rows = len(self._read_shard(shard, verify=True))
+            except (OSError, ValueError, EOFError) as e:
+                problems.append(f"{shard['file']}: {e}")
+                continue
+            if rows != shard["rows"]:
+                problems.append(f"{shard['file']}: 줄 수 {rows}개 (manifest {shard['rows']}개)")
+        return problems
+
+
+class ShardWriter:
+    """
+    레코드를 SHARD_ROWS 줄씩 모아 압축 샤드로 씁니다. 샤드 파일은 다 찰 때마다 임시 이름으로 쓰고 fsync한 뒤 제자리로 옮기며,
+    close() 때 새 샤드를 manifest에 한 번에 커밋합니다. (overwrite=True면 기존 샤드를 새 샤드로 통째로 교체)
+    with 블록이 예외로 끝나면 커밋하지 않으므로 데이터셋은 쓰기 전 상태로 남습니다.
+    """
+
+    def __init__(self, dataset, overwrite=False, shard_rows=SHARD_ROWS, compression=SHARD_COMPRESSION, source=None):
+        if compression not in COMPRESSED_SUFFIXES:
+            raise ValueError(f"지원하지 않는 샤드 압축 방식입니다: {compression} (gzip, zstd)")
+        self.dataset = dataset
+        self.shard_rows = shard_rows
+        self.compression = compression
+        self.source = source
+        os.makedirs(dataset.directory, exist_ok=True)
+        dataset.remove_orphans()
+        self._shards = [] if overwrite else list(dataset.shards)
+        self._next_shard = dataset.manifest["next_shard"]
+        self._lines = []
+        self.rows_written = 0
+
+    def write_line(self, line):
+        """이미 JSON으로 직렬화된 줄을 추가합니다. (줄바꿈 없이)"""
+        self._lines.append(line)
+        if len(self._lines) >= self.shard_rows:
+            self._seal()
+
+    def write(self, record):
+        self.write_line(_encode(record))
+
+    def write_many(self, records):
+        count = 0
+        for record in records:
+            self.write(record)
+            count += 1
+        return count
+
+    def _seal(self):
+        if not self._lines:
+            return
+        data = ("\n".join(self._lines) + "\n").encode('utf-8')
+        payload = _compress(data, self.compression)
+        name = f"part-{self._next_shard:06d}.jsonl{COMPRESSED_SUFFIXES[self.compression]}"
+        _atomic_write(os.path.join(self.dataset.directory, name), payload)
+        self._shards.append({"file": name, "rows": len(self._lines), "bytes": len(payload), "raw_bytes": len(data),
+                             "sha256": hashlib.sha256(payload).hexdigest(), "compression": self.compression})
+        self._next_shard += 1
+        self.rows_written += len(self._lines)
+        self._lines = []
+
+    def close(self):
+        """남은 줄을 샤드로 쓰고 manifest를 커밋합니다. 덮어쓰기였다면 이전 샤드 파일을 지웁니다."""
+        self._seal()
+        self.dataset._commit(self._shards, self._next_shard, self.source)
+        self.dataset.remove_orphans()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+
+# --- 3. JSONL 파일과 함께 읽기 / 묶기 ---
+
+def iter_dataset_lines(filename, workers=SHARD_READ_WORKERS):
+    """
+    원본 파일의 논리적 내용을 줄 단위로 내보냅니다.
+    샤드로 묶인 부분(pack_jsonl)을 병렬로 먼저 읽고, 이어서 아직 묶지 않은 JSONL(.gz/.zst 포함)을 읽습니다.
+    """
+    yield from ShardedDataset(dataset_dir(filename)).iter_lines(workers)
+    yield from iter_jsonl_lines(filename)
+
+
+def dataset_exists(filename):
+    return ShardedDataset(dataset_dir(filename)).exists() or jsonl_exists(filename)
+
+
+def iter_exported_lines(filename, workers=SHARD_READ_WORKERS):
+    """
+    내보낸 샤드 데이터셋(export_jsonl)이 지금의 파일과 같으면 샤드를 병렬로 읽고, 아니면 파일을 그대로 읽습니다.
+    (정제 파일처럼 파일 자체가 기준이고 샤드는 읽기용 사본인 경우)
+    """
+    dataset = ShardedDataset(dataset_dir(filename))
+    if dataset.exists() and os.path.exists(filename) and dataset.source_size() == os.path.getsize(filename):
+        yield from dataset.iter_lines(workers)
+        return
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            yield from f
+
+
+def export_jsonl(filename, appended_records=None, previous_size=None, **writer_options):
+    """
+    JSONL 파일을 읽기용 샤드 데이터셋으로 내보냅니다.
+    appended_records와 추가 전 파일 크기(previous_size)를 넘기면, 데이터셋이 추가 전 파일과 같을 때 새 레코드만 샤드로 추가합니다.
+    """
+    dataset = ShardedDataset(dataset_dir(filename))
+    if appended_records is not None and dataset.exists() and dataset.source_size() == previous_size:
+        dataset.append(appended_records, source=filename, **writer_options)
+        return dataset
+    with dataset.writer(overwrite=True, source=filename, **writer_options) as writer:
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    writer.write_line(line.rstrip("\n"))
+    return dataset
+
+
+def pack_jsonl(filename, **writer_options):
+    """
+    계속 추가되는 원본 JSONL(.gz/.zst 포함)을 데이터셋 끝에 샤드로 묶고 원본 파일을 지웁니다.
+    수집기가 실행 중이지 않을 때 사용하세요. (수집기는 다음 실행에서 빈 원본 파일부터 다시 추가합니다)
+    manifest 커밋과 원본 삭제 사이에 중단되면 같은 줄이 샤드와 원본에 모두 남지만, 전처리기가 ID/엣지 키로 중복을 제거합니다.
+    """
+    dataset = ShardedDataset(dataset_dir(filename))
+    if not jsonl_exists(filename):
+        return 0
+    with dataset.writer(**writer_options) as writer:
+        for line in iter_jsonl_lines(filename):
+            line = line.rstrip("\n")
+            if line.strip():
+                writer.write_line(line)
+    for path in [filename] + [filename + suffix for suffix in COMPRESSED_SUFFIXES.values()]:
+        if os.path.exists(path):
+            os.remove(path)
+    return writer.rows_written
+
+
+# --- 4. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="JSONL 파일의 압축 샤드 데이터셋 관리")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pack_parser = subparsers.add_parser("pack", help="원본 수집 파일을 압축 샤드로 묶고 원본 파일 삭제 (수집기 실행 중에는 사용 금지)")
+    pack_parser.add_argument("files", nargs="*", default=list(RAW_DATA_FILES))
+    pack_parser.add_argument("--compression", choices=tuple(COMPRESSED_SUFFIXES), default=SHARD_COMPRESSION)
+    export_parser = subparsers.add_parser("export", help="JSONL 파일을 읽기용 샤드 데이터셋으로 내보내기 (원본 유지)")
+    export_parser.add_argument("files", nargs="+")
+    export_parser.add_argument("--compression", choices=tuple(COMPRESSED_SUFFIXES), default=SHARD_COMPRESSION)
+    for name, help_text in (("verify", "샤드 체크섬과 줄 수 확인"), ("stats", "샤드 수, 줄 수, 디스크 크기 출력")):
+        command_parser = subparsers.add_parser(name, help=help_text)
+        command_parser.add_argument("files", nargs="*", default=list(RAW_DATA_FILES))
+    args = parser.parse_args()
+
+    exit_code = 0
+    for filename in args.files:
+        start_time = time.perf_counter()
+        if args.command == "pack":
+            rows = pack_jsonl(filename, compression=args.compression)
+            logging.info(f"'{os.path.basename(filename)}': {rows}줄을 샤드로 묶었습니다. ({time.perf_counter() - start_time:.1f}초)")
+            continue
+        if args.command == "export":
+            export_jsonl(filename, compression=args.compression)
+            logging.info(f"'{os.path.basename(filename)}'을(를) 샤드로 내보냈습니다. ({time.perf_counter() - start_time:.1f}초)")
+            continue
+
+        dataset = ShardedDataset(dataset_dir(filename))
+        if not dataset.exists():
+            print(f"- {os.path.basename(filename)}: 샤드 데이터셋 없음")
+            continue
+        if args.command == "verify":
+            problems = dataset.verify()
+            print(f"- {os.path.basename(filename)}: 샤드 {len(dataset.shards)}개 "
+                  + ("정상" if not problems else f"문제 {len(problems)}개"))
+            for problem in problems:
+                print(f"    {problem}")
+            exit_code = exit_code or (1 if problems else 0)
+        else:
+            raw_bytes = sum(shard["raw_bytes"] for shard in dataset.shards)
+            print(f"- {os.path.basename(filename)}: 샤드 {len(dataset.shards)}개, {dataset.rows}줄, "
+                  f"{dataset.disk_bytes() / 1e6:.1f}MB (압축 전 {raw_bytes / 1e6:.1f}MB)")
+    raise SystemExit(exit_code)
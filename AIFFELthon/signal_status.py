@@ -0,0 +1,92 @@
+import os
+import json
+import time
+import argparse
+
+# --- 1. 설정 ---
+
+DATA_DIR = "semantic_scholar_sociology_data"
+
+# 미리 계산해 두는 신호(스냅샷, 중심성, 서지 결합, 어휘 색인, 압축 벡터 인덱스)의 최신 여부를 기록하는 파일
+# graph_sync.py가 그래프를 갱신하면 영향받는 신호를 stale로 표시하고, 각 계산 스크립트가 완료 시 다시 최신으로 표시합니다.
+SIGNAL_STATUS_FILE = os.path.join(DATA_DIR, "derived_signals.json")
+
+# 신호별로 영향을 주는 데이터 종류(papers/authors/edges)와 갱신 명령 (갱신 순서대로 나열)
+DERIVED_SIGNALS = {
+    "graph_snapshot": {"depends_on": ("edges",), "refresh": "python graph_snapshot.py refresh"},
+    "centrality": {"depends_on": ("edges",), "refresh": "python centrality_calculator.py"},
+    "bibliographic_coupling": {"depends_on": ("edges",), "refresh": "python bibliographic_coupling.py"},
+    "lexical_index": {"depends_on": ("papers", "authors"), "refresh": "python lexical_index.py build"},
+    "vector_index": {"depends_on": ("papers",), "refresh": "python vector_compressor.py build"},
+}
+
+
+# --- 2. 상태 기록 ---
+
+def load_status(path=SIGNAL_STATUS_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_status(status, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def mark_stale(changes, path=SIGNAL_STATUS_FILE):
+    """
+    데이터 변경 건수(예: {"papers": 10, "edges": 250})를 받아 영향받는 신호를 stale로 표시하고, 그 신호 이름 목록을 반환합니다.
+    이미 stale인 신호는 처음 stale이 된 시각을 유지하고 누적 변경 건수만 더합니다.
+    """
+    status = load_status(path)
+    stale = []
+    for name, signal in DERIVED_SIGNALS.items():
+        count = sum(changes.get(kind, 0) for kind in signal["depends_on"])
+        if not count:
+            continue
+        entry = status.get(name) or {}
+        if not entry.get("stale"):
+            entry = {"stale": True, "since": time.strftime("%Y-%m-%dT%H:%M:%S"), "pending_changes": 0}
+        entry["pending_changes"] += count
+        status[name] = entry
+        stale.append(name)
+    if stale:
+        _save_status(status, path)
+    return stale
+
+
+def mark_fresh(name, path=SIGNAL_STATUS_FILE):
+    """
+    신호를 다시 계산했음을 기록합니다.
+    상태 파일이 없으면(그래프 동기화를 사용하지 않는 환경) 아무것도 만들지 않습니다.
+    """
+    if not os.path.exists(path):
+        return
+    status = load_status(path)
+    status[name] = {"stale": False, "refreshed_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "pending_changes": 0}
+    _save_status(status, path)
+
+
+def stale_signals(path=SIGNAL_STATUS_FILE):
+    """stale 상태인 신호 이름 목록 (갱신 순서대로)."""
+    status = load_status(path)
+    return [name for name in DERIVED_SIGNALS if (status.get(name) or {}).get("stale")]
+
+
+# --- 3. 스크립트 실행 ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="미리 계산된 신호(스냅샷, 중심성, 서지 결합, 어휘 색인, 압축 벡터 인덱스)의 최신 여부 확인")
+    parser.parse_args()
+
+    status = load_status()
+    for name, signal in DERIVED_SIGNALS.items():
+        entry = status.get(name) or {}
+        if entry.get("stale"):
+            print(f"- {name}: stale (변경 {entry['pending_changes']}건, {entry['since']}부터) -> {signal['refresh']}")
+        else:
+            print(f"- {name}: 최신" + (f" ({entry['refreshed_at']} 갱신)" if entry.get("refreshed_at") else ""))
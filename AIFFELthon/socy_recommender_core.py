@@ -2,12 +2,29 @@ import os
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain_neo4j import Neo4jVector
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables import RunnableGenerator
 from langchain_core.output_parsers import StrOutputParser
 from neo4j import GraphDatabase
 import re
 import random
+import time
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
+
+from graph_snapshot import GraphSnapshot, SNAPSHOT_DIR, current_version as current_snapshot_version
+from graph_ranker import recommend_by_random_walk
+from bibliographic_coupling import CouplingTable, COUPLING_TABLE_DIR
+from lexical_index import LexicalIndex, LEXICAL_INDEX_DIR, reciprocal_rank_fusion
+from vector_compressor import CompressedVectorIndex, VECTOR_INDEX_DIR
+from answer_cache import SemanticAnswerCache, replay_answer
+from prompt_builder import build_context, build_prompt, PROMPT_CACHE_NAME
+from admission_controller import AdmissionController, ServerBusyError, DEGRADE_TO_RETRIEVAL_ONLY
+from conversation_store import ConversationStore, resolve_follow_up
+import tracing
 
 # --- 1. 기본 설정 및 초기화 ---
 load_dotenv()  # 환경 변수 로드
@@ -17,26 +34,142 @@ NEO4J_URI = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# 답변 생성 모델 (prompt_builder.py create-cache도 같은 모델로 지시문 캐시를 만듭니다)
+LLM_MODEL = "models/gemini-2.0-flash"
+
+# 추천 모드: "default" (1-hop 저자/공동 인용 Cypher 조회) 또는 "ppr" (인용/저자 그래프 Personalized PageRank)
+RECOMMENDATION_MODE = os.getenv("SOCY_RECOMMENDATION_MODE", "default")
+# PPR 랜덤 워크에 허용하는 시간 예산 (밀리초) 및 그래프 기반 추천 개수
+PPR_TIME_BUDGET_MS = float(os.getenv("SOCY_PPR_TIME_BUDGET_MS", "30"))
+PPR_TOP_N = 4
+# 서지 결합(공유 참고문헌) 이웃 테이블에서 가져올 추천 개수
+COUPLING_TOP_N = 2
+# 핵심 논문 한 편에서 저자/공동 인용 Cypher 질의로 확장할 추천 개수 (질의별)
+EXPANSION_LIMIT = 2
+# 저자 기반 추천에서 영향력 있는 저자로 보는 코퍼스 내 피인용 수 (centrality_calculator.py의 corpusCitationCount)
+# 중심성이 아직 계산되지 않은 저자는 Semantic Scholar의 hIndex > 10 OR citationCount > 1000으로 판단합니다.
+AUTHOR_MIN_CORPUS_CITATIONS = int(os.getenv("SOCY_AUTHOR_MIN_CORPUS_CITATIONS", "20"))
+# 그래프 확장 신호(저자/공동 인용 질의, 랜덤 워크, 서지 결합)를 기다리는 최대 시간 (초). 넘기면 끝난 신호만으로 진행합니다.
+GRAPH_EXPANSION_TIMEOUT = float(os.getenv("SOCY_GRAPH_EXPANSION_TIMEOUT", "2"))
+# 검색 후보 중 추천 목록에 바로 넣는 상위 논문 수와, 상세 정보를 조회해 LLM 컨텍스트에 넣는 논문 수
+SEED_PAPERS = 5
+CONTEXT_PAPERS = 5
+
+# 하이브리드 검색: BM25 역색인(lexical_index.py)과 벡터 검색 결과를 RRF로 융합합니다.
+LEXICAL_TOP_K = 20
+VECTOR_TOP_K = 20
+# 벡터 검색(임베딩 API + Neo4j 벡터 인덱스)을 기다리는 최대 시간 (초)
+VECTOR_SEARCH_TIMEOUT = float(os.getenv("SOCY_VECTOR_SEARCH_TIMEOUT", "5"))
+# 동시에 실행할 수 있는 벡터 검색 수. 시간 초과로 버려진 검색도 끝날 때까지 자리를 차지하므로,
+# 자리가 모두 찬 동안에는 새 벡터 검색을 띄우지 않고 어휘 검색 결과만 사용합니다.
+VECTOR_SEARCH_WORKERS = int(os.getenv("SOCY_VECTOR_SEARCH_WORKERS", "4"))
+# 질의 용어 여러 개가 논문 제목이나 저자명에서 그대로 일치하면 벡터 검색은 이 시간만 기다립니다. (초)
+# 초록에서만 일치한 용어는 세지 않으므로, 일반적인 주제 질문은 벡터 검색 결과를 끝까지 기다립니다.
+# (임베딩이 이미 메모리에 있는 반복 질문 정도만 융합하고, 나머지는 어휘 검색 결과로 바로 응답)
+STRONG_LEXICAL_VECTOR_TIMEOUT = 0.02
+STRONG_LEXICAL_MIN_TERMS = 2
+# Neo4j 벡터 검색 결과 중 남길 논문 언어 (None이면 언어로 거르지 않음)
+VECTOR_LANGUAGES = ("en", "ko")
+# 벡터 검색 백엔드: "neo4j" (Neo4j 벡터 인덱스) 또는 "compressed" (vector_compressor.py의 PCA + int8 압축 인덱스를
+# 프로세스 안에서 검색하고 상위 후보만 원본 벡터로 다시 채점). 압축 인덱스가 없으면 Neo4j 벡터 인덱스를 사용합니다.
+VECTOR_BACKEND = os.getenv("SOCY_VECTOR_BACKEND", "neo4j")
+
+# 빠른 목록 모드(LLM 해설 없이 그래프에서 찾은 추천 논문만 바로 보여줌)에서 보여줄 논문 수와 벡터 검색 대기 시간 (초)
+# 첫 결과가 1초 안에 보이도록 벡터 검색을 짧게 기다리고, 늦으면 어휘 검색 결과로 먼저 보여줍니다.
+RETRIEVAL_ONLY_PAPERS = 10
+RETRIEVAL_ONLY_VECTOR_TIMEOUT = 0.7
+
+# 의미 기반 답변 캐시(answer_cache.py): 말만 바꾼 질문이 같은 논문들을 찾으면 LLM을 다시 호출하지 않고 이전 답변을 스트리밍합니다.
+ANSWER_CACHE_ENABLED = os.getenv("SOCY_ANSWER_CACHE", "1") == "1"
+# 답변 캐시가 사용할 수 있도록 벡터 검색에서 계산한 최근 질문 임베딩을 기억해 두는 개수
+QUESTION_EMBEDDING_MEMO_SIZE = 256
+
+# 세션별 대화 턴(질문, 답변, 추천 논문 ID와 점수)을 SQLite에 저장하고 후속 질문을 직전 턴의 후보로 해석할지 여부
+CONVERSATION_STORE_ENABLED = os.getenv("SOCY_CONVERSATION_STORE", "1") == "1"
+# 후속 질문을 직전 턴의 후보와 그래프 이웃으로 해석했을 때 새 논문이 이보다 적으면 질문으로 새로 검색합니다.
+MIN_FOLLOW_UP_PAPERS = 3
+
+# 언어 모델, 임베딩 모델, Neo4j 드라이버, 벡터 인덱스는 처음 사용할 때 생성합니다.
+# 모듈 임포트만으로 외부 서비스에 연결하지 않으며, 벤치마크에서는 configure_backends()로 대체 객체를 주입합니다.
+_backends = {}
+_backends_lock = threading.RLock()
+
+# 모든 세션이 공유하는 요청 승인/외부 서비스 동시 호출 제한 (admission_controller.py)
+admission = AdmissionController()
+
+
+def configure_backends(llm=None, embedding_model=None, driver=None, vector_store=None):
+    """
+    지정한 백엔드 객체를 기본 객체 대신 사용하도록 등록합니다. (None인 항목은 그대로 둡니다)
+    LLM이나 임베딩 모델을 바꾸면 이전 모델로 만든 답변 캐시와 질문 임베딩은 버립니다.
+    """
+    with _backends_lock:
+        for name, backend in (("llm", llm), ("embedding_model", embedding_model),
+                              ("driver", driver), ("vector_store", vector_store)):
+            if backend is not None:
+                _backends[name] = backend
+    if llm is not None or embedding_model is not None:
+        answer_cache.clear()
+        with _question_embeddings_lock:
+            _question_embeddings.clear()
+
+
+def _get_backend(name, factory):
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                backend = _backends[name] = factory()
+    return backend
+
+
+def get_llm():
+    # SOCY_PROMPT_CACHE가 설정되어 있으면 미리 올려 둔 고정 지시문(cached content)을 참조합니다.
+    return _get_backend("llm", lambda: ChatGoogleGenerativeAI(model=LLM_MODEL, temperature=0.3, top_k=5,
+                                                              cached_content=PROMPT_CACHE_NAME))
+
+
+def get_embedding_model():
+    return _get_backend("embedding_model", lambda: GoogleGenerativeAIEmbeddings(model="models/embedding-001"))
+
+
+def get_driver():
+    return _get_backend("driver", lambda: GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)))
+
+
+# 벡터 검색 결과로 본문(제목 + 초록)과 paperId/language만 반환합니다.
+# 임베딩 입력 텍스트를 노드에 따로 저장하지 않으며, 노드 전체 속성(임베딩 포함)을 결과로 보내지 않습니다.
+VECTOR_RETRIEVAL_QUERY = """
+    RETURN 'Title: ' + coalesce(node.title, '') + '\\n\\nAbstract: ' + coalesce(node.abstract, '') AS text, score,
+           node {.paperId, .language} AS metadata
+    """
 
-# 언어 모델 및 임베딩 모델 초기화
-llm = ChatGoogleGenerativeAI(model="models/gemini-2.0-flash", temperature=0.3, top_k=5)
-embedding_model = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
 
-# Neo4j 드라이버 및 벡터 인덱스 연결
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-neo4j_vector = Neo4jVector.from_existing_index(
-    embedding=embedding_model,
-    url=NEO4J_URI,
-    username=NEO4J_USER,
-    password=NEO4J_PASSWORD,
-    index_name="paper_abstract_embeddings",
-    text_node_property="text_for_embedding",
-)
+@contextmanager
+def neo4j_session():
+    """Neo4j 동시 호출 슬롯을 차지한 채 세션을 엽니다. (슬롯을 얻지 못하면 ServerBusyError)"""
+    with admission.dependency("neo4j"):
+        with get_driver().session(database="neo4j") as session:
+            yield session
+
+
+def get_vector_store():
+    # Neo4j 벡터 인덱스 연결
+    return _get_backend("vector_store", lambda: Neo4jVector.from_existing_index(
+        embedding=get_embedding_model(),
+        url=NEO4J_URI,
+        username=NEO4J_USER,
+        password=NEO4J_PASSWORD,
+        index_name="paper_abstract_embeddings",
+        retrieval_query=VECTOR_RETRIEVAL_QUERY,
+    ))
 
 
 # --- 2. Neo4j 데이터 조회 함수 ---
-def get_full_paper_and_author_details(tx, paper_id):
-    query = """
+
+# 추천에 사용하는 Cypher 질의 (벤치마크의 Neo4j 대체 드라이버도 이 상수로 질의를 구분합니다)
+PAPER_DETAILS_QUERY = """
     MATCH (p:Paper {paperId: $paperId})
     OPTIONAL MATCH (p)-[:PUBLISHED_IN]->(j:Journal)
     WITH p, j, [(p)-[:HAS_AUTHOR]->(a) | {
@@ -44,9 +177,39 @@ def get_full_paper_and_author_details(tx, paper_id):
         hIndex: a.hIndex,
         citationCount: a.citationCount
     }] AS authors
-    RETURN p as paper, authors, j.journalName AS journalName
+    RETURN p {.*, abstractEmbedding: null, text_for_embedding: null} AS paper, authors, j.journalName AS journalName
+    """
+
+# 저자 영향력과 추천 순위는 코퍼스 내 중심성(corpusCitationCount, corpusPageRank)을 사용하고,
+# 중심성이 없는 노드(계산 전이거나 이후에 추가된 노드)만 Semantic Scholar 값으로 대신합니다.
+AUTHOR_RECS_QUERY = """
+    MATCH (seed:Paper {paperId: $paperId})-[:HAS_AUTHOR]->(author:Author)
+    WHERE CASE WHEN author.corpusCitationCount IS NULL
+               THEN author.hIndex > 10 OR author.citationCount > 1000
+               ELSE author.corpusCitationCount >= $minCorpusCitations END
+    MATCH (rec:Paper)-[:HAS_AUTHOR]->(author)
+    WHERE seed <> rec
+    RETURN rec.paperId AS paperId, '핵심 논문의 영향력 있는 저자(' + author.name + ')가 저술' AS reason,
+           rec.corpusPageRank AS pagerank, rec.citationCount AS citationCount
+    ORDER BY coalesce(rec.corpusPageRank, 0) DESC, coalesce(rec.citationCount, 0) DESC
+    LIMIT $limit
     """
-    result = tx.run(query, paperId=paper_id).single()
+
+COCITATION_RECS_QUERY = """
+    MATCH (seed:Paper {paperId: $paperId})<-[:CITES]-(citer:Paper)
+    WITH seed, collect(citer) AS citers
+    UNWIND citers AS citer
+    MATCH (citer)-[:CITES]->(rec:Paper)
+    WHERE seed <> rec AND NOT (rec)-[:CITES]->(seed) AND NOT (seed)-[:CITES]->(rec)
+    RETURN rec.paperId AS paperId, '함께 자주 인용됨 (학술적 연관성 높음)' AS reason, count(citer) AS score
+    ORDER BY score DESC
+    LIMIT $limit
+    """
+
+
+def get_full_paper_and_author_details(tx, paper_id):
+    records = tracing.run_query(tx, PAPER_DETAILS_QUERY, "paper_details", paperId=paper_id)
+    result = records[0] if records else None
     if result:
         return {
             "paper": dict(result["paper"]),
@@ -56,91 +219,511 @@ def get_full_paper_and_author_details(tx, paper_id):
     return None
 
 
-def get_ultimate_context(question: str) -> str:
+# 그래프 스냅샷: 디스크에 저장된 스냅샷(graph_snapshot.py build)이 있으면 메모리 매핑으로 불러옵니다.
+# 없으면 요청 경로에서 Neo4j 전체 내보내기를 기다리지 않도록 백그라운드 스레드에서 한 번만 내보내고,
+# 그동안은 None을 반환해 기본 Cypher 추천을 사용합니다.
+# 새 버전이 저장되었는지는 SNAPSHOT_RELOAD_INTERVAL초마다 CURRENT 포인터로 확인합니다.
+SNAPSHOT_RELOAD_INTERVAL = 60
+_graph_snapshot = None
+_snapshot_checked_at = 0.0
+_snapshot_build_lock = threading.Lock()
+_snapshot_build_thread = None
+
+
+def _build_snapshot_from_neo4j():
+    global _graph_snapshot
+    try:
+        with tracing.span("load_graph_snapshot", source="neo4j"):
+            snapshot = GraphSnapshot.from_neo4j(get_driver())
+    except Exception as e:
+        logging.warning(f"Neo4j에서 그래프 스냅샷을 만들지 못했습니다. 기본 추천 모드를 계속 사용합니다: {e}")
+        return
+    with _snapshot_build_lock:
+        # 내보내는 동안 디스크 스냅샷이 먼저 로드되었다면 그쪽을 유지합니다.
+        if _graph_snapshot is None:
+            _graph_snapshot = snapshot
+    tracing.increment("index_loads_total", index="graph_snapshot")
+    logging.info("Neo4j에서 그래프 스냅샷을 만들었습니다.")
+
+
+def _start_snapshot_build():
+    """Neo4j 스냅샷 내보내기를 아직 시작하지 않았으면 백그라운드 스레드로 시작합니다. (프로세스당 한 번)"""
+    global _snapshot_build_thread
+    with _snapshot_build_lock:
+        if _snapshot_build_thread is not None:
+            return
+        _snapshot_build_thread = threading.Thread(target=_build_snapshot_from_neo4j, name="graph-snapshot-build",
+                                                  daemon=True)
+        _snapshot_build_thread.start()
+
+
+def get_graph_snapshot():
+    global _graph_snapshot, _snapshot_checked_at
+    now = time.monotonic()
+    if _graph_snapshot is not None and now - _snapshot_checked_at < SNAPSHOT_RELOAD_INTERVAL:
+        tracing.increment("index_cache_hits_total", index="graph_snapshot")
+        return _graph_snapshot
+    _snapshot_checked_at = now
+
+    version = current_snapshot_version(SNAPSHOT_DIR)
+    if version is not None:
+        if _graph_snapshot is None or _graph_snapshot.version != version:
+            with tracing.span("load_graph_snapshot", version=version):
+                _graph_snapshot = GraphSnapshot.load(SNAPSHOT_DIR)
+            tracing.increment("index_loads_total", index="graph_snapshot")
+    elif _graph_snapshot is None:
+        _start_snapshot_build()
+    return _graph_snapshot
+
+
+# 서지 결합 이웃 테이블(bibliographic_coupling.py로 오프라인 계산)도 같은 방식으로 메모리 매핑해 둡니다.
+_coupling_table = None
+_coupling_checked_at = 0.0
+
+
+def get_coupling_table():
+    global _coupling_table, _coupling_checked_at
+    now = time.monotonic()
+    if now - _coupling_checked_at >= SNAPSHOT_RELOAD_INTERVAL:
+        _coupling_checked_at = now
+        version = current_snapshot_version(COUPLING_TABLE_DIR)
+        if version is not None and (_coupling_table is None or _coupling_table.version != version):
+            _coupling_table = CouplingTable.load(COUPLING_TABLE_DIR)
+            tracing.increment("index_loads_total", index="coupling_table")
+            return _coupling_table
+    tracing.increment("index_cache_hits_total", index="coupling_table")
+    return _coupling_table
+
+
+# BM25 역색인도 같은 방식으로 메모리 매핑해 두고, 벡터 검색은 별도 스레드에서 시간 제한을 두고 실행합니다.
+_lexical_index = None
+_lexical_checked_at = 0.0
+_search_executor = ThreadPoolExecutor(max_workers=VECTOR_SEARCH_WORKERS)
+_vector_search_slots = threading.BoundedSemaphore(VECTOR_SEARCH_WORKERS)
+
+
+def get_lexical_index():
+    global _lexical_index, _lexical_checked_at
+    now = time.monotonic()
+    if now - _lexical_checked_at >= SNAPSHOT_RELOAD_INTERVAL:
+        _lexical_checked_at = now
+        version = current_snapshot_version(LEXICAL_INDEX_DIR)
+        if version is not None and (_lexical_index is None or _lexical_index.version != version):
+            _lexical_index = LexicalIndex.load(LEXICAL_INDEX_DIR)
+            tracing.increment("index_loads_total", index="lexical_index")
+            return _lexical_index
+    tracing.increment("index_cache_hits_total", index="lexical_index")
+    return _lexical_index
+
+
+# 압축 벡터 인덱스(VECTOR_BACKEND="compressed")도 같은 방식으로 메모리 매핑해 둡니다.
+_vector_index = None
+_vector_index_checked_at = 0.0
+
+
+def get_compressed_vector_index():
+    global _vector_index, _vector_index_checked_at
+    now = time.monotonic()
+    if now - _vector_index_checked_at >= SNAPSHOT_RELOAD_INTERVAL:
+        _vector_index_checked_at = now
+        version = current_snapshot_version(VECTOR_INDEX_DIR)
+        if version is not None and (_vector_index is None or _vector_index.version != version):
+            _vector_index = CompressedVectorIndex.load(VECTOR_INDEX_DIR)
+            tracing.increment("index_loads_total", index="vector_index")
+            return _vector_index
+    tracing.increment("index_cache_hits_total", index="vector_index")
+    return _vector_index
+
+
+def clear_cached_indexes():
+    """메모리에 보관 중인 그래프 스냅샷·서지 결합 테이블·BM25 역색인·압축 벡터 인덱스를 버리고 다음 요청에서 다시 불러오게 합니다."""
+    global _graph_snapshot, _snapshot_checked_at, _coupling_table, _coupling_checked_at, _lexical_index, _lexical_checked_at
+    global _vector_index, _vector_index_checked_at, _snapshot_build_thread
+    _graph_snapshot, _coupling_table, _lexical_index, _vector_index = None, None, None, None
+    with _snapshot_build_lock:
+        _snapshot_build_thread = None
+    _snapshot_checked_at = _coupling_checked_at = _lexical_checked_at = _vector_index_checked_at = 0.0
+
+
+# 벡터 검색 스레드가 계산한 질문 임베딩 (답변 캐시 조회/저장에 재사용, 오래된 질문부터 버림)
+_question_embeddings = OrderedDict()
+_question_embeddings_lock = threading.Lock()
+
+
+def recent_question_embedding(question):
+    """벡터 검색에서 이미 계산한 질문 임베딩을 반환합니다. 아직 계산되지 않았으면 기다리지 않고 None을 반환합니다."""
+    with _question_embeddings_lock:
+        return _question_embeddings.get(question)
+
+
+def _vector_search(question):
+    """질문을 임베딩한 뒤 벡터 인덱스에서 유사한 논문의 paperId 목록을 찾습니다. (임베딩과 검색 시간을 따로 기록)"""
+    with tracing.span("embedding"), admission.dependency("embedding"):
+        embedding = get_embedding_model().embed_query(question)
+    with _question_embeddings_lock:
+        _question_embeddings[question] = embedding
+        _question_embeddings.move_to_end(question)
+        while len(_question_embeddings) > QUESTION_EMBEDDING_MEMO_SIZE:
+            _question_embeddings.popitem(last=False)
+    with tracing.span("vector_search") as search_span:
+        vector_index = get_compressed_vector_index() if VECTOR_BACKEND == "compressed" else None
+        if vector_index is not None:
+            # 압축 인덱스는 전처리(영어 논문만 남김)를 거친 논문만 담고 있으므로 언어 필터가 필요 없습니다.
+            paper_ids = [paper_id for paper_id, _ in vector_index.search(embedding, k=VECTOR_TOP_K)]
+        else:
+            similar_nodes = get_vector_store().similarity_search_by_vector(embedding, k=VECTOR_TOP_K)
+            paper_ids = [n.metadata['paperId'] for n in similar_nodes if VECTOR_LANGUAGES is None or
+                         'language' not in n.metadata or n.metadata['language'] in VECTOR_LANGUAGES]
+        search_span.set(results=len(paper_ids), backend="compressed" if vector_index is not None else "neo4j")
+    return paper_ids
+
+
+def search_candidate_papers(question, vector_timeout=None):
+    """
+    BM25 역색인 검색과 벡터 유사도 검색을 함께 수행하고 Reciprocal Rank Fusion으로 합칩니다.
+    임베딩 서비스가 느리거나 응답하지 않아도 어휘 검색 결과만으로 후보를 반환합니다.
+    vector_timeout을 지정하면 벡터 검색을 VECTOR_SEARCH_TIMEOUT 대신 그 시간(초)만 기다립니다.
+    Returns:
+        tuple: (융합 순위 paperId 목록, 벡터 검색 paperId 집합, 제목·저자명이 질의 용어와 일치한 paperId 집합)
+    """
+    # 현재 컨텍스트(추적 스팬 포함)를 복사해 벡터 검색 스레드에서도 같은 요청의 하위 스팬으로 기록되게 합니다.
+    # 빈 자리가 없으면(앞선 검색들이 임베딩 서비스에 묶여 있으면) 작업을 쌓지 않고 어휘 검색만 사용합니다.
+    vector_future = None
+    if _vector_search_slots.acquire(blocking=False):
+        vector_future = _search_executor.submit(contextvars.copy_context().run, _vector_search, question)
+        vector_future.add_done_callback(lambda _: _vector_search_slots.release())
+
+    lexical_hits = []
+    with tracing.span("lexical_search") as lexical_span:
+        lexical_index = get_lexical_index()
+        if lexical_index is not None:
+            lexical_hits = lexical_index.search(question, k=LEXICAL_TOP_K)
+        lexical_span.set(results=len(lexical_hits))
+    strong_lexical_ids = {paper_id for paper_id, _, key_matched in lexical_hits
+                          if key_matched >= STRONG_LEXICAL_MIN_TERMS}
+
+    try:
+        if vector_future is None:
+            if not lexical_hits:
+                # 어휘 검색 결과도 없으면 빈 목록 대신 요청 스레드에서 직접 벡터 검색을 수행합니다.
+                vector_ids = _vector_search(question)
+            else:
+                logging.warning("벡터 검색이 모두 사용 중입니다. 어휘 검색 결과만 사용합니다.")
+                tracing.increment("vector_search_fallbacks_total", reason="busy")
+                vector_ids = []
+        else:
+            timeout = VECTOR_SEARCH_TIMEOUT if vector_timeout is None else vector_timeout
+            vector_ids = vector_future.result(
+                timeout=min(STRONG_LEXICAL_VECTOR_TIMEOUT, timeout) if strong_lexical_ids else timeout
+            )
+    except FutureTimeoutError:
+        # 아직 시작하지 않은 작업은 취소하고, 이미 실행 중인 작업은 끝나면 자리를 돌려줍니다.
+        vector_future.cancel()
+        logging.warning("벡터 검색 시간 초과. 어휘 검색 결과만 사용합니다.")
+        tracing.increment("vector_search_fallbacks_total", reason="timeout")
+        vector_ids = []
+    except Exception as e:
+        if not lexical_hits:
+            raise
+        logging.warning(f"벡터 검색 실패. 어휘 검색 결과만 사용합니다: {e}")
+        tracing.increment("vector_search_fallbacks_total", reason="error")
+        vector_ids = []
+
+    lexical_ids = [paper_id for paper_id, _, _ in lexical_hits]
+    return reciprocal_rank_fusion([vector_ids, lexical_ids]), set(vector_ids), strong_lexical_ids
+
+
+def get_random_walk_recs(seed_paper_ids):
+    """
+    벡터 검색 상위 논문을 시드로 인용/저자 그래프에서 PPR 랜덤 워크를 수행해 추천 후보를 반환합니다.
+    스냅샷을 불러올 수 없거나 아직 만드는 중이면 None을 반환하여 기본 Cypher 추천으로 대체되도록 합니다.
+    """
+    try:
+        snapshot = get_graph_snapshot()
+    except Exception as e:
+        logging.warning(f"그래프 스냅샷 로드 실패. 기본 추천 모드로 대체합니다: {e}")
+        return None
+    if snapshot is None:
+        tracing.increment("random_walk_fallbacks_total", reason="snapshot_pending")
+        return None
+    with tracing.span("random_walk", seeds=len(seed_paper_ids)):
+        return recommend_by_random_walk(snapshot, seed_paper_ids, top_n=PPR_TOP_N,
+                                        time_budget_ms=PPR_TIME_BUDGET_MS)
+
+
+# 그래프 확장 신호는 서로 독립적이므로 별도 스레드에서 동시에 실행하고, 끝나는 순서대로 추천 목록에 반영합니다.
+# 최종 점수와 근거 순서는 완료 순서와 관계없이 이 순서로 합산합니다.
+SIGNAL_ORDER = ("random_walk", "author", "cocitation", "coupling")
+_expansion_executor = ThreadPoolExecutor(max_workers=8)
+
+
+def _random_walk_signal(seed_paper_ids):
+    walk_recs = get_random_walk_recs(seed_paper_ids)
+    if not walk_recs:
+        return None
+    max_walk_score = walk_recs[0][1]
+    return [(paper_id, '질문 관련 논문들과 인용·저자 네트워크로 긴밀히 연결됨 (랜덤 워크 근접도 높음)', 10 * walk_score / max_walk_score)
+            for paper_id, walk_score in walk_recs]
+
+
+def _author_signal(paper_id):
+    with neo4j_session() as session:
+        author_recs = tracing.run_query(session, AUTHOR_RECS_QUERY, "author_recs", paperId=paper_id,
+                                        limit=EXPANSION_LIMIT, minCorpusCitations=AUTHOR_MIN_CORPUS_CITATIONS)
+    if not author_recs:
+        return []
+    # 코퍼스 PageRank가 있으면 그 값으로, 없으면 API 피인용 수로 최고점 10점에 맞춰 정규화합니다. (랜덤 워크 신호와 같은 척도)
+    key = 'pagerank' if any(rec['pagerank'] is not None for rec in author_recs) else 'citationCount'
+    max_value = max(rec[key] or 0 for rec in author_recs)
+    return [(rec['paperId'], rec['reason'], 10 * (rec[key] or 0) / max_value if max_value else 0)
+            for rec in author_recs]
+
+
+def _cocitation_signal(paper_id):
+    with neo4j_session() as session:
+        cocitation_recs = tracing.run_query(session, COCITATION_RECS_QUERY, "cocitation_recs",
+                                            paperId=paper_id, limit=EXPANSION_LIMIT)
+    return [(rec['paperId'], rec['reason'], rec['score'] * 10) for rec in cocitation_recs]
+
+
+def _coupling_signal(paper_id):
+    with tracing.span("coupling"):
+        coupling_table = get_coupling_table()
+        if coupling_table is None:
+            return []
+        return [(neighbor_id, f'핵심 논문과 많은 참고문헌을 공유함 (공유 참고문헌 {shared_count}편, 서지 결합도 높음)',
+                 shared_count * 10)
+                for neighbor_id, shared_count in coupling_table.neighbors_of(paper_id, limit=COUPLING_TOP_N)]
+
+
+def _merge_signals(seed_recommendations, signal_results, exclude_ids=frozenset()):
+    """
+    검색 후보에 완료된 신호를 SIGNAL_ORDER 순서로 더해 점수 내림차순 [(paperId, {'reasons', 'score'}), ...]를 만듭니다.
+    exclude_ids에 있는 논문(후속 질문에서 이미 보여준 논문)은 신호로 추가하지 않습니다.
+    """
+    recommendations = {paper_id: {'reasons': list(data['reasons']), 'score': data['score']}
+                       for paper_id, data in seed_recommendations.items()}
+    for signal in SIGNAL_ORDER:
+        for paper_id, reason, score in signal_results.get(signal) or ():
+            if paper_id in exclude_ids:
+                continue
+            if paper_id not in recommendations:
+                recommendations[paper_id] = {'reasons': [], 'score': 0}
+            recommendations[paper_id]['reasons'].append(reason)
+            recommendations[paper_id]['score'] += score
+    return sorted(recommendations.items(), key=lambda item: item[1]['score'], reverse=True)
+
+
+def iter_ranked_recommendations(question: str, mode: str = None, vector_timeout: float = None):
+    """
+    검색 후보에 그래프 확장(저자/공동 인용 또는 랜덤 워크)과 서지 결합 신호를 반영하며,
+    단계가 끝날 때마다 (단계 이름, 점수순 추천 목록)을 내보냅니다.
+    첫 단계는 "search"이고, 이후 "random_walk"(ppr 모드) 또는 "author"/"cocitation", 그리고 "coupling"이 동시에 실행되어
+    끝나는 순서대로 나옵니다. GRAPH_EXPANSION_TIMEOUT 안에 끝나지 않거나 실패한 신호는 빼고 진행합니다.
+    후보가 없으면 아무것도 내보내지 않습니다.
+    """
+    mode = mode or RECOMMENDATION_MODE
+
+    # 어휘(BM25) + 벡터 유사도 하이브리드 검색 (많이 뽑고 융합 순위로 정렬)
+    with tracing.span("candidate_search") as search_span:
+        candidate_ids, vector_ids, strong_lexical_ids = search_candidate_papers(question, vector_timeout)
+        search_span.set(candidates=len(candidate_ids))
+
+    if not candidate_ids:
+        return
+
+    seed_recommendations = {}
+    for paper_id in candidate_ids[:SEED_PAPERS]:
+        reasons = []
+        if paper_id in strong_lexical_ids:
+            reasons.append('질문에 언급된 제목·저자명의 핵심어와 일치함')
+        if paper_id in vector_ids or not reasons:
+            reasons.append('질문과 유사한 주제를 다룸')
+        seed_recommendations[paper_id] = {'reasons': reasons, 'score': 1.0}
+    yield "search", _merge_signals(seed_recommendations, {})
+    yield from _iter_graph_expansion(seed_recommendations, candidate_ids[:SEED_PAPERS], mode)
+
+
+def _iter_graph_expansion(seed_recommendations, seed_paper_ids, mode, exclude_ids=frozenset()):
+    """
+    시드 논문(순위순)의 그래프 확장 신호를 동시에 실행하고, 끝나는 순서대로 (신호 이름, 점수순 추천 목록)을 내보냅니다.
+    저자/공동 인용/서지 결합은 첫 번째 시드를, 랜덤 워크(ppr 모드)는 시드 전체를 기준으로 합니다.
+    """
+    most_relevant_paper_id = seed_paper_ids[0]
+
+    def submit(signal, function, *args):
+        # 현재 컨텍스트(추적 스팬 포함)를 복사해 확장 스레드에서도 같은 요청의 하위 스팬으로 기록되게 합니다.
+        future = _expansion_executor.submit(contextvars.copy_context().run, function, *args)
+        futures[future] = signal
+
+    futures = {}
+    if mode == "ppr":
+        submit("random_walk", _random_walk_signal, seed_paper_ids)
+    else:
+        submit("author", _author_signal, most_relevant_paper_id)
+        submit("cocitation", _cocitation_signal, most_relevant_paper_id)
+    submit("coupling", _coupling_signal, most_relevant_paper_id)
+
+    signal_results = {}
+    deadline = time.monotonic() + GRAPH_EXPANSION_TIMEOUT
+    while futures:
+        done, _ = wait(futures, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            for signal in futures.values():
+                logging.warning(f"그래프 확장 신호 '{signal}' 시간 초과. 이 신호 없이 진행합니다.")
+                tracing.increment("graph_expansion_fallbacks_total", signal=signal, reason="timeout")
+            break
+        for future in done:
+            signal = futures.pop(future)
+            try:
+                signal_results[signal] = future.result()
+            except Exception as e:
+                logging.warning(f"그래프 확장 신호 '{signal}' 실패. 이 신호 없이 진행합니다: {e}")
+                tracing.increment("graph_expansion_fallbacks_total", signal=signal, reason="error")
+                signal_results[signal] = []
+            if signal == "random_walk" and signal_results[signal] is None:
+                # 스냅샷을 불러올 수 없으면 기본 Cypher 추천(저자/공동 인용)으로 대체합니다.
+                submit("author", _author_signal, most_relevant_paper_id)
+                submit("cocitation", _cocitation_signal, most_relevant_paper_id)
+                continue
+            yield signal, _merge_signals(seed_recommendations, signal_results, exclude_ids)
+
+
+def rank_recommendations(question: str, mode: str = None) -> list:
+    """
+    질문에 대한 검색 후보와 그래프 확장(저자/공동 인용 또는 랜덤 워크, 서지 결합) 추천을 모아 점수순으로 정렬합니다.
+    Returns:
+        list: [(paperId, {'reasons': [...], 'score': 점수}), ...] 점수 내림차순. 후보가 없으면 빈 목록.
+    """
+    sorted_recs = []
+    for _, sorted_recs in iter_ranked_recommendations(question, mode):
+        pass
+    return sorted_recs
+
+
+# 세션별 대화 턴 저장소 (conversation_store.py). 후속 질문은 직전 턴의 추천 후보와 그래프 이웃을 재사용합니다.
+conversations = ConversationStore()
+
+
+def resolve_session_follow_up(session_id, question):
+    """
+    질문이 세션 직전 턴의 추천 목록을 가리키는 후속 질문이면 resolve_follow_up() 결과에
+    지금까지 보여준 논문 집합('shown_ids')을 더해 반환합니다. (아니면 None)
+    """
+    if not (CONVERSATION_STORE_ENABLED and session_id):
+        return None
+    try:
+        follow_up = resolve_follow_up(question, conversations.last_turn(session_id))
+        if follow_up:
+            follow_up["shown_ids"] = conversations.shown_paper_ids(session_id)
+        return follow_up
+    except Exception as e:
+        logging.warning(f"대화 기록 조회 실패. 새 질문으로 처리합니다: {e}")
+        return None
+
+
+def iter_follow_up_recommendations(question: str, follow_up: dict, mode: str = None, vector_timeout: float = None):
+    """
+    후속 질문은 임베딩·벡터 검색 없이 직전 턴의 추천 후보와 기준 논문의 그래프 이웃에서 먼저 찾습니다.
+    순번으로 특정 논문을 가리키면 그 논문의 이웃만, 아니면 직전 목록의 이웃과 아직 보여주지 않은 후보를 함께 씁니다.
+    이미 보여준 논문은 빼며, 새 논문이 MIN_FOLLOW_UP_PAPERS편보다 적으면 follow_up['fell_back']을 표시하고
+    질문으로 새로 검색합니다. (iter_ranked_recommendations와 같은 형식으로 내보냄)
+    """
+    mode = mode or RECOMMENDATION_MODE
+    exclude_ids = frozenset(follow_up["shown_ids"]) | frozenset(follow_up["anchors"])
+    seed_recommendations = {}
+    if follow_up["anchor_rank"] is None:
+        for paper_id, score in follow_up["candidates"]:
+            if paper_id not in exclude_ids:
+                seed_recommendations[paper_id] = {'reasons': ['앞선 질문의 추천 후보 중 아직 소개하지 않은 논문'],
+                                                  'score': score}
+
+    with tracing.span("follow_up", anchors=len(follow_up["anchors"]), candidates=len(seed_recommendations)):
+        sorted_recs = _merge_signals(seed_recommendations, {})
+        if sorted_recs:
+            yield "follow_up", sorted_recs
+        for stage, sorted_recs in _iter_graph_expansion(seed_recommendations, follow_up["anchors"][:SEED_PAPERS],
+                                                        mode, exclude_ids):
+            yield stage, sorted_recs
+
+    if len(sorted_recs) >= MIN_FOLLOW_UP_PAPERS:
+        tracing.increment("follow_up_resolutions_total", result="reused")
+        return
+    logging.info(f"후속 질문에서 새 논문 {len(sorted_recs)}편만 찾아 질문으로 새로 검색합니다.")
+    tracing.increment("follow_up_resolutions_total", result="search")
+    follow_up["fell_back"] = True
+    yield from iter_ranked_recommendations(question, mode, vector_timeout)
+
+
+def _follow_up_question(question, follow_up):
+    """LLM이 "그 중 두 번째 논문" 같은 지시 표현을 이해하도록 무엇을 가리키는지 질문에 덧붙입니다."""
+    if not follow_up or follow_up.get("fell_back"):
+        return question
+    if follow_up["anchor_rank"] is not None:
+        return (f"{question}\n(앞서 추천한 {follow_up['anchor_rank']}번째 논문 \"{follow_up['anchor_title']}\"과 "
+                f"관련된 새 논문들입니다. 이미 소개한 논문은 제외했습니다.)")
+    return f"{question}\n(앞서 추천한 논문들에 이어지는 새 논문들입니다. 이미 소개한 논문은 제외했습니다.)"
+
+
+def _record_turn(session_id, question, cards, sorted_recs, follow_up):
+    """대화 저장소에 턴을 기록합니다. 저장에 실패해도 답변은 계속합니다."""
+    if not (CONVERSATION_STORE_ENABLED and session_id):
+        return
+    try:
+        conversations.record_turn(session_id, question, cards, sorted_recs,
+                                  follow_up if follow_up and not follow_up.get("fell_back") else None)
+    except Exception as e:
+        logging.warning(f"대화 기록 저장 실패: {e}")
+
+
+def get_ultimate_context(question: str, mode: str = None) -> str:
+    return format_context(rank_recommendations(question, mode))
+
+
+def fetch_paper_cards(sorted_recs: list, limit: int = CONTEXT_PAPERS, known_details: dict = None) -> list:
+    """
+    점수순 추천 목록의 상위 limit편의 상세 정보를 조회해 제목이 라틴 문자인 논문만
+    [{'paperId', 'details': {'paper', 'authors', 'journalName'}, 'reasons', 'score'}, ...]로 반환합니다.
+    known_details(paperId -> 상세 정보)를 넘기면 이미 조회한 논문은 다시 조회하지 않고, 새로 조회한 결과를 채워 넣습니다.
+    """
     def is_latin(text):
         return all(ord(c) < 128 or c.isspace() for c in text)
 
-    # 벡터 유사도 검색 (많이 뽑고 나중에 필터링)
-    similar_nodes = neo4j_vector.similarity_search(question, k=20)
-    filtered_nodes = [n for n in similar_nodes if
-                      'language' not in n.metadata or n.metadata['language'] in ['en', 'ko']]
+    known_details = {} if known_details is None else known_details
+    top_recs = sorted_recs[:limit]
+    missing_ids = [paper_id for paper_id, _ in top_recs if paper_id not in known_details]
+    if missing_ids:
+        with neo4j_session() as session:
+            with tracing.span("detail_fetch", papers=len(missing_ids)):
+                for paper_id in missing_ids:
+                    known_details[paper_id] = session.execute_read(get_full_paper_and_author_details, paper_id)
 
-    if not filtered_nodes:
+    cards = []
+    for paper_id, data in top_recs:
+        details = known_details.get(paper_id)
+        if details and is_latin(details['paper'].get('title', '')):
+            cards.append({'paperId': paper_id, 'details': details, 'reasons': data['reasons'], 'score': data['score']})
+    return cards
+
+
+def format_context(sorted_recs: list, known_details: dict = None) -> str:
+    """
+    rank_recommendations()의 상위 CONTEXT_PAPERS편의 상세 정보를 조회해 LLM 컨텍스트 문자열로 만듭니다.
+    저자 목록과 추천 근거는 prompt_builder.py가 토큰 예산(SOCY_CONTEXT_TOKEN_BUDGET)에 맞게 줄입니다.
+    """
+    if not sorted_recs:
         return "관련 논문을 찾을 수 없습니다."
 
-    recommendations = {}
-    with driver.session(database="neo4j") as session:
-        for node in filtered_nodes[:5]:
-            paper_id = node.metadata['paperId']
-            recommendations[paper_id] = {'reasons': ['질문과 유사한 주제를 다룸'], 'score': 1.0}
-
-        most_relevant_paper_id = filtered_nodes[0].metadata['paperId']
-
-        author_recs = session.run("""
-            MATCH (seed:Paper {paperId: $paperId})-[:HAS_AUTHOR]->(author:Author)
-            WHERE author.hIndex > 10 OR author.citationCount > 1000
-            MATCH (rec:Paper)-[:HAS_AUTHOR]->(author)
-            WHERE seed <> rec
-            RETURN rec.paperId AS paperId, '핵심 논문의 영향력 있는 저자(' + author.name + ')가 저술' AS reason, rec.citationCount AS score
-            LIMIT 2
-        """, paperId=most_relevant_paper_id)
-        for rec in author_recs:
-            if rec['paperId'] not in recommendations:
-                recommendations[rec['paperId']] = {'reasons': [], 'score': 0}
-            recommendations[rec['paperId']]['reasons'].append(rec['reason'])
-            recommendations[rec['paperId']]['score'] += rec['score'] * 5
-
-        cocitation_recs = session.run("""
-            MATCH (seed:Paper {paperId: $paperId})<-[:CITES]-(citer:Paper)
-            WITH seed, collect(citer) AS citers
-            UNWIND citers AS citer
-            MATCH (citer)-[:CITES]->(rec:Paper)
-            WHERE seed <> rec AND NOT (rec)-[:CITES]->(seed) AND NOT (seed)-[:CITES]->(rec)
-            RETURN rec.paperId AS paperId, '함께 자주 인용됨 (학술적 연관성 높음)' AS reason, count(citer) AS score
-            ORDER BY score DESC
-            LIMIT 2
-        """, paperId=most_relevant_paper_id)
-        for rec in cocitation_recs:
-            if rec['paperId'] not in recommendations:
-                recommendations[rec['paperId']] = {'reasons': [], 'score': 0}
-            recommendations[rec['paperId']]['reasons'].append(rec['reason'])
-            recommendations[rec['paperId']]['score'] += rec['score'] * 10
-
-        sorted_recs = sorted(recommendations.items(), key=lambda item: item[1]['score'], reverse=True)
-        top_recs_info = []
-        for paper_id, data in sorted_recs[:5]:
-            details = session.execute_read(get_full_paper_and_author_details, paper_id)
-            if details and is_latin(details['paper'].get('title', '')):
-                top_recs_info.append({'details': details, 'reasons': data['reasons']})
-
-        def format_authors(authors_list):
-            if not authors_list:
-                return 'N/A'
-            return ', '.join([
-                f"{a.get('name', 'N/A')} (h-index: {a.get('hIndex', 0)}, 총 인용: {a.get('citationCount', 0)})"
-                for a in authors_list
-            ])
-
-        full_context = ""
-        if top_recs_info:
-            full_context += "### 추천 논문 목록 ###\n"
-            for i, rec in enumerate(top_recs_info):
-                details = rec['details']['paper']
-                authors_formatted = format_authors(rec['details']['authors'])
-                journal_name = rec['details']['journalName']
-                reasons = rec['reasons']
-                full_context += f"""
-[추천 {i + 1}] {details.get('title', 'N/A')} ({details.get('year', 'N/A')})
-- 저자: {authors_formatted}
-- 저널: {journal_name if journal_name else 'N/A'}
-- 인용 수: {details.get('citationCount', 0)}
-- **추천 핵심 근거:** {' / '.join(reasons)}
-"""
-        return full_context
+    top_recs_info = fetch_paper_cards(sorted_recs, CONTEXT_PAPERS, known_details)
+    with tracing.span("context_build") as build_span:
+        full_context, context_stats = build_context(top_recs_info)
+        build_span.set(**context_stats)
+    return full_context
 
 
 # --- 3. 최종 프롬프트 템플릿 ---
-template = """
+# 고정 지시문은 모든 요청에서 같으므로 system 메시지로 프롬프트 맨 앞에 둡니다. (prompt_builder.py 참고)
+instructions = """
 당신은 세계 최고의 사회학 연구자이자, 깊은 통찰을 지닌 석학입니다.
 학생들과 신진 연구자들을 지도하며, 그들의 질문에 담긴 문제의식과 이론적 맥락을 날카롭게 파악해, 가장 적절한 논문들을 안내해주는 역할을 맡고 있습니다.
 
@@ -186,9 +769,10 @@ template = """
 이 논문은 정신 질환을 단순히 개인의 문제로 보지 않고, 사회적 상호작용과 규범의 산물로 이해해야 한다는 전환점을 마련했습니다.
 이후 낙인 이론과 정신질환 사회학의 주요 이론적 기반이 되었으며, Scheff는 이 분야에서 매우 영향력 있는 학자로 평가받습니다.
 이 연구는 Aldine Transaction에서 출판되었고, 현재까지 2,000회 이상 인용되었습니다.
+"""
 
-
-**Context:**
+# 요청마다 바뀌는 부분 (추천 논문 컨텍스트와 사용자 질문)
+request_template = """**Context:**
 {context}
 
 **User's Request:**
@@ -197,14 +781,196 @@ template = """
 **Answer:**
 """
 
-prompt = ChatPromptTemplate.from_template(template)
+prompt = build_prompt(instructions, request_template)
+
+
+answer_cache = SemanticAnswerCache()
+
+
+def _stream_llm(prompt_values):
+    """
+    LLM은 호출 시점에 get_llm()으로 가져와 스트리밍합니다.
+    추적이 켜져 있으면 첫 토큰까지의 시간과 입력/출력 토큰 수(usage_metadata)를 기록합니다.
+    """
+    for prompt_value in prompt_values:
+        with tracing.span("llm") as llm_span:
+            start_time = time.perf_counter()
+            input_tokens = output_tokens = cache_read_tokens = 0
+            first_chunk = True
+            for chunk in get_llm().stream(prompt_value):
+                if first_chunk:
+                    llm_span.set(time_to_first_token_ms=round((time.perf_counter() - start_time) * 1000.0, 3))
+                    first_chunk = False
+                usage = getattr(chunk, "usage_metadata", None)
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+                    cache_read_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+                yield chunk
+            llm_span.set(input_tokens=input_tokens, output_tokens=output_tokens, cache_read_tokens=cache_read_tokens)
+        tracing.increment("llm_tokens_total", input_tokens, type="input")
+        tracing.increment("llm_tokens_total", cache_read_tokens, type="cache_read")
+        tracing.increment("llm_tokens_total", output_tokens, type="output")
+
+
+def _chunk_text(chunk):
+    return chunk.content if hasattr(chunk, "content") else str(chunk)
+
+
+def _answer_cacheable(follow_up):
+    """
+    직전 턴을 가리키는 후속 질문("그 중 두 번째와 비슷한 거")은 같은 문장이라도 세션마다 가리키는 논문이 다르고,
+    벡터 검색을 하지 않아 질문 임베딩도 없으므로 답변 캐시를 쓰지 않습니다. (질문으로 새로 검색한 경우는 사용)
+    """
+    return not follow_up or bool(follow_up.get("fell_back"))
+
+
+def _lookup_cached_answer(question, paper_ids, follow_up=None):
+    """
+    답변 캐시에서 말만 바꾼 이전 질문의 답변을 찾습니다. 질문 임베딩이 시간 초과 등으로 아직 없으면 기다리지 않고 None을 반환합니다.
+    후속 질문이나 임베딩이 없어 조회하지 않은 요청은 적중/실패와 따로 셉니다.
+    """
+    if not ANSWER_CACHE_ENABLED or not paper_ids:
+        return None
+    if not _answer_cacheable(follow_up):
+        answer_cache.skip("follow_up")
+        return None
+    embedding = recent_question_embedding(question)
+    if embedding is None:
+        answer_cache.skip("no_embedding")
+        return None
+    return answer_cache.lookup(embedding, paper_ids)
+
+
+def _generate_answer(question, paper_ids, context, cacheable=True):
+    """LLM 답변을 스트리밍하고, 끝까지 생성된 답변만 답변 캐시에 저장합니다. (중간에 끊기거나 실패하면 저장하지 않음)"""
+    answer_parts = []
+    for chunk in _stream_llm([prompt.invoke({"context": context, "question": question})]):
+        answer_parts.append(_chunk_text(chunk))
+        yield chunk
+    if ANSWER_CACHE_ENABLED and paper_ids and cacheable:
+        embedding = recent_question_embedding(question)
+        if embedding is not None:
+            answer_cache.store(question, embedding, paper_ids, "".join(answer_parts))
+
+
+def stream_answer_events(question: str, mode: str = None, progressive: bool = True, session_id: str = None):
+    """
+    질문에 대한 추천과 답변을 단계별 이벤트(dict)로 내보냅니다.
+    - {"type": "papers", "stage": 단계 이름, "cards": [...]}: 검색 후보, 그래프 확장 신호가 반영될 때마다 상위 CONTEXT_PAPERS편
+      (fetch_paper_cards 형식, progressive=True일 때만. 앞 단계에서 조회한 상세 정보는 다시 조회하지 않음)
+    - {"type": "degraded", "reason": "llm_busy", "follow_up": 후속 질문 해석 결과 또는 None}: LLM 동시 호출 상한으로 답변 없이
+      추천 목록만으로 끝냄 (progressive=True이고 DEGRADE_TO_RETRIEVAL_ONLY일 때만. 아니면 ServerBusyError)
+      나중에 해설을 불러올 때 follow_up을 stream_narrative()에 넘깁니다.
+    - {"type": "answer_start", "cached": 캐시 적중 여부}: 답변 조각을 내보내기 직전
+    - {"type": "token", "text": 답변 조각}
+    말만 바꾼 이전 질문이 같은 논문들을 찾았다면(answer_cache.py) LLM 호출 없이 캐시된 답변을 내보내고,
+    그렇지 않으면 LLM 답변을 끝까지 생성한 뒤 캐시에 저장합니다.
+    session_id를 넘기면 턴의 추천 결과를 대화 저장소에 기록하고, 직전 턴을 가리키는 후속 질문은
+    새로 검색하지 않고 직전 턴의 후보와 그래프 이웃으로 답합니다. (iter_follow_up_recommendations)
+    """
+    mode = mode or RECOMMENDATION_MODE
+    follow_up = resolve_session_follow_up(session_id, question)
+    known_details = {}
+    sorted_recs = []
+    with tracing.span("context", mode=mode, follow_up=follow_up is not None) as context_span:
+        if follow_up:
+            recommendation_stream = iter_follow_up_recommendations(question, follow_up, mode)
+        else:
+            recommendation_stream = iter_ranked_recommendations(question, mode)
+        for stage, sorted_recs in recommendation_stream:
+            if progressive:
+                yield {"type": "papers", "stage": stage,
+                       "cards": fetch_paper_cards(sorted_recs, CONTEXT_PAPERS, known_details)}
+        paper_ids = [paper_id for paper_id, _ in sorted_recs[:CONTEXT_PAPERS]]
+        cached_answer = _lookup_cached_answer(question, paper_ids, follow_up)
+        context_span.set(answer_cache="hit" if cached_answer is not None else
+                         "miss" if _answer_cacheable(follow_up) else "follow_up_skipped")
+        context = format_context(sorted_recs, known_details) if cached_answer is None else None
+        _record_turn(session_id, question, fetch_paper_cards(sorted_recs, CONTEXT_PAPERS, known_details),
+                     sorted_recs, follow_up)
+
+    if cached_answer is None and not admission.acquire_dependency("llm"):
+        # LLM 호출이 몰려 슬롯을 얻지 못하면, 이미 보여준 추천 목록만으로 응답을 마칩니다. (또는 혼잡 응답)
+        if not (progressive and DEGRADE_TO_RETRIEVAL_ONLY):
+            raise ServerBusyError("llm")
+        tracing.increment("answer_degraded_total", reason="llm_busy")
+        yield {"type": "degraded", "reason": "llm_busy", "follow_up": follow_up}
+        return
+
+    if cached_answer is not None:
+        yield {"type": "answer_start", "cached": True}
+        with tracing.span("answer_cache_replay", chars=len(cached_answer)):
+            for text in replay_answer(cached_answer):
+                yield {"type": "token", "text": text}
+        return
+    # 슬롯을 얻은 뒤의 모든 yield를 try 안에 두어, 소비하는 쪽이 어느 지점에서 제너레이터를 닫아도 슬롯을 돌려줍니다.
+    try:
+        yield {"type": "answer_start", "cached": False}
+        for chunk in _generate_answer(_follow_up_question(question, follow_up), paper_ids, context,
+                                      _answer_cacheable(follow_up)):
+            yield {"type": "token", "text": _chunk_text(chunk)}
+    finally:
+        admission.release_dependency("llm")
+
+
+def _answer(questions):
+    """질문마다 stream_answer_events()의 답변 조각만 내보냅니다. (중간 추천 목록 이벤트 없이)"""
+    for question in questions:
+        for event in stream_answer_events(question, progressive=False):
+            if event["type"] == "token":
+                yield event["text"]
+
+
+chain = RunnableGenerator(_answer) | StrOutputParser()
+
+
+# --- 4. 빠른 목록 모드 (LLM 없이 추천 목록만) ---
+
+def stream_paper_cards(question: str, mode: str = None, limit: int = RETRIEVAL_ONLY_PAPERS, session_id: str = None,
+                       follow_up: dict = None):
+    """
+    LLM 해설 없이 추천 논문 카드(fetch_paper_cards 형식)를 단계별로 내보냅니다.
+    검색 후보, 그래프 확장, 서지 결합 신호가 반영될 때마다 (단계 이름, 카드 목록)을 내보내며
+    이전 단계에서 조회한 논문 상세 정보는 다시 조회하지 않습니다.
+    session_id를 넘기면 stream_answer_events()처럼 후속 질문을 직전 턴으로 해석하고 턴을 기록합니다.
+    나중에 stream_narrative()에 같은 해석 결과를 넘기려면 resolve_session_follow_up()으로 먼저 해석해 follow_up으로 넘깁니다.
+    """
+    if follow_up is None:
+        follow_up = resolve_session_follow_up(session_id, question)
+    if follow_up:
+        recommendation_stream = iter_follow_up_recommendations(question, follow_up, mode, RETRIEVAL_ONLY_VECTOR_TIMEOUT)
+    else:
+        recommendation_stream = iter_ranked_recommendations(question, mode, RETRIEVAL_ONLY_VECTOR_TIMEOUT)
+    known_details = {}
+    sorted_recs, cards = [], []
+    for stage, sorted_recs in recommendation_stream:
+        cards = fetch_paper_cards(sorted_recs, limit, known_details)
+        yield stage, cards
+    _record_turn(session_id, question, cards, sorted_recs, follow_up)
+
+
+def stream_narrative(question: str, cards: list, follow_up: dict = None):
+    """
+    빠른 목록 모드에서 보여준 카드의 상위 CONTEXT_PAPERS편으로 LLM 해설을 나중에 생성해 문자열 조각으로 스트리밍합니다.
+    검색과 상세 조회를 다시 하지 않으며, 답변 캐시도 그대로 사용합니다.
+    follow_up은 목록을 만들 때 쓴 후속 질문 해석 결과로, stream_answer_events()처럼 가리키는 논문을 질문에 덧붙입니다.
+    """
+    cards = cards[:CONTEXT_PAPERS]
+    paper_ids = [card['paperId'] for card in cards]
+    cached_answer = _lookup_cached_answer(question, paper_ids, follow_up)
+    if cached_answer is not None:
+        with tracing.span("answer_cache_replay", chars=len(cached_answer)):
+            yield from replay_answer(cached_answer)
+        return
 
-chain = (
-        {"context": RunnableLambda(get_ultimate_context), "question": RunnableLambda(lambda x: x)}
-        | prompt
-        | llm
-        | StrOutputParser()
-)
+    with tracing.span("context_build") as build_span:
+        context, context_stats = build_context(cards)
+        build_span.set(**context_stats)
+    with admission.dependency("llm"):
+        for chunk in _generate_answer(_follow_up_question(question, follow_up), paper_ids,
+                                      context or "관련 논문을 찾을 수 없습니다.", _answer_cacheable(follow_up)):
+            yield _chunk_text(chunk)
 
 # --- 애플리케이션 실행 ---
 if __name__ == "__main__":
@@ -230,7 +996,8 @@ if __name__ == "__main__":
 
         # 사용자의 질문을 받은 후에 chain.invoke 호출
         try:
-            response = chain.invoke(question)
+            with tracing.span("request", app="cli"):
+                response = chain.invoke(question)
         except NameError:
             print("오류: 'chain' 객체가 정의되지 않았습니다. LangChain 셋업 코드를 확인해주세요.")
             break
@@ -289,12 +1056,8 @@ if __name__ == "__main__":
         print(processed_response)  # 처리된 답변을 출력
         print("-" * 30)
 
-    # driver 객체는 이 코드 블록 외부에 정의되어 있어야 합니다.
     try:
-        if 'driver' in locals() and driver:  # driver가 로컬 스코프에 정의되어 있고 유효한지 확인
-            driver.close()
-            print("Neo4j 드라이버 연결 종료.")
-    except NameError:
-        print("오류: 'driver' 객체가 정의되지 않았습니다. Neo4j 연결 코드를 확인해주세요.")
+        get_driver().close()
+        print("Neo4j 드라이버 연결 종료.")
     except Exception as e:
         print(f"Neo4j 드라이버 종료 중 오류 발생: {e}")
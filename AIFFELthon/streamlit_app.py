@@ -1,9 +1,13 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from socy_recommender_core import chain  # socy_recommender_core.py에서 chain 임포트
+from socy_recommender_core import admission, conversations, CONVERSATION_STORE_ENABLED, resolve_session_follow_up, stream_answer_events, stream_paper_cards, stream_narrative  # socy_recommender_core.py에서 답변/추천 스트림 임포트
+from admission_controller import ServerBusyError
 from neo4j import GraphDatabase  # driver close를 위해 필요
 import re
+import uuid
+from prompt_builder import format_authors, format_reasons
+import tracing  # 단계별 추적/지표 (SOCY_TRACE_FILE, SOCY_METRICS_PORT 설정 시 활성화)
 
 # Streamlit 페이지 기본 설정
 st.set_page_config(
@@ -72,6 +76,76 @@ def post_process_response(response: str) -> str:
     return processed
 
 
+# 추천 목록을 단계별로 표시할 때의 진행 상황 문구 (socy_recommender_core.iter_ranked_recommendations의 단계 이름)
+# 검색 이후의 그래프 확장 신호는 동시에 실행되어 끝나는 순서대로 반영됩니다.
+STAGE_LABELS = {
+    "search": "질문과 관련된 논문을 찾았습니다. 인용·저자 네트워크로 확장하는 중...",
+    "author": "영향력 있는 저자의 다른 논문을 반영했습니다...",
+    "cocitation": "함께 자주 인용되는 논문을 반영했습니다...",
+    "random_walk": "인용·저자 네트워크 랜덤 워크 결과를 반영했습니다...",
+    "coupling": "참고문헌을 많이 공유하는 논문을 반영했습니다...",
+    "follow_up": "앞서 찾은 후보 중 아직 소개하지 않은 논문입니다. 인용·저자 네트워크로 확장하는 중...",
+}
+
+
+def render_paper_cards(cards, stage=None) -> str:
+    """추천 논문 카드(socy_recommender_core.fetch_paper_cards 형식)를 마크다운 목록으로 만듭니다."""
+    if not cards:
+        return "관련 논문을 찾을 수 없습니다. 더 구체적인 학술 주제로 질문해 주세요."
+    lines = ["### 추천 논문 목록"]
+    for i, card in enumerate(cards, start=1):
+        paper = card["details"]["paper"]
+        corpus_citations = ""
+        if paper.get("corpusCitationCount") is not None:
+            corpus_citations = f" (수집된 사회학 코퍼스 내 {paper['corpusCitationCount']}회)"
+        lines.append(f"\n**{i}. {paper.get('title', 'N/A')}** ({paper.get('year', 'N/A')})")
+        lines.append(f"- 저자: {format_authors(card['details']['authors'])}")
+        lines.append(f"- 저널: {card['details']['journalName'] or 'N/A'}")
+        lines.append(f"- 인용 수: {paper.get('citationCount', 0)}{corpus_citations}")
+        lines.append(f"- 추천 근거: {format_reasons(card['reasons'])}")
+    if stage in STAGE_LABELS:
+        lines.append(f"\n_{STAGE_LABELS[stage]}_")
+    return "\n".join(lines)
+
+
+def show_paper_cards(question):
+    """LLM 없이 추천 논문 목록을 신호가 반영될 때마다 갱신하며 보여주고, 해설은 나중에 버튼으로 불러올 수 있게 합니다."""
+    message_placeholder = st.empty()
+    message_placeholder.markdown("_관련 논문을 찾는 중..._")
+    cards = []
+    try:
+        with admission.admit(st.session_state.session_id), tracing.span("request", app="streamlit", mode="retrieval_only"):
+            # 해설을 나중에 불러올 때도 같은 후속 질문 해석(가리키는 논문)을 쓰도록 먼저 해석해 둡니다.
+            follow_up = resolve_session_follow_up(st.session_state.session_id, question)
+            for stage, cards in stream_paper_cards(question, session_id=st.session_state.session_id, follow_up=follow_up):
+                message_placeholder.markdown(render_paper_cards(cards, stage))
+        content = render_paper_cards(cards)
+        message_placeholder.markdown(content)
+        st.session_state.messages.append({"role": "assistant", "content": content})
+        record_answer(content)
+        if cards:
+            st.session_state.pending_narrative = {"question": question, "cards": cards, "follow_up": follow_up}
+        tracing.increment("requests_total", app="streamlit", status="ok")
+    except ServerBusyError as e:
+        tracing.increment("requests_total", app="streamlit", status="busy")
+        message_placeholder.warning(str(e))
+    except Exception as e:
+        tracing.increment("requests_total", app="streamlit", status="error")
+        error_message = f"죄송합니다, 논문을 찾는 중에 오류가 발생했습니다: {e}"
+        message_placeholder.error(error_message)
+        st.session_state.messages.append({"role": "assistant", "content": error_message})
+
+
+def record_answer(content, append=False):
+    """화면에 표시한 최종 답변을 대화 저장소의 마지막 턴에 기록합니다. (새로고침 후 대화 기록 복원용)"""
+    if not CONVERSATION_STORE_ENABLED:
+        return
+    try:
+        conversations.record_answer(st.session_state.session_id, content, append)
+    except Exception as e:
+        print(f"대화 기록 저장 실패: {e}")
+
+
 # --- 5. Streamlit 애플리케이션 UI 구성 ---
 
 st.title("🎓 SOCY Assistant: 사회학 논문 추천 챗봇")
@@ -84,9 +158,29 @@ st.markdown("""
 
 """)
 
-# 세션 상태에 대화 기록 초기화
+# 빠른 목록 모드: LLM 해설을 기다리지 않고 그래프에서 찾은 추천 논문 목록(근거, 저자, 저널, 인용 수)을 바로 보여줍니다.
+fast_mode = st.sidebar.checkbox(
+    "⚡ 빠른 목록 모드",
+    help="AI 해설 없이 추천 논문 목록만 바로 보여줍니다. 해설은 목록 아래 버튼으로 나중에 불러올 수 있습니다.",
+)
+
+# 세션 ID: 요청 승인 대기열에서 세션을 구분하고(세션마다 공정하게 차례가 돌아가도록) 대화 저장소의 키로 씁니다.
+# 주소(?sid=...)에 남겨 두므로 새로고침하거나 같은 주소로 다시 접속해도 대화를 이어갈 수 있습니다.
+if "session_id" not in st.session_state:
+    st.session_state.session_id = st.query_params.get("sid") or uuid.uuid4().hex
+    st.query_params["sid"] = st.session_state.session_id
+
+# 세션 상태에 대화 기록 초기화 (대화 저장소에 이 세션의 기록이 있으면 복원)
 if "messages" not in st.session_state:
     st.session_state.messages = []
+    if CONVERSATION_STORE_ENABLED:
+        try:
+            for turn in conversations.history(st.session_state.session_id):
+                st.session_state.messages.append({"role": "user", "content": turn["question"]})
+                if turn["answer"]:
+                    st.session_state.messages.append({"role": "assistant", "content": turn["answer"]})
+        except Exception as e:
+            print(f"대화 기록 복원 실패: {e}")
 
 # 이전 대화 기록 출력
 for message in st.session_state.messages:
@@ -96,49 +190,108 @@ for message in st.session_state.messages:
 # 사용자 입력 처리
 if user_question := st.chat_input("사회학 관련 질문을 입력하세요. (예: 사회학 입문자에게 맞는 논문을 추천해줄래?)"):
     st.session_state.messages.append({"role": "user", "content": user_question})
+    st.session_state.pop("pending_narrative", None)
     with st.chat_message("user"):
         st.markdown(user_question)
 
-    with st.chat_message("assistant"):
-        # 응답이 스트리밍될 동안 표시될 빈 플레이스홀더를 생성합니다.
-        message_placeholder = st.empty()
-        full_response = ""
+    if fast_mode:
+        with st.chat_message("assistant"):
+            show_paper_cards(user_question)
+    else:
+        with st.chat_message("assistant"):
+            # 추천 논문 목록은 검색·그래프 확장 신호가 반영될 때마다 먼저 보여주고, 그 아래에 답변을 스트리밍합니다.
+            papers_placeholder = st.empty()
+            message_placeholder = st.empty()
+            papers_placeholder.markdown("_관련 논문을 찾는 중..._")
+            full_response = ""
+            cards = []
+            degraded = False
 
-        with st.spinner("관련 논문을 찾고 답변을 생성하는 중입니다... 잠시만 기다려주세요."):
             try:
-                # socy_recommender_core.py에서 임포트된 chain의 stream 메서드 사용
-                # 이는 LLM의 응답을 청크(chunk) 단위로 스트리밍합니다.
-                for chunk in chain.stream(user_question):
-                    # 각 청크의 내용(content)을 full_response에 추가합니다.
-                    # chunk가 TextGenerationChunk 객체일 경우 content 속성을 사용합니다.
-                    # 그렇지 않은 경우, chunk 자체가 문자열일 수 있습니다.
-                    if hasattr(chunk, 'content'):
-                        full_response += chunk.content
-                    else:
-                        full_response += chunk  # Fallback for non-LangChain string chunks
-
-                    # 현재까지의 응답에 깜빡이는 커서 효과를 추가하여 실시간 스트리밍 느낌을 줍니다.
-                    # 이 시점에는 최소한의 후처리만 적용하여 LLM의 원본 출력에 가깝게 유지합니다.
-                    # 완벽한 서식은 스트리밍 완료 후 'processed_response'에서 적용됩니다.
-                    display_response = full_response.replace("##", "###").replace("###", "\n\n###")  # 스트리밍 중 제목 크기만 통일
-                    message_placeholder.markdown(display_response + "▌")
+                # 세션 간 공정 대기열에서 차례를 기다린 뒤 처리합니다. (혼잡하면 ServerBusyError)
+                with admission.admit(st.session_state.session_id), tracing.span("request", app="streamlit"):
+                    for event in stream_answer_events(user_question, session_id=st.session_state.session_id):
+                        if event["type"] == "papers":
+                            cards = event["cards"]
+                            papers_placeholder.markdown(render_paper_cards(cards, event["stage"]))
+                        elif event["type"] == "answer_start":
+                            # 답변이 시작되면 추천 목록은 접어 두고 답변에 자리를 내줍니다.
+                            if cards:
+                                with papers_placeholder.container():
+                                    with st.expander(f"추천 논문 목록 ({len(cards)}편)"):
+                                        st.markdown(render_paper_cards(cards))
+                            else:
+                                papers_placeholder.empty()
+                            message_placeholder.markdown("_답변을 작성하는 중..._")
+                        elif event["type"] == "degraded":
+                            # LLM 호출이 몰려 있으면 추천 목록만 먼저 보여주고, 해설은 나중에 버튼으로 불러오게 합니다.
+                            degraded = True
+                            full_response = render_paper_cards(cards)
+                            papers_placeholder.empty()
+                            if cards:
+                                st.session_state.pending_narrative = {"question": user_question, "cards": cards,
+                                                                      "follow_up": event["follow_up"]}
+                            st.info("지금은 AI 해설 요청이 많아 추천 논문 목록만 먼저 보여드립니다. 잠시 후 아래 버튼으로 해설을 불러올 수 있습니다.")
+                        else:
+                            full_response += event["text"]
+                            # 현재까지의 응답에 깜빡이는 커서 효과를 추가하여 실시간 스트리밍 느낌을 줍니다.
+                            # 이 시점에는 최소한의 후처리만 적용하여 LLM의 원본 출력에 가깝게 유지합니다.
+                            # 완벽한 서식은 스트리밍 완료 후 'processed_response'에서 적용됩니다.
+                            display_response = full_response.replace("##", "###").replace("###", "\n\n###")  # 스트리밍 중 제목 크기만 통일
+                            message_placeholder.markdown(display_response + "▌")
 
                 # 스트리밍 완료 후, 최종 응답에 후처리 함수를 적용합니다.
                 # 이는 답변의 형식을 일관되게 유지하는 데 도움을 줍니다.
-                processed_response = post_process_response(full_response)
+                # (강등되어 추천 목록만 보여준 경우에는 LLM 답변용 후처리를 하지 않습니다)
+                processed_response = full_response if degraded else post_process_response(full_response)
 
                 # 최종적으로 후처리된 전체 응답을 커서 없이 표시합니다.
                 message_placeholder.markdown(processed_response)
 
-                # 세션 상태에 최종 답변 저장
+                # 세션 상태와 대화 저장소에 최종 답변 저장
                 st.session_state.messages.append({"role": "assistant", "content": processed_response})
+                record_answer(processed_response)
+                tracing.increment("requests_total", app="streamlit", status="ok")
+
+            except ServerBusyError as e:
+                # 대기열이 가득 찼거나 오래 기다린 요청은 오류 대신 혼잡 안내를 보여줍니다. (대화 기록에는 남기지 않음)
+                tracing.increment("requests_total", app="streamlit", status="busy")
+                papers_placeholder.empty()
+                st.warning(str(e))
 
             except Exception as e:
                 # 오류 발생 시 사용자에게 메시지 표시
+                tracing.increment("requests_total", app="streamlit", status="error")
                 error_message = f"죄송합니다, 답변을 생성하는 중에 오류가 발생했습니다: {e}"
                 st.error(error_message)
                 st.session_state.messages.append({"role": "assistant", "content": error_message})
 
+# 빠른 목록 모드에서 마지막으로 보여준 목록의 AI 해설은 버튼을 눌렀을 때만 생성합니다.
+if st.session_state.get("pending_narrative") and st.button("🎓 이 목록에 대한 AI 해설 보기"):
+    pending = st.session_state.pop("pending_narrative")
+    with st.chat_message("assistant"):
+        message_placeholder = st.empty()
+        full_response = ""
+        try:
+            with admission.admit(st.session_state.session_id), tracing.span("request", app="streamlit", mode="narrative"):
+                for chunk in stream_narrative(pending["question"], pending["cards"], pending.get("follow_up")):
+                    full_response += chunk
+                    message_placeholder.markdown(full_response.replace("##", "###").replace("###", "\n\n###") + "▌")
+            processed_response = post_process_response(full_response)
+            message_placeholder.markdown(processed_response)
+            st.session_state.messages.append({"role": "assistant", "content": processed_response})
+            record_answer(processed_response, append=True)
+            tracing.increment("requests_total", app="streamlit", status="ok")
+        except ServerBusyError as e:
+            # 해설을 다시 요청할 수 있도록 목록을 되돌려 둡니다.
+            tracing.increment("requests_total", app="streamlit", status="busy")
+            st.session_state.pending_narrative = pending
+            message_placeholder.warning(str(e))
+        except Exception as e:
+            tracing.increment("requests_total", app="streamlit", status="error")
+            st.error(f"죄송합니다, 해설을 생성하는 중에 오류가 발생했습니다: {e}")
+
+
 # Streamlit 앱 종료 시 드라이버 연결 닫기 (선택 사항이지만 권장)
 # Streamlit의 라이프사이클 관리와 충돌할 수 있으므로 주의 필요
 # 일반적으로 st.cache_resource를 사용하면 Streamlit이 앱 종료 시 자동으로 리소스를 정리하려고 시도합니다.
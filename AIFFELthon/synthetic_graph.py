@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import zlib
+import random
+import logging
+from collections import Counter, defaultdict
+
+import numpy as np
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from mock_s2_server import MockCorpus, SYNTHETIC_WORDS
+from lexical_index import tokenize
+from socy_recommender_core import PAPER_DETAILS_QUERY, AUTHOR_RECS_QUERY, COCITATION_RECS_QUERY
+
+# --- 1. 설정 ---
+
+# 전처리된 파일명 (data_preprocessor.py와 동일)
+CLEANED_PAPER_NODE_FILE = "sociology_papers_cleaned.jsonl"
+CLEANED_AUTHOR_NODE_FILE = "sociology_authors_cleaned.jsonl"
+CLEANED_EDGE_DATA_FILE = "sociology_edges_cleaned.jsonl"
+
+# 가짜 임베딩 차원 및 임베딩에 사용하는 초록 앞부분 단어 수
+EMBEDDING_DIMENSION = 256
+EMBEDDING_ABSTRACT_WORDS = 50
+
+
+# --- 2. 합성 그래프 ---
+
+class SyntheticGraph:
+    """
+    벤치마크용 합성 논문/저자/인용 그래프입니다.
+    mock_s2_server.py의 합성 코퍼스를 그대로 사용하여 수집 파이프라인 벤치마크와 같은 분포를 가집니다.
+    """
+
+    def __init__(self, corpus):
+        self.papers = corpus.papers
+        self.authors = corpus.authors
+        self.references = corpus.references
+        self.citations = corpus.citations
+        self.paper_ids = corpus.paper_ids
+        self.paper_authors = {paper_id: [a["authorId"] for a in paper.get("authors") or []]
+                              for paper_id, paper in self.papers.items()}
+        self.author_papers = defaultdict(list)
+        for paper_id, author_ids in self.paper_authors.items():
+            for author_id in author_ids:
+                self.author_papers[author_id].append(paper_id)
+
+    @classmethod
+    def generate(cls, num_papers, seed=0):
+        start_time = time.perf_counter()
+        graph = cls(MockCorpus.synthetic(num_papers, seed))
+        logging.info(f"합성 그래프 생성 완료: 논문 {len(graph.papers)}개, 저자 {len(graph.authors)}명 "
+                     f"({time.perf_counter() - start_time:.1f}초)")
+        return graph
+
+    def write_cleaned_files(self, data_dir):
+        """전처리 결과와 같은 형식의 논문/저자/엣지 파일을 씁니다. (스냅샷·역색인 생성 입력)"""
+        os.makedirs(data_dir, exist_ok=True)
+        with open(os.path.join(data_dir, CLEANED_PAPER_NODE_FILE), 'w', encoding='utf-8') as f:
+            for paper in self.papers.values():
+                f.write(json.dumps(paper, ensure_ascii=False) + "\n")
+        with open(os.path.join(data_dir, CLEANED_AUTHOR_NODE_FILE), 'w', encoding='utf-8') as f:
+            for author in self.authors.values():
+                f.write(json.dumps({"authorId": author["authorId"], "name": author["name"]}, ensure_ascii=False) + "\n")
+        with open(os.path.join(data_dir, CLEANED_EDGE_DATA_FILE), 'w', encoding='utf-8') as f:
+            for source, targets in self.references.items():
+                for target in targets:
+                    f.write(json.dumps({"source": source, "target": target, "relation": "REFERENCES"}) + "\n")
+            for paper_id, author_ids in self.paper_authors.items():
+                for author_id in author_ids:
+                    f.write(json.dumps({"source": author_id, "target": paper_id, "relation": "WROTE"}) + "\n")
+
+    def generate_queries(self, num_queries, seed=0):
+        """주제어 질의, 저자명 질의, 제목 질의를 섞은 재현 가능한 질의 목록을 만듭니다."""
+        rng = random.Random(seed)
+        queries = []
+        for i in range(num_queries):
+            kind = i % 3
+            if kind == 0:
+                queries.append(f"{rng.choice(SYNTHETIC_WORDS)}과 {rng.choice(SYNTHETIC_WORDS)}의 관계를 다룬 논문을 추천해 주세요.")
+            elif kind == 1:
+                author = self.authors[rng.choice(list(self.author_papers))]
+                queries.append(f"{author['name']}의 {rng.choice(SYNTHETIC_WORDS)} 관련 논문이 필요합니다.")
+            else:
+                queries.append(f"'{self.papers[rng.choice(self.paper_ids)]['title']}'와 비슷한 연구가 있나요?")
+        return queries
+
+    # --- Cypher 질의 대체 구현 ---
+
+    def paper_details(self, paperId):
+        paper = self.papers.get(paperId)
+        if paper is None:
+            return []
+        properties = {key: paper.get(key) for key in ("paperId", "title", "abstract", "year", "citationCount", "language")}
+        authors = [{"name": self.authors[a]["name"], "hIndex": self.authors[a].get("hIndex"),
+                    "citationCount": self.authors[a].get("citationCount")}
+                   for a in self.paper_authors.get(paperId, []) if a in self.authors]
+        journal = (paper.get("journal") or {}).get("name")
+        return [{"paper": properties, "authors": authors, "journalName": journal}]
+
+    def author_recs(self, paperId, limit=2, minCorpusCitations=0):
+        rows = []
+        for author_id in self.paper_authors.get(paperId, []):
+            author = self.authors.get(author_id, {})
+            if author.get("corpusCitationCount") is not None:
+                if author["corpusCitationCount"] < minCorpusCitations:
+                    continue
+            elif not ((author.get("hIndex") or 0) > 10 or (author.get("citationCount") or 0) > 1000):
+                continue
+            for rec_id in self.author_papers[author_id]:
+                if rec_id != paperId:
+                    rows.append({"paperId": rec_id, "reason": f"핵심 논문의 영향력 있는 저자({author['name']})가 저술",
+                                 "pagerank": self.papers[rec_id].get("corpusPageRank"),
+                                 "citationCount": self.papers[rec_id].get("citationCount", 0)})
+        rows.sort(key=lambda row: (row["pagerank"] or 0, row["citationCount"] or 0), reverse=True)
+        return rows[:limit]
+
+    def cocitation_recs(self, paperId, limit=2):
+        counts = Counter()
+        linked = set(self.references.get(paperId, ())) | set(self.citations.get(paperId, ()))
+        for citer in self.citations.get(paperId, ()):
+            for rec_id in self.references.get(citer, ()):
+                if rec_id != paperId and rec_id not in linked:
+                    counts[rec_id] += 1
+        return [{"paperId": rec_id, "reason": "함께 자주 인용됨 (학술적 연관성 높음)", "score": count}
+                for rec_id, count in counts.most_common(limit)]
+
+
+# --- 3. 외부 서비스 대체 객체 ---
+
+def _record(recorder, stage, start_time):
+    if recorder is not None:
+        recorder(stage, time.perf_counter() - start_time)
+
+
+class FakeResult(list):
+    """neo4j.Result처럼 레코드를 순회하거나 single()로 첫 레코드를 가져올 수 있는 결과 목록입니다."""
+
+    def single(self):
+        return self[0] if self else None
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def run(self, query, **params):
+        return self._driver.run(query, **params)
+
+    def execute_read(self, work, *args, **kwargs):
+        return work(self, *args, **kwargs)
+
+    execute_write = execute_read
+
+    def close(self):
+        pass
+
+
+class FakeNeo4jDriver:
+    """
+    socy_recommender_core의 Cypher 질의 상수로 질의를 구분해 합성 그래프에서 결과를 계산하는 Neo4j 대체 드라이버입니다.
+    알 수 없는 질의는 ValueError를 발생시켜, 새 질의가 추가되면 벤치마크에도 반영하도록 합니다.
+    """
+
+    def __init__(self, graph, latency_ms=0.0, recorder=None):
+        self._latency = latency_ms / 1000.0
+        self._recorder = recorder
+        self._handlers = {
+            PAPER_DETAILS_QUERY: ("detail_fetch", graph.paper_details),
+            AUTHOR_RECS_QUERY: ("author_query", graph.author_recs),
+            COCITATION_RECS_QUERY: ("cocitation_query", graph.cocitation_recs),
+        }
+
+    def session(self, database=None):
+        return FakeSession(self)
+
+    def run(self, query, **params):
+        # SOCY_TRACE_PROFILE_QUERIES=1이면 tracing.run_query가 질의 앞에 PROFILE을 붙입니다.
+        query = query[len("PROFILE "):] if query.startswith("PROFILE ") else query
+        if query not in self._handlers:
+            raise ValueError(f"벤치마크 드라이버가 지원하지 않는 질의입니다: {query.strip()[:80]}")
+        stage, handler = self._handlers[query]
+        start_time = time.perf_counter()
+        if self._latency:
+            time.sleep(self._latency)
+        result = FakeResult(handler(**params))
+        _record(self._recorder, stage, start_time)
+        return result
+
+    def close(self):
+        pass
+
+
+class FakeEmbeddings:
+    """단어를 해시하여 고정 차원 벡터로 만드는 결정적인 임베딩 모델입니다."""
+
+    def __init__(self, dimension=EMBEDDING_DIMENSION, latency_ms=0.0, recorder=None):
+        self.dimension = dimension
+        self._latency = latency_ms / 1000.0
+        self._recorder = recorder
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in tokenize(text):
+            vector[zlib.crc32(token.encode("utf-8")) % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        start_time = time.perf_counter()
+        if self._latency:
+            time.sleep(self._latency)
+        vector = self._embed(text)
+        _record(self._recorder, "embedding", start_time)
+        return vector
+
+
+class FakeDocument:
+    def __init__(self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+class FakeVectorStore:
+    """합성 논문 임베딩 행렬에 대해 내적으로 최근접 논문을 찾는 Neo4jVector 대체 객체입니다."""
+
+    def __init__(self, graph, embeddings, latency_ms=0.0, recorder=None):
+        self._graph = graph
+        self._embeddings = embeddings
+        self._latency = latency_ms / 1000.0
+        self._recorder = recorder
+        texts = [f"{graph.papers[p].get('title') or ''} "
+                 f"{' '.join(str(graph.papers[p].get('abstract') or '').split()[:EMBEDDING_ABSTRACT_WORDS])}"
+                 for p in graph.paper_ids]
+        self.matrix = np.vstack(embeddings.embed_documents(texts)) if texts else np.zeros((0, embeddings.dimension))
+
+    def similarity_search(self, query, k=4):
+        return self.similarity_search_by_vector(self._embeddings.embed_query(query), k=k)
+
+    def similarity_search_by_vector(self, query_vector, k=4):
+        start_time = time.perf_counter()
+        if self._latency:
+            time.sleep(self._latency)
+        scores = self.matrix @ query_vector
+        top = min(k, len(scores))
+        best = np.argpartition(-scores, top - 1)[:top] if top else []
+        best = sorted(best, key=lambda i: -scores[i])
+        documents = []
+        for i in best:
+            paper = self._graph.papers[self._graph.paper_ids[i]]
+            documents.append(FakeDocument(paper.get("abstract") or "",
+                                          {"paperId": paper["paperId"], "language": paper.get("language")}))
+        _record(self._recorder, "vector_search", start_time)
+        return documents
+
+
+def make_fake_llm(latency_ms=0.0, recorder=None):
+    """프롬프트 길이에 따라 정해진 답변을 돌려주는 결정적인 LLM 대체 Runnable을 만듭니다."""
+    latency = latency_ms / 1000.0
+
+    def respond(prompt_value):
+        start_time = time.perf_counter()
+        if latency:
+            time.sleep(latency)
+        text = prompt_value.to_string()
+        content = f"## 추천 논문 안내\n\n총 {text.count('[추천 ')}편의 논문을 추천합니다. (프롬프트 {len(text)}자)"
+        _record(recorder, "llm", start_time)
+        return AIMessage(content=content)
+
+    return RunnableLambda(respond)
@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- 1. 설정 ---
+
+# 스팬을 한 줄에 하나씩 JSON으로 기록할 파일 경로 (설정하지 않으면 기록하지 않음)
+TRACE_FILE = os.getenv("SOCY_TRACE_FILE")
+# Prometheus 텍스트 형식(/metrics) 엔드포인트 포트 (설정하지 않으면 띄우지 않음)
+METRICS_PORT = os.getenv("SOCY_METRICS_PORT")
+# Neo4j 질의 앞에 PROFILE을 붙여 DB hit 수를 집계할지 여부 (질의가 느려지므로 진단할 때만 사용)
+PROFILE_QUERIES = os.getenv("SOCY_TRACE_PROFILE_QUERIES", "0") == "1"
+
+# 모든 지표 이름 앞에 붙는 접두사와 지연 시간 히스토그램 구간 (초)
+METRIC_PREFIX = "socy_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# --- 2. 스팬 ---
+
+# 추적이 꺼져 있으면 span()/increment()/observe()는 플래그만 확인하고 바로 반환합니다.
+_enabled = False
+_lock = threading.Lock()
+_trace_sink = None
+_metrics_server = None
+_counters = defaultdict(float)
+_histograms = {}
+_current_span = contextvars.ContextVar("socy_current_span", default=None)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """
+    하나의 처리 단계를 나타내는 스팬입니다. 같은 컨텍스트 안에서 열린 스팬은 부모-자식 관계로 연결되며,
+    종료 시 단계별 지연 시간 히스토그램에 반영되고 JSONL 파일에 기록됩니다.
+    """
+
+    __slots__ = ("name", "attributes", "trace_id", "span_id", "parent_id", "start_time", "_start", "_token")
+
+    def __init__(self, name, attributes):
+        parent = _current_span.get()
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = parent.trace_id if parent else os.urandom(8).hex()
+        self.span_id = os.urandom(4).hex()
+        self.parent_id = parent.span_id if parent else None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self._start
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # 스트리밍 제너레이터처럼 다른 컨텍스트에서 종료되는 경우에는 되돌릴 필요가 없습니다.
+            pass
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        observe("stage_duration_seconds", duration, stage=self.name)
+        _write_span({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": round(duration * 1000.0, 3),
+            "attributes": self.attributes,
+        })
+        return False
+
+
+def span(name, **attributes):
+    """`with span("단계명"):` 형태로 단계의 소요 시간을 기록합니다. 추적이 꺼져 있으면 아무 일도 하지 않습니다."""
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def _write_span(record):
+    if _trace_sink is None:
+        return
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _lock:
+        _trace_sink.write(line)
+
+
+# --- 3. 지표 ---
+
+def _metric_key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def increment(name, value=1, **labels):
+    """카운터 지표를 value만큼 증가시킵니다."""
+    if not _enabled:
+        return
+    key = _metric_key(name, labels)
+    with _lock:
+        _counters[key] += value
+
+
+def observe(name, seconds, **labels):
+    """지연 시간 히스토그램에 관측값을 추가합니다."""
+    if not _enabled:
+        return
+    key = _metric_key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+def render_prometheus():
+    """현재까지의 카운터/히스토그램을 Prometheus 텍스트 형식으로 반환합니다."""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, dict(value, buckets=list(value["buckets"]))) for key, value in _histograms.items())
+
+    typed = set()
+    for (name, labels), value in counters:
+        metric = METRIC_PREFIX + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+    for (name, labels), histogram in histograms:
+        metric = METRIC_PREFIX + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} histogram")
+            typed.add(metric)
+        for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', f'{bound:g}')])} {count}")
+        lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port):
+    """/metrics 엔드포인트를 데몬 스레드에서 띄웁니다. (이미 떠 있으면 그대로 둡니다)"""
+    global _metrics_server
+    if _metrics_server is not None:
+        return _metrics_server
+    _metrics_server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsRequestHandler)
+    _metrics_server.daemon_threads = True
+    threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    logging.info(f"Prometheus 지표 엔드포인트 시작: http://0.0.0.0:{port}/metrics")
+    return _metrics_server
+
+
+# --- 4. 활성화 ---
+
+def configure(trace_file=None, metrics_port=None):
+    """추적을 켭니다. trace_file을 주면 스팬을 JSONL로 기록하고, metrics_port를 주면 /metrics 엔드포인트를 띄웁니다."""
+    global _enabled, _trace_sink
+    if trace_file:
+        with _lock:
+            if _trace_sink is not None:
+                _trace_sink.close()
+            _trace_sink = open(trace_file, 'a', encoding='utf-8', buffering=1)
+    if metrics_port:
+        start_metrics_server(int(metrics_port))
+    _enabled = True
+
+
+def is_enabled():
+    return _enabled
+
+
+# --- 5. Neo4j 질의 계측 ---
+
+def _sum_db_hits(profile):
+    if not profile:
+        return 0
+    return int(profile.get("dbHits", 0)) + sum(_sum_db_hits(child) for child in profile.get("children", []))
+
+
+def run_query(runner, query, name, **params):
+    """
+    세션/트랜잭션에서 Cypher 질의를 실행하고 레코드 목록을 반환합니다.
+    추적이 켜져 있으면 질의별 스팬, 반환 행 수, 서버 처리 시간, (PROFILE_QUERIES일 때) DB hit 수를 기록합니다.
+    """
+    if not _enabled:
+        return list(runner.run(query, **params))
+
+    with span(f"neo4j.{name}") as query_span:
+        result = runner.run(f"PROFILE {query}" if PROFILE_QUERIES else query, **params)
+        records = list(result)
+        query_span.set(rows=len(records))
+        increment("neo4j_queries_total", query=name)
+        increment("neo4j_rows_total", len(records), query=name)
+        summary = result.consume() if hasattr(result, "consume") else None
+        if summary is not None:
+            if summary.result_available_after is not None:
+                query_span.set(server_ms=summary.result_available_after + (summary.result_consumed_after or 0))
+            if summary.profile:
+                db_hits = _sum_db_hits(summary.profile)
+                query_span.set(db_hits=db_hits)
+                increment("neo4j_db_hits_total", db_hits, query=name)
+    return records
+
+
+if TRACE_FILE or METRICS_PORT:
+    configure(TRACE_FILE, METRICS_PORT)
@@ -0,0 +1,447 @@
+import os
+import json
+import time
+import logging
+import argparse
+
+import numpy as np
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+from graph_snapshot import DATA_DIR, publish_arrays, load_arrays
+from signal_status import mark_fresh
+
+# --- 1. 설정 ---
+load_dotenv()
+
+NEO4J_URI = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+# 압축 벡터 인덱스 저장 디렉토리 (버전 디렉토리 + CURRENT 포인터)
+VECTOR_INDEX_DIR = os.path.join(DATA_DIR, "vector_index")
+
+# PCA로 줄일 차원 수 (embedding-001은 768차원). 0이면 차원 축소 없이 int8 양자화만 합니다.
+PCA_DIMENSIONS = 256
+# PCA를 학습할 최대 표본 수 (오프라인 학습이므로 전체 대신 무작위 표본으로 충분합니다)
+PCA_SAMPLE_SIZE = 50000
+# int8 양자화 범위를 정할 때 사용하는 차원별 절댓값 백분위수 (극단값 몇 개 때문에 해상도가 떨어지지 않도록 잘라냄)
+QUANTIZATION_PERCENTILE = 99.9
+
+# 압축 벡터로 고른 후보 중 원본 벡터로 다시 점수를 매길 개수
+RESCORE_CANDIDATES = 200
+# 재채점용 원본 벡터의 저장 형식. offload 명령으로 Neo4j의 abstractEmbedding을 지우면 이 사본이 유일한 원본이 되므로,
+# 재채점과 다음 PCA 학습에 충분한 float16으로 저장합니다. (단위 벡터의 코사인 유사도 오차는 약 1e-3으로 상위 후보 순위에는 영향이 거의 없음)
+RESCORE_VECTOR_DTYPE = np.float16
+# 챗봇이 Neo4jVector로 사용하는 벡터 인덱스 이름 (neo4j_schema.py). offload 명령이 함께 삭제합니다.
+NEO4J_VECTOR_INDEX_NAME = "paper_abstract_embeddings"
+# Neo4j 백엔드에서 논문 임베딩 한 개가 차지하는 값당 크기 (바이트): abstractEmbedding 속성(float 목록은 8바이트 double로 저장)과
+# 벡터 인덱스가 따로 보관하는 float32 사본 (HNSW 그래프 연결 정보는 제외한 하한)
+NEO4J_PROPERTY_VALUE_BYTES = 8
+NEO4J_VECTOR_INDEX_VALUE_BYTES = 4
+# 압축 벡터 점수를 계산할 때 한 번에 float32로 변환하는 행 수
+# 변환 결과(행 수 x 차원 x 4바이트)가 CPU 캐시에 머무를 정도로 작아야 전체 검색이 빠릅니다. (1024행 x 256차원 = 1MB)
+SCAN_CHUNK_ROWS = 1024
+
+# Neo4j에서 임베딩을 내보낼 때 한 번에 읽는 논문 수
+EXPORT_BATCH_SIZE = 5000
+RANDOM_SEED = 42
+
+# paperId 순서로 커서 이후의 임베딩을 가져옵니다. (paperId 고유 제약 조건의 인덱스로 범위 탐색)
+EXPORT_EMBEDDINGS_QUERY = """
+    MATCH (p:Paper)
+    WHERE p.paperId > $cursor AND p.abstractEmbedding IS NOT NULL
+    RETURN p.paperId AS paperId, p.abstractEmbedding AS embedding
+    ORDER BY p.paperId
+    LIMIT $limit
+    """
+
+# 압축 인덱스로 옮긴 논문의 Neo4j 임베딩을 지우고 표시합니다. (표시된 논문은 neo4j_loader.py/graph_sync.py가 다시 임베딩하지 않음)
+OFFLOAD_EMBEDDINGS_QUERY = """
+    UNWIND $ids AS id
+    MATCH (p:Paper {paperId: id})
+    WHERE p.abstractEmbedding IS NOT NULL
+    REMOVE p.abstractEmbedding
+    SET p.embeddingOffloaded = true
+    RETURN count(p) AS offloaded
+    """
+
+# 임베딩을 압축 인덱스로 옮긴 논문의 paperId를 커서 이후부터 가져옵니다. (다음 build에서 이전 인덱스의 벡터를 이어받음)
+OFFLOADED_PAPERS_QUERY = """
+    MATCH (p:Paper)
+    WHERE p.paperId > $cursor AND p.embeddingOffloaded = true
+    RETURN p.paperId AS paperId
+    ORDER BY p.paperId
+    LIMIT $limit
+    """
+
+# 이전 버전의 neo4j_loader.py가 저장하던 임베딩 입력 텍스트(제목 + 초록의 중복 사본)를 배치 단위로 지웁니다.
+STRIP_EMBEDDING_TEXT_QUERY = """
+    MATCH (p:Paper)
+    WHERE p.text_for_embedding IS NOT NULL
+    WITH p LIMIT $limit
+    REMOVE p.text_for_embedding
+    RETURN count(p) AS removed
+    """
+
+
+# --- 2. 압축 (PCA + int8 양자화) ---
+
+def normalize_rows(vectors):
+    """코사인 유사도를 내적으로 계산할 수 있도록 각 행을 단위 벡터로 만듭니다."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+def fit_pca(vectors, dimensions=PCA_DIMENSIONS, sample_size=PCA_SAMPLE_SIZE, seed=RANDOM_SEED):
+    """
+    무작위 표본으로 PCA를 학습해 (평균 벡터, 주성분 행렬 (dimensions x 원본 차원), 설명된 분산 비율)을 반환합니다.
+    dimensions가 0이거나 원본 차원 이상이면 회전 없이 원본 축을 그대로 사용합니다.
+    """
+    source_dimensions = vectors.shape[1]
+    if not dimensions or dimensions >= source_dimensions:
+        return np.zeros(source_dimensions, dtype=np.float32), np.eye(source_dimensions, dtype=np.float32), 1.0
+    rng = np.random.default_rng(seed)
+    sample = vectors[np.sort(rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False))]
+    mean = sample.mean(axis=0)
+    _, singular_values, components = np.linalg.svd(sample - mean, full_matrices=False)
+    variance = singular_values ** 2
+    explained = float(variance[:dimensions].sum() / variance.sum()) if variance.sum() else 1.0
+    return mean.astype(np.float32), components[:dimensions].astype(np.float32), explained
+
+
+def project(vectors, mean, components):
+    """(벡터 - 평균)을 주성분 공간으로 투영합니다. (메모리를 아끼기 위해 SCAN_CHUNK_ROWS행씩 처리)"""
+    projected = np.empty((len(vectors), len(components)), dtype=np.float32)
+    for start in range(0, len(vectors), SCAN_CHUNK_ROWS):
+        projected[start:start + SCAN_CHUNK_ROWS] = (vectors[start:start + SCAN_CHUNK_ROWS] - mean) @ components.T
+    return projected
+
+
+def quantize(projected, percentile=QUANTIZATION_PERCENTILE):
+    """차원별 대칭 스케일로 int8 양자화하여 (코드 행렬, 차원별 스케일)을 반환합니다. 원래 값 ≈ 코드 x 스케일."""
+    if len(projected) == 0:
+        return np.zeros(projected.shape, dtype=np.int8), np.ones(projected.shape[1], dtype=np.float32)
+    scales = np.percentile(np.abs(projected), percentile, axis=0) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(projected / scales), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+# --- 3. 인덱스 생성 ---
+
+def export_embeddings(driver, database="neo4j", batch_size=EXPORT_BATCH_SIZE, previous=None):
+    """
+    Neo4j에 저장된 논문 임베딩을 paperId 커서로 나눠 읽어 (paperId 목록, float32 행렬)을 반환합니다.
+    offload로 Neo4j에서 지운 논문(embeddingOffloaded)은 previous(이전 압축 인덱스)의 재채점 벡터를 이어받습니다.
+    """
+    paper_ids, batches = [], []
+    cursor = ""
+    with driver.session(database=database) as session:
+        while True:
+            records = list(session.run(EXPORT_EMBEDDINGS_QUERY, cursor=cursor, limit=batch_size))
+            if not records:
+                break
+            paper_ids.extend(record["paperId"] for record in records)
+            batches.append(np.asarray([record["embedding"] for record in records], dtype=np.float32))
+            cursor = records[-1]["paperId"]
+            logging.info(f"임베딩 {len(paper_ids)}개 내보냄.")
+
+        offloaded, cursor = [], ""
+        while True:
+            records = list(session.run(OFFLOADED_PAPERS_QUERY, cursor=cursor, limit=batch_size))
+            if not records:
+                break
+            offloaded.extend(record["paperId"] for record in records)
+            cursor = records[-1]["paperId"]
+
+    if offloaded:
+        rows = previous.rows_of(offloaded) if previous is not None else {}
+        missing = len(offloaded) - len(rows)
+        if missing:
+            logging.warning(f"Neo4j에서 지운 임베딩 {missing}개가 이전 압축 인덱스에 없어 제외합니다. "
+                            f"(해당 논문은 embeddingOffloaded 표시를 지우고 neo4j_loader.py로 다시 임베딩하세요)")
+        if rows:
+            paper_ids.extend(rows)
+            batches.append(np.asarray(previous.vectors_at(list(rows.values())), dtype=np.float32))
+        logging.info(f"이전 압축 인덱스에서 임베딩 {len(rows)}개 이어받음.")
+    vectors = np.vstack(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+    return paper_ids, vectors
+
+
+def build_vector_index(paper_ids, vectors, dimensions=PCA_DIMENSIONS, directory=VECTOR_INDEX_DIR):
+    """
+    논문 임베딩으로 압축 벡터 인덱스를 만들어 .npy 파일로 저장합니다.
+    - codes.npy / scales.npy: PCA 투영 후 int8 양자화한 벡터와 차원별 스케일 (검색 시 전체를 훑는 부분)
+    - mean.npy / components.npy: 논문 벡터를 투영할 때 뺀 PCA 평균과 주성분 (질의 벡터는 주성분으로만 투영)
+    - vectors.npy: 단위 길이로 정규화한 원본 벡터 (float16, 상위 후보를 다시 채점할 때만 해당 행을 읽음. offload 이후에는 유일한 사본)
+    - paper_ids.npy: 행 번호별 paperId
+    """
+    logging.info("\n" + "=" * 30 + " 압축 벡터 인덱스 생성 시작 " + "=" * 30)
+    start_time = time.perf_counter()
+    vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+    mean, components, explained = fit_pca(vectors, dimensions)
+    codes, scales = quantize(project(vectors, mean, components))
+
+    arrays = {
+        "paper_ids": np.array([str(paper_id).encode("ascii") for paper_id in paper_ids])
+        if paper_ids else np.array([], dtype="S1"),
+        "codes": codes,
+        "scales": scales,
+        "mean": mean,
+        "components": components,
+        "vectors": vectors.astype(RESCORE_VECTOR_DTYPE),
+    }
+    # 논문 수에 비례하는 배열(paperId, int8 코드, 재채점 벡터)만 더한 실제 논문당 저장 크기
+    bytes_per_paper = sum(array[0].nbytes for name, array in arrays.items()
+                          if name in ("paper_ids", "codes", "vectors") and len(array))
+    source_dimensions = int(vectors.shape[1]) if vectors.size else 0
+    # 같은 임베딩을 Neo4j 백엔드가 보관하는 크기 (abstractEmbedding 속성 + 벡터 인덱스의 float32 사본)
+    neo4j_bytes_per_paper = source_dimensions * (NEO4J_PROPERTY_VALUE_BYTES + NEO4J_VECTOR_INDEX_VALUE_BYTES)
+    manifest = {
+        "num_papers": len(paper_ids),
+        "source_dimensions": source_dimensions,
+        "dimensions": int(codes.shape[1]) if codes.ndim == 2 else 0,
+        "explained_variance": explained,
+        "bytes_per_paper": bytes_per_paper,
+        "neo4j_bytes_per_paper": neo4j_bytes_per_paper,
+    }
+    _, version_name = publish_arrays(directory, arrays, manifest)
+    source_bytes = source_dimensions * 4
+    logging.info(
+        f"압축 벡터 인덱스 {version_name} 저장 완료: 논문 {len(paper_ids)}개, {manifest['source_dimensions']}차원 -> "
+        f"{manifest['dimensions']}차원 int8 (설명된 분산 {explained:.1%}), 검색 시 훑는 크기 논문당 {source_bytes}바이트 -> "
+        f"{manifest['dimensions']}바이트 ({time.perf_counter() - start_time:.1f}초)"
+    )
+    logging.info(
+        f"인덱스 파일 크기: 논문당 {bytes_per_paper}바이트 (paperId + int8 코드 {manifest['dimensions']}바이트 + "
+        f"float16 재채점 벡터 {source_dimensions * 2}바이트), 전체 {bytes_per_paper * len(paper_ids) / 1e6:.1f}MB"
+    )
+    logging.info(
+        f"임베딩 저장 크기: Neo4j 백엔드 논문당 약 {neo4j_bytes_per_paper}바이트 (abstractEmbedding "
+        f"{source_dimensions * NEO4J_PROPERTY_VALUE_BYTES} + 벡터 인덱스 {source_dimensions * NEO4J_VECTOR_INDEX_VALUE_BYTES}) -> "
+        f"압축 백엔드 {bytes_per_paper}바이트 ({neo4j_bytes_per_paper / max(bytes_per_paper, 1):.1f}배 감소). "
+        f"'python vector_compressor.py offload'를 실행해야 Neo4j 사본이 지워집니다."
+    )
+    logging.info("=" * 32 + " 압축 벡터 인덱스 생성 완료 " + "=" * 32 + "\n")
+    return version_name
+
+
+def offload_neo4j_embeddings(driver, index, database="neo4j", batch_size=EXPORT_BATCH_SIZE):
+    """
+    압축 인덱스에 담긴 논문의 Neo4j abstractEmbedding을 배치 단위로 지우고 Neo4j 벡터 인덱스를 삭제합니다.
+    이후에는 압축 인덱스의 float16 벡터가 유일한 원본이므로, 챗봇은 SOCY_VECTOR_BACKEND=compressed로 실행해야 합니다.
+    지운 임베딩 수를 반환합니다.
+    """
+    paper_ids = [paper_id.decode("ascii") for paper_id in index.paper_ids]
+    offloaded = 0
+    with driver.session(database=database) as session:
+        for start in range(0, len(paper_ids), batch_size):
+            batch = paper_ids[start:start + batch_size]
+            offloaded += session.execute_write(
+                lambda tx: tx.run(OFFLOAD_EMBEDDINGS_QUERY, ids=batch).single()["offloaded"])
+            logging.info(f"abstractEmbedding {offloaded}개 제거.")
+        session.run(f"DROP INDEX {NEO4J_VECTOR_INDEX_NAME} IF EXISTS").consume()
+    logging.info(f"Neo4j 벡터 인덱스 '{NEO4J_VECTOR_INDEX_NAME}'를 삭제했습니다.")
+    return offloaded
+
+
+def strip_embedding_text(driver, database="neo4j", batch_size=EXPORT_BATCH_SIZE):
+    """Paper 노드의 text_for_embedding 속성을 배치 단위로 제거하고 제거한 노드 수를 반환합니다."""
+    removed = 0
+    with driver.session(database=database) as session:
+        while True:
+            count = session.execute_write(
+                lambda tx: tx.run(STRIP_EMBEDDING_TEXT_QUERY, limit=batch_size).single()["removed"])
+            if not count:
+                break
+            removed += count
+            logging.info(f"text_for_embedding {removed}개 제거.")
+    return removed
+
+
+# --- 4. 검색 ---
+
+class CompressedVectorIndex:
+    """
+    build_vector_index()가 저장한 압축 벡터 인덱스를 메모리 매핑으로 읽어 코사인 유사도 검색을 합니다.
+    int8 코드 전체를 훑어 상위 RESCORE_CANDIDATES개 후보를 고른 뒤, 그 후보만 원본 벡터로 다시 채점하여 정확한 순위를 만듭니다.
+    """
+
+    def __init__(self, version, arrays, manifest):
+        self.version = version
+        self.paper_ids = arrays["paper_ids"]
+        self._codes = arrays["codes"]
+        self._scales = np.asarray(arrays["scales"])
+        self._components = np.asarray(arrays["components"])
+        self._vectors = arrays["vectors"]
+        self.num_papers = manifest["num_papers"]
+        self.dimensions = manifest["dimensions"]
+
+    @classmethod
+    def load(cls, directory=VECTOR_INDEX_DIR):
+        version, manifest, arrays = load_arrays(
+            directory, ["paper_ids", "codes", "scales", "components", "vectors"]
+        )
+        return cls(version, arrays, manifest)
+
+    def rows_of(self, paper_ids):
+        """인덱스에 있는 paperId의 {paperId: 행 번호}를 반환합니다."""
+        wanted = set(paper_ids)
+        return {paper_id.decode("ascii"): row for row, paper_id in enumerate(self.paper_ids)
+                if paper_id.decode("ascii") in wanted}
+
+    def vectors_at(self, rows):
+        """행 번호 목록의 재채점 벡터를 float32로 반환합니다."""
+        return np.asarray(self._vectors[np.asarray(rows, dtype=np.int64)], dtype=np.float32)
+
+    def approximate_scores(self, query):
+        """
+        정규화된 질의 벡터와 모든 논문의 근사 내적을 계산합니다.
+        (x - 평균)·q 는 x·q 와 논문에 무관한 상수만큼 차이 나므로, 질의는 평균을 빼지 않고 투영합니다.
+        """
+        weights = (self._components @ query) * self._scales
+        scores = np.empty(self.num_papers, dtype=np.float32)
+        for start in range(0, self.num_papers, SCAN_CHUNK_ROWS):
+            scores[start:start + SCAN_CHUNK_ROWS] = self._codes[start:start + SCAN_CHUNK_ROWS].astype(np.float32) @ weights
+        return scores
+
+    def search(self, query_vector, k=20, rescore=RESCORE_CANDIDATES):
+        """
+        질의 벡터와 코사인 유사도가 높은 상위 k개 논문을 검색합니다.
+        Returns:
+            list: [(paperId, 코사인 유사도), ...] 유사도 내림차순. rescore=0이면 근사 점수만으로 순위를 정합니다.
+        """
+        if self.num_papers == 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = self.approximate_scores(query)
+
+        candidates = min(max(k, rescore), self.num_papers)
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        if rescore:
+            # 행 번호 순으로 읽어 메모리 매핑 파일을 앞에서부터 차례로 접근합니다.
+            top = np.sort(top)
+            scores = np.asarray(self._vectors[top], dtype=np.float32) @ query
+        else:
+            scores = scores[top]
+        best = np.argsort(-scores, kind="stable")[:k]
+        return [(self.paper_ids[top[i]].decode("ascii"), float(scores[i])) for i in best]
+
+    def exact_search(self, query_vector, k=20):
+        """원본 벡터 전체와 비교하는 정확한 검색 (평가 기준용)."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = np.empty(self.num_papers, dtype=np.float32)
+        for start in range(0, self.num_papers, SCAN_CHUNK_ROWS):
+            scores[start:start + SCAN_CHUNK_ROWS] = np.asarray(self._vectors[start:start + SCAN_CHUNK_ROWS],
+                                                               dtype=np.float32) @ query
+        top = np.argpartition(-scores, min(k, self.num_papers) - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.paper_ids[i].decode("ascii"), float(scores[i])) for i in top]
+
+
+# --- 5. 평가 ---
+
+def sample_queries(index, num_queries=200, noise=0.05, seed=RANDOM_SEED):
+    """
+    무작위 논문 벡터에 잡음을 더해 평가용 질의 벡터를 만듭니다.
+    (질문 임베딩은 초록과 정확히 같지 않으므로, 잡음으로 정답 근처의 애매한 순위까지 비교되도록 합니다)
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(index.num_papers, size=min(num_queries, index.num_papers), replace=False)
+    vectors = np.asarray(index._vectors[np.sort(rows)], dtype=np.float32)
+    return vectors + rng.normal(scale=noise, size=vectors.shape).astype(np.float32)
+
+
+def evaluate_recall(index, queries, k=20, rescore=RESCORE_CANDIDATES):
+    """
+    질의별로 정확한 검색의 상위 k개 중 압축 검색이 찾은 비율(recall@k)의 평균과 평균 검색 시간을 반환합니다.
+    rescore 없이 근사 점수만 쓴 경우도 함께 측정합니다.
+    """
+    results = {}
+    for name, rescore_count in (("int8", 0), ("int8+rescore", rescore)):
+        recalls, elapsed = [], 0.0
+        for query in queries:
+            exact = {paper_id for paper_id, _ in index.exact_search(query, k)}
+            search_start = time.perf_counter()
+            found = {paper_id for paper_id, _ in index.search(query, k, rescore=rescore_count)}
+            elapsed += time.perf_counter() - search_start
+            recalls.append(len(exact & found) / max(len(exact), 1))
+        results[name] = {"recall": float(np.mean(recalls)) if recalls else 0.0,
+                         "latency_ms": 1000 * elapsed / max(len(queries), 1)}
+    return results
+
+
+def evaluate_labelled(index, query_file, k=20, rescore=RESCORE_CANDIDATES):
+    """
+    {"query": 질문, "relevant": [paperId, ...]} 형식의 JSONL 질의 집합으로, 정확한 검색과 압축 검색의 정답 recall@k를 비교합니다.
+    질문 임베딩에는 챗봇과 같은 임베딩 모델을 사용합니다.
+    """
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=GOOGLE_API_KEY)
+    with open(query_file, 'r', encoding='utf-8') as f:
+        labelled = [json.loads(line) for line in f if line.strip()]
+    vectors = [embeddings.embed_query(item["query"]) for item in labelled]
+    recalls = {"exact": [], "int8+rescore": []}
+    for item, vector in zip(labelled, vectors):
+        relevant = set(item["relevant"])
+        if not relevant:
+            continue
+        for name, hits in (("exact", index.exact_search(vector, k)), ("int8+rescore", index.search(vector, k, rescore))):
+            recalls[name].append(len(relevant & {paper_id for paper_id, _ in hits}) / len(relevant))
+    return {name: float(np.mean(values)) if values else 0.0 for name, values in recalls.items()}
+
+
+# --- 6. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="논문 임베딩 PCA + int8 압축 인덱스 생성, recall 평가 및 중복 텍스트 속성 정리")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build")
+    build_parser.add_argument("--dimensions", type=int, default=PCA_DIMENSIONS, help="PCA 차원 수 (0: 차원 축소 안 함)")
+    evaluate_parser = subparsers.add_parser("evaluate")
+    evaluate_parser.add_argument("--queries", type=int, default=200, help="논문 벡터로 만든 평가 질의 수")
+    evaluate_parser.add_argument("--query-file", default=None, help="정답이 표시된 질의 집합 (.jsonl)")
+    evaluate_parser.add_argument("-k", type=int, default=20)
+    evaluate_parser.add_argument("--rescore", type=int, default=RESCORE_CANDIDATES)
+    subparsers.add_parser("offload", help="압축 인덱스에 담긴 논문의 Neo4j 임베딩과 벡터 인덱스 삭제")
+    subparsers.add_parser("strip-text")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        try:
+            previous = CompressedVectorIndex.load()
+        except FileNotFoundError:
+            previous = None
+        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+        try:
+            build_vector_index(*export_embeddings(driver, previous=previous), dimensions=args.dimensions)
+        finally:
+            driver.close()
+        mark_fresh("vector_index")
+    elif args.command == "offload":
+        index = CompressedVectorIndex.load()
+        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+        try:
+            print(f"Neo4j abstractEmbedding {offload_neo4j_embeddings(driver, index)}개를 압축 인덱스로 옮겼습니다. "
+                  f"챗봇은 SOCY_VECTOR_BACKEND=compressed로 실행하세요.")
+        finally:
+            driver.close()
+    elif args.command == "evaluate":
+        index = CompressedVectorIndex.load()
+        for name, result in evaluate_recall(index, sample_queries(index, args.queries), args.k, args.rescore).items():
+            print(f"{name:<14} recall@{args.k} (정확한 검색 대비): {result['recall']:.4f}, "
+                  f"평균 검색 시간 {result['latency_ms']:.2f}ms")
+        if args.query_file:
+            for name, recall in evaluate_labelled(index, args.query_file, args.k, args.rescore).items():
+                print(f"{name:<14} recall@{args.k} (정답 기준): {recall:.4f}")
+    else:
+        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+        try:
+            print(f"text_for_embedding 속성 {strip_embedding_text(driver)}개를 제거했습니다.")
+        finally:
+            driver.close()
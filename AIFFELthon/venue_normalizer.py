@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import logging
+import argparse
+import unicodedata
+from collections import Counter, defaultdict
+
+from sharded_dataset import iter_exported_lines
+
+# --- 1. 설정 ---
+
+# 전처리된 논문 파일 (data_preprocessor.py에서 생성)
+DATA_DIR = "semantic_scholar_sociology_data"
+CLEANED_PAPER_NODE_FILE = os.path.join(DATA_DIR, "sociology_papers_cleaned.jsonl")
+
+# 수집 대상 사회학 저널의 정식 이름과 별칭 (약어, 괄호 표기 등)
+# data_collector.py / data_preprocessor.py의 저널 필터와 neo4j_loader.py의 Journal 노드 이름이 모두 이 사전을 사용합니다.
+# 괄호 안 표기("(1967)"), '&'/'and', 앞의 'The', 대소문자·구두점 차이는 정규화 키가 흡수하므로 별칭으로 적을 필요가 없습니다.
+CANONICAL_VENUES = {
+    "YOUNG - Nordic Journal of Youth Research": [],
+    "American Journal of Sociology": ["AJS"],
+    "Social Forces": [],
+    "Demography": [],
+    "Sociological Symposium": [],
+    "Sociological Science": [],
+    "Sociological Methodology": [],
+    "Social Science Research": [],
+    "Sociological Analysis": [],
+    "Sociological Bulletin": [],
+    "Sociological Abstracts": [],
+    "Sociological Jurisprudence Journal": [],
+    "Sociological Forum": [],
+    "Sociological Theory": [],
+    "Sociological Methods & Research": [],
+    "Sociological Perspectives": [],
+    "Sociological Research": [],
+    "Sociological Studies of Children and Youth": [],
+    "Sociological Practice": [],
+    "British Journal of Sociology": [],
+    "Sociological Inquiry": [],
+    "Sociological Journal": [],
+    "Sociological Spectrum": [],
+    "American Sociological Review": ["ASR"],
+    "Journal of Health and Social Behavior": ["Journal of Health and Social Behaviour"],
+    "Sociologia da Educação": [],
+    "Gender & Society": [],
+    "Sociology of Health and Illness": [],
+    "Sociological Research Online": [],
+    "The Sociological Quarterly": [],
+    "Theory and Society": [],
+    "Sociology of Race and Ethnicity": [],
+    "Men and Masculinities": [],
+    "Sexualities": [],
+    "Politics & Society": [],
+    "Cultural Sociology": [],
+    "Current Sociology": [],
+    "Social Networks": [],
+    "Qualitative Sociology": [],
+    "European Sociological Review": [],
+    "Contexts": [],
+    "Social Indicators Research": [],
+    "Ethnic and Racial Studies": [],
+    "Advances in Group Processes": [],
+    "Socius": ["Socius: Sociological Research for a Dynamic World"],
+    "Social Psychology Quarterly": [],
+    "Social Science & Medicine": [],
+    "Social Science & Medicine. Medical Psychology and Medical Sociology": [],
+    "Sociology Compass": [],
+    "Journal of Marriage and Family": ["Journal of Marriage and the Family"],
+    "City & Society": [],
+    "City & Community": [],
+    "Work and Occupations": [],
+    "Social Problems": [],
+    "Annual Review of Sociology": [],
+}
+
+# 약어 비교 시 무시하는 단어 (ISO 4 저널 약어는 이런 단어를 생략합니다. 예: "Am. J. Sociol.")
+STOPWORDS = {"the", "of", "and", "for", "in", "on", "a", "an"}
+# 철자 변형 허용 기준: 정규화 키의 문자 3-gram 자카드 유사도
+FUZZY_THRESHOLD = 0.85
+
+
+# --- 2. 정규화 키 ---
+
+def venue_key(name):
+    """
+    저널/발행처 이름의 정규화 키를 만듭니다.
+    악센트 제거, 소문자화, 괄호 안 표기 제거, '&' -> 'and', 구두점 제거, 앞의 'the' 제거.
+    예: "The Sociological Quarterly" -> "sociological quarterly",
+        "Social Science & Medicine (1967)" -> "social science and medicine"
+    """
+    text = unicodedata.normalize("NFKD", str(name or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r"\([^)]*\)", " ", text)
+    text = text.replace("&", " and ")
+    tokens = re.sub(r"[\W_]+", " ", text).split()
+    if len(tokens) > 1 and tokens[0] == "the":
+        tokens = tokens[1:]
+    return " ".join(tokens)
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def paper_venue(paper_data):
+    """논문 데이터에서 저널 이름(journal.name)을, 없으면 발행처(venue)를 반환합니다."""
+    journal_info = paper_data.get("journal")
+    if journal_info and journal_info.get("name"):
+        return journal_info["name"]
+    return paper_data.get("venue") or ""
+
+
+# --- 3. 저널 정규화 인덱스 ---
+
+class VenueIndex:
+    """
+    정식 저널 이름 사전에 대한 조회 인덱스입니다. 생성 시 모든 키를 미리 계산해 두고,
+    정확한 키 일치 -> 약어(토큰 접두어) 일치 -> 3-gram 유사도 순으로 찾습니다.
+    조회 결과는 원래 이름별로 캐시되므로 같은 표기가 반복되는 수백만 건의 논문에도 비용이 거의 들지 않습니다.
+    """
+
+    def __init__(self, canonical_venues=None):
+        canonical_venues = CANONICAL_VENUES if canonical_venues is None else canonical_venues
+        self.names = list(canonical_venues)
+        self._exact = {}
+        self._content_tokens = []
+        self._trigram_sets = []
+        self._trigram_index = defaultdict(set)
+        self._cache = {}
+        for i, (name, aliases) in enumerate(canonical_venues.items()):
+            for variant in (name, *aliases):
+                self._exact[venue_key(variant)] = i
+            key = venue_key(name)
+            self._content_tokens.append(tuple(token for token in key.split() if token not in STOPWORDS))
+            grams = _trigrams(key)
+            self._trigram_sets.append(grams)
+            for gram in grams:
+                self._trigram_index[gram].add(i)
+
+    def _match_abbreviation(self, tokens):
+        tokens = [token for token in tokens if token not in STOPWORDS]
+        # 한 단어짜리 접두어(예: "soc" -> "Socius")는 일반 단어와 구분할 수 없으므로 두 단어 이상일 때만 약어로 봅니다.
+        if len(tokens) < 2:
+            return None
+        matches = [i for i, full in enumerate(self._content_tokens)
+                   if len(full) == len(tokens) and all(f.startswith(t) for t, f in zip(tokens, full))]
+        # 여러 저널에 걸리는 약어(예: "soc")는 모호하므로 일치로 보지 않습니다.
+        return matches[0] if len(matches) == 1 else None
+
+    def _match_fuzzy(self, key):
+        grams = _trigrams(key)
+        candidates = Counter(i for gram in grams for i in self._trigram_index.get(gram, ()))
+        best, best_score = None, 0.0
+        for i, shared in candidates.items():
+            score = shared / (len(grams) + len(self._trigram_sets[i]) - shared)
+            if score > best_score:
+                best, best_score = i, score
+        return best if best_score >= FUZZY_THRESHOLD else None
+
+    def match(self, name):
+        """이름에 해당하는 정식 저널 이름을 반환합니다. 사전에 없는 저널이면 None을 반환합니다."""
+        cached = self._cache.get(name, self)
+        if cached is not self:
+            return cached
+        key = venue_key(name)
+        index = None
+        if key:
+            index = self._exact.get(key)
+            if index is None:
+                index = self._match_abbreviation(key.split())
+            if index is None:
+                index = self._match_fuzzy(key)
+        result = self.names[index] if index is not None else None
+        self._cache[name] = result
+        return result
+
+    def identity(self, name):
+        """
+        Journal 노드 식별 정보 (정규화 키, 표시 이름, 수집 대상 저널 여부)를 반환합니다. 이름이 비어 있으면 None.
+        사전에 있는 저널은 정식 이름의 키로 합쳐지고, 그 밖의 저널은 자신의 정규화 키를 사용합니다.
+        """
+        canonical = self.match(name)
+        if canonical is not None:
+            return venue_key(canonical), canonical, True
+        key = venue_key(name)
+        if not key:
+            return None
+        return key, str(name).strip(), False
+
+
+_default_index = None
+
+
+def get_venue_index():
+    global _default_index
+    if _default_index is None:
+        _default_index = VenueIndex()
+    return _default_index
+
+
+def canonical_venue(name):
+    """이름에 해당하는 정식 저널 이름 (사전에 없으면 None)."""
+    return get_venue_index().match(name)
+
+
+def is_target_venue(paper_data):
+    """논문이 수집 대상 사회학 저널(CANONICAL_VENUES)에 게재되었는지 확인합니다."""
+    venue = paper_venue(paper_data)
+    return bool(venue) and canonical_venue(venue) is not None
+
+
+def build_journal_rows(papers, index=None):
+    """
+    논문 목록으로 Journal 노드와 PUBLISHED_IN 관계 적재용 행을 만듭니다.
+    사전에 없는 저널의 표시 이름은 같은 키로 묶인 표기 중 가장 많이 쓰인 것을 사용합니다.
+    Returns:
+        (journals, links): journals는 [{"key", "name", "isTarget", "paperCount"}],
+                           links는 [{"paperId", "key"}]
+    """
+    index = index or get_venue_index()
+    spellings = defaultdict(Counter)
+    targets = {}
+    links = []
+    for paper in papers:
+        venue = paper_venue(paper)
+        identity = index.identity(venue) if venue and paper.get("paperId") else None
+        if identity is None:
+            continue
+        key, name, is_target = identity
+        spellings[key][name] += 1
+        targets[key] = is_target
+        links.append({"paperId": paper["paperId"], "key": key})
+    journals = [{"key": key, "name": counts.most_common(1)[0][0], "isTarget": targets[key],
+                 "paperCount": sum(counts.values())}
+                for key, counts in spellings.items()]
+    return journals, links
+
+
+def iter_papers(filename):
+    # 정제 파일을 샤드로 내보냈다면(SOCY_CLEANED_SHARDS=1) 샤드를 병렬로 읽습니다. (sharded_dataset.py)
+    for line in iter_exported_lines(filename):
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+
+# --- 4. 스크립트 실행 ---
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="논문 파일의 저널 표기를 정규화하여 통합 결과와 사전에 없는 주요 저널을 출력")
+    parser.add_argument("--input", default=CLEANED_PAPER_NODE_FILE)
+    parser.add_argument("--top", type=int, default=20, help="출력할 사전에 없는 저널 수")
+    args = parser.parse_args()
+
+    raw_names = Counter(paper_venue(paper) for paper in iter_papers(args.input))
+    raw_names.pop("", None)
+    journals, links = build_journal_rows(iter_papers(args.input))
+    matched = sum(journal["paperCount"] for journal in journals if journal["isTarget"])
+    print(f"저널 표기 {len(raw_names)}종 -> Journal 노드 {len(journals)}개 (논문 {len(links)}편 연결, "
+          f"수집 대상 저널 게재 {matched}편)")
+    unmatched = sorted((journal for journal in journals if not journal["isTarget"]),
+                       key=lambda journal: -journal["paperCount"])[:args.top]
+    if unmatched:
+        print("\n사전에 없는 주요 저널 (CANONICAL_VENUES 추가 검토):")
+        for journal in unmatched:
+            print(f"  {journal['paperCount']:>6}  {journal['name']}")